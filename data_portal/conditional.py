@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""conditional module
+
+Conditional GET of read-only list and detail endpoints, so that polling client, e.g. portal UI refreshing workflow
+list, revalidates its copy with If-None-Match or If-Modified-Since and gets 304 without the query nor serialization.
+
+Validators are from CacheVersion of the model, see cacheversion.model_cache_key(), which the service layer bumps on
+every write to the model table. Hence, 304 costs one indexed lookup. ETag is of the version and the request path with
+its query string, i.e. per filter, page and ordering; Last-Modified is the time of last bump. A write outside the
+service layer, e.g. by hand in database, must bump the model version too, otherwise clients keep their stale copy.
+"""
+import hashlib
+from typing import Optional
+
+from django.utils.http import http_date, parse_http_date_safe, parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from data_portal.models.cacheversion import CacheVersion, model_cache_key
+
+
+class ConditionalGetMixin:
+    """
+    Mixin of ReadOnlyModelViewSet that adds ETag and Last-Modified validators to list and retrieve responses
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional_get(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_get(super().retrieve, request, *args, **kwargs)
+
+    def _conditional_get(self, handler, request, *args, **kwargs):
+        model = self.get_serializer_class().Meta.model
+        version, last_modified = CacheVersion.objects.get_validator(model_cache_key(model))
+
+        etag = _etag(version, request)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if last_modified:
+            headers['Last-Modified'] = http_date(last_modified.timestamp())
+
+        if _not_modified(request, etag, last_modified):
+            return Response(headers=headers, status=status.HTTP_304_NOT_MODIFIED)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            for name, value in headers.items():
+                response[name] = value
+        return response
+
+
+def _etag(version: int, request) -> str:
+    fingerprint = f"{version}|{request.get_full_path()}|{request.accepted_media_type}"
+    return f'"{hashlib.md5(fingerprint.encode()).hexdigest()}"'
+
+
+def _not_modified(request, etag: str, last_modified) -> bool:
+    """
+    If-None-Match, by weak comparison, takes precedence over If-Modified-Since, as of RFC 9110 section 13.1.2. Wildcard
+    If-None-Match is not matched, since the check runs before the record is looked up, i.e. it may not exist
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = [e[2:] if e.startswith('W/') else e for e in parse_etags(if_none_match)]
+        return etag in etags
+
+    if_modified_since: Optional[int] = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    if if_modified_since and last_modified:
+        return int(last_modified.timestamp()) <= if_modified_since
+
+    return False
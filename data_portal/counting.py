@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""counting module
+
+Count strategies for paginated responses of large tables, i.e. S3Object and GDSFile, so that a request does not
+always pay for an exact COUNT(*). Strategy is switched on by PAGINATION_COUNT_STRATEGY setting, i.e. env var
+PORTAL_PAGINATION_COUNT_STRATEGY, and:
+
+    exact       COUNT(*) on every request, as before
+    cached      COUNT(*) once per PAGINATION_COUNT_CACHE_TTL seconds per normalized filter, within the warm container
+    estimate    table statistics row count for unfiltered query, otherwise as of cached
+    has_more    no count, only whether there are more rows after the page, see pagination.CountingPaginator
+
+A count served from cache or statistics may be stale or off, and is flagged approximate in the response.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import QuerySet
+
+MAX_ENTRIES = 1024
+
+
+class CountStrategy:
+    EXACT = 'exact'
+    CACHED = 'cached'
+    ESTIMATE = 'estimate'
+    HAS_MORE = 'has_more'
+
+
+class CountCache:
+    """
+    Bounded TTL cache of exact counts keyed by normalized filter, with hit/miss counters
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, clock: Callable[[], float] = time.monotonic):
+        self._max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict()  # key to (count, expire at)
+        self._lock = threading.Lock()
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def get(self, qs: QuerySet, ttl: int) -> Tuple[int, bool]:
+        """
+        :return: tuple of (count, whether served from cache)
+        """
+        key = normalize(qs)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > self._clock():
+                self.hit_count += 1
+                return entry[0], True
+            self.miss_count += 1
+
+        count = qs.count()
+
+        with self._lock:
+            self._entries[key] = (count, self._clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+        return count, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hit_count = self.miss_count = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'size': len(self._entries), 'hit_count': self.hit_count, 'miss_count': self.miss_count}
+
+
+def normalize(qs: QuerySet) -> str:
+    """
+    Normalized filter of the query set, i.e. its SQL with ordering cleared, as ordering does not change the count
+    """
+    return f"{qs.model._meta.label}|{qs.order_by().query}"
+
+
+def estimate(qs: QuerySet) -> Optional[int]:
+    """
+    Row count from table statistics, only for unfiltered query set
+
+    :return: estimated row count, or None if the query set is filtered or the database has no statistics
+    """
+    if qs.query.where:
+        return None
+
+    table = qs.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [table]
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s ORDER BY idx IS NOT NULL LIMIT 1", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+
+    if row is None or row[0] is None:
+        return None
+    return int(str(row[0]).split()[0])
+
+
+_cache = CountCache()
+
+
+def count(qs: QuerySet, strategy: str) -> Tuple[int, bool]:
+    """
+    :param qs: query set to count
+    :param strategy: CountStrategy, except has_more which is up to the paginator
+    :return: tuple of (count, whether it is approximate)
+    """
+    if strategy == CountStrategy.ESTIMATE:
+        estimated = estimate(qs)
+        if estimated is not None:
+            return estimated, True
+
+    if strategy in (CountStrategy.CACHED, CountStrategy.ESTIMATE):
+        return _cache.get(qs, ttl=settings.PAGINATION_COUNT_CACHE_TTL)
+
+    return qs.count(), False
+
+
+def clear():
+    _cache.clear()
+
+
+def stats() -> dict:
+    return _cache.stats()
@@ -36,6 +36,33 @@ class HashField(models.CharField):
         setattr(instance, self.attname, sha256.hexdigest())
 
 
+class ClassifierField(models.IntegerField):
+    description = ("ClassifierField is related to a base field (other column) in a model and"
+                   "stores its classification for indexed lookup, in place of regex match on the base field.")
+
+    def __init__(self, base_field, classifier, *args, **kwargs):
+        """
+        :param base_field: name of field storing the value to be classified
+        :param classifier: module level function that take the base field value and return int
+        """
+        self.base_field = base_field
+        self.classifier = classifier
+        super(ClassifierField, self).__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['base_field'] = self.base_field
+        kwargs['classifier'] = self.classifier
+        return name, path, args, kwargs
+
+    def pre_save(self, instance, add):
+        self.classify(instance)
+        return super(ClassifierField, self).pre_save(instance, add)
+
+    def classify(self, instance):
+        setattr(instance, self.attname, self.classifier(getattr(instance, self.base_field)))
+
+
 class HashFieldHelper(object):
 
     def __init__(self):
@@ -3,6 +3,10 @@
 
 Meant to run as offline tool to ingest GDS files metadata into Portal database
 
+Upcoming pages are fetched ahead while the current page is bulk upserted. Progress is checkpointed per page into
+--checkpoint file, so re-running the same command resumes an interrupted crawl. Checkpoint file is removed once the
+crawl has completed; remove it to force a crawl from scratch.
+
 Usage:
     aws sso login --profile dev && export AWS_PROFILE=dev
     make up
@@ -10,6 +14,7 @@ Usage:
     python manage.py migrate
     python manage.py help gdscrawler
     python manage.py gdscrawler umccr-temp-data-dev --dry --log
+    python manage.py gdscrawler umccr-temp-data-dev --path "/analysis_data/*" --prefetch 8 --log
 """
 import logging
 from datetime import datetime
@@ -17,9 +22,8 @@ from datetime import datetime
 from django.core.management import BaseCommand, CommandParser
 from libica.app import configuration
 from libica.openapi import libgds
-from libumccr import libdt
 
-from data_processors.gds import services
+from data_processors.gds import crawler
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -29,6 +33,12 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser: CommandParser):
         parser.add_argument('volume', help="GDS volume name")
+        parser.add_argument('-p', '--path', help="GDS path pattern", default="/*")
+        parser.add_argument('--page-size', help="Number of files per page", type=int,
+                            default=crawler.DEFAULT_PAGE_SIZE)
+        parser.add_argument('--prefetch', help="Number of pages fetched ahead of persisting", type=int,
+                            default=crawler.DEFAULT_PREFETCH)
+        parser.add_argument('-c', '--checkpoint', help="Checkpoint file, default to gdscrawler-<volume>.checkpoint")
         parser.add_argument('-d', '--dry', help="Dry run", action="store_true")
         parser.add_argument('-l', '--log', help="Output to log file", action="store_true")
 
@@ -44,52 +54,27 @@ class Command(BaseCommand):
             logger.addHandler(log_file)
 
         gds_volume = opt_volume
+        checkpoint_path = options['checkpoint'] if options['checkpoint'] else f"gdscrawler-{gds_volume}.checkpoint"
 
         with libgds.ApiClient(configuration(libgds)) as gds_client:
             files_api = libgds.FilesApi(gds_client)
-            try:
-                logger.info(f"Crawling files metadata from volume gds://{gds_volume}")
-
-                uin = input("WARNING: this process may take time. Continue? (y or n): ")
-                if uin != 'y':
-                    logger.info("Abort upon user request")
-                    exit(0)
-
-                cnt = 0
-                page_token = None
-                volume_name = [f"{gds_volume}", ]
-                output_path = ["/*", ]
-                while True:
-                    file_list: libgds.FileListResponse = files_api.list_files(
-                        volume_name=volume_name,
-                        path=output_path,
-                        page_size=1000,
-                        page_token=page_token,
-                    )
-
-                    for item in file_list.items:
-                        file: libgds.FileResponse = item
-
-                        # transform back into REST style representation
-                        file_rest_repr = {}
-                        for k, v in file.attribute_map.items():
-                            item = getattr(file, k)
-                            if isinstance(item, datetime):
-                                item = libdt.serializable_datetime(item)
-                            file_rest_repr[v] = item
-
-                        if opt_dry:
-                            logger.info(f"gds://{file.volume_name}{file.path}")
-                        else:
-                            services.create_or_update_gds_file(file_rest_repr)
-                        cnt += 1
-
-                    page_token = file_list.next_page_token
-                    if not file_list.next_page_token:
-                        break
-
-                # end while
-                logger.info(f"Total {cnt} files have been crawled from gds://{gds_volume}")
-
-            except libgds.ApiException as e:
-                logger.error(f"Exception - {e}")
+
+            logger.info(f"Crawling files metadata from volume gds://{gds_volume}{options['path']}")
+
+            uin = input("WARNING: this process may take time. Continue? (y or n): ")
+            if uin != 'y':
+                logger.info("Abort upon user request")
+                exit(0)
+
+            results = crawler.crawl_gds_files(
+                files_api=files_api,
+                volume_name=gds_volume,
+                path=options['path'],
+                page_size=options['page_size'],
+                prefetch=options['prefetch'],
+                checkpoint_path=checkpoint_path,
+                dry=opt_dry,
+            )
+
+            logger.info(f"Total {results['crawled_count']} files have been crawled from gds://{gds_volume}: "
+                        f"{dict(results)}")
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""importtime
+
+Meant to run as offline tool to guard lambda cold start. It imports each lambda handler module of serverless.yml in a
+fresh interpreter with `python -X importtime` and compares its cumulative import time against the function budget
+declared in serverless.yml custom.importTimeBudget (milliseconds). Import time is the bulk of cold start before the
+handler runs, i.e. django.setup(), models and, whatever heavy modules the handler module pulls in at top level.
+
+Budgets are measured on developer machine with local or it settings, so that settings do not hit SSM. Treat them as
+relative guard against regression, e.g. someone importing pandas at top level of a handler that never uses it. Hence,
+heavy modules that only some code paths need, i.e. pandas, gspread and sample_sheet, are imported inside the function
+that uses them.
+
+Import time differs by machine, therefore, budgets are scaled by the import time of the reference module, i.e.
+serverless.yml custom.importTimeReference, on this machine over that of the machine where budgets were measured. On
+top of it, --headroom allows for run to run noise. Command exits with error if any handler module is over its budget.
+CI runs it after the test suite, see buildspec.yml. Do not run it alongside other load on the machine, e.g. the test
+suite, since contended CPU inflates the measured import times and, handlers then fail their budgets.
+
+Usage:
+    export DJANGO_SETTINGS_MODULE=data_portal.settings.it PORTAL_DB_URL=sqlite:////tmp/portal.sqlite3
+    python manage.py help importtime
+    python manage.py importtime
+    python manage.py importtime -f sqs_s3_event_processor -f sqs_gds_event_processor --top 20
+"""
+import logging
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import List, Tuple
+
+import yaml
+from django.conf import settings
+from django.core.management import BaseCommand, CommandParser, CommandError
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SERVERLESS_YML = os.path.join(os.path.dirname(settings.BASE_DIR), "serverless.yml")
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def get_handler_modules(serverless_yml: str = SERVERLESS_YML) -> Tuple[dict, dict, dict]:
+    """
+    :return: function name to handler module, function name to import time budget (ms), and reference module of the
+        budgets as dict of module and ms
+    """
+    with open(serverless_yml) as f:
+        sls = yaml.safe_load(f)
+
+    handler_modules = {}
+    for name, function in sls['functions'].items():
+        module = function['handler'].rsplit(".", 1)[0]
+        if module == "wsgi_handler":
+            # serverless-wsgi generated handler, it imports the WSGI app
+            module = sls['custom']['wsgi']['app'].rsplit(".", 1)[0]
+        handler_modules[name] = module
+
+    return handler_modules, sls['custom'].get('importTimeBudget', {}), sls['custom'].get('importTimeReference', {})
+
+
+def measure_import_time(module: str, repeat: int = 3) -> Tuple[float, List[Tuple[float, str]]]:
+    """
+    Import module in fresh interpreter, best of repeat runs
+
+    :return: cumulative import time (ms), and direct imports of the module as (cumulative ms, package) descending
+    """
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=os.path.dirname(settings.BASE_DIR),
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise CommandError(f"Failed importing {module}:\n{proc.stderr[-2000:]}")
+
+        entries = []
+        for line in proc.stderr.splitlines():
+            match = IMPORT_TIME_LINE.match(line)
+            if match:
+                entries.append((int(match.group(2)) / 1000, len(match.group(3)), match.group(4)))
+
+        # top level entries are the module and its parent packages, the rest are interpreter startup i.e. site
+        total = sum(c for c, depth, pkg in entries if depth == 1 and (pkg == module or module.startswith(f"{pkg}.")))
+        if best is None or total < best[0]:
+            best = (total, sorted([(c, pkg) for c, depth, pkg in entries if depth == 3], reverse=True))
+
+    return best
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument('-f', '--function', help="Lambda function name in serverless.yml, default all",
+                            action="append")
+        parser.add_argument('-r', '--repeat', help="Number of runs per handler module, best is taken", type=int,
+                            default=3)
+        parser.add_argument('--top', help="Number of the most expensive imports to print per handler module",
+                            type=int, default=0)
+        parser.add_argument('--headroom', help="Percentage over the scaled budget that is still within budget",
+                            type=int, default=20)
+
+    def handle(self, *args, **options):
+        if settings.SETTINGS_MODULE.startswith("data_portal.settings.aws"):
+            raise CommandError("Use local or it settings, aws settings fetch secrets from SSM upon import")
+
+        handler_modules, budgets, reference = get_handler_modules()
+
+        functions = options['function'] or list(handler_modules.keys())
+        unknown = set(functions) - set(handler_modules.keys())
+        if unknown:
+            raise CommandError(f"Unknown function: {sorted(unknown)}")
+
+        module_functions = defaultdict(list)
+        for name in functions:
+            module_functions[handler_modules[name]].append(name)
+
+        scale = 1.0
+        if reference:
+            reference_total, _ = measure_import_time(reference['module'], repeat=options['repeat'])
+            scale = reference_total / reference['ms']
+            logger.info(f"Reference {reference['module']} {reference_total:.0f}ms / {reference['ms']}ms, "
+                        f"scale budgets by {scale:.2f}")
+        scale *= 1 + options['headroom'] / 100
+
+        over_budget = []
+        for module, names in module_functions.items():
+            total, children = measure_import_time(module, repeat=options['repeat'])
+
+            for name in names:
+                budget = budgets.get(name)
+                limit = None if budget is None else budget * scale
+                status = "NO BUDGET" if limit is None else "OK" if total <= limit else "OVER BUDGET"
+                logger.info(f"{name:<48} {module:<64} {total:>8.0f}ms / {limit or 0:.0f}ms {status}")
+                if limit is not None and total > limit:
+                    over_budget.append(name)
+
+            for cumulative, pkg in children[:options['top']]:
+                logger.info(f"    {cumulative:>8.0f}ms {pkg}")
+
+        if over_budget:
+            raise CommandError(f"Import time over budget: {over_budget}")
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""pathtoken
+
+Meant to run as offline tool to backfill path token index of S3Object and GDSFile rows, that have been ingested before
+the index existed. Ingest keeps the index up-to-date afterward. Token lookup is turned on by PATH_TOKEN_LOOKUP setting,
+i.e. env var PORTAL_PATH_TOKEN_LOOKUP=true, once this has completed for both tables. Backfill is idempotent and, can
+resume from the last id logged with --start-after-id.
+Typically, we run this on EC2 instance that has access to RDS database in Private Subnet.
+
+Usage:
+    aws sso login --profile dev && export AWS_PROFILE=dev
+    make up
+    export DJANGO_SETTINGS_MODULE=data_portal.settings.local
+    python manage.py migrate
+    python manage.py help pathtoken
+    python manage.py pathtoken s3 --dry
+    python manage.py pathtoken s3 --log
+    python manage.py pathtoken gds --start-after-id 1234567 --log
+"""
+import logging
+from datetime import datetime
+
+from django.core.management import BaseCommand, CommandParser
+
+from data_portal.models.pathtoken import S3ObjectPathToken, GDSFilePathToken, BULK_BATCH_SIZE
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+TOKEN_MODELS = {
+    's3': S3ObjectPathToken,
+    'gds': GDSFilePathToken,
+}
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument('table', help="Which table to backfill", choices=TOKEN_MODELS.keys())
+        parser.add_argument('--start-after-id', help="Resume after this S3Object or GDSFile id", type=int, default=0)
+        parser.add_argument('-c', '--chunk-size', help="Number of rows per chunk", type=int, default=BULK_BATCH_SIZE)
+        parser.add_argument('-d', '--dry', help="Dry run", action="store_true")
+        parser.add_argument('-l', '--log', help="Output to log file", action="store_true")
+        parser.add_argument('--log-every', help="Log progress every N chunks", type=int, default=100)
+
+    def handle(self, *args, **options):
+        token_model = TOKEN_MODELS[options['table']]
+
+        if options['log']:
+            log_file = logging.FileHandler("pathtoken-{}.log".format(datetime.now().strftime("%Y%m%d%H%M%S")))
+            log_file.setLevel(logging.INFO)
+            log_file.setFormatter(logging.Formatter("%(asctime)s %(name)-12s %(levelname)-8s %(message)s"))
+            logger.addHandler(log_file)
+
+        uin = input("WARNING: this process may take time. Continue? (y or n): ")
+
+        if uin == 'y':
+            progress = None
+            for i, progress in enumerate(token_model.backfill(
+                    start_after_id=options['start_after_id'],
+                    chunk_size=options['chunk_size'],
+                    dry=options['dry'],
+            )):
+                if i % options['log_every'] == 0:
+                    logger.info(f"Backfilling {token_model.__name__}: {progress}")
+
+            logger.info(f"Backfilled {token_model.__name__}{' (dry run)' if options['dry'] else ''}: {progress}")
+        else:
+            logger.info("Abort upon user request")
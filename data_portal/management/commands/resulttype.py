@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""resulttype
+
+Meant to run as offline tool to backfill result_pipeline and result_type columns of S3Object and GDSFile rows, that
+have been ingested before the columns existed. Ingest classifies rows afterward. Lookup on the columns is turned on by
+RESULT_TYPE_LOOKUP setting, i.e. env var PORTAL_RESULT_TYPE_LOOKUP=true, once this has completed for both tables.
+Backfill is idempotent, i.e. re-run after classifier rules changed updates stale rows only, and can resume from the
+last id logged with --start-after-id.
+Typically, we run this on EC2 instance that has access to RDS database in Private Subnet.
+
+Usage:
+    aws sso login --profile dev && export AWS_PROFILE=dev
+    make up
+    export DJANGO_SETTINGS_MODULE=data_portal.settings.local
+    python manage.py migrate
+    python manage.py help resulttype
+    python manage.py resulttype s3 --dry
+    python manage.py resulttype s3 --log
+    python manage.py resulttype gds --start-after-id 1234567 --log
+"""
+import logging
+from datetime import datetime
+
+from django.core.management import BaseCommand, CommandParser
+
+from data_portal.models.gdsfile import GDSFile
+from data_portal.models.resulttype import backfill, BULK_BATCH_SIZE
+from data_portal.models.s3object import S3Object
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+MODELS = {
+    's3': S3Object,
+    'gds': GDSFile,
+}
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument('table', help="Which table to backfill", choices=MODELS.keys())
+        parser.add_argument('--start-after-id', help="Resume after this S3Object or GDSFile id", type=int, default=0)
+        parser.add_argument('-c', '--chunk-size', help="Number of rows per chunk", type=int, default=BULK_BATCH_SIZE)
+        parser.add_argument('-d', '--dry', help="Dry run", action="store_true")
+        parser.add_argument('-l', '--log', help="Output to log file", action="store_true")
+        parser.add_argument('--log-every', help="Log progress every N chunks", type=int, default=100)
+
+    def handle(self, *args, **options):
+        model = MODELS[options['table']]
+
+        if options['log']:
+            log_file = logging.FileHandler("resulttype-{}.log".format(datetime.now().strftime("%Y%m%d%H%M%S")))
+            log_file.setLevel(logging.INFO)
+            log_file.setFormatter(logging.Formatter("%(asctime)s %(name)-12s %(levelname)-8s %(message)s"))
+            logger.addHandler(log_file)
+
+        uin = input("WARNING: this process may take time. Continue? (y or n): ")
+
+        if uin == 'y':
+            progress = None
+            for i, progress in enumerate(backfill(
+                    model,
+                    start_after_id=options['start_after_id'],
+                    chunk_size=options['chunk_size'],
+                    dry=options['dry'],
+            )):
+                if i % options['log_every'] == 0:
+                    logger.info(f"Backfilling {model.__name__}: {progress}")
+
+            logger.info(f"Backfilled {model.__name__}{' (dry run)' if options['dry'] else ''}: {progress}")
+        else:
+            logger.info("Abort upon user request")
@@ -5,6 +5,13 @@ Meant to run one time, offline tool to index S3 objects.
 Typically, we run this on EC2 instance that has access to RDS database in Private Subnet.
 Otherwise, locally as an example shown below.
 
+Keyspace is split into "/" delimited prefix shards that are listed concurrently. Progress is checkpointed per shard
+into --checkpoint-dir, so re-running the same command resumes an interrupted crawl. Checkpoint files are removed once
+all shards have completed; remove the directory to force a crawl from scratch.
+
+With --reconcile, S3Object rows of the bucket are merge-joined against the S3 listing instead. Objects missing from db
+are inserted, changed objects updated and, rows of objects no longer in S3 deleted.
+
 Usage:
     aws sso login --profile dev && export AWS_PROFILE=dev
     make up
@@ -13,14 +20,15 @@ Usage:
     python manage.py help s3crawler
     python manage.py s3crawler umccr-temp-dev --dry --log
     python manage.py s3crawler umccr-temp-dev --key some/folder/ --dry --log
+    python manage.py s3crawler umccr-temp-dev --workers 16 --batch-size 5000 --shard-depth 2 --log
+    python manage.py s3crawler umccr-temp-dev --reconcile --dry --log
 """
 import logging
 from datetime import datetime
 
 from django.core.management import BaseCommand, CommandParser
-from libumccr.aws import libs3
 
-from data_processors.s3 import services
+from data_processors.s3 import crawler
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -33,6 +41,21 @@ class Command(BaseCommand):
         parser.add_argument('-k', '--key', help="S3 key prefix")
         parser.add_argument('-d', '--dry', help="Dry run", action="store_true")
         parser.add_argument('-l', '--log', help="Output to log file", action="store_true")
+        parser.add_argument('-w', '--workers', help="Number of shards listed concurrently", type=int,
+                            default=crawler.DEFAULT_WORKERS)
+        parser.add_argument('-b', '--batch-size', help="Number of S3 objects per bulk upsert", type=int,
+                            default=crawler.DEFAULT_BATCH_SIZE)
+        parser.add_argument('-s', '--shard-depth', help="Number of key prefix levels to split into shards", type=int,
+                            default=crawler.DEFAULT_SHARD_DEPTH)
+        parser.add_argument('-c', '--checkpoint-dir', help="Shard checkpoint directory",
+                            default="s3crawler-checkpoint")
+        parser.add_argument('-r', '--reconcile', help="Reconcile db with S3 listing, including deletes",
+                            action="store_true")
+        parser.add_argument('--chunk-size', help="Number of db rows fetched at a time in reconcile", type=int,
+                            default=crawler.DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--sort-chunk-size', help="Number of db rows per sorted run in reconcile, on MySQL",
+                            type=int, default=crawler.DEFAULT_SORT_CHUNK_SIZE)
+        parser.add_argument('--tmp-dir', help="Directory of sorted runs in reconcile")
 
     def handle(self, *args, **options):
         opt_bucket = options['bucket']
@@ -53,32 +76,33 @@ class Command(BaseCommand):
 
         uin = input("WARNING: this process may take time and API request cost. Continue? (y or n): ")
 
-        if uin == 'y':
-            cnt = 0
-            batch_list = []
-            for obj in libs3.get_matching_s3_objects(bucket, prefix=key_prefix):
-                if opt_dry:
-                    logger.info(f"s3://{bucket}/{obj['Key']}")
-                else:
-                    batch_list.append(
-                        services.persist_s3_object(
-                            bucket=bucket,
-                            key=obj['Key'],
-                            last_modified_date=obj['LastModified'],
-                            e_tag=str(obj['ETag'][1:-1]),
-                            size=int(obj['Size']),
-                        )
-                    )
-
-                    if len(batch_list) == 10:
-                        services.persist_s3_object_bulk(batch_list)
-                        batch_list.clear()
-
-                cnt += 1
-
-            # any remainder in the last batch
-            services.persist_s3_object_bulk(batch_list)
-
-            logger.info(f"Total {cnt} objects have been indexd from s3://{bucket}/{key_prefix}")
+        if uin == 'y' and options['reconcile']:
+            results = crawler.reconcile_s3_objects(
+                bucket=bucket,
+                prefix=key_prefix,
+                batch_size=options['batch_size'],
+                chunk_size=options['chunk_size'],
+                sort_chunk_size=options['sort_chunk_size'],
+                tmp_dir=options['tmp_dir'],
+                dry=opt_dry,
+            )
+
+            logger.info(f"Reconciled s3://{bucket}/{key_prefix}: {dict(results)}")
+        elif uin == 'y':
+            results = crawler.crawl_s3_objects(
+                bucket=bucket,
+                prefix=key_prefix,
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+                shard_depth=options['shard_depth'],
+                checkpoint_dir=options['checkpoint_dir'],
+                dry=opt_dry,
+            )
+
+            logger.info(f"Total {results['indexed_count']} objects have been indexed from s3://{bucket}/{key_prefix}")
+            logger.info(f"Shards: {dict(results)}")
+
+            if results['failed_shard_count']:
+                logger.warning("Some shards have failed, re-run the same command to resume from checkpoint")
         else:
             logger.info("Abort upon user request")
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""s3inventory
+
+Meant to run as offline tool to index S3 objects from S3 Inventory report, instead of listing the bucket through API.
+Typically, we run this on EC2 instance that has access to RDS database in Private Subnet.
+Otherwise, locally as an example shown below.
+
+Download the inventory manifest and data files of the day, keeping the layout of inventory destination prefix, i.e.
+    aws s3 sync s3://<inventory-bucket>/<source-bucket>/<config-id>/2024-10-16T01-00Z/ inventory/2024-10-16T01-00Z/
+    aws s3 sync s3://<inventory-bucket>/<source-bucket>/<config-id>/data/ inventory/data/
+
+Without --reconcile, objects are upserted only. With --reconcile, rows of objects not in the inventory are also deleted,
+unless they have been modified since the inventory was taken.
+
+Usage:
+    aws sso login --profile dev && export AWS_PROFILE=dev
+    make up
+    export DJANGO_SETTINGS_MODULE=data_portal.settings.local
+    python manage.py migrate
+    python manage.py help s3inventory
+    python manage.py s3inventory inventory/2024-10-16T01-00Z/manifest.json --dry --log
+    python manage.py s3inventory inventory/2024-10-16T01-00Z/manifest.json --reconcile --log
+"""
+import logging
+from datetime import datetime
+
+from django.core.management import BaseCommand, CommandParser
+
+from data_processors.s3 import inventory, crawler
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument('manifest', help="Local path to S3 Inventory manifest.json")
+        parser.add_argument('--data-dir', help="Local directory of S3 Inventory data files, if not next to manifest")
+        parser.add_argument('-r', '--reconcile', help="Reconcile db with inventory, including deletes",
+                            action="store_true")
+        parser.add_argument('-b', '--batch-size', help="Number of S3 objects per bulk upsert", type=int,
+                            default=inventory.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--chunk-size', help="Number of db rows fetched at a time in reconcile", type=int,
+                            default=crawler.DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--sort-chunk-size', help="Number of objects per sorted run in reconcile", type=int,
+                            default=crawler.DEFAULT_SORT_CHUNK_SIZE)
+        parser.add_argument('--tmp-dir', help="Directory of sorted runs in reconcile")
+        parser.add_argument('-d', '--dry', help="Dry run", action="store_true")
+        parser.add_argument('-l', '--log', help="Output to log file", action="store_true")
+
+    def handle(self, *args, **options):
+        opt_manifest = options['manifest']
+        opt_dry = options['dry']
+        opt_log = options['log']
+
+        if opt_log:
+            log_file = logging.FileHandler("s3inventory-{}.log".format(datetime.now().strftime("%Y%m%d%H%M%S")))
+            log_file.setLevel(logging.INFO)
+            log_file.setFormatter(logging.Formatter("%(asctime)s %(name)-12s %(levelname)-8s %(message)s"))
+            logger.addHandler(log_file)
+
+        manifest = inventory.InventoryManifest(opt_manifest, data_dir=options['data_dir'])
+
+        logger.info(f"Importing S3 Inventory of bucket ({manifest.source_bucket}) taken at ({manifest.creation_time}), "
+                    f"{len(manifest.data_files)} {manifest.file_format} data files")
+
+        uin = input("WARNING: this process may take time. Continue? (y or n): ")
+
+        if uin == 'y':
+            results = inventory.import_inventory(
+                manifest=manifest,
+                reconcile=options['reconcile'],
+                batch_size=options['batch_size'],
+                chunk_size=options['chunk_size'],
+                sort_chunk_size=options['sort_chunk_size'],
+                tmp_dir=options['tmp_dir'],
+                dry=opt_dry,
+            )
+
+            logger.info(f"Imported S3 Inventory of s3://{manifest.source_bucket}: {dict(results)}")
+        else:
+            logger.info("Abort upon user request")
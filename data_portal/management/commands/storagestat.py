@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""storagestat
+
+Meant to run as offline tool to rebuild materialized storage stats, i.e. per S3 bucket and per GDS volume counters of
+StorageStat, in full from S3Object and GDSFile tables. Sync services keep the counters up-to-date incrementally
+afterward. Stats lookup is turned on by STORAGE_STATS_LOOKUP setting, i.e. env var PORTAL_STORAGE_STATS_LOOKUP=true,
+once this has completed for all sources. Rebuild is idempotent and, can be rerun any time to correct drift, preferably
+when sync is quiet, as counter changes made while it is scanning are overwritten.
+Typically, we run this on EC2 instance that has access to RDS database in Private Subnet.
+
+Usage:
+    aws sso login --profile dev && export AWS_PROFILE=dev
+    make up
+    export DJANGO_SETTINGS_MODULE=data_portal.settings.local
+    python manage.py migrate
+    python manage.py help storagestat
+    python manage.py storagestat
+    python manage.py storagestat s3 --log
+    python manage.py storagestat counter
+"""
+import logging
+from datetime import datetime
+
+from django.core.management import BaseCommand, CommandParser
+
+from data_portal.models.storagestat import StorageStat, StorageStatSource
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument('source', help="Which source to rebuild, all if omitted", nargs='?',
+                            choices=StorageStatSource.values)
+        parser.add_argument('-l', '--log', help="Output to log file", action="store_true")
+
+    def handle(self, *args, **options):
+        sources = [options['source']] if options['source'] else StorageStatSource.values
+
+        if options['log']:
+            log_file = logging.FileHandler("storagestat-{}.log".format(datetime.now().strftime("%Y%m%d%H%M%S")))
+            log_file.setLevel(logging.INFO)
+            log_file.setFormatter(logging.Formatter("%(asctime)s %(name)-12s %(levelname)-8s %(message)s"))
+            logger.addHandler(log_file)
+
+        uin = input("WARNING: this process may take time. Continue? (y or n): ")
+
+        if uin == 'y':
+            for source in sources:
+                row_count = StorageStat.objects.rebuild(source)
+                logger.info(f"Rebuilt StorageStat of {source}: {row_count} rows")
+        else:
+            logger.info("Abort upon user request")
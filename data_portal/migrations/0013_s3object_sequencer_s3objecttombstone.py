@@ -0,0 +1,30 @@
+# Generated by Django 5.1.2 on 2026-10-16 23:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_portal", "0012_analysisresult"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="s3object",
+            name="sequencer",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.CreateModel(
+            name="S3ObjectTombstone",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("unique_hash", models.CharField(max_length=64, unique=True)),
+                ("sequencer", models.CharField(blank=True, max_length=255, null=True)),
+                ("event_time", models.DateTimeField()),
+            ],
+            options={
+                "indexes": [models.Index(fields=["event_time"], name="data_portal_event_t_465d87_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.2 on 2026-10-17 00:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_portal', '0013_s3object_sequencer_s3objecttombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GDSFilePathToken',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('type', models.IntegerField(choices=[(1, 'subject'), (2, 'library'), (3, 'sample'), (4, 'portal_run')])),
+                ('token', models.CharField(max_length=255)),
+                ('gdsfile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='path_tokens', to='data_portal.gdsfile')),
+            ],
+            options={
+                'unique_together': {('type', 'token', 'gdsfile')},
+            },
+        ),
+        migrations.CreateModel(
+            name='S3ObjectPathToken',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('type', models.IntegerField(choices=[(1, 'subject'), (2, 'library'), (3, 'sample'), (4, 'portal_run')])),
+                ('token', models.CharField(max_length=255)),
+                ('s3object', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='path_tokens', to='data_portal.s3object')),
+            ],
+            options={
+                'unique_together': {('type', 'token', 's3object')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-17 00:36
+
+import data_portal.fields
+import data_portal.models.resulttype
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_portal', '0014_pathtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gdsfile',
+            name='result_pipeline',
+            field=data_portal.fields.ClassifierField(base_field='path', blank=True, classifier=data_portal.models.resulttype.gds_result_pipeline, null=True),
+        ),
+        migrations.AddField(
+            model_name='gdsfile',
+            name='result_type',
+            field=data_portal.fields.ClassifierField(base_field='path', blank=True, classifier=data_portal.models.resulttype.gds_result_type, null=True),
+        ),
+        migrations.AddField(
+            model_name='s3object',
+            name='result_pipeline',
+            field=data_portal.fields.ClassifierField(base_field='key', blank=True, classifier=data_portal.models.resulttype.s3_result_pipeline, null=True),
+        ),
+        migrations.AddField(
+            model_name='s3object',
+            name='result_type',
+            field=data_portal.fields.ClassifierField(base_field='key', blank=True, classifier=data_portal.models.resulttype.s3_result_type, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='gdsfile',
+            index=models.Index(fields=['result_pipeline', 'result_type'], name='data_portal_result__2d2a89_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='s3object',
+            index=models.Index(fields=['result_pipeline', 'result_type'], name='data_portal_result__63e591_idx'),
+        ),
+    ]
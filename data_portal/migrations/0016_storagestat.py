@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_portal', '0015_resulttype'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageStat',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('source', models.CharField(choices=[('s3', 'S3 bucket'), ('gds', 'GDS volume'), ('counter', 'Counter')], max_length=16)),
+                ('name', models.CharField(max_length=255)),
+                ('object_count', models.BigIntegerField(default=0)),
+                ('total_bytes', models.BigIntegerField(default=0)),
+                ('last_refreshed', models.DateTimeField(blank=True, null=True)),
+                ('last_updated', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('source', 'name')},
+            },
+        ),
+    ]
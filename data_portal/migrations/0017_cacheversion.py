@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_portal', '0016_storagestat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-17 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_portal', '0017_cacheversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cacheversion',
+            name='last_modified',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
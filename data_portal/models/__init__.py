@@ -18,3 +18,6 @@ from .sequence import Sequence
 from .sequencerun import SequenceRun
 from .workflow import Workflow
 from .analysisresult import AnalysisResult
+from .pathtoken import S3ObjectPathToken, GDSFilePathToken
+from .storagestat import StorageStat
+from .cacheversion import CacheVersion
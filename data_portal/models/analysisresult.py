@@ -2,6 +2,7 @@ from django.db import models
 from django.db.models import QuerySet
 
 from data_portal.models import S3Object, GDSFile
+from data_portal.models.cacheversion import CacheVersion, subject_cache_key
 
 
 class PlatformGeneration(models.IntegerChoices):
@@ -66,6 +67,8 @@ class AnalysisResultManager(models.Manager):
             result.gdsfiles.add(*gdsfiles)
         result.save()
 
+        CacheVersion.objects.bump([subject_cache_key(lookup.key)])
+
 
 class AnalysisResult(models.Model):
     """
@@ -33,6 +33,7 @@ class PortalBaseManager(models.Manager):
             api_settings.ORDERING_PARAM,
             PaginationConstant.PAGE,
             PaginationConstant.ROWS_PER_PAGE,
+            PaginationConstant.CURSOR,
             "sortCol",
             "sortAsc",
         ])
@@ -0,0 +1,67 @@
+from typing import Iterable
+
+from django.db import models
+from django.db.models import F
+from django.utils.timezone import now
+
+from data_portal.models.pathtoken import PathTokenType, tokenize
+
+
+def subject_cache_key(subject_id: str) -> str:
+    return f"subject:{subject_id.upper()}"
+
+
+def subject_cache_keys(paths: Iterable[str]) -> set:
+    """
+    :param paths: S3 object keys or GDS paths
+    :return: cache keys of subjects found in the paths, see pathtoken.tokenize()
+    """
+    return {
+        subject_cache_key(token) for path in paths
+        for token_type, token in tokenize(path) if token_type == PathTokenType.SUBJECT
+    }
+
+
+def model_cache_key(model) -> str:
+    """
+    :param model: model class
+    :return: cache key of list and detail responses of the model, see data_portal.conditional
+    """
+    return f"model:{model._meta.label_lower}"
+
+
+class CacheVersionManager(models.Manager):
+
+    def get_version(self, key: str) -> int:
+        return self.filter(key=key).values_list('version', flat=True).first() or 0
+
+    def get_validator(self, key: str) -> tuple:
+        """
+        :return: tuple of (version, last modified) of the key, (0, None) if it has not been bumped yet
+        """
+        return self.filter(key=key).values_list('version', 'last_modified').first() or (0, None)
+
+    def bump(self, keys: Iterable[str]):
+        """
+        Invalidate cached responses of the given keys, by version increment. Key without version row yet starts at 1.
+        """
+        keys = sorted(set(keys))  # consistent lock order between concurrent sync
+        if not keys:
+            return
+
+        self.bulk_create([CacheVersion(key=key) for key in keys], ignore_conflicts=True)
+        self.filter(key__in=keys).update(version=F('version') + 1, last_modified=now())
+
+
+class CacheVersion(models.Model):
+    """
+    Version of cached API response, e.g. subject page, that lives in another process, i.e. per Lambda container. Writer
+    such as S3 event sync bumps the version of what it has changed and, reader serves its cached response only while
+    the version it was cached at is still current. Hence, invalidation costs one indexed lookup per read.
+    """
+    id = models.BigAutoField(primary_key=True)
+    key = models.CharField(max_length=255, unique=True)
+    version = models.BigIntegerField(default=0)
+    last_modified = models.DateTimeField(null=True, blank=True)
+
+    objects = CacheVersionManager()
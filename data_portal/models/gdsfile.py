@@ -1,13 +1,49 @@
 import logging
 
+from django.conf import settings
 from django.db import models
 from django.db.models import QuerySet, Q
 
-from data_portal.fields import HashField
+from data_portal.fields import ClassifierField, HashField
+from data_portal.models.pathtoken import GDSFilePathToken
+from data_portal.models.resulttype import ResultPipeline, gds_result_pipeline, gds_result_type, pipeline_mask_values
 
 logger = logging.getLogger(__name__)
 
 
+def _results_regex_q() -> Q:
+    bam = Q(path__iregex='wgs') & Q(path__iregex='tumor') & Q(path__iregex='normal') & Q(path__iregex='.bam$')
+    vcf = (Q(path__iregex=r'umccrise/[^\/]*/[^\/]*/[^(work)*]')
+           & Q(path__iregex=r'small_variants/[^\/]*(.vcf.gz$|.maf$)'))
+
+    vcf_germline = (
+            Q(path__iregex='[umccrise|wgs_tumor_normal]')
+            & Q(path__iregex='dragen_germline')
+            & Q(path__iregex='.vcf.gz$')
+    )
+
+    cancer = Q(path__iregex='umccrise') & Q(path__iregex='cancer_report.html$')
+    qc = Q(path__iregex='umccrise') & Q(path__iregex='multiqc_report.html$')
+    pcgr = Q(path__iregex=r'umccrise/[^\/]*/[^\/]*/[^\/]*/[^\/]*(pcgr|cpsr).html$')
+    coverage = Q(path__iregex='umccrise') & Q(path__iregex='(normal|tumor).cacao.html$')
+    circos = (Q(path__iregex=r'umccrise/[^\/]*/[^\/]*/[^(work)*]') & Q(path__iregex='purple/')
+              & Q(path__iregex='circos') & Q(path__iregex='baf') & Q(path__iregex='.png$'))
+
+    wts_bam = Q(path__iregex='wts') & Q(path__iregex='tumor') & Q(path__iregex='.bam$')
+    wts_qc = Q(path__iregex='wts') & Q(path__iregex='tumor') & Q(path__iregex='multiqc') & Q(path__iregex='.html$')
+    wts_fusions = Q(path__iregex='wts') & Q(path__iregex='fusions') & Q(path__iregex='.pdf$')
+    rnasum = Q(path__iregex='rnasum') & Q(path__iregex='RNAseq_report.html$')
+
+    gpl = Q(path__iregex='gridss_purple_linx') & Q(path__iregex='linx.html$')
+
+    tso_ctdna_bam = Q(path__iregex='tso') & Q(path__iregex='ctdna') & Q(path__iregex='.bam$')
+    tso_ctdna_vcf = Q(path__iregex='tso') & Q(path__iregex='ctdna') & Q(path__iregex='.vcf.gz$')
+    tso_ctdna_tsv = Q(path__iregex='tso') & Q(path__iregex='ctdna') & Q(path__iregex='.tsv$')
+
+    return (bam | vcf | vcf_germline | cancer | qc | pcgr | coverage | circos | wts_bam | wts_qc
+            | wts_fusions | rnasum | gpl | tso_ctdna_bam | tso_ctdna_vcf | tso_ctdna_tsv)
+
+
 class GDSFileManager(models.Manager):
 
     def get_by_keyword(self, **kwargs) -> QuerySet:
@@ -19,49 +55,21 @@ class GDSFileManager(models.Manager):
 
         subject = kwargs.get('subject', None)
         if subject:
-            qs = qs.filter(path__icontains=subject)
+            qs = qs.filter(GDSFilePathToken.contains_q(subject))
 
         run = kwargs.get('run', None)
         if run:
-            qs = qs.filter(path__icontains=run)
+            qs = qs.filter(GDSFilePathToken.contains_q(run))
 
         return qs
 
     def get_subject_results(self, subject_id: str, **kwargs):
-        qs: QuerySet = self.filter(path__icontains=subject_id)
+        qs: QuerySet = self.filter(GDSFilePathToken.contains_q(subject_id))
 
-        bam = Q(path__iregex='wgs') & Q(path__iregex='tumor') & Q(path__iregex='normal') & Q(path__iregex='.bam$')
-        vcf = (Q(path__iregex=r'umccrise/[^\/]*/[^\/]*/[^(work)*]')
-               & Q(path__iregex=r'small_variants/[^\/]*(.vcf.gz$|.maf$)'))
-
-        vcf_germline = (
-                Q(path__iregex='[umccrise|wgs_tumor_normal]')
-                & Q(path__iregex='dragen_germline')
-                & Q(path__iregex='.vcf.gz$')
-        )
-
-        cancer = Q(path__iregex='umccrise') & Q(path__iregex='cancer_report.html$')
-        qc = Q(path__iregex='umccrise') & Q(path__iregex='multiqc_report.html$')
-        pcgr = Q(path__iregex=r'umccrise/[^\/]*/[^\/]*/[^\/]*/[^\/]*(pcgr|cpsr).html$')
-        coverage = Q(path__iregex='umccrise') & Q(path__iregex='(normal|tumor).cacao.html$')
-        circos = (Q(path__iregex=r'umccrise/[^\/]*/[^\/]*/[^(work)*]') & Q(path__iregex='purple/')
-                  & Q(path__iregex='circos') & Q(path__iregex='baf') & Q(path__iregex='.png$'))
-
-        wts_bam = Q(path__iregex='wts') & Q(path__iregex='tumor') & Q(path__iregex='.bam$')
-        wts_qc = Q(path__iregex='wts') & Q(path__iregex='tumor') & Q(path__iregex='multiqc') & Q(path__iregex='.html$')
-        wts_fusions = Q(path__iregex='wts') & Q(path__iregex='fusions') & Q(path__iregex='.pdf$')
-        rnasum = Q(path__iregex='rnasum') & Q(path__iregex='RNAseq_report.html$')
-
-        gpl = Q(path__iregex='gridss_purple_linx') & Q(path__iregex='linx.html$')
-
-        tso_ctdna_bam = Q(path__iregex='tso') & Q(path__iregex='ctdna') & Q(path__iregex='.bam$')
-        tso_ctdna_vcf = Q(path__iregex='tso') & Q(path__iregex='ctdna') & Q(path__iregex='.vcf.gz$')
-        tso_ctdna_tsv = Q(path__iregex='tso') & Q(path__iregex='ctdna') & Q(path__iregex='.tsv$')
-
-        q_results: Q = (bam | vcf | vcf_germline | cancer | qc | pcgr | coverage | circos | wts_bam | wts_qc
-                        | wts_fusions | rnasum | gpl | tso_ctdna_bam | tso_ctdna_vcf | tso_ctdna_tsv)
-
-        qs = qs.filter(q_results)
+        if settings.RESULT_TYPE_LOOKUP:
+            qs = qs.filter(result_pipeline__in=pipeline_mask_values(ResultPipeline.ICAV1))
+        else:
+            qs = qs.filter(_results_regex_q())
 
         volume_name = kwargs.get('volume_name', None)
         if volume_name:
@@ -79,6 +87,11 @@ class GDSFile(models.Model):
     For composite (unique) key, it follows S3 style bucket + key pattern, see unique_hash.
     i.e. gds://volume_name/path ~ s3://bucket/key and, this full path must be unique globally.
     """
+    class Meta:
+        indexes = [
+            models.Index(fields=['result_pipeline', 'result_type']),
+        ]
+
     id = models.BigAutoField(primary_key=True)
     file_id = models.CharField(max_length=255)
     name = models.TextField()
@@ -101,6 +114,9 @@ class GDSFile(models.Model):
     storage_tier = models.CharField(max_length=255)
     presigned_url = models.TextField(null=True, blank=True)
     unique_hash = HashField(unique=True, base_fields=['volume_name', 'path'], default=None)
+    # classified upon save from path, null until backfilled by `python manage.py resulttype gds`
+    result_pipeline = ClassifierField(base_field='path', classifier=gds_result_pipeline, null=True, blank=True)
+    result_type = ClassifierField(base_field='path', classifier=gds_result_type, null=True, blank=True)
 
     objects = GDSFileManager()
 
@@ -0,0 +1,204 @@
+import logging
+import re
+from collections import defaultdict
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from libumccr import libregex
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = 1000
+
+
+class PathTokenType(models.IntegerChoices):
+    SUBJECT = 1, 'subject'
+    LIBRARY = 2, 'library'
+    SAMPLE = 3, 'sample'
+    PORTAL_RUN = 4, 'portal_run'
+
+
+# case-insensitive as of `icontains` lookup that the token index replaces, tokens are stored upper case
+TOKEN_REGEX_OBJS = {
+    PathTokenType.SUBJECT: re.compile(r"SBJ\d{5}", re.IGNORECASE),
+    PathTokenType.LIBRARY: re.compile(libregex.LIBRARY_REGEX_STR["id"], re.IGNORECASE),
+    PathTokenType.SAMPLE: re.compile(libregex.SAMPLE_ID_REGEX_STR["sample_id_non_control"], re.IGNORECASE),
+    # portal_run_id is yyyymmdd + 8 alphanumeric, match as whole path element fragment only, see IdHelper
+    PathTokenType.PORTAL_RUN: re.compile(r"(?<![a-z0-9])\d{8}[a-z0-9]{8}(?![a-z0-9])", re.IGNORECASE),
+}
+
+
+def _strip_topup_rerun(library_id: str) -> str:
+    rglb = re.split(libregex.EXPERIMENT_REGEX_STR["top_up"], library_id, 1, flags=re.IGNORECASE)[0]
+    return re.split(libregex.EXPERIMENT_REGEX_STR["rerun"], rglb, 1, flags=re.IGNORECASE)[0]
+
+
+def tokenize(path: str) -> Set[Tuple[int, str]]:
+    """
+    Extract subject, library, sample and portal run IDs found in S3 key or GDS path
+
+    Library ID is indexed both as-is and stripped of _topup/_rerun suffix, so that looking up the stripped library ID
+    also finds top-up and rerun outputs, as `icontains` did.
+
+    :param path: S3 object key or GDS file path
+    :return: set of (PathTokenType, token) tuple
+    """
+    tokens = set()
+    for token_type, regex in TOKEN_REGEX_OBJS.items():
+        for match in regex.findall(path):
+            tokens.add((token_type.value, match.upper()))
+            if token_type == PathTokenType.LIBRARY:
+                tokens.add((token_type.value, _strip_topup_rerun(match).upper()))
+    return tokens
+
+
+def match_token(value: str) -> Optional[Tuple[int, str]]:
+    """
+    :param value: lookup value e.g. subject query parameter
+    :return: (PathTokenType, token) if the whole value is a token that the index holds, otherwise None
+    """
+    for token_type, regex in TOKEN_REGEX_OBJS.items():
+        if regex.fullmatch(value):
+            return token_type.value, value.upper()
+    return None
+
+
+class PathToken(models.Model):
+    """
+    Token index of S3 key or GDS path. Each row is one ID (subject, library, sample or portal run) found in the path of
+    the owner row. Hence, lookup such as `key__icontains=subject_id`, which no database index can serve, becomes an
+    indexed equality lookup on (type, token) and, a join back to the owner by PK.
+
+    Tokens of a path never change, i.e. S3 key or GDS path is immutable for the same unique_hash. Index rows are added
+    at ingest and, removed along with the owner row by cascade.
+    """
+    class Meta:
+        abstract = True
+
+    OWNER_FIELD: str = None  # FK field name to the owner model
+    PATH_FIELD: str = None  # path field name of the owner model
+
+    id = models.BigAutoField(primary_key=True)
+    type = models.IntegerField(choices=PathTokenType, null=False, blank=False)
+    token = models.CharField(max_length=255, null=False, blank=False)
+
+    @classmethod
+    def owner_model(cls):
+        return cls._meta.get_field(cls.OWNER_FIELD).related_model
+
+    @classmethod
+    def index(cls, owners: Iterable[models.Model]) -> int:
+        """
+        Add token index rows for the given owner rows. Owner rows must have been persisted. Owner PK is resolved by
+        unique_hash, since bulk upsert on MySQL does not return PK. Existing index rows are left as-is.
+
+        :param owners: S3Object or GDSFile instances
+        :return: number of index rows submitted
+        """
+        path_by_hash = {owner.unique_hash: getattr(owner, cls.PATH_FIELD) for owner in owners}
+        if not path_by_hash:
+            return 0
+
+        hash_list = list(path_by_hash.keys())
+        id_path_list = []
+        for i in range(0, len(hash_list), BULK_BATCH_SIZE):
+            chunk = hash_list[i:i + BULK_BATCH_SIZE]
+            for unique_hash, pk in cls.owner_model().objects.filter(unique_hash__in=chunk).values_list(
+                    'unique_hash', 'id'):
+                id_path_list.append((pk, path_by_hash[unique_hash]))
+
+        return cls.index_paths(id_path_list)
+
+    @classmethod
+    def index_paths(cls, id_path_list: List[Tuple[int, str]]) -> int:
+        """
+        :param id_path_list: list of (owner PK, path) tuple
+        :return: number of index rows submitted
+        """
+        rows = []
+        for pk, path in id_path_list:
+            for token_type, token in tokenize(path):
+                rows.append(cls(**{f"{cls.OWNER_FIELD}_id": pk, 'type': token_type, 'token': token}))
+
+        cls.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+
+        return len(rows)
+
+    @classmethod
+    def backfill(cls, start_after_id: int = 0, chunk_size: int = BULK_BATCH_SIZE, dry: bool = False) -> Iterator[dict]:
+        """
+        Index all owner rows in PK order, chunk by chunk. Resumable from the last PK reported.
+
+        :param start_after_id: owner PK to resume after
+        :param chunk_size: number of owner rows per chunk
+        :param dry: tokenize only, do not write index rows
+        :return: progress of each chunk, i.e. last_id, owner_count and token_count so far
+        """
+        progress = {'last_id': start_after_id, 'owner_count': 0, 'token_count': 0}
+        while True:
+            id_path_list = list(
+                cls.owner_model().objects.filter(id__gt=progress['last_id']).order_by('id').values_list(
+                    'id', cls.PATH_FIELD)[:chunk_size]
+            )
+            if not id_path_list:
+                break
+
+            if dry:
+                progress['token_count'] += sum(len(tokenize(path)) for _, path in id_path_list)
+            else:
+                progress['token_count'] += cls.index_paths(id_path_list)
+
+            progress['last_id'] = id_path_list[-1][0]
+            progress['owner_count'] += len(id_path_list)
+            yield dict(progress)
+
+    @classmethod
+    def contains_q(cls, value: str) -> Q:
+        """
+        Drop-in for Q(<path field>__icontains=value) on the owner model. If the value is a token (e.g. a subject ID)
+        and PATH_TOKEN_LOOKUP is enabled, it is an indexed token lookup instead.
+        """
+        return cls.contains_any_q([value])
+
+    @classmethod
+    def contains_any_q(cls, values: Iterable[str]) -> Q:
+        """
+        Drop-in for OR-ed Q(<path field>__icontains=value) of values, see contains_q(). Tokens of the same type are
+        looked up in one IN clause.
+        """
+        tokens_by_type = defaultdict(list)
+        q = Q()
+        for value in values:
+            matched = match_token(value) if settings.PATH_TOKEN_LOOKUP else None
+            if matched:
+                tokens_by_type[matched[0]].append(matched[1])
+            else:
+                q |= Q(**{f"{cls.PATH_FIELD}__icontains": value})
+
+        for token_type, tokens in tokens_by_type.items():
+            owner_ids = cls.objects.filter(type=token_type, token__in=tokens).values(f"{cls.OWNER_FIELD}_id")
+            q |= Q(id__in=owner_ids)
+
+        return q
+
+
+class S3ObjectPathToken(PathToken):
+    class Meta:
+        unique_together = ['type', 'token', 's3object']  # also the covering index for token lookup
+
+    OWNER_FIELD = 's3object'
+    PATH_FIELD = 'key'
+
+    s3object = models.ForeignKey('data_portal.S3Object', on_delete=models.CASCADE, related_name='path_tokens')
+
+
+class GDSFilePathToken(PathToken):
+    class Meta:
+        unique_together = ['type', 'token', 'gdsfile']  # also the covering index for token lookup
+
+    OWNER_FIELD = 'gdsfile'
+    PATH_FIELD = 'path'
+
+    gdsfile = models.ForeignKey('data_portal.GDSFile', on_delete=models.CASCADE, related_name='path_tokens')
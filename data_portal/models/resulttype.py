@@ -0,0 +1,269 @@
+import re
+from functools import lru_cache
+from typing import FrozenSet, Iterable, Iterator, List, Tuple, Type
+
+from django.db import models
+
+from data_portal.fields import ClassifierField
+
+BULK_BATCH_SIZE = 1000
+
+
+class ResultPipeline(models.IntegerChoices):
+    """
+    Which subject result set a file belongs to, i.e. which manager lookup it is a result of. A file may belong to more
+    than one, hence, result_pipeline column stores the set of them as bitmask, see pipeline_mask()
+    """
+    NONE = 0, 'none'
+    BCBIO = 1, 'bcbio'  # S3ObjectManager.get_subject_results
+    SASH = 2, 'sash'  # S3ObjectManager.get_subject_sash_results and get_subject_sash_results_from_icav2
+    CTTSOV2 = 3, 'cttsov2'  # S3ObjectManager.get_subject_cttsov2_results_from_icav2
+    WGTS = 4, 'wgts'  # S3ObjectManager.get_subject_wgts_results_from_icav2
+    ICAV1 = 5, 'icav1'  # GDSFileManager.get_subject_results
+
+
+class ResultType(models.IntegerChoices):
+    NONE = 0, 'none'
+    BAM = 1, 'bam'
+    VCF = 2, 'vcf'
+    VCF_GERMLINE = 3, 'vcf_germline'
+    VCF_SOMATIC = 4, 'vcf_somatic'
+    VCF_SOMATIC_FILTER_SET = 5, 'vcf_somatic_filter_set'
+    VCF_SOMATIC_SV = 6, 'vcf_somatic_sv'
+    CANCER_REPORT = 7, 'cancer_report'
+    MULTIQC = 8, 'multiqc'
+    PCGR = 9, 'pcgr'
+    CPSR = 10, 'cpsr'
+    COVERAGE = 11, 'coverage'
+    CIRCOS = 12, 'circos'
+    LINX = 13, 'linx'
+    WTS_BAM = 14, 'wts_bam'
+    WTS_MULTIQC = 15, 'wts_multiqc'
+    WTS_FUSIONS = 16, 'wts_fusions'
+    RNASUM = 17, 'rnasum'
+    TMB_METRICS = 18, 'tmb_metrics'
+    RESULTS = 19, 'results'
+    TSV = 20, 'tsv'
+
+
+# Each rule is (ResultType, regexes) and, the file is of that type if all regexes match, i.e. AND-ed `iregex` Q of
+# the manager lookup. Rules and baselines here must mirror the regex Q objects of the manager lookups, see
+# test_resulttype regression test. First matching rule wins the type, whereas the file is member of every result set
+# that has a matching rule.
+
+BCBIO_RULES = [
+    (ResultType.BAM, ['wgs', 'ready', '.bam$']),
+    (ResultType.VCF, ['umccrised/[^(work)*]', r'small_variants/[^\/]*(.vcf.gz$|.maf$)']),
+    (ResultType.CANCER_REPORT, ['umccrised', 'cancer_report.html$']),
+    (ResultType.MULTIQC, ['umccrised', 'multiqc_report.html$']),
+    (ResultType.PCGR, [r'umccrised/[^\/]*/[^\/]*pcgr.html$']),
+    (ResultType.CPSR, [r'umccrised/[^\/]*/[^\/]*cpsr.html$']),
+    (ResultType.COVERAGE, [r'umccrised/[^\/]*/[^\/]*(normal|tumor).cacao.html$']),
+    (ResultType.CIRCOS, ['umccrised/[^(work)*]', 'purple/', 'circos', 'baf', '.png$']),
+    (ResultType.WTS_BAM, ['wts', 'ready', '.bam$']),
+    (ResultType.WTS_MULTIQC, ['wts', 'multiqc/', 'multiqc_report.html$']),
+    (ResultType.WTS_FUSIONS, ['wts', 'fusions', '.pdf$']),
+    (ResultType.RNASUM, ['RNAseq_report.html$']),
+    (ResultType.LINX, ['wgs', 'gridss_purple_linx', 'linx.html$']),
+]
+
+SASH_RULES = [
+    (ResultType.CANCER_REPORT, ['cancer_report.html$']),
+    (ResultType.PCGR, ['pcgr.html$']),
+    (ResultType.CPSR, ['cpsr.html$']),
+    (ResultType.CIRCOS, ['circos_baf.png$']),
+    (ResultType.LINX, ['linx.html$']),
+    (ResultType.VCF_GERMLINE, ['smlv_germline', '.annotations.vcf.gz$']),
+    (ResultType.MULTIQC, ['multiqc', '.html$']),
+    (ResultType.VCF_SOMATIC_FILTER_SET, ['smlv_somatic', '.filters_set.vcf.gz$']),
+    (ResultType.VCF_SOMATIC, ['smlv_somatic', '^((?!pcgr).)+$', '.pass.vcf.gz$']),
+    (ResultType.VCF_SOMATIC_SV, ['sv_somatic', 'sv.prioritised.vcf.gz$']),
+]
+
+CTTSOV2_RULES = [
+    (ResultType.TMB_METRICS, ['tmb.metrics.csv$']),
+    (ResultType.RESULTS, [re.escape('/Results/')]),
+    (ResultType.BAM, ['.bam$']),
+]
+
+WGTS_RULES = [
+    (ResultType.BAM, ['tumor', 'normal', '.bam$']),
+    (ResultType.VCF, [r'umccrise/[^\/]*/[^\/]*/[^(work)*]', r'small_variants/[^\/]*(.vcf.gz$|.maf$)']),
+    (ResultType.VCF_GERMLINE, ['dragen_germline', '.vcf.gz$']),
+    (ResultType.CANCER_REPORT, ['umccrise', 'cancer_report.html$']),
+    (ResultType.MULTIQC, ['umccrise', 'multiqc_report.html$']),
+    (ResultType.PCGR, [r'umccrise/[^\/]*/[^\/]*/[^\/]*/[^\/]*pcgr.html$']),
+    (ResultType.CPSR, [r'umccrise/[^\/]*/[^\/]*/[^\/]*/[^\/]*cpsr.html$']),
+    (ResultType.COVERAGE, ['umccrise', '(normal|tumor).cacao.html$']),
+    (ResultType.CIRCOS, [r'umccrise/[^\/]*/[^\/]*/[^(work)*]', 'purple/', 'circos', 'baf', '.png$']),
+    (ResultType.WTS_BAM, ['wts', '.bam$']),
+    (ResultType.WTS_MULTIQC, ['wts', 'multiqc', '.html$']),
+    (ResultType.WTS_FUSIONS, ['wts', 'fusions', '.pdf$']),
+    (ResultType.RNASUM, ['rnasum', 'RNAseq_report.html$']),
+]
+
+ICAV1_RULES = [
+    (ResultType.BAM, ['wgs', 'tumor', 'normal', '.bam$']),
+    (ResultType.VCF, [r'umccrise/[^\/]*/[^\/]*/[^(work)*]', r'small_variants/[^\/]*(.vcf.gz$|.maf$)']),
+    (ResultType.VCF_GERMLINE, ['[umccrise|wgs_tumor_normal]', 'dragen_germline', '.vcf.gz$']),
+    (ResultType.CANCER_REPORT, ['umccrise', 'cancer_report.html$']),
+    (ResultType.MULTIQC, ['umccrise', 'multiqc_report.html$']),
+    (ResultType.PCGR, [r'umccrise/[^\/]*/[^\/]*/[^\/]*/[^\/]*pcgr.html$']),
+    (ResultType.CPSR, [r'umccrise/[^\/]*/[^\/]*/[^\/]*/[^\/]*cpsr.html$']),
+    (ResultType.COVERAGE, ['umccrise', '(normal|tumor).cacao.html$']),
+    (ResultType.CIRCOS, [r'umccrise/[^\/]*/[^\/]*/[^(work)*]', 'purple/', 'circos', 'baf', '.png$']),
+    (ResultType.WTS_BAM, ['wts', 'tumor', '.bam$']),
+    (ResultType.WTS_MULTIQC, ['wts', 'tumor', 'multiqc', '.html$']),
+    (ResultType.WTS_FUSIONS, ['wts', 'fusions', '.pdf$']),
+    (ResultType.RNASUM, ['rnasum', 'RNAseq_report.html$']),
+    (ResultType.LINX, ['gridss_purple_linx', 'linx.html$']),
+    (ResultType.BAM, ['tso', 'ctdna', '.bam$']),
+    (ResultType.VCF, ['tso', 'ctdna', '.vcf.gz$']),
+    (ResultType.TSV, ['tso', 'ctdna', '.tsv$']),
+]
+
+WGTS_BASELINES = ['/analysis/umccrise/', '/analysis/tumor_normal/', '/analysis/tumor-normal/', '/analysis/wts/',
+                  '/analysis/rnasum/']
+
+
+def _compile(rules) -> List[Tuple[ResultType, List[re.Pattern]]]:
+    return [(result_type, [re.compile(regex, re.IGNORECASE) for regex in regexes]) for result_type, regexes in rules]
+
+
+_BCBIO = _compile(BCBIO_RULES)
+_SASH = _compile(SASH_RULES)
+_CTTSOV2 = _compile(CTTSOV2_RULES)
+_WGTS = _compile(WGTS_RULES)
+_ICAV1 = _compile(ICAV1_RULES)
+
+
+def pipeline_bit(pipeline: ResultPipeline) -> int:
+    return 1 << (pipeline - 1) if pipeline else 0
+
+
+def pipeline_mask(pipelines: Iterable[ResultPipeline]) -> int:
+    mask = 0
+    for pipeline in pipelines:
+        mask |= pipeline_bit(pipeline)
+    return mask
+
+
+@lru_cache(maxsize=None)
+def pipeline_mask_values(pipeline: ResultPipeline) -> List[int]:
+    """
+    :return: result_pipeline bitmask values that have the pipeline as member, i.e. for `IN` lookup that uses the index
+    """
+    bit = pipeline_bit(pipeline)
+    return [mask for mask in range(1, 1 << (len(ResultPipeline) - 1)) if mask & bit]
+
+
+def _match(compiled_rules, path: str) -> ResultType:
+    for result_type, regexes in compiled_rules:
+        if all(regex.search(path) for regex in regexes):
+            return result_type
+    return ResultType.NONE
+
+
+@lru_cache(maxsize=64)  # pipeline and type fields of the same row classify in turn
+def classify_s3_key(key: str) -> Tuple[FrozenSet[ResultPipeline], ResultType]:
+    """
+    Classify S3 object key into the subject result sets it belongs to and its result type. Result sets are checked
+    with their key baseline, in order of SASH, CTTSOV2, WGTS (ICA v2 BYOB) and then BCBIO, whose lookup has no key
+    baseline. Result type is of the first result set that matches.
+
+    :return: (set of ResultPipeline, ResultType), or (empty set, NONE) if the key is not a subject result
+    """
+    lower_key = key.lower()
+
+    candidates = [
+        (ResultPipeline.SASH, _SASH, '/sash/' in lower_key),
+        (ResultPipeline.CTTSOV2, _CTTSOV2, '/cttsov2/' in lower_key),
+        (ResultPipeline.WGTS, _WGTS, any(baseline in lower_key for baseline in WGTS_BASELINES)),
+        (ResultPipeline.BCBIO, _BCBIO, '.snakemake' not in key),
+    ]
+
+    pipelines = set()
+    first_type = ResultType.NONE
+    for pipeline, compiled_rules, in_baseline in candidates:
+        if not in_baseline:
+            continue
+        result_type = _match(compiled_rules, key)
+        if result_type:
+            pipelines.add(pipeline)
+            first_type = first_type or result_type
+
+    return frozenset(pipelines), first_type
+
+
+@lru_cache(maxsize=64)  # pipeline and type fields of the same row classify in turn
+def classify_gds_path(path: str) -> Tuple[FrozenSet[ResultPipeline], ResultType]:
+    """
+    Classify GDS file path into a subject result type
+
+    :return: (set of ResultPipeline, ResultType), or (empty set, NONE) if the path is not a subject result
+    """
+    result_type = _match(_ICAV1, path)
+    if result_type:
+        return frozenset({ResultPipeline.ICAV1}), result_type
+    return frozenset(), ResultType.NONE
+
+
+def s3_result_pipeline(key: str) -> int:
+    return pipeline_mask(classify_s3_key(key)[0])
+
+
+def s3_result_type(key: str) -> int:
+    return classify_s3_key(key)[1].value
+
+
+def gds_result_pipeline(path: str) -> int:
+    return pipeline_mask(classify_gds_path(path)[0])
+
+
+def gds_result_type(path: str) -> int:
+    return classify_gds_path(path)[1].value
+
+
+def backfill(model: Type[models.Model], start_after_id: int = 0, chunk_size: int = BULK_BATCH_SIZE,
+             dry: bool = False) -> Iterator[dict]:
+    """
+    Classify all rows of the model in PK order, chunk by chunk, and update the rows whose ClassifierField value is
+    unset or stale. Resumable from the last PK reported.
+
+    :param model: S3Object or GDSFile
+    :param start_after_id: PK to resume after
+    :param chunk_size: number of rows per chunk
+    :param dry: classify only, do not update rows
+    :return: progress of each chunk, i.e. last_id, row_count, update_count and result_count so far
+    """
+    fields = [f for f in model._meta.concrete_fields if isinstance(f, ClassifierField)]
+    base_fields = {f.base_field for f in fields}
+    field_names = [f.attname for f in fields]
+
+    progress = {'last_id': start_after_id, 'row_count': 0, 'update_count': 0, 'result_count': 0}
+    while True:
+        rows = list(
+            model.objects.filter(id__gt=progress['last_id']).order_by('id').only('id', *base_fields, *field_names)[
+                :chunk_size]
+        )
+        if not rows:
+            break
+
+        changed = []
+        for row in rows:
+            before = [getattr(row, name) for name in field_names]
+            for f in fields:
+                f.classify(row)
+            after = [getattr(row, name) for name in field_names]
+            if before != after:
+                changed.append(row)
+            if any(after):
+                progress['result_count'] += 1
+
+        if changed and not dry:
+            model.objects.bulk_update(changed, field_names, batch_size=BULK_BATCH_SIZE)
+
+        progress['last_id'] = rows[-1].id
+        progress['row_count'] += len(rows)
+        progress['update_count'] += len(changed)
+        yield dict(progress)
@@ -3,14 +3,17 @@ import random
 import re
 from typing import List
 
+from django.conf import settings
 from django.db import models
-from django.db.models import Max, QuerySet, Q
+from django.db.models import Count, Max, Min, QuerySet, Q
 from libumccr import libregex
 
 from data_portal.exceptions import RandSamplesTooLarge
-from data_portal.fields import HashField, HashFieldHelper
+from data_portal.fields import ClassifierField, HashField, HashFieldHelper
 from data_portal.models import LabMetadata
 from data_portal.models.labmetadata import LabMetadataAssay, LabMetadataType
+from data_portal.models.pathtoken import S3ObjectPathToken
+from data_portal.models.resulttype import ResultPipeline, s3_result_pipeline, s3_result_type, pipeline_mask_values
 
 logger = logging.getLogger(__name__)
 
@@ -32,37 +35,167 @@ def _strip_topup_rerun_from_library_id_list(library_id_list: List[str]) -> List[
     return list(rglb_id_set)
 
 
+def _bcbio_results_regex_q() -> Q:
+    bam = Q(key__iregex='wgs') & Q(key__iregex='ready') & Q(key__iregex='.bam$')
+    vcf = (Q(key__iregex='umccrised/[^(work)*]') & Q(key__iregex=r'small_variants/[^\/]*(.vcf.gz$|.maf$)'))
+    cancer = Q(key__iregex='umccrised') & Q(key__iregex='cancer_report.html$')
+    qc = Q(key__iregex='umccrised') & Q(key__iregex='multiqc_report.html$')
+    pcgr = Q(key__iregex=r'umccrised/[^\/]*/[^\/]*(pcgr|cpsr).html$')
+    coverage = Q(key__iregex=r'umccrised/[^\/]*/[^\/]*(normal|tumor).cacao.html$')
+    circos = (Q(key__iregex='umccrised/[^(work)*]') & Q(key__iregex='purple/') & Q(key__iregex='circos')
+              & Q(key__iregex='baf') & Q(key__iregex='.png$'))
+    wts_bam = Q(key__iregex='wts') & Q(key__iregex='ready') & Q(key__iregex='.bam$')
+    wts_qc = Q(key__iregex='wts') & Q(key__iregex='multiqc/') & Q(key__iregex='multiqc_report.html$')
+    wts_fusions = Q(key__iregex='wts') & Q(key__iregex='fusions') & Q(key__iregex='.pdf$')
+    rnasum = Q(key__iregex='RNAseq_report.html$')
+    gpl = Q(key__iregex='wgs') & Q(key__iregex='gridss_purple_linx') & Q(key__iregex='linx.html$')
+    return (bam | vcf | cancer | qc | pcgr | coverage | circos | wts_bam | wts_qc | wts_fusions
+            | rnasum | gpl)
+
+
+def _sash_results_regex_q() -> Q:
+    cancer = Q(key__iregex='cancer_report.html$')
+    pcgr = Q(key__iregex='pcgr.html$')
+    cpsr = Q(key__iregex='cpsr.html$')
+    linx = Q(key__iregex='linx.html$')
+    circos = Q(key__iregex='circos_baf.png$')
+    multiqc = Q(key__iregex='multiqc') & Q(key__iregex='.html$')
+
+    vcf_germline_snv = Q(key__iregex='smlv_germline') & Q(key__iregex='.annotations.vcf.gz$')
+    vcf_somatic_snv_filter_set = Q(key__iregex='smlv_somatic') & Q(key__iregex='.filters_set.vcf.gz$')
+    vcf_somatic_snv_filter_applied = Q(key__iregex='smlv_somatic') & Q(key__iregex='^((?!pcgr).)+$') & \
+                                     Q(key__iregex='.pass.vcf.gz$')
+    vcf_somatic_sv = Q(key__iregex='sv_somatic') & Q(key__iregex='sv.prioritised.vcf.gz$')
+
+    return (
+            cancer | pcgr | cpsr | circos | linx | vcf_germline_snv | multiqc |
+            vcf_somatic_snv_filter_set | vcf_somatic_snv_filter_applied | vcf_somatic_sv
+    )
+
+
+def _cttsov2_results_regex_q() -> Q:
+    tmb_metrics_csv_q = Q(key__iregex='tmb.metrics.csv$')
+    all_bam_q = Q(key__iregex='.bam$')
+    all_results_q = Q(key__icontains='/Results/')
+    return tmb_metrics_csv_q | all_results_q | all_bam_q
+
+
+def _wgts_results_regex_q() -> Q:
+    bam = Q(key__iregex='tumor') & Q(key__iregex='normal') & Q(key__iregex='.bam$')
+    vcf = (Q(key__iregex=r'umccrise/[^\/]*/[^\/]*/[^(work)*]')
+           & Q(key__iregex=r'small_variants/[^\/]*(.vcf.gz$|.maf$)'))
+
+    vcf_germline = (
+            Q(key__iregex='dragen_germline')
+            & Q(key__iregex='.vcf.gz$')
+    )
+
+    cancer = Q(key__iregex='umccrise') & Q(key__iregex='cancer_report.html$')
+    qc = Q(key__iregex='umccrise') & Q(key__iregex='multiqc_report.html$')
+    pcgr = Q(key__iregex=r'umccrise/[^\/]*/[^\/]*/[^\/]*/[^\/]*(pcgr|cpsr).html$')
+    coverage = Q(key__iregex='umccrise') & Q(key__iregex='(normal|tumor).cacao.html$')
+    circos = (Q(key__iregex=r'umccrise/[^\/]*/[^\/]*/[^(work)*]') & Q(key__iregex='purple/')
+              & Q(key__iregex='circos') & Q(key__iregex='baf') & Q(key__iregex='.png$'))
+
+    wts_bam = Q(key__iregex='wts') & Q(key__iregex='.bam$')
+    wts_qc = Q(key__iregex='wts') & Q(key__iregex='multiqc') & Q(key__iregex='.html$')
+    wts_fusions = Q(key__iregex='wts') & Q(key__iregex='fusions') & Q(key__iregex='.pdf$')
+    rnasum = Q(key__iregex='rnasum') & Q(key__iregex='RNAseq_report.html$')
+
+    return (bam | vcf | vcf_germline | cancer | qc | pcgr | coverage | circos | wts_bam | wts_qc
+            | wts_fusions | rnasum)
+
+
+RESULTS_REGEX_Q = {
+    ResultPipeline.BCBIO: _bcbio_results_regex_q,
+    ResultPipeline.SASH: _sash_results_regex_q,
+    ResultPipeline.CTTSOV2: _cttsov2_results_regex_q,
+    ResultPipeline.WGTS: _wgts_results_regex_q,
+}
+
+
+def _results_q(pipeline: ResultPipeline) -> Q:
+    """
+    File of interest Q of the result set. It is indexed lookup on the classified result_pipeline bitmask column if
+    RESULT_TYPE_LOOKUP is enabled, otherwise the regex match on key that the classifier mirrors, see resulttype.
+    """
+    if settings.RESULT_TYPE_LOOKUP:
+        return Q(result_pipeline__in=pipeline_mask_values(pipeline))
+    return RESULTS_REGEX_Q[pipeline]()
+
+
 class S3ObjectManager(models.Manager):
     """
     Manager class for S3 objects, providing additional helper methods.
     """
     MAX_RAND_SAMPLES_LIMIT = 500
+    MAX_RAND_CANDIDATES = 10000  # bound size of IN clause per round
+    RAND_SAMPLES_OVERSAMPLING = 1.5
+    RAND_SAMPLES_ROUNDS = 3
 
     def random_samples(self, required: int) -> QuerySet:
         """
         Obtain random samples as a lazy-loading query set.
-        Follows the suggested practice from https://books.agiliq.com/projects/django-orm-cookbook/en/latest/random.html.
+
+        Over-sample random candidate PKs between min and max id, scaled by the observed PK density, and resolve them
+        in one `pk__in` query per round. Hence, number of queries is bounded, i.e. one aggregate plus at most
+        RAND_SAMPLES_ROUNDS rounds and, two fallback queries for extremely sparse PK space, no matter how many gaps
+        there are in PK.
+
+        Fallback samples the rest from a window of up to MAX_RAND_CANDIDATES PKs from a random id onwards, wrapping
+        around to min id, i.e. bounded PK index range scan instead of `ORDER BY RAND()` that reads and sorts the whole
+        table on MySQL. Samples of the fallback are less spread out than these of the rounds.
+
         :param required: the required number of samples
         :return: list of random S3OBject samples
         """
-        total = self.count()
-
         if required > self.MAX_RAND_SAMPLES_LIMIT:
             raise RandSamplesTooLarge(self.MAX_RAND_SAMPLES_LIMIT)
 
+        stats = self.aggregate(total=Count('id'), min_id=Min('id'), max_id=Max('id'))
+        total = stats['total']
+
         # We can't give more samples than the maximum of what we have
         actual = min(total, required)
-        count = 1
-        max_id = self.aggregate(max_id=Max("id"))['max_id']
-        sample_ids = []
-
-        while count <= actual:
-            pk = random.randint(1, max_id)
-            query = self.filter(pk=pk)
+        if actual == 0:
+            return self.none()
 
-            if query.exists():
-                sample_ids.append(pk)
-                count += 1
+        min_id, max_id = stats['min_id'], stats['max_id']
+        id_space = range(min_id, max_id + 1)
+        density = total / len(id_space)
+
+        sample_ids = set()
+        tried_ids = set()
+        for _ in range(self.RAND_SAMPLES_ROUNDS):
+            needed = actual - len(sample_ids)
+            if needed <= 0:
+                break
+
+            # expected hits of n candidates is n * density, over-sample for variance
+            n = min(int(needed / density * self.RAND_SAMPLES_OVERSAMPLING) + 1, self.MAX_RAND_CANDIDATES)
+            untried = len(id_space) - len(tried_ids)
+            if n >= untried:
+                candidates = [pk for pk in id_space if pk not in tried_ids]
+            else:
+                candidates = set()
+                while len(candidates) < n:
+                    pk = random.randint(min_id, max_id)
+                    if pk not in tried_ids:
+                        candidates.add(pk)
+            tried_ids.update(candidates)
+
+            found = list(self.filter(id__in=candidates).values_list('id', flat=True))
+            sample_ids.update(random.sample(found, min(needed, len(found))))
+
+        needed = actual - len(sample_ids)
+        if needed > 0:
+            logger.info(f"Random samples fallback to PK window for {needed} samples, PK density {density:.6f}")
+            start = random.randint(min_id, max_id)
+            window_qs = self.exclude(id__in=sample_ids).order_by('id').values_list('id', flat=True)
+            window = list(window_qs.filter(id__gte=start)[:self.MAX_RAND_CANDIDATES])
+            if len(window) < needed:
+                window.extend(window_qs.filter(id__lt=start)[:self.MAX_RAND_CANDIDATES - len(window)])
+            sample_ids.update(random.sample(window, min(needed, len(window))))
 
         return self.filter(id__in=sample_ids)
 
@@ -75,11 +208,11 @@ class S3ObjectManager(models.Manager):
 
         subject = kwargs.get('subject', None)
         if subject:
-            qs = qs.filter(key__icontains=subject)
+            qs = qs.filter(S3ObjectPathToken.contains_q(subject))
 
         run = kwargs.get('run', None)
         if run:
-            qs = qs.filter(key__icontains=run)
+            qs = qs.filter(S3ObjectPathToken.contains_q(run))
 
         key = kwargs.get('key', None)
         if key:
@@ -88,23 +221,8 @@ class S3ObjectManager(models.Manager):
         return qs
 
     def get_subject_results(self, subject_id: str, **kwargs) -> QuerySet:
-        qs: QuerySet = self.filter(key__icontains=subject_id).exclude(key__contains='.snakemake')
-        bam = Q(key__iregex='wgs') & Q(key__iregex='ready') & Q(key__iregex='.bam$')
-        vcf = (Q(key__iregex='umccrised/[^(work)*]') & Q(key__iregex=r'small_variants/[^\/]*(.vcf.gz$|.maf$)'))
-        cancer = Q(key__iregex='umccrised') & Q(key__iregex='cancer_report.html$')
-        qc = Q(key__iregex='umccrised') & Q(key__iregex='multiqc_report.html$')
-        pcgr = Q(key__iregex=r'umccrised/[^\/]*/[^\/]*(pcgr|cpsr).html$')
-        coverage = Q(key__iregex=r'umccrised/[^\/]*/[^\/]*(normal|tumor).cacao.html$')
-        circos = (Q(key__iregex='umccrised/[^(work)*]') & Q(key__iregex='purple/') & Q(key__iregex='circos')
-                  & Q(key__iregex='baf') & Q(key__iregex='.png$'))
-        wts_bam = Q(key__iregex='wts') & Q(key__iregex='ready') & Q(key__iregex='.bam$')
-        wts_qc = Q(key__iregex='wts') & Q(key__iregex='multiqc/') & Q(key__iregex='multiqc_report.html$')
-        wts_fusions = Q(key__iregex='wts') & Q(key__iregex='fusions') & Q(key__iregex='.pdf$')
-        rnasum = Q(key__iregex='RNAseq_report.html$')
-        gpl = Q(key__iregex='wgs') & Q(key__iregex='gridss_purple_linx') & Q(key__iregex='linx.html$')
-        q_results: Q = (bam | vcf | cancer | qc | pcgr | coverage | circos | wts_bam | wts_qc | wts_fusions
-                        | rnasum | gpl)
-        qs = qs.filter(q_results)
+        qs: QuerySet = self.filter(S3ObjectPathToken.contains_q(subject_id)).exclude(key__contains='.snakemake')
+        qs = qs.filter(_results_q(ResultPipeline.BCBIO))
 
         bucket = kwargs.get('bucket', None)
         if bucket:
@@ -112,27 +230,8 @@ class S3ObjectManager(models.Manager):
         return qs
 
     def get_subject_sash_results(self, subject_id: str, **kwargs) -> QuerySet:
-        qs: QuerySet = self.filter(key__icontains=subject_id).filter(key__icontains="/sash/")
-
-        cancer = Q(key__iregex='cancer_report.html$')
-        pcgr = Q(key__iregex='pcgr.html$')
-        cpsr = Q(key__iregex='cpsr.html$')
-        linx = Q(key__iregex='linx.html$')
-        circos = Q(key__iregex='circos_baf.png$')
-        multiqc = Q(key__iregex='multiqc') & Q(key__iregex='.html$')
-
-        vcf_germline_snv = Q(key__iregex='smlv_germline') & Q(key__iregex='.annotations.vcf.gz$')
-        vcf_somatic_snv_filter_set = Q(key__iregex='smlv_somatic') & Q(key__iregex='.filters_set.vcf.gz$')
-        vcf_somatic_snv_filter_applied = Q(key__iregex='smlv_somatic') & Q(key__iregex='^((?!pcgr).)+$') & \
-                                         Q(key__iregex='.pass.vcf.gz$')
-        vcf_somatic_sv = Q(key__iregex='sv_somatic') & Q(key__iregex='sv.prioritised.vcf.gz$')
-
-        q_results: Q = (
-                cancer | pcgr | cpsr | circos | linx | vcf_germline_snv | multiqc |
-                vcf_somatic_snv_filter_set | vcf_somatic_snv_filter_applied | vcf_somatic_sv
-        )
-
-        qs = qs.filter(q_results)
+        qs: QuerySet = self.filter(S3ObjectPathToken.contains_q(subject_id)).filter(key__icontains="/sash/")
+        qs = qs.filter(_results_q(ResultPipeline.SASH))
 
         bucket = kwargs.get('bucket', None)
         if bucket:
@@ -180,18 +279,10 @@ class S3ObjectManager(models.Manager):
         qs: QuerySet = self.filter(key__icontains="/cttsov2/")
 
         # create library filter Q
-        lib_q = Q()
-        for lib in minted_cttsov2_libraries:
-            lib_q.add(data=Q(key__icontains=lib), conn_type=Q.OR)
+        lib_q = S3ObjectPathToken.contains_any_q(minted_cttsov2_libraries)
 
         # create file of interest Q
-        tmb_metrics_csv_q = Q(key__iregex='tmb.metrics.csv$')
-        all_bam_q = Q(key__iregex='.bam$')
-        all_results_q = Q(key__icontains='/Results/')
-
-        q_results: Q = (
-            tmb_metrics_csv_q | all_results_q | all_bam_q
-        ) & lib_q
+        q_results: Q = _results_q(ResultPipeline.CTTSOV2) & lib_q
 
         bucket = kwargs.get('bucket', None)
         if bucket:
@@ -232,33 +323,9 @@ class S3ObjectManager(models.Manager):
         )
 
         # create library filter Q
-        lib_q = Q()
-        for lib in minted_wgts_libraries:
-            lib_q.add(data=Q(key__icontains=lib), conn_type=Q.OR)
+        lib_q = S3ObjectPathToken.contains_any_q(minted_wgts_libraries)
 
-        bam = Q(key__iregex='tumor') & Q(key__iregex='normal') & Q(key__iregex='.bam$')
-        vcf = (Q(key__iregex=r'umccrise/[^\/]*/[^\/]*/[^(work)*]')
-               & Q(key__iregex=r'small_variants/[^\/]*(.vcf.gz$|.maf$)'))
-
-        vcf_germline = (
-                Q(key__iregex='dragen_germline')
-                & Q(key__iregex='.vcf.gz$')
-        )
-
-        cancer = Q(key__iregex='umccrise') & Q(key__iregex='cancer_report.html$')
-        qc = Q(key__iregex='umccrise') & Q(key__iregex='multiqc_report.html$')
-        pcgr = Q(key__iregex=r'umccrise/[^\/]*/[^\/]*/[^\/]*/[^\/]*(pcgr|cpsr).html$')
-        coverage = Q(key__iregex='umccrise') & Q(key__iregex='(normal|tumor).cacao.html$')
-        circos = (Q(key__iregex=r'umccrise/[^\/]*/[^\/]*/[^(work)*]') & Q(key__iregex='purple/')
-                  & Q(key__iregex='circos') & Q(key__iregex='baf') & Q(key__iregex='.png$'))
-
-        wts_bam = Q(key__iregex='wts') & Q(key__iregex='.bam$')
-        wts_qc = Q(key__iregex='wts') & Q(key__iregex='multiqc') & Q(key__iregex='.html$')
-        wts_fusions = Q(key__iregex='wts') & Q(key__iregex='fusions') & Q(key__iregex='.pdf$')
-        rnasum = Q(key__iregex='rnasum') & Q(key__iregex='RNAseq_report.html$')
-
-        q_results: Q = (bam | vcf | vcf_germline | cancer | qc | pcgr | coverage | circos | wts_bam | wts_qc
-                        | wts_fusions | rnasum) & lib_q & baseline
+        q_results: Q = _results_q(ResultPipeline.WGTS) & lib_q & baseline
 
         exclude_uq_hashes = kwargs.get('exclude_uq_hashes', [])  # exclude migrated (relocated) objects
 
@@ -292,27 +359,9 @@ class S3ObjectManager(models.Manager):
         baseline = Q(key__icontains='/analysis/sash/')
 
         # create library filter Q
-        lib_q = Q()
-        for lib in minted_wgts_libraries:
-            lib_q.add(data=Q(key__icontains=lib), conn_type=Q.OR)
-
-        cancer = Q(key__iregex='cancer_report.html$')
-        pcgr = Q(key__iregex='pcgr.html$')
-        cpsr = Q(key__iregex='cpsr.html$')
-        linx = Q(key__iregex='linx.html$')
-        circos = Q(key__iregex='circos_baf.png$')
-        multiqc = Q(key__iregex='multiqc') & Q(key__iregex='.html$')
-
-        vcf_germline_snv = Q(key__iregex='smlv_germline') & Q(key__iregex='.annotations.vcf.gz$')
-        vcf_somatic_snv_filter_set = Q(key__iregex='smlv_somatic') & Q(key__iregex='.filters_set.vcf.gz$')
-        vcf_somatic_snv_filter_applied = Q(key__iregex='smlv_somatic') & Q(key__iregex='^((?!pcgr).)+$') & \
-                                         Q(key__iregex='.pass.vcf.gz$')
-        vcf_somatic_sv = Q(key__iregex='sv_somatic') & Q(key__iregex='sv.prioritised.vcf.gz$')
-
-        q_results: Q = (
-                cancer | pcgr | cpsr | circos | linx | vcf_germline_snv | multiqc |
-                vcf_somatic_snv_filter_set | vcf_somatic_snv_filter_applied | vcf_somatic_sv
-        ) & lib_q & baseline
+        lib_q = S3ObjectPathToken.contains_any_q(minted_wgts_libraries)
+
+        q_results: Q = _results_q(ResultPipeline.SASH) & lib_q & baseline
 
         exclude_uq_hashes = kwargs.get('exclude_uq_hashes', [])  # exclude migrated (relocated) objects
 
@@ -416,6 +465,7 @@ class S3Object(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['bucket']),
+            models.Index(fields=['result_pipeline', 'result_type']),
         ]
 
     id = models.BigAutoField(primary_key=True)
@@ -425,8 +475,29 @@ class S3Object(models.Model):
     last_modified_date = models.DateTimeField()
     e_tag = models.CharField(max_length=255)
     unique_hash = HashField(unique=True, base_fields=['bucket', 'key'], default=None)
+    sequencer = models.CharField(max_length=255, null=True, blank=True)
+    # classified upon save from key, null until backfilled by `python manage.py resulttype s3`
+    result_pipeline = ClassifierField(base_field='key', classifier=s3_result_pipeline, null=True, blank=True)
+    result_type = ClassifierField(base_field='key', classifier=s3_result_type, null=True, blank=True)
 
     SORTABLE_COLUMNS = ['size', 'last_modified_date']
     DEFAULT_SORT_COL = 'last_modified_date'
 
     objects = S3ObjectManager()
+
+
+class S3ObjectTombstone(models.Model):
+    """
+    Last known deletion of a S3 object, keyed by the same unique_hash of S3Object. This keeps the S3 event sequencer
+    (or event time) of the removal after the S3Object row is gone, so that a late-delivered older ObjectCreated event
+    does not resurrect a deleted object. Tombstones are only needed as long as events can still be in-flight.
+    """
+    class Meta:
+        indexes = [
+            models.Index(fields=['event_time']),
+        ]
+
+    id = models.BigAutoField(primary_key=True)
+    unique_hash = models.CharField(max_length=64, unique=True)
+    sequencer = models.CharField(max_length=255, null=True, blank=True)
+    event_time = models.DateTimeField()
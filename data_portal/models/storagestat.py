@@ -0,0 +1,191 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from django.db import models, transaction
+from django.db.models import Count, F, QuerySet, Sum
+from django.utils.timezone import now
+
+from data_portal.models.gdsfile import GDSFile
+from data_portal.models.limsrow import LIMSRow
+from data_portal.models.s3object import S3Object
+
+BULK_BATCH_SIZE = 500
+
+
+class StorageStatSource(models.TextChoices):
+    S3 = 's3', 'S3 bucket'
+    GDS = 'gds', 'GDS volume'
+    COUNTER = 'counter', 'Counter'
+
+
+class StorageStatCounter(models.TextChoices):
+    """
+    Named counters of the legacy storage-stats endpoint, i.e. S3Object to LIMSRow linking. These are only refreshed
+    by full rebuild, as S3LIMS association is no longer maintained at ingest, see issue #343
+    """
+    LINKED_S3 = 'linked_s3', 'Linked S3 Objects'
+    TOTAL_LIMS = 'total_lims', 'Total LIMS Rows'
+    LINKED_LIMS = 'linked_lims', 'Linked LIMS Rows'
+
+
+# source to (owner model, name field, size field)
+SOURCE_MODELS = {
+    StorageStatSource.S3: (S3Object, 'bucket', 'size'),
+    StorageStatSource.GDS: (GDSFile, 'volume_name', 'size_in_bytes'),
+}
+
+
+class StorageStatManager(models.Manager):
+
+    @staticmethod
+    def upsert_deltas(source: str, obj_list: Iterable[models.Model]) -> Dict[str, List[int]]:
+        """
+        Counter deltas of upserting the given unsaved owner rows, i.e. one more object for new row and, size difference
+        for existing row. Must be called before the upsert, within the same transaction. Existing rows are read for
+        update, so that concurrent upsert of the same row, e.g. crawler alongside S3 event, can not count it twice.
+
+        :param source: StorageStatSource S3 or GDS
+        :param obj_list: unsaved S3Object or GDSFile instances
+        :return: dict of name to [object count delta, total bytes delta]
+        """
+        model, name_field, size_field = SOURCE_MODELS[source]
+        hash_field = model._meta.get_field('unique_hash')
+
+        obj_by_hash = {}
+        for obj in obj_list:
+            hash_field.calculate_hash(obj)
+            obj_by_hash[obj.unique_hash] = obj
+
+        hash_list = list(obj_by_hash.keys())
+        existing_sizes = {}
+        for i in range(0, len(hash_list), BULK_BATCH_SIZE):
+            chunk = hash_list[i:i + BULK_BATCH_SIZE]
+            existing_sizes.update(
+                model.objects.select_for_update().filter(unique_hash__in=chunk).values_list('unique_hash', size_field)
+            )
+
+        deltas = defaultdict(lambda: [0, 0])
+        for unique_hash, obj in obj_by_hash.items():
+            delta = deltas[getattr(obj, name_field)]
+            size = getattr(obj, size_field) or 0
+            if unique_hash in existing_sizes:
+                delta[1] += size - (existing_sizes[unique_hash] or 0)
+            else:
+                delta[0] += 1
+                delta[1] += size
+        return deltas
+
+    @staticmethod
+    def delete_deltas(source: str, qs: QuerySet) -> Dict[str, List[int]]:
+        """
+        Counter deltas of deleting the owner rows of given query set. Must be called before the delete, within the
+        same transaction.
+
+        :return: dict of name to [object count delta, total bytes delta]
+        """
+        _, name_field, size_field = SOURCE_MODELS[source]
+
+        deltas = defaultdict(lambda: [0, 0])
+        for name, count, total in qs.order_by().values(name_field).annotate(c=Count('id'), s=Sum(size_field)) \
+                .values_list(name_field, 'c', 's'):
+            deltas[name] = [-count, -(total or 0)]
+        return deltas
+
+    @staticmethod
+    def merge_deltas(*deltas_list: Dict[str, List[int]]) -> Dict[str, List[int]]:
+        """
+        Sum counter deltas, e.g. of upsert and delete within the same sync, so that these are applied at once
+        """
+        merged = defaultdict(lambda: [0, 0])
+        for deltas in deltas_list:
+            for name, (count_delta, bytes_delta) in deltas.items():
+                merged[name][0] += count_delta
+                merged[name][1] += bytes_delta
+        return merged
+
+    def apply(self, source: str, deltas: Dict[str, List[int]]):
+        """
+        Add counter deltas to the stat rows of the source, creating the rows that are not there yet.
+
+        Stat row of a bucket or volume is shared by all writers of it and stays locked until commit. Hence, call this
+        once per transaction, as its last statement, see merge_deltas(). Rows are updated in name order, so that
+        concurrent transactions lock them in consistent order.
+        """
+        deltas = {name: delta for name, delta in sorted(deltas.items()) if any(delta)}
+        if not deltas:
+            return
+
+        def _update(name, count_delta, bytes_delta) -> int:
+            return self.filter(source=source, name=name).update(
+                object_count=F('object_count') + count_delta,
+                total_bytes=F('total_bytes') + bytes_delta,
+                last_updated=now(),
+            )
+
+        missing = {name: delta for name, delta in deltas.items() if not _update(name, *delta)}
+        if missing:
+            # concurrent sync may have created the same row meanwhile, hence, ignore conflict then update
+            self.bulk_create([StorageStat(source=source, name=name) for name in missing.keys()], ignore_conflicts=True)
+            for name, delta in missing.items():
+                _update(name, *delta)
+
+    @transaction.atomic
+    def rebuild(self, source: str) -> int:
+        """
+        Replace the stat rows of the source with full aggregate of the owner table, i.e. one GROUP BY scan
+
+        :return: number of stat rows
+        """
+        timestamp = now()
+
+        if source == StorageStatSource.COUNTER:
+            values = {
+                StorageStatCounter.LINKED_S3: (S3Object.objects.filter(s3lims__isnull=False).distinct().count(), 0),
+                StorageStatCounter.TOTAL_LIMS: (LIMSRow.objects.count(), 0),
+                StorageStatCounter.LINKED_LIMS: (LIMSRow.objects.filter(s3lims__isnull=False).distinct().count(), 0),
+            }
+        else:
+            model, name_field, size_field = SOURCE_MODELS[source]
+            values = {
+                name: (count, total or 0)
+                for name, count, total in model.objects.order_by().values(name_field).annotate(
+                    c=Count('id'), s=Sum(size_field)).values_list(name_field, 'c', 's')
+            }
+
+        self.filter(source=source).delete()
+        self.bulk_create(
+            [
+                StorageStat(source=source, name=name, object_count=count, total_bytes=total,
+                            last_refreshed=timestamp, last_updated=timestamp)
+                for name, (count, total) in values.items()
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+        return len(values)
+
+
+class StorageStat(models.Model):
+    """
+    Materialized per S3 bucket and per GDS volume counters (object count, total bytes), so that storage stats and
+    bucket listing read O(buckets) rows instead of scanning S3Object and GDSFile tables.
+
+    Counters are maintained incrementally by the S3 and GDS sync services and, rebuilt in full by the `storagestat`
+    management command. Incremental counters may drift, e.g. when concurrent syncs insert the same new object, until
+    the next rebuild. The `last_refreshed` is the time of last full rebuild and, `last_updated` the last change.
+    """
+    class Meta:
+        unique_together = ['source', 'name']
+
+    id = models.BigAutoField(primary_key=True)
+    source = models.CharField(max_length=16, choices=StorageStatSource.choices)
+    name = models.CharField(max_length=255)
+    object_count = models.BigIntegerField(default=0)
+    total_bytes = models.BigIntegerField(default=0)
+    last_refreshed = models.DateTimeField(null=True, blank=True)
+    last_updated = models.DateTimeField(null=True, blank=True)
+
+    objects = StorageStatManager()
+
+    def __str__(self):
+        return f"ID: {self.id}, SOURCE: {self.source}, NAME: {self.name}, OBJECT_COUNT: {self.object_count}"
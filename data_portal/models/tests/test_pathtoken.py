@@ -0,0 +1,182 @@
+import logging
+import time
+from unittest import skip
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils.timezone import now
+
+from data_portal.models.gdsfile import GDSFile
+from data_portal.models.pathtoken import PathTokenType, S3ObjectPathToken, tokenize, match_token
+from data_portal.models.s3object import S3Object
+from data_portal.tests.factories import GDSFileFactory
+from data_processors.gds import services as gds_services
+from data_processors.s3 import services as s3_services
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SUBJECT_KEYS = [
+    "Project/SBJ00001/WGS/2020-01-01/final/SBJ00001/SBJ00001-ready.bam",
+    "Project/SBJ00001/WGS/2020-01-01/umccrised/SBJ00001__SBJ00001_MDX000001_L2000001/cancer_report.html",
+    "Project/SBJ00001/WGS/2020-01-01/umccrised/SBJ00001__SBJ00001_MDX000001_L2000001/multiqc_report.html",
+    "Project/SBJ00001/WTS/2020-01-01/final/SBJ00001_PRJ000001_L2000002_topup-ready.bam",
+    "Project/SBJ00001/WTS/2020-01-01/RNAseq_report.html",
+    "Project/SBJ00001/WGS/2020-01-01/.snakemake/cancer_report.html",
+    "Project/SBJ00002/WGS/2020-01-01/umccrised/SBJ00002__SBJ00002_MDX000002_L2000003/cancer_report.html",
+    "Project/SBJ000010/WGS/2020-01-01/umccrised/cancer_report.html",
+    "project/sbj00001/wgs/2020-01-01/umccrised/lower_case/cancer_report.html",
+]
+
+
+def _s3_object(bucket, key):
+    return S3Object(bucket=bucket, key=key, size=1, last_modified_date=now(), e_tag="etag")
+
+
+class PathTokenTests(TestCase):
+
+    def test_tokenize(self):
+        """
+        python manage.py test data_portal.models.tests.test_pathtoken.PathTokenTests.test_tokenize
+        """
+        tokens = tokenize(
+            "byob-icav2/production/analysis/umccrise/20240101abcd1234/SBJ00001__L2000001_rerun/PRJ000001.bam"
+        )
+        logger.info(tokens)
+        self.assertEqual(tokens, {
+            (PathTokenType.SUBJECT.value, "SBJ00001"),
+            (PathTokenType.LIBRARY.value, "L2000001_RERUN"),
+            (PathTokenType.LIBRARY.value, "L2000001"),
+            (PathTokenType.SAMPLE.value, "PRJ000001"),
+            (PathTokenType.PORTAL_RUN.value, "20240101ABCD1234"),
+        })
+
+        # portal run id must not be a fragment of a longer alphanumeric run
+        self.assertEqual(tokenize("1234567890123456789/x20240101abcd1234"), set())
+
+        self.assertEqual(match_token("sbj00001"), (PathTokenType.SUBJECT.value, "SBJ00001"))
+        self.assertEqual(match_token("L2000001_topup"), (PathTokenType.LIBRARY.value, "L2000001_TOPUP"))
+        self.assertIsNone(match_token("SBJ001"))
+        self.assertIsNone(match_token("200508_A01052_0001_BH5LY7ACGT"))
+
+    def test_index_at_ingest(self):
+        """
+        python manage.py test data_portal.models.tests.test_pathtoken.PathTokenTests.test_index_at_ingest
+        """
+        s3_services.persist_s3_object_bulk([_s3_object("bucket1", key) for key in SUBJECT_KEYS])
+
+        # upsert of the same objects again does not duplicate index rows
+        s3_services.persist_s3_object_bulk([_s3_object("bucket1", key) for key in SUBJECT_KEYS])
+        token_count = S3ObjectPathToken.objects.count()
+        self.assertEqual(token_count, sum(len(tokenize(key)) for key in SUBJECT_KEYS))
+
+        # index rows go along with the owner
+        s3_services.delete_s3_object_bulk([("bucket1", SUBJECT_KEYS[0])])
+        self.assertEqual(S3ObjectPathToken.objects.count(), token_count - len(tokenize(SUBJECT_KEYS[0])))
+
+    def test_token_lookup_same_as_icontains(self):
+        """
+        python manage.py test data_portal.models.tests.test_pathtoken.PathTokenTests.test_token_lookup_same_as_icontains
+        """
+        s3_services.persist_s3_object_bulk([_s3_object("bucket1", key) for key in SUBJECT_KEYS])
+
+        def _lookup():
+            return {
+                'subject_results': sorted(S3Object.objects.get_subject_results("SBJ00001").values_list('key', flat=True)),
+                'by_subject': sorted(S3Object.objects.get_by_keyword(subject="SBJ00001").values_list('key', flat=True)),
+                'by_library': sorted(S3Object.objects.get_by_keyword(subject="L2000002").values_list('key', flat=True)),
+                'by_keyword': sorted(S3Object.objects.get_by_keyword(subject="umccrised").values_list('key', flat=True)),
+            }
+
+        with override_settings(PATH_TOKEN_LOOKUP=False):
+            expected = _lookup()
+
+        with override_settings(PATH_TOKEN_LOOKUP=True):
+            actual = _lookup()
+
+        logger.info(actual)
+        self.assertEqual(actual, expected)
+        self.assertEqual(len(actual['subject_results']), 7)
+        self.assertEqual(len(actual['by_library']), 1)
+
+        with override_settings(PATH_TOKEN_LOOKUP=True):
+            sql = str(S3Object.objects.get_by_keyword(subject="SBJ00001").query)
+        logger.info(sql)
+        self.assertIn(S3ObjectPathToken._meta.db_table, sql)
+
+    @override_settings(PATH_TOKEN_LOOKUP=True)
+    def test_gds_file_token_lookup(self):
+        """
+        python manage.py test data_portal.models.tests.test_pathtoken.PathTokenTests.test_gds_file_token_lookup
+        """
+        gds_file_list = []
+        for path in ["/analysis_data/SBJ00001/umccrise/20240101abcd1234/cancer_report.html", "/Runs/x/Test.txt"]:
+            gds_file: GDSFile = GDSFileFactory.build(path=path)
+            gds_file_list.append(gds_file)
+        gds_services.persist_gds_file_bulk(gds_file_list)
+
+        self.assertEqual(GDSFile.objects.get_by_keyword(subject="SBJ00001").count(), 1)
+        self.assertEqual(GDSFile.objects.get_by_keyword(run="20240101abcd1234").count(), 1)
+        self.assertEqual(GDSFile.objects.get_subject_results("SBJ00001").count(), 1)
+
+    def test_backfill(self):
+        """
+        python manage.py test data_portal.models.tests.test_pathtoken.PathTokenTests.test_backfill
+        """
+        for key in SUBJECT_KEYS:
+            S3Object.objects.create(bucket="bucket1", key=key, size=1, last_modified_date=now(), e_tag="etag")
+        self.assertEqual(S3ObjectPathToken.objects.count(), 0)
+
+        progress_list = list(S3ObjectPathToken.backfill(chunk_size=4))
+        logger.info(progress_list)
+        self.assertEqual(len(progress_list), 3)
+        self.assertEqual(progress_list[-1]['owner_count'], len(SUBJECT_KEYS))
+
+        # resume after the first chunk, idempotent
+        list(S3ObjectPathToken.backfill(start_after_id=progress_list[0]['last_id'], chunk_size=4))
+        self.assertEqual(S3ObjectPathToken.objects.count(), sum(len(tokenize(key)) for key in SUBJECT_KEYS))
+
+        with override_settings(PATH_TOKEN_LOOKUP=True):
+            self.assertEqual(S3Object.objects.get_subject_results("SBJ00001").count(), 7)
+
+
+@skip
+class PathTokenBenchmarkTests(TestCase):
+    # benchmark is manual run, comment @skip and run i.e.
+    #   python manage.py test data_portal.models.tests.test_pathtoken.PathTokenBenchmarkTests
+    # and keep decorated @skip after run
+    # for MySQL, run with `export DJANGO_SETTINGS_MODULE=data_portal.settings.local` against portal db container
+
+    def test_benchmark_subject_lookup(self):
+        """
+        python manage.py test data_portal.models.tests.test_pathtoken.PathTokenBenchmarkTests.test_benchmark_subject_lookup
+        """
+        subjects = 2000
+        objects_per_subject = 100
+
+        obj_list = []
+        for i in range(subjects * objects_per_subject):
+            sbj = f"SBJ{i % subjects:05d}"
+            key = f"Project/{sbj}/WGS/2020-01-01/umccrised/{sbj}__{sbj}_MDX{i % subjects:06d}_L{i:07d}/file{i}.html"
+            obj_list.append(_s3_object("bucket1", key))
+
+        start = time.perf_counter()
+        for i in range(0, len(obj_list), 10000):
+            s3_services.persist_s3_object_bulk(obj_list[i:i + 10000])
+        logger.info(f"Ingest {len(obj_list)} S3Object with token index in {time.perf_counter() - start:.1f}s, "
+                    f"{S3ObjectPathToken.objects.count()} token rows")
+
+        lookups = [f"SBJ{i:05d}" for i in range(0, subjects, subjects // 20)]
+
+        elapsed = {}
+        for enabled in [False, True]:
+            with override_settings(PATH_TOKEN_LOOKUP=enabled):
+                start = time.perf_counter()
+                for sbj in lookups:
+                    self.assertEqual(S3Object.objects.get_by_keyword(subject=sbj).count(), objects_per_subject)
+                elapsed[enabled] = (time.perf_counter() - start) / len(lookups)
+
+        logger.info(f"{connection.vendor}: icontains {elapsed[False] * 1000:.1f}ms vs token {elapsed[True] * 1000:.1f}ms "
+                    f"per subject lookup over {len(obj_list)} rows")
+        self.assertLess(elapsed[True], elapsed[False])
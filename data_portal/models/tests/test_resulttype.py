@@ -0,0 +1,284 @@
+import logging
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils.timezone import now
+
+from data_portal.models.gdsfile import GDSFile
+from data_portal.models.labmetadata import LabMetadataAssay, LabMetadataType
+from data_portal.models.resulttype import ResultPipeline, ResultType, classify_s3_key, classify_gds_path, backfill, \
+    pipeline_mask, pipeline_mask_values
+from data_portal.models.s3object import S3Object
+from data_portal.tests.factories import LabMetadataFactory, GDSFileFactory
+from data_processors.gds import services as gds_services
+from data_processors.s3 import services as s3_services
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+BCBIO_BUCKET = "umccr-primary-data-prod"
+ONCOANALYSER_BUCKET = "org.umccr.data.oncoanalyser"
+BYOB_BUCKET = "pipeline-prod-cache-503977275616-ap-southeast-2"
+
+# fixture corpus of real key shapes, both result and non-result files, of each subject result set
+BCBIO_KEYS = [
+    "Project/SBJ00001/WGS/2020-01-01/final/SBJ00001_PRJ000001_L2000001/SBJ00001_PRJ000001_L2000001-ready.bam",
+    "Project/SBJ00001/WGS/2020-01-01/final/SBJ00001_PRJ000001_L2000001/SBJ00001_PRJ000001_L2000001-ready.bam.bai",
+    "Project/SBJ00001/WGS/2020-01-01/umccrised/SBJ00001__SBJ00001_PRJ000001_L2000001/small_variants/"
+    "SBJ00001__SBJ00001_PRJ000001_L2000001-somatic-PASS.vcf.gz",
+    "Project/SBJ00001/WGS/2020-01-01/umccrised/SBJ00001__SBJ00001_PRJ000001_L2000001/small_variants/"
+    "SBJ00001__SBJ00001_PRJ000001_L2000001-somatic.maf",
+    "Project/SBJ00001/WGS/2020-01-01/umccrised/work/SBJ00001__SBJ00001_PRJ000001_L2000001/small_variants/"
+    "SBJ00001__SBJ00001_PRJ000001_L2000001-somatic-PASS.vcf.gz",
+    "Project/SBJ00001/WGS/2020-01-01/umccrised/SBJ00001__SBJ00001_PRJ000001_L2000001/"
+    "SBJ00001__SBJ00001_PRJ000001_L2000001_cancer_report.html",
+    "Project/SBJ00001/WGS/2020-01-01/umccrised/SBJ00001__SBJ00001_PRJ000001_L2000001/"
+    "SBJ00001__SBJ00001_PRJ000001_L2000001-multiqc_report.html",
+    "Project/SBJ00001/WGS/2020-01-01/umccrised/SBJ00001__SBJ00001_PRJ000001_L2000001/"
+    "SBJ00001__SBJ00001_PRJ000001_L2000001-somatic.pcgr.html",
+    "Project/SBJ00001/WGS/2020-01-01/umccrised/SBJ00001__SBJ00001_PRJ000001_L2000001/"
+    "SBJ00001__SBJ00001_PRJ000001_L2000001-normal.cpsr.html",
+    "Project/SBJ00001/WGS/2020-01-01/umccrised/SBJ00001__SBJ00001_PRJ000001_L2000001/pcgr/"
+    "SBJ00001__SBJ00001_PRJ000001_L2000001-somatic.pcgr.html",
+    "Project/SBJ00001/WGS/2020-01-01/umccrised/SBJ00001__SBJ00001_PRJ000001_L2000001/"
+    "SBJ00001__SBJ00001_PRJ000001_L2000001-tumor.cacao.html",
+    "Project/SBJ00001/WGS/2020-01-01/umccrised/SBJ00001__SBJ00001_PRJ000001_L2000001/purple/"
+    "SBJ00001__SBJ00001_PRJ000001_L2000001.circos.baf.png",
+    "Project/SBJ00001/WGS/2020-01-01/umccrised/.snakemake/log/SBJ00001_cancer_report.html",
+    "Project/SBJ00001/WGS/2020-01-01/gridss_purple_linx/SBJ00001_PRJ000001_L2000001_linx.html",
+    "Project/SBJ00001/WTS/2020-01-01/final/SBJ00001_PRJ000003_L2000003/SBJ00001_PRJ000003_L2000003-ready.bam",
+    "Project/SBJ00001/WTS/2020-01-01/final/multiqc/multiqc_report.html",
+    "Project/SBJ00001/WTS/2020-01-01/final/SBJ00001_PRJ000003_L2000003/arriba/fusions.pdf",
+    "Project/SBJ00001/WTS/2020-01-01/RNAsum/SBJ00001_PRJ000003_L2000003_RNAseq_report.html",
+    "Project/SBJ00001/WTS/2020-01-01/final/SBJ00001_PRJ000003_L2000003/SBJ00001_PRJ000003_L2000003.counts.tsv",
+    "Project/SBJ00002/WGS/2020-01-01/umccrised/SBJ00002__SBJ00002_PRJ000009_L2000009/"
+    "SBJ00002__SBJ00002_PRJ000009_L2000009_cancer_report.html",
+]
+
+SASH_KEYS = [
+    "analysis_data/SBJ00001/sash/20240101abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/cancer_report/"
+    "SBJ00001_PRJ000002.cancer_report.html",
+    "analysis_data/SBJ00001/sash/20240101abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/smlv_somatic/report/"
+    "SBJ00001_PRJ000002.pcgr.html",
+    "analysis_data/SBJ00001/sash/20240101abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/smlv_germline/report/"
+    "SBJ00001_PRJ000001.cpsr.html",
+    "analysis_data/SBJ00001/sash/20240101abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/linx/"
+    "SBJ00001_PRJ000002_linx.html",
+    "analysis_data/SBJ00001/sash/20240101abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/purple/plot/"
+    "SBJ00001_PRJ000002.circos_baf.png",
+    "analysis_data/SBJ00001/sash/20240101abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/multiqc/"
+    "SBJ00001_PRJ000002.multiqc_report.html",
+    "analysis_data/SBJ00001/sash/20240101abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/smlv_germline/prepare/"
+    "SBJ00001_PRJ000001.annotations.vcf.gz",
+    "analysis_data/SBJ00001/sash/20240101abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/smlv_somatic/filter/"
+    "SBJ00001_PRJ000002.filters_set.vcf.gz",
+    "analysis_data/SBJ00001/sash/20240101abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/smlv_somatic/filter/"
+    "SBJ00001_PRJ000002.filters_set.vcf.gz.tbi",
+    "analysis_data/SBJ00001/sash/20240101abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/smlv_somatic/filter/"
+    "SBJ00001_PRJ000002.pass.vcf.gz",
+    "analysis_data/SBJ00001/sash/20240101abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/smlv_somatic/report/pcgr/"
+    "SBJ00001_PRJ000002.pass.vcf.gz",
+    "analysis_data/SBJ00001/sash/20240101abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/sv_somatic/prioritise/"
+    "SBJ00001_PRJ000002.sv.prioritised.vcf.gz",
+    "analysis_data/SBJ00001/oncoanalyser/20240101abcd5678/wgts/L2000001_L2000002/SBJ00001_PRJ000002/purple/"
+    "SBJ00001_PRJ000002.purple.cnv.somatic.tsv",
+]
+
+BYOB_KEYS = [
+    # sash
+    "byob-icav2/production/analysis/sash/20240601abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/cancer_report/"
+    "SBJ00001_PRJ000002.cancer_report.html",
+    "byob-icav2/production/analysis/sash/20240601abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/smlv_somatic/filter/"
+    "SBJ00001_PRJ000002.pass.vcf.gz",
+    "byob-icav2/production/analysis/sash/20240601abcd1234/L2000001_L2000002/SBJ00001_PRJ000002/smlv_somatic/filter/"
+    "SBJ00001_PRJ000002.pass.vcf.gz.tbi",
+    # cttsov2
+    "byob-icav2/production/analysis/cttsov2/20240601efgh5678/L2000005/Results/L2000005/L2000005.tmb.metrics.csv",
+    "byob-icav2/production/analysis/cttsov2/20240601efgh5678/L2000005/Results/L2000005/L2000005_CombinedVariantOutput.tsv",
+    "byob-icav2/production/analysis/cttsov2/20240601efgh5678/L2000005/Logs_Intermediates/DnaRealignment/L2000005/"
+    "L2000005.bam",
+    "byob-icav2/production/analysis/cttsov2/20240601efgh5678/L2000005/Logs_Intermediates/Tmb/L2000005.json",
+    # wgts
+    "byob-icav2/production/analysis/tumor-normal/20240601abcd5678/L2000001_L2000002_dragen_somatic/PRJ000002_tumor.bam",
+    "byob-icav2/production/analysis/tumor-normal/20240601abcd5678/L2000001_L2000002_dragen_somatic/"
+    "PRJ000002_tumor.bam.bai",
+    "byob-icav2/production/analysis/tumor-normal/20240601abcd5678/L2000001_dragen_germline/"
+    "PRJ000001.hard-filtered.vcf.gz",
+    "byob-icav2/production/analysis/umccrise/20240601aaaa1111/L2000001__L2000002/SBJ00001__PRJ000002/small_variants/"
+    "SBJ00001__PRJ000002-somatic-PASS.vcf.gz",
+    "byob-icav2/production/analysis/umccrise/20240601aaaa1111/L2000001__L2000002/work/SBJ00001__PRJ000002/"
+    "small_variants/SBJ00001__PRJ000002-somatic-PASS.vcf.gz",
+    "byob-icav2/production/analysis/umccrise/20240601aaaa1111/L2000001__L2000002/SBJ00001__PRJ000002/"
+    "SBJ00001__PRJ000002-cancer_report.html",
+    "byob-icav2/production/analysis/umccrise/20240601aaaa1111/L2000001__L2000002/SBJ00001__PRJ000002/"
+    "SBJ00001__PRJ000002-multiqc_report.html",
+    "byob-icav2/production/analysis/umccrise/20240601aaaa1111/L2000001__L2000002/SBJ00001__PRJ000002/"
+    "SBJ00001__PRJ000002-somatic.pcgr.html",
+    "byob-icav2/production/analysis/umccrise/20240601aaaa1111/L2000001__L2000002/SBJ00001__PRJ000002/"
+    "SBJ00001__PRJ000002-normal.cpsr.html",
+    "byob-icav2/production/analysis/umccrise/20240601aaaa1111/L2000001__L2000002/SBJ00001__PRJ000002/"
+    "SBJ00001__PRJ000002-tumor.cacao.html",
+    "byob-icav2/production/analysis/umccrise/20240601aaaa1111/L2000001__L2000002/SBJ00001__PRJ000002/purple/"
+    "SBJ00001__PRJ000002.circos.baf.png",
+    "byob-icav2/production/analysis/wts/20240601bbbb2222/L2000003_dragen/L2000003.bam",
+    "byob-icav2/production/analysis/wts/20240601bbbb2222/L2000003_dragen/multiqc/L2000003_multiqc_report.html",
+    "byob-icav2/production/analysis/wts/20240601bbbb2222/L2000003_dragen/arriba/fusions.pdf",
+    "byob-icav2/production/analysis/rnasum/20240601cccc3333/L2000003/SBJ00001_L2000003.RNAseq_report.html",
+    "byob-icav2/production/analysis/rnasum/20240601cccc3333/L2000003/SBJ00001_L2000003.RNAseq_report.html.md5",
+    "byob-icav2/production/primary/240601_A01052_0200_BH7JMMDRX5/20240601dddd4444/Samples/Lane_1/L2000001/"
+    "L2000001_S1_L001_R1_001.fastq.ora",
+]
+
+GDS_PATHS = [
+    "/analysis_data/SBJ00001/wgs_tumor_normal/20210101abcd1234/L2000001_L2000002_dragen/PRJ000002_tumor.bam",
+    "/analysis_data/SBJ00001/wgs_tumor_normal/20210101abcd1234/L2000001_L2000002_dragen/PRJ000002_tumor.bam.bai",
+    "/analysis_data/SBJ00001/wgs_tumor_normal/20210101abcd1234/L2000001_dragen_germline/PRJ000001.vcf.gz",
+    "/analysis_data/SBJ00001/umccrise/20210101efgh5678/L2000001__L2000002/SBJ00001__PRJ000002/small_variants/"
+    "SBJ00001__PRJ000002-somatic-PASS.vcf.gz",
+    "/analysis_data/SBJ00001/umccrise/20210101efgh5678/L2000001__L2000002/SBJ00001__PRJ000002/"
+    "SBJ00001__PRJ000002-cancer_report.html",
+    "/analysis_data/SBJ00001/umccrise/20210101efgh5678/L2000001__L2000002/SBJ00001__PRJ000002/"
+    "SBJ00001__PRJ000002-multiqc_report.html",
+    "/analysis_data/SBJ00001/umccrise/20210101efgh5678/L2000001__L2000002/SBJ00001__PRJ000002/"
+    "SBJ00001__PRJ000002-somatic.pcgr.html",
+    "/analysis_data/SBJ00001/umccrise/20210101efgh5678/L2000001__L2000002/SBJ00001__PRJ000002/"
+    "SBJ00001__PRJ000002-normal.cacao.html",
+    "/analysis_data/SBJ00001/umccrise/20210101efgh5678/L2000001__L2000002/SBJ00001__PRJ000002/purple/"
+    "SBJ00001__PRJ000002.circos.baf.png",
+    "/analysis_data/SBJ00001/umccrise/20210101efgh5678/L2000001__L2000002/SBJ00001__PRJ000002/"
+    "gridss_purple_linx/SBJ00001__PRJ000002_linx.html",
+    "/analysis_data/SBJ00001/wts_tumor_only/20210101ijkl9012/L2000003_dragen/PRJ000003_tumor.bam",
+    "/analysis_data/SBJ00001/wts_tumor_only/20210101ijkl9012/L2000003_dragen/multiqc/PRJ000003_tumor_multiqc.html",
+    "/analysis_data/SBJ00001/wts_tumor_only/20210101ijkl9012/L2000003_dragen/arriba/fusions.pdf",
+    "/analysis_data/SBJ00001/rnasum/20210101mnop3456/L2000003/SBJ00001_PRJ000003.RNAseq_report.html",
+    "/analysis_data/SBJ00001/tso_ctdna_tumor_only/20210101qrst7890/L2000005/Results/PRJ000005_L2000005/"
+    "PRJ000005_L2000005.bam",
+    "/analysis_data/SBJ00001/tso_ctdna_tumor_only/20210101qrst7890/L2000005/Results/PRJ000005_L2000005/"
+    "PRJ000005_L2000005.hard-filtered.vcf.gz",
+    "/analysis_data/SBJ00001/tso_ctdna_tumor_only/20210101qrst7890/L2000005/Results/PRJ000005_L2000005/"
+    "PRJ000005_L2000005_Fusions.tsv",
+    "/analysis_data/SBJ00001/tso_ctdna_tumor_only/20210101qrst7890/L2000005/Results/PRJ000005_L2000005/"
+    "PRJ000005_L2000005.json",
+    "/Runs/210101_A01052_0030_AHGFJKDSXY_r.ACGTlKjDgEy099ioQOeOWg/SampleSheet.csv",
+]
+
+
+def _s3_object(bucket, key):
+    return S3Object(bucket=bucket, key=key, size=1, last_modified_date=now(), e_tag="etag")
+
+
+class ResultTypeTests(TestCase):
+
+    def setUp(self) -> None:
+        s3_services.persist_s3_object_bulk(
+            [_s3_object(BCBIO_BUCKET, key) for key in BCBIO_KEYS] +
+            [_s3_object(ONCOANALYSER_BUCKET, key) for key in SASH_KEYS] +
+            [_s3_object(BYOB_BUCKET, key) for key in BYOB_KEYS]
+        )
+
+        gds_file_list = []
+        for path in GDS_PATHS:
+            gds_file: GDSFile = GDSFileFactory.build(path=path, volume_name="production")
+            gds_file_list.append(gds_file)
+        gds_services.persist_gds_file_bulk(gds_file_list)
+
+        for library_id, type_, assay in [
+            ("L2000001", LabMetadataType.WGS.value, LabMetadataAssay.TSQ_NANO.value),
+            ("L2000002", LabMetadataType.WGS.value, LabMetadataAssay.TSQ_NANO.value),
+            ("L2000003", LabMetadataType.WTS.value, LabMetadataAssay.NEB_RNA.value),
+            ("L2000005", "ctDNA", LabMetadataAssay.CT_TSO_V2.value),
+        ]:
+            LabMetadataFactory(library_id=library_id, type=type_, assay=assay)
+
+    def test_classify(self):
+        """
+        python manage.py test data_portal.models.tests.test_resulttype.ResultTypeTests.test_classify
+        """
+        none = (frozenset(), ResultType.NONE)
+        self.assertEqual(classify_s3_key(BCBIO_KEYS[0]), ({ResultPipeline.BCBIO}, ResultType.BAM))
+        self.assertEqual(classify_s3_key(BCBIO_KEYS[1]), none)
+        self.assertEqual(classify_s3_key(BCBIO_KEYS[4]), none)  # umccrised/work
+        self.assertEqual(classify_s3_key(BCBIO_KEYS[11]), ({ResultPipeline.BCBIO}, ResultType.CIRCOS))
+        self.assertEqual(classify_s3_key(BCBIO_KEYS[12]), none)  # .snakemake
+        self.assertEqual(classify_s3_key(SASH_KEYS[10]), none)  # pcgr pass vcf
+        self.assertEqual(classify_s3_key(BYOB_KEYS[0]), ({ResultPipeline.SASH}, ResultType.CANCER_REPORT))
+        self.assertEqual(classify_s3_key(BYOB_KEYS[3]), ({ResultPipeline.CTTSOV2}, ResultType.TMB_METRICS))
+        # rnasum report is both WGTS result and, BCBIO result when looked up without bucket
+        self.assertEqual(
+            classify_s3_key(BYOB_KEYS[21]), ({ResultPipeline.WGTS, ResultPipeline.BCBIO}, ResultType.RNASUM))
+        self.assertEqual(classify_gds_path(GDS_PATHS[0]), ({ResultPipeline.ICAV1}, ResultType.BAM))
+        self.assertEqual(classify_gds_path(GDS_PATHS[-1]), none)
+
+        # classified at ingest, as bitmask of result sets
+        s3_object = S3Object.objects.get(key=BYOB_KEYS[17])
+        self.assertEqual(s3_object.result_pipeline, pipeline_mask(classify_s3_key(BYOB_KEYS[17])[0]))
+        self.assertIn(s3_object.result_pipeline, pipeline_mask_values(ResultPipeline.WGTS))
+        self.assertEqual(s3_object.result_type, ResultType.CIRCOS)
+
+    def test_same_as_regex(self):
+        """
+        python manage.py test data_portal.models.tests.test_resulttype.ResultTypeTests.test_same_as_regex
+        """
+
+        def _lookup():
+            def _keys(qs):
+                return sorted(qs.values_list('key', flat=True))
+
+            return {
+                'bcbio': _keys(S3Object.objects.get_subject_results("SBJ00001", bucket=BCBIO_BUCKET)),
+                'sash': _keys(S3Object.objects.get_subject_sash_results("SBJ00001", bucket=ONCOANALYSER_BUCKET)),
+                'icav2_cttsov2': _keys(
+                    S3Object.objects.get_subject_cttsov2_results_from_icav2("SBJ00001", bucket=BYOB_BUCKET)),
+                'icav2_wgts': _keys(
+                    S3Object.objects.get_subject_wgts_results_from_icav2("SBJ00001", bucket=BYOB_BUCKET)),
+                'icav2_sash': _keys(
+                    S3Object.objects.get_subject_sash_results_from_icav2("SBJ00001", bucket=BYOB_BUCKET)),
+                # unscoped, i.e. any bucket
+                'bcbio_any': _keys(S3Object.objects.get_subject_results("SBJ00001")),
+                'sash_any': _keys(S3Object.objects.get_subject_sash_results("SBJ00001")),
+                'icav2_cttsov2_any': _keys(S3Object.objects.get_subject_cttsov2_results_from_icav2("SBJ00001")),
+                'icav2_wgts_any': _keys(S3Object.objects.get_subject_wgts_results_from_icav2("SBJ00001")),
+                'icav2_sash_any': _keys(S3Object.objects.get_subject_sash_results_from_icav2("SBJ00001")),
+                'gds': sorted(GDSFile.objects.get_subject_results("SBJ00001").values_list('path', flat=True)),
+            }
+
+        with override_settings(RESULT_TYPE_LOOKUP=False):
+            expected = _lookup()
+
+        with override_settings(RESULT_TYPE_LOOKUP=True):
+            actual = _lookup()
+
+        logger.info({k: len(v) for k, v in actual.items()})
+        self.assertEqual(actual, expected)
+        self.assertEqual(
+            {k: len(v) for k, v in actual.items()},
+            {
+                'bcbio': 14, 'sash': 10, 'icav2_cttsov2': 3, 'icav2_wgts': 13, 'icav2_sash': 2,
+                'bcbio_any': 15, 'sash_any': 12, 'icav2_cttsov2_any': 3, 'icav2_wgts_any': 13, 'icav2_sash_any': 2,
+                'gds': 16,
+            }
+        )
+
+        with override_settings(RESULT_TYPE_LOOKUP=True):
+            sql = str(S3Object.objects.get_subject_results("SBJ00001").query)
+        logger.info(sql)
+        self.assertNotIn("REGEXP", sql.upper())
+
+    def test_backfill(self):
+        """
+        python manage.py test data_portal.models.tests.test_resulttype.ResultTypeTests.test_backfill
+        """
+        S3Object.objects.update(result_pipeline=None, result_type=None)
+        with override_settings(RESULT_TYPE_LOOKUP=True):
+            self.assertEqual(S3Object.objects.get_subject_results("SBJ00001").count(), 0)
+
+        progress_list = list(backfill(S3Object, chunk_size=20))
+        logger.info(progress_list)
+        self.assertEqual(progress_list[-1]['row_count'], S3Object.objects.count())
+        self.assertEqual(progress_list[-1]['update_count'], S3Object.objects.count())
+
+        # idempotent, nothing stale on re-run
+        self.assertEqual(list(backfill(S3Object))[-1]['update_count'], 0)
+
+        with override_settings(RESULT_TYPE_LOOKUP=True):
+            self.assertEqual(S3Object.objects.get_subject_results("SBJ00001", bucket=BCBIO_BUCKET).count(), 14)
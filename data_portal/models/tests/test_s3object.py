@@ -1,7 +1,13 @@
 import hashlib
 import logging
+import random
+import time
+from unittest import skip
+from unittest.mock import patch
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import now
 
 from data_portal.fields import HashFieldHelper
@@ -85,3 +91,85 @@ class S3ObjectTests(TestCase):
 
         self.assertEqual(len(sash_results), 4, "4 valid key is expected")
         self.assertEqual(list_sash_results, valid_keys, 'only valid key is expected')
+
+    def test_random_samples_gappy_pk(self):
+        """
+        python manage.py test data_portal.models.tests.test_s3object.S3ObjectTests.test_random_samples_gappy_pk
+        """
+        # dense, clustered and very sparse PK space
+        for pk_list in [list(range(1, 301)), list(range(1, 101)) + list(range(100001, 100201)),
+                        [i * 100000 for i in range(1, 301)]]:
+            S3Object.objects.all().delete()
+            _create_s3_objects(pk_list)
+
+            with CaptureQueriesContext(connection) as ctx:
+                samples = list(S3Object.objects.random_samples(50))
+
+            logger.info(f"{len(ctx.captured_queries)} queries for 50 samples out of PK {pk_list[0]}..{pk_list[-1]}")
+            self.assertEqual(len(samples), 50)
+            self.assertEqual(len({o.id for o in samples}), 50)
+            self.assertTrue({o.id for o in samples}.issubset(pk_list))
+            self.assertLessEqual(len(ctx.captured_queries), 1 + S3Object.objects.RAND_SAMPLES_ROUNDS + 2 + 1)
+            self.assertFalse(any('RAND' in q['sql'].upper() for q in ctx.captured_queries))
+
+        # cannot give more samples than what we have
+        self.assertEqual(S3Object.objects.random_samples(500).count(), 300)
+
+        S3Object.objects.all().delete()
+        self.assertEqual(S3Object.objects.random_samples(10).count(), 0)
+
+    def test_random_samples_fallback(self):
+        """
+        python manage.py test data_portal.models.tests.test_s3object.S3ObjectTests.test_random_samples_fallback
+        """
+        pk_list = [i * 100000 for i in range(1, 301)]
+        _create_s3_objects(pk_list)
+
+        # no round, all samples from the PK window, which wraps around when it starts near max id
+        with patch.object(S3Object.objects, 'RAND_SAMPLES_ROUNDS', 0):
+            for _ in range(20):
+                sample_ids = {o.id for o in S3Object.objects.random_samples(50)}
+                self.assertEqual(len(sample_ids), 50)
+                self.assertTrue(sample_ids.issubset(pk_list))
+
+
+def _create_s3_objects(pk_list):
+    S3Object.objects.bulk_create([
+        S3Object(id=pk, bucket='some-bucket', key=f"key-{pk}.csv", size=1000, last_modified_date=now(), e_tag='etag')
+        for pk in pk_list
+    ])
+
+
+@skip
+class S3ObjectRandomSamplesBenchmarkTests(TestCase):
+    # benchmark is manual run, comment @skip and run i.e.
+    #   python manage.py test data_portal.models.tests.test_s3object.S3ObjectRandomSamplesBenchmarkTests
+    # and keep decorated @skip after run
+    # for MySQL, run with `export DJANGO_SETTINGS_MODULE=data_portal.settings.local` against portal db container
+
+    def test_benchmark_random_samples(self):
+        """
+        python manage.py test data_portal.models.tests.test_s3object.S3ObjectRandomSamplesBenchmarkTests.test_benchmark_random_samples
+        """
+        rows = 100000
+
+        distributions = {
+            'dense': range(1, rows + 1),
+            'every_10th': range(1, rows * 10 + 1, 10),
+            'clustered': [c * 10000000 + i for c in range(10) for i in range(1, rows // 10 + 1)],
+            'uniform_sparse': sorted(random.sample(range(1, rows * 1000), rows)),
+        }
+
+        for name, pk_list in distributions.items():
+            S3Object.objects.all().delete()
+            for i in range(0, len(pk_list), 10000):
+                _create_s3_objects(pk_list[i:i + 10000])
+
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                samples = list(S3Object.objects.random_samples(S3Object.objects.MAX_RAND_SAMPLES_LIMIT))
+                elapsed = time.perf_counter() - start
+
+            logger.info(f"{connection.vendor} {name}: {len(samples)} samples in {elapsed * 1000:.1f}ms with "
+                        f"{len(ctx.captured_queries)} queries over {rows} rows")
+            self.assertEqual(len(samples), S3Object.objects.MAX_RAND_SAMPLES_LIMIT)
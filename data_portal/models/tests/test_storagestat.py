@@ -0,0 +1,89 @@
+import logging
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import override_settings, CaptureQueriesContext
+from django.utils.timezone import now
+
+from data_portal.models.gdsfile import GDSFile
+from data_portal.models.s3object import S3Object
+from data_portal.models.storagestat import StorageStat, StorageStatSource
+from data_portal.tests.factories import GDSFileFactory, LIMSRowFactory, S3LIMSFactory
+from data_processors.gds import services as gds_services
+from data_processors.s3 import services as s3_services
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def _s3_object(bucket, key, size=1):
+    return S3Object(bucket=bucket, key=key, size=size, last_modified_date=now(), e_tag="etag")
+
+
+def _stats(source):
+    return {
+        s.name: (s.object_count, s.total_bytes) for s in StorageStat.objects.filter(source=source, object_count__gt=0)
+    }
+
+
+class StorageStatTests(TestCase):
+
+    def test_incremental_same_as_rebuild(self):
+        """
+        python manage.py test data_portal.models.tests.test_storagestat.StorageStatTests.test_incremental_same_as_rebuild
+        """
+        s3_services.persist_s3_object_bulk([_s3_object(f"bucket{i % 2}", f"key-{i}", size=i) for i in range(10)])
+        # overwrite with new size, add one more, then delete some
+        s3_services.persist_s3_object_bulk([_s3_object("bucket0", "key-0", size=100), _s3_object("bucket2", "key")])
+        s3_services.delete_s3_object_bulk([("bucket1", "key-1"), ("bucket1", "key-3"), ("bucket1", "no-such-key")])
+        s3_services.delete_s3_object("bucket2", "key")
+
+        gds_services.persist_gds_file_bulk([GDSFileFactory.build(path=f"/p/{i}", size_in_bytes=10) for i in range(3)])
+        gds_services.persist_gds_file_bulk([GDSFileFactory.build(volume_name="vol2", path="/p/0", size_in_bytes=5)])
+        gds_services.delete_gds_file_bulk([GDSFile.objects.get(volume_name="vol2").unique_hash])
+        gds_services.delete_gds_file({'volumeName': GDSFileFactory.volume_name, 'path': "/p/2"})
+
+        incremental = {source: _stats(source) for source in [StorageStatSource.S3, StorageStatSource.GDS]}
+
+        self.assertEqual(incremental[StorageStatSource.S3], {
+            'bucket0': (5, 100 + 2 + 4 + 6 + 8),
+            'bucket1': (3, 5 + 7 + 9),
+        })
+        self.assertEqual(incremental[StorageStatSource.GDS], {GDSFileFactory.volume_name: (2, 20)})
+
+        for source in [StorageStatSource.S3, StorageStatSource.GDS]:
+            StorageStat.objects.rebuild(source)
+            self.assertEqual(_stats(source), incremental[source])
+
+        self.assertIsNotNone(StorageStat.objects.filter(source=StorageStatSource.S3).first().last_refreshed)
+
+    @override_settings(STORAGE_STATS_LOOKUP=True)
+    def test_storage_stats(self):
+        """
+        python manage.py test data_portal.models.tests.test_storagestat.StorageStatTests.test_storage_stats
+        """
+        s3_services.persist_s3_object_bulk([_s3_object(f"bucket{i % 3}", f"key-{i}") for i in range(9)])
+        S3LIMSFactory(s3_object=S3Object.objects.first(), lims_row=LIMSRowFactory())
+        LIMSRowFactory()
+
+        for source in StorageStatSource.values:
+            StorageStat.objects.rebuild(source)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/storage-stats')
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        values = {k: v['value'] for k, v in response.json().items()}
+        self.assertEqual(values, {
+            'total_s3': 9, 'linked_s3': 1, 'not_linked_s3': 8, 'total_lims': 2, 'linked_lims': 1, 'not_linked_lims': 1,
+        })
+
+        # same as live count
+        with override_settings(STORAGE_STATS_LOOKUP=False):
+            response = self.client.get('/storage-stats')
+        self.assertEqual({k: v['value'] for k, v in response.json().items()}, values)
+
+        response = self.client.get('/buckets/?ordering=bucket')
+        self.assertEqual(response.data['results'], ['bucket0', 'bucket1', 'bucket2'])
+        response = self.client.get('/buckets/?search=bucket1')
+        self.assertEqual(response.data['results'], ['bucket1'])
@@ -1,31 +1,231 @@
+import base64
+import json
 from abc import ABC
+from functools import partial
+from typing import List, Optional, Tuple
 
+from django.conf import settings
+from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from data_portal import counting
+from data_portal.counting import CountStrategy
 
 
 class PaginationConstant(ABC):
     ROWS_PER_PAGE = 'rowsPerPage'
     PAGE = 'page'
     COUNT = 'count'
+    CURSOR = 'cursor'
+    COUNT_APPROXIMATE = 'countApproximate'
+    HAS_MORE = 'hasMore'
+
+
+class CountingPaginator(Paginator):
+    """
+    Django Paginator that counts by the given counting.CountStrategy. With `has_more`, page fetches one row past the
+    page instead of COUNT(*), and count is then the lower bound known so far. The `approximate` flag tells whether
+    count may be off, i.e. served from cache or table statistics, or a lower bound with more rows to come.
+    """
+
+    def __init__(self, object_list, per_page, strategy: str = CountStrategy.EXACT, **kwargs):
+        super(CountingPaginator, self).__init__(object_list, per_page, **kwargs)
+        self.strategy = strategy
+        self.approximate = False
+        self.has_more = None
+        self._count = None
+
+    @property
+    def count(self):
+        if self._count is None:
+            if self.strategy == CountStrategy.HAS_MORE:
+                # not known until a page has been fetched
+                self._count, self.approximate = 0, True
+            elif isinstance(self.object_list, QuerySet):
+                self._count, self.approximate = counting.count(self.object_list, self.strategy)
+            else:
+                self._count = len(self.object_list)
+        return self._count
+
+    def page(self, number):
+        if self.strategy != CountStrategy.HAS_MORE:
+            return super(CountingPaginator, self).page(number)
+
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+
+        self.has_more = len(rows) > self.per_page
+        self._count = bottom + len(rows)
+        self.approximate = self.has_more
+        self.__dict__.pop('num_pages', None)  # as of count so far
+        return self._get_page(rows[:self.per_page], number, self)
 
 
 class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Page number pagination. View may opt-in `approximate_count = True`, then count is done by PAGINATION_COUNT_STRATEGY
+    setting, see counting module, and `pagination` envelope carries `countApproximate`, plus `hasMore` for has_more.
+    """
     page_size = api_settings.PAGE_SIZE
     page_size_query_param = PaginationConstant.ROWS_PER_PAGE
     max_page_size = 1000
 
+    count_strategy = CountStrategy.EXACT
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if getattr(view, 'approximate_count', False):
+            self.count_strategy = settings.PAGINATION_COUNT_STRATEGY
+        self.django_paginator_class = partial(CountingPaginator, strategy=self.count_strategy)
+        return super(StandardResultsSetPagination, self).paginate_queryset(queryset, request, view)
+
     def get_paginated_response(self, data):
+        paginator = self.page.paginator
+        pagination = {
+            PaginationConstant.COUNT: paginator.count,
+            PaginationConstant.PAGE: self.page.number,
+            PaginationConstant.ROWS_PER_PAGE: self.get_page_size(self.request),
+        }
+        if self.count_strategy != CountStrategy.EXACT:
+            pagination[PaginationConstant.COUNT_APPROXIMATE] = paginator.approximate
+        if self.count_strategy == CountStrategy.HAS_MORE:
+            pagination[PaginationConstant.HAS_MORE] = paginator.has_more
+
+        return Response({
+            'links': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+            },
+            'pagination': pagination,
+            'results': data
+        })
+
+
+class KeysetResultsSetPagination(StandardResultsSetPagination):
+    """
+    Page number pagination as StandardResultsSetPagination by default. Client opt-in keyset pagination by passing
+    `cursor` query parameter, empty for the first page, then follow `links.next` and `links.previous`.
+
+    Keyset page is seek on the view `cursor_ordering`, i.e. an indexed column plus id for stable order, instead of
+    OFFSET. And, it does not COUNT(*). Hence, page latency stays flat at any depth. Response envelope is the same;
+    `count` and `page` are null, `ordering` query parameter does not apply, in keyset mode.
+    """
+    cursor_query_param = PaginationConstant.CURSOR
+    cursor_ordering = ('-id',)
+    invalid_cursor_message = "Invalid cursor"
+
+    keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super(KeysetResultsSetPagination, self).paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.keyset_page_size = self.get_page_size(request)
+        self.ordering = list(getattr(view, 'cursor_ordering', self.cursor_ordering))
+
+        position, reverse = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+        ordering = [_invert(o) for o in self.ordering] if reverse else self.ordering
+
+        qs = queryset.order_by(*ordering)
+        if position is not None:
+            qs = qs.filter(_seek_q(ordering, position))
+
+        rows = list(qs[:self.keyset_page_size + 1])
+        has_more = len(rows) > self.keyset_page_size
+        rows = rows[:self.keyset_page_size]
+        if reverse:
+            rows.reverse()
+
+        # coming from the other direction, there is always a page to go back to
+        self.has_next = position is not None if reverse else has_more
+        self.has_previous = has_more if reverse else position is not None
+        self.rows = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super(KeysetResultsSetPagination, self).get_paginated_response(data)
+
         return Response({
             'links': {
                 'next': self.get_next_link(),
                 'previous': self.get_previous_link(),
             },
             'pagination': {
-                PaginationConstant.COUNT: self.page.paginator.count,
-                PaginationConstant.PAGE: self.page.number,
-                PaginationConstant.ROWS_PER_PAGE: self.get_page_size(self.request),
+                PaginationConstant.COUNT: None,
+                PaginationConstant.PAGE: None,
+                PaginationConstant.ROWS_PER_PAGE: self.keyset_page_size,
             },
             'results': data
         })
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super(KeysetResultsSetPagination, self).get_next_link()
+        if not self.has_next or not self.rows:
+            return None
+        return self._link(self.rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super(KeysetResultsSetPagination, self).get_previous_link()
+        if not self.has_previous or not self.rows:
+            return None
+        return self._link(self.rows[0], reverse=True)
+
+    def _link(self, row, reverse: bool) -> str:
+        position = [getattr(row, o.lstrip('-')) for o in self.ordering]
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor(position, reverse)
+        )
+
+    @staticmethod
+    def encode_cursor(position: List, reverse: bool) -> str:
+        token = json.dumps({'p': position, 'r': reverse}, default=str)
+        return base64.urlsafe_b64encode(token.encode()).decode()
+
+    def decode_cursor(self, encoded: Optional[str]) -> Tuple[Optional[List], bool]:
+        if not encoded:
+            return None, False
+        try:
+            token = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            position, reverse = token['p'], bool(token['r'])
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+
+def _invert(ordering: str) -> str:
+    return ordering[1:] if ordering.startswith('-') else f"-{ordering}"
+
+
+def _seek_q(ordering: List[str], position: List) -> Q:
+    """
+    Rows after the position in the ordering, i.e. row value comparison (a, b, id) > (x, y, z) spelled out as
+    (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND id > z), with < for descending field
+    """
+    q = Q()
+    for i, o in enumerate(ordering):
+        field = o.lstrip('-')
+        step = Q(**{f"{field}__{'lt' if o.startswith('-') else 'gt'}": position[i]})
+        for j in range(i):
+            step &= Q(**{ordering[j].lstrip('-'): position[j]})
+        q |= step
+    return q
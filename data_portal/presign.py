@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""presign module
+
+Shared presign layer of S3 object and GDS file, i.e. one pooled client per warm container instead of one per call and,
+a bounded cache of issued URLs. A URL is keyed by the object identity (bucket and key, or GDS file id), its version
+(S3 ETag, or GDS time modified) and the signing params. Hence, a changed object is never served the URL of its old
+content. A cached URL is reused while its remaining validity is at least PRESIGN_CACHE_MIN_REMAINING of its full
+expiry, then reissued, so that a reused URL still gives the caller at least that long.
+
+Hit rate is exposed by stats() and, logged every STATS_LOG_INTERVAL lookups for CloudWatch Logs Insights.
+
+Usage:
+    from data_portal import presign
+    ok, url_or_error = presign.presign_s3_file(bucket, key, e_tag=e_tag)
+    ok, url_or_error = presign.presign_gds_file(file_id, volume_name, path_, version=time_modified)
+
+Clients are obtained by libs3.s3_client() and libgds.ApiClient() once, hence, mock those in test and call
+presign.clear() in setUp and tearDown, so that pooled client and cached URL do not leak between tests.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+import boto3
+from botocore.exceptions import ClientError
+from django.conf import settings
+from libica.app import configuration
+from libica.openapi import libgds
+from libumccr.aws import libs3
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 4096
+STATS_LOG_INTERVAL = 500  # lookups
+GDS_CLIENT_TTL = 900  # seconds, the pooled GDS client is rebuilt after, so that rotated ICA token is picked up
+
+
+class PresignCache:
+    """
+    Bounded cache of presigned URLs with expiry-aware reuse, and hit/miss counters
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, clock: Callable[[], float] = time.time):
+        self._max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict()  # key to (url, issued at, expire at)
+        self._lock = threading.Lock()
+        self.hit_count = 0
+        self.miss_count = 0
+        self.reissue_count = 0
+
+    def get(self, key: tuple, issue: Callable[[], Tuple[bool, str]], expires_in: Optional[int] = None,
+            min_remaining: float = 0.5) -> Tuple[bool, str]:
+        """
+        :param key: object identity, version and signing params
+        :param issue: presign call on miss, returns tuple of (bool, url or error message)
+        :param expires_in: seconds the issued URL is valid for, parsed from the URL if not given
+        :param min_remaining: fraction of full validity a cached URL must still have to be reused
+        :return: tuple of (bool, url or error message), error is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                url, issued_at, expire_at = entry
+                if expire_at - self._clock() >= (expire_at - issued_at) * min_remaining:
+                    self._entries.move_to_end(key)
+                    self.hit_count += 1
+                    self._maybe_log()
+                    return True, url
+                self.reissue_count += 1
+            self.miss_count += 1
+            self._maybe_log()
+
+        issued_at = self._clock()
+        ok, url = issue()
+        if not ok:
+            return ok, url
+
+        expire_at = issued_at + expires_in if expires_in is not None else _expire_at(url)
+        if expire_at is None or min_remaining >= 1:
+            return ok, url
+
+        with self._lock:
+            self._entries[key] = (url, issued_at, expire_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+        return ok, url
+
+    def _maybe_log(self):
+        if (self.hit_count + self.miss_count) % STATS_LOG_INTERVAL == 0:
+            logger.info(f"Presign cache stats: {self._stats()}")
+
+    def _stats(self) -> dict:
+        lookups = self.hit_count + self.miss_count
+        return {
+            'size': len(self._entries),
+            'hit_count': self.hit_count,
+            'miss_count': self.miss_count,
+            'reissue_count': self.reissue_count,
+            'hit_rate': self.hit_count / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hit_count = self.miss_count = self.reissue_count = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return self._stats()
+
+
+def _expire_at(url: str) -> Optional[float]:
+    """
+    Expiry of presigned URL from its query string, i.e. SigV4 X-Amz-Date plus X-Amz-Expires, or SigV2 Expires
+
+    :return: epoch seconds, or None if the URL does not tell
+    """
+    params = parse_qs(urlparse(url).query)
+    try:
+        if 'X-Amz-Date' in params and 'X-Amz-Expires' in params:
+            signed_at = datetime.strptime(params['X-Amz-Date'][0], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+            return signed_at.timestamp() + int(params['X-Amz-Expires'][0])
+        if 'Expires' in params:
+            return float(params['Expires'][0])
+    except ValueError:
+        pass
+    return None
+
+
+_cache = PresignCache()
+_client_lock = threading.Lock()
+_s3_client = None
+_gds_client = None  # tuple of (ApiClient, created at)
+
+
+def s3_client():
+    """
+    Pooled S3 client, boto3 client is thread safe
+    """
+    global _s3_client
+    with _client_lock:
+        if _s3_client is None:
+            _s3_client = libs3.s3_client()
+        return _s3_client
+
+
+def gds_files_api() -> libgds.FilesApi:
+    """
+    Pooled GDS files API, so that ICA token lookup and connection pool are shared between calls
+    """
+    global _gds_client
+    with _client_lock:
+        if _gds_client is None or time.monotonic() - _gds_client[1] > GDS_CLIENT_TTL:
+            _gds_client = (libgds.ApiClient(configuration(libgds)), time.monotonic())
+        return libgds.FilesApi(_gds_client[0])
+
+
+def presign_s3_file(bucket: str, key: str, content_disposition: Optional[str] = 'inline', expires_in: int = 3600,
+                    e_tag: Optional[str] = None) -> Tuple[bool, str]:
+    """
+    Same as libs3.presign_s3_file, through pooled client and cache
+
+    :param content_disposition: response content disposition override, None for no override
+    :param e_tag: S3 object ETag, part of cache key
+    :return tuple (bool, str): (true, signed_url) if success, otherwise (false, error message)
+    """
+    def _issue():
+        params = {'Bucket': bucket, 'Key': key}
+        if content_disposition is not None:
+            params['ResponseContentDisposition'] = content_disposition
+        try:
+            return True, s3_client().generate_presigned_url('get_object', Params=params, ExpiresIn=expires_in)
+        except ClientError as e:
+            message = f"Failed to sign the specified S3 object (s3://{bucket}/{key}). Exception - {e}"
+            logger.error(message)
+            return False, message
+
+    cache_key = ('s3', bucket, key, e_tag, content_disposition, expires_in)
+    return _cache.get(cache_key, _issue, expires_in, settings.PRESIGN_CACHE_MIN_REMAINING)
+
+
+def presign_gds_file(file_id: str, volume_name: str, path_: str, presigned_url_mode: str = "Attachment",
+                     version=None) -> Tuple[bool, str]:
+    """
+    Same as gds.presign_gds_file, through pooled client and cache. Expiry is as of the URL that GDS has issued.
+
+    :param version: GDS file time modified, part of cache key
+    :return tuple (bool, str): (true, signed_url) if success, otherwise (false, error message)
+    """
+    def _issue():
+        try:
+            file_details: libgds.FileResponse = gds_files_api().get_file(file_id=file_id,
+                                                                         presigned_url_mode=presigned_url_mode)
+            return True, file_details.presigned_url
+        except libgds.ApiException as e:
+            message = f"Failed to sign the specified GDS file (gds://{volume_name}{path_}). Exception - {e}"
+            logger.error(message)
+            return False, message
+
+    cache_key = ('gds', file_id, str(version), presigned_url_mode)
+    return _cache.get(cache_key, _issue, None, settings.PRESIGN_CACHE_MIN_REMAINING)
+
+
+def presign_gds_file_with_override(file_id: str, version=None, **kwargs) -> Tuple[bool, str]:
+    """
+    Same as gds.presign_gds_file_with_override, through pooled client and cache. The S3 client is still one per
+    call, as it signs with the temporary credential of the file.
+
+    :param version: GDS file time modified, part of cache key
+    :return tuple (bool, str): (true, signed_url) if success, otherwise (false, error message)
+    """
+    expiration = kwargs.get('expiration', 3600)
+    response_content_type = kwargs.get('response_content_type', 'text/html')
+    response_content_disposition = kwargs.get('response_content_disposition', 'inline')
+
+    def _issue():
+        try:
+            resp: libgds.FileResponse = gds_files_api().update_file(file_id=file_id, include='objectStoreAccess')
+            cred: libgds.AwsS3TemporaryUploadCredentials = resp.object_store_access.aws_s3_temporary_upload_credentials
+
+            # URL signed by temporary credential is only good until the credential expires
+            expires_in = expiration
+            if cred.expiration_date:
+                remaining = int((cred.expiration_date - datetime.now(timezone.utc)).total_seconds())
+                expires_in = max(min(expiration, remaining), 1)
+
+            client = boto3.client(
+                's3',
+                aws_access_key_id=cred.access_key_id,
+                aws_secret_access_key=cred.secret_access_key,
+                aws_session_token=cred.session_token,
+                region_name=cred.region,
+            )
+
+            signed_url = client.generate_presigned_url(
+                'get_object',
+                Params={
+                    'Bucket': cred.bucket_name,
+                    'Key': cred.key_prefix,
+                    'ResponseContentType': response_content_type,
+                    'ResponseContentDisposition': response_content_disposition,
+                },
+                ExpiresIn=expires_in)
+            return True, signed_url
+        except (libgds.ApiException, ClientError) as e:
+            message = f"Failed to sign the GDS file ID ({file_id}). Exception - {e}"
+            logger.error(message)
+            return False, message
+
+    cache_key = ('gds', file_id, str(version), response_content_type, response_content_disposition, expiration)
+    return _cache.get(cache_key, _issue, None, settings.PRESIGN_CACHE_MIN_REMAINING)
+
+
+def clear():
+    """
+    Clear cached URLs, counters and pooled clients
+    """
+    global _s3_client, _gds_client
+    _cache.clear()
+    with _client_lock:
+        _s3_client = None
+        _gds_client = None
+
+
+def stats() -> dict:
+    return _cache.stats()
@@ -1,10 +1,11 @@
-from typing import Dict, List
+from collections import defaultdict
+from typing import Dict, Iterable, List
 
 from rest_framework import serializers
 from rest_framework.fields import empty
 
 from data_portal.models.s3object import S3Object
-from data_portal.models.limsrow import LIMSRow
+from data_portal.models.limsrow import LIMSRow, S3LIMS
 from data_portal.models.gdsfile import GDSFile
 from data_portal.models.labmetadata import LabMetadata
 from data_portal.models.fastqlistrow import FastqListRow
@@ -45,6 +46,8 @@ class S3ObjectSerializer(serializers.Serializer):
     subject_id = serializers.SerializerMethodField()
     sample_id = serializers.SerializerMethodField()
 
+    LIMS_CONTEXT = 'lims_rows'
+
     def __init__(self, instance=None, data=empty, **kwargs):
         super().__init__(instance, data, **kwargs)
         # Current LIMS data
@@ -64,11 +67,27 @@ class S3ObjectSerializer(serializers.Serializer):
         """
         return 's3://%s/%s' % (obj.bucket, obj.key)
 
+    @classmethod
+    def get_lims_context(cls, objs: Iterable[S3Object]) -> dict:
+        """
+        Resolve LIMS rows of all S3 objects of the page in one query, pass it as serializer context i.e.
+            S3ObjectSerializer(objs, many=True, context=S3ObjectSerializer.get_lims_context(objs))
+        so that serializing the page does not query LIMS row per S3 object
+        """
+        lims_rows = defaultdict(list)
+        s3_lims_qs = S3LIMS.objects.filter(s3_object_id__in=[o.id for o in objs]).select_related('lims_row')
+        for s3_lims in s3_lims_qs.order_by('id'):
+            lims_rows[s3_lims.s3_object_id].append(s3_lims.lims_row)
+        return {cls.LIMS_CONTEXT: lims_rows}
+
     def get_lims(self, obj: S3Object) -> None:
         """
         Get and set associated LIMS data, so it can be used for other lims field getters
         """
-        lims_rows = LIMSRow.objects.filter(s3lims__s3_object=obj)
+        if self.LIMS_CONTEXT in self.context:
+            lims_rows = self.context[self.LIMS_CONTEXT].get(obj.id, [])
+        else:
+            lims_rows = LIMSRow.objects.filter(s3lims__s3_object=obj)
 
         # In case we don't have associated lims record
         # Use dict for each value so that we don't get duplicate values
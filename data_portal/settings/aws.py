@@ -7,15 +7,20 @@ Usage:
 import copy
 
 from environ import Env
-from libumccr.aws import libssm
 
 from .base import *  # noqa
+from .ssm import get_secrets
 
-SECRET_KEY = libssm.get_secret('/data_portal/backend/django_secret_key')
+SECRET_KEY_PARAM = '/data_portal/backend/django_secret_key'
+DB_URL_PARAM = '/data_portal/backend/full_db_url'
+
+_secrets = get_secrets(SECRET_KEY_PARAM, DB_URL_PARAM)
+
+SECRET_KEY = _secrets[SECRET_KEY_PARAM]
 
 DEBUG = False
 
-db_conn_cfg = Env.db_url_config(libssm.get_secret('/data_portal/backend/full_db_url'))
+db_conn_cfg = Env.db_url_config(_secrets[DB_URL_PARAM])
 db_conn_cfg['OPTIONS'] = {
     'max_allowed_packet': MYSQL_CLIENT_MAX_ALLOWED_PACKET,
 }
@@ -156,3 +156,33 @@ XRAY_RECORDER = {
 
 # turn off xray more generally and, you can overwrite with env var AWS_XRAY_SDK_ENABLED=true at runtime
 xray.global_sdk_config.set_sdk_enabled(False)
+
+# serve subject and keyword lookup of S3Object and GDSFile through path token index, see data_portal.models.pathtoken
+# turn on with env var PORTAL_PATH_TOKEN_LOOKUP=true, only after `python manage.py pathtoken` backfill has completed
+PATH_TOKEN_LOOKUP = os.getenv('PORTAL_PATH_TOKEN_LOOKUP', 'false').lower() == 'true'
+
+# serve subject result lookup of S3Object and GDSFile through classified result_pipeline column, see
+# data_portal.models.resulttype. turn on with env var PORTAL_RESULT_TYPE_LOOKUP=true, only after
+# `python manage.py resulttype` backfill has completed
+RESULT_TYPE_LOOKUP = os.getenv('PORTAL_RESULT_TYPE_LOOKUP', 'false').lower() == 'true'
+
+# count strategy of paginated S3Object and GDSFile responses, one of exact, cached, estimate, has_more, see
+# data_portal.counting. cached count is reused for PAGINATION_COUNT_CACHE_TTL seconds within the warm container
+PAGINATION_COUNT_STRATEGY = os.getenv('PORTAL_PAGINATION_COUNT_STRATEGY', 'exact').lower()
+PAGINATION_COUNT_CACHE_TTL = int(os.getenv('PORTAL_PAGINATION_COUNT_CACHE_TTL', '60'))
+
+# serve storage stats and bucket listing from materialized per bucket counters, see data_portal.models.storagestat
+# turn on with env var PORTAL_STORAGE_STATS_LOOKUP=true, only after `python manage.py storagestat` rebuild has completed
+STORAGE_STATS_LOOKUP = os.getenv('PORTAL_STORAGE_STATS_LOOKUP', 'false').lower() == 'true'
+
+# seconds to serve subject page from the warm container cache, S3 sync of the subject invalidates it earlier. must be
+# well below presigned URL expiry of the features, 0 to turn off, see data_portal.viewsets.subject
+SUBJECT_CACHE_TTL = int(os.getenv('PORTAL_SUBJECT_CACHE_TTL', '300'))
+
+# fraction of its full expiry a cached presigned URL must still be valid for to be reused, otherwise reissued. 1 to turn
+# off the cache, see data_portal.presign
+PRESIGN_CACHE_MIN_REMAINING = float(os.getenv('PORTAL_PRESIGN_CACHE_MIN_REMAINING', '0.5'))
+
+# max bytes of S3 object (or its range) that /s3/{id}/content proxies, beyond it redirects to presigned URL. default is
+# such that base64 encoded binary body still fits in 6 MB Lambda response payload, see data_portal.viewsets.s3object
+S3_CONTENT_MAX_PROXY_SIZE = int(os.getenv('PORTAL_S3_CONTENT_MAX_PROXY_SIZE', str(4 * 1024 * 1024)))
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""ssm module for settings
+
+Settings secrets are fetched from SSM Parameter Store in one GetParameters call, instead of one GetParameter call per
+secret, as this is on the import path of every lambda. Result is cached for the lifetime of the process, so that warm
+lambda container does not hit SSM again.
+"""
+from functools import lru_cache
+from typing import Dict
+
+from libumccr.aws import ssm_client
+
+
+@lru_cache(maxsize=8)
+def get_secrets(*names: str) -> Dict[str, str]:
+    """
+    Retrieve the secret values from SSM in one call, at most 10 names as of SSM GetParameters limit
+
+    :param names: names of secret
+    :return: dict of name to secret value
+    """
+    resp = ssm_client().get_parameters(Names=list(names), WithDecryption=True)
+
+    if resp.get('InvalidParameters'):
+        raise ValueError(f"Secret not found in SSM: {resp['InvalidParameters']}")
+
+    return {param['Name']: param['Value'] for param in resp['Parameters']}
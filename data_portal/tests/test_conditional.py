@@ -0,0 +1,140 @@
+import logging
+import time
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+
+from data_portal.models.cacheversion import CacheVersion, model_cache_key
+from data_portal.models.libraryrun import LibraryRun
+from data_portal.models.workflow import Workflow
+from data_portal.tests.factories import WorkflowFactory, LibraryRunFactory, LabMetadataFactory
+from data_processors.pipeline.services import libraryrun_srv
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self) -> None:
+        self.workflow = WorkflowFactory()
+
+    def test_list_not_modified(self):
+        """
+        python manage.py test data_portal.tests.test_conditional.ConditionalGetTests.test_list_not_modified
+        """
+        response = self.client.get("/workflows/")
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/workflows/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertIn('data_portal_cacheversion', ctx.captured_queries[0]['sql'])
+
+        # other filter, page or ordering has its own validator
+        response = self.client.get("/workflows/?ordering=id", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # as of write through service layer, that bumps the model version
+        CacheVersion.objects.bump([model_cache_key(Workflow)])
+        response = self.client.get("/workflows/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_not_modified(self):
+        """
+        python manage.py test data_portal.tests.test_conditional.ConditionalGetTests.test_detail_not_modified
+        """
+        etag = self.client.get(f"/workflows/{self.workflow.id}/")['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f"/workflows/{self.workflow.id}/", HTTP_IF_NONE_MATCH=f'W/{etag}, "other"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        # not found is not cached
+        response = self.client.get("/workflows/999999/")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+        response = self.client.get("/workflows/999999/", HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+    def test_workflow_library_id_filter(self):
+        """
+        python manage.py test data_portal.tests.test_conditional.ConditionalGetTests.test_workflow_library_id_filter
+        """
+        library_run = LibraryRunFactory()
+        sequence_run = self.workflow.sequence_run
+        library_run.instrument_run_id = sequence_run.instrument_run_id
+        library_run.run_id = sequence_run.run_id
+        library_run.save()
+
+        path = f"/workflows/?library_id={library_run.library_id}"
+        response = self.client.get(path)
+        self.assertEqual(response.data['results'], [])
+        etag = response['ETag']
+
+        # workflow list filtered through libraryrun link must not be served stale after linking
+        libraryrun_srv.link_library_run_with_workflow(library_run.library_id, library_run.lane, self.workflow)
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([w['id'] for w in response.data['results']], [self.workflow.id])
+
+        etag = response['ETag']
+        libraryrun_srv.link_library_runs_with_x_seq_workflow([library_run.library_id], self.workflow)
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        """
+        python manage.py test data_portal.tests.test_conditional.ConditionalGetTests.test_if_modified_since
+        """
+        LibraryRunFactory()
+
+        # no Last-Modified until first write
+        response = self.client.get("/libraryrun/")
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        libraryrun_srv.create_or_update_library_run({
+            'instrument_run_id': "200101_A00130_0001_BH00000000",
+            'run_id': "r.AAAAAA",
+            'library_id': "L2000001",
+            'lane': 1,
+            'override_cycles': "Y151;I8;I8;Y151",
+        })
+        response = self.client.get("/libraryrun/")
+        last_modified = response['Last-Modified']
+        self.assertEqual(response.data['results'][0]['library_id'], "L2000001")
+
+        response = self.client.get("/libraryrun/", HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get("/libraryrun/", HTTP_IF_MODIFIED_SINCE=http_date(time.time() - 3600))
+        self.assertEqual(response.status_code, 200)
+
+        # If-None-Match takes precedence
+        response = self.client.get("/libraryrun/", HTTP_IF_MODIFIED_SINCE=last_modified, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(CacheVersion.objects.get(key=model_cache_key(LibraryRun)).last_modified)
+
+    def test_endpoints(self):
+        """
+        python manage.py test data_portal.tests.test_conditional.ConditionalGetTests.test_endpoints
+        """
+        LibraryRunFactory()
+        LabMetadataFactory()
+        sequence_run = self.workflow.sequence_run
+
+        for path in ["/workflows/", "/sequencerun/", "/libraryrun/", "/metadata/", f"/sequencerun/{sequence_run.id}/"]:
+            etag = self.client.get(path)['ETag']
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, msg=path)
+            self.assertLessEqual(len(ctx.captured_queries), 1, msg=path)
@@ -0,0 +1,204 @@
+import logging
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from data_portal import counting
+from data_portal.counting import CountCache, CountStrategy
+from data_portal.models.s3object import S3Object
+from data_portal.pagination import CountingPaginator
+from data_portal.tests.test_pagination import _create_s3_objects
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _count_queries(ctx):
+    return len([q for q in ctx.captured_queries if "COUNT(" in q['sql'].upper()])
+
+
+class CountCacheTests(TestCase):
+
+    def setUp(self) -> None:
+        counting.clear()
+
+    def tearDown(self) -> None:
+        counting.clear()
+
+    def test_cache_hit(self):
+        """
+        python manage.py test data_portal.tests.test_counting.CountCacheTests.test_cache_hit
+        """
+        _create_s3_objects(10)
+        cache = CountCache(clock=FakeClock())
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(cache.get(S3Object.objects.filter(bucket='bucket0'), ttl=60), (4, False))
+            # same filter, ordering does not matter
+            self.assertEqual(cache.get(S3Object.objects.filter(bucket='bucket0').order_by('-id'), ttl=60), (4, True))
+            # different filter is its own entry
+            self.assertEqual(cache.get(S3Object.objects.filter(bucket='bucket1'), ttl=60), (3, False))
+
+        self.assertEqual(_count_queries(ctx), 2)
+        self.assertEqual(cache.stats(), {'size': 2, 'hit_count': 1, 'miss_count': 2})
+
+    def test_staleness_window(self):
+        """
+        python manage.py test data_portal.tests.test_counting.CountCacheTests.test_staleness_window
+        """
+        _create_s3_objects(10)
+        clock = FakeClock()
+        cache = CountCache(clock=clock)
+        qs = S3Object.objects.all()
+
+        self.assertEqual(cache.get(qs, ttl=30), (10, False))
+
+        # within the window, new rows are not seen yet
+        _create_s3_objects(5, start=10)
+        clock.now = 29.9
+        self.assertEqual(cache.get(qs, ttl=30), (10, True))
+
+        # past the window, count is fresh again and starts a new window
+        clock.now = 30.0
+        self.assertEqual(cache.get(qs, ttl=30), (15, False))
+        clock.now = 59.9
+        self.assertEqual(cache.get(qs, ttl=30), (15, True))
+
+    def test_cache_bounded(self):
+        """
+        python manage.py test data_portal.tests.test_counting.CountCacheTests.test_cache_bounded
+        """
+        _create_s3_objects(3)
+        cache = CountCache(max_entries=2, clock=FakeClock())
+
+        for bucket in ['bucket0', 'bucket1', 'bucket2']:
+            cache.get(S3Object.objects.filter(bucket=bucket), ttl=60)
+
+        self.assertEqual(cache.stats()['size'], 2)
+        # oldest entry is evicted
+        self.assertEqual(cache.get(S3Object.objects.filter(bucket='bucket0'), ttl=60), (1, False))
+
+    def test_estimate(self):
+        """
+        python manage.py test data_portal.tests.test_counting.CountCacheTests.test_estimate
+        """
+        _create_s3_objects(10)
+
+        # filtered query set is never estimated
+        self.assertIsNone(counting.estimate(S3Object.objects.filter(bucket='bucket0')))
+
+        if connection.vendor == 'sqlite':
+            self.assertIsNone(counting.estimate(S3Object.objects.all()))
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+            self.assertEqual(counting.estimate(S3Object.objects.all()), 10)
+            self.assertEqual(counting.count(S3Object.objects.all(), CountStrategy.ESTIMATE), (10, True))
+
+        # filtered query set falls back to cached count
+        self.assertEqual(counting.count(S3Object.objects.filter(bucket='bucket0'), CountStrategy.ESTIMATE), (4, False))
+        self.assertEqual(counting.count(S3Object.objects.filter(bucket='bucket0'), CountStrategy.ESTIMATE), (4, True))
+
+
+class CountingPaginatorTests(TestCase):
+
+    def setUp(self) -> None:
+        counting.clear()
+
+    def tearDown(self) -> None:
+        counting.clear()
+
+    def test_has_more(self):
+        """
+        python manage.py test data_portal.tests.test_counting.CountingPaginatorTests.test_has_more
+        """
+        _create_s3_objects(25)
+        qs = S3Object.objects.order_by('id')
+
+        with CaptureQueriesContext(connection) as ctx:
+            paginator = CountingPaginator(qs, per_page=10, strategy=CountStrategy.HAS_MORE)
+            page = paginator.page(2)
+            self.assertEqual(len(page.object_list), 10)
+            self.assertTrue(page.has_next())
+            self.assertTrue(paginator.has_more)
+            self.assertTrue(paginator.approximate)
+            self.assertEqual(paginator.count, 21)
+        self.assertEqual(_count_queries(ctx), 0)
+
+        paginator = CountingPaginator(qs, per_page=10, strategy=CountStrategy.HAS_MORE)
+        page = paginator.page(3)
+        self.assertEqual(len(page.object_list), 5)
+        self.assertFalse(page.has_next())
+        self.assertFalse(paginator.approximate)
+        self.assertEqual(paginator.count, 25)
+
+        # past the end falls back to the first page
+        paginator = CountingPaginator(qs, per_page=10, strategy=CountStrategy.HAS_MORE)
+        page = paginator.get_page(9)
+        self.assertEqual(page.number, 1)
+        self.assertTrue(page.has_next())
+
+    @override_settings(PAGINATION_COUNT_STRATEGY=CountStrategy.CACHED)
+    def test_envelope_cached(self):
+        """
+        python manage.py test data_portal.tests.test_counting.CountingPaginatorTests.test_envelope_cached
+        """
+        _create_s3_objects(25)
+
+        response = self.client.get('/s3/?rowsPerPage=10')
+        self.assertEqual(response.data['pagination'], {'count': 25, 'page': 1, 'rowsPerPage': 10,
+                                                       'countApproximate': False})
+
+        _create_s3_objects(5, start=25)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/s3/?rowsPerPage=10&page=2')
+        self.assertEqual(_count_queries(ctx), 0)
+        self.assertEqual(response.data['pagination']['count'], 25)
+        self.assertTrue(response.data['pagination']['countApproximate'])
+
+        # view without opt-in stays exact
+        response = self.client.get('/libraryrun/?rowsPerPage=10')
+        self.assertNotIn('countApproximate', response.data['pagination'])
+
+    @override_settings(PAGINATION_COUNT_STRATEGY=CountStrategy.HAS_MORE)
+    def test_envelope_has_more(self):
+        """
+        python manage.py test data_portal.tests.test_counting.CountingPaginatorTests.test_envelope_has_more
+        """
+        _create_s3_objects(25)
+
+        response = self.client.get('/s3/?rowsPerPage=10')
+        pagination = response.data['pagination']
+        self.assertTrue(pagination['hasMore'])
+        self.assertTrue(pagination['countApproximate'])
+        self.assertIsNotNone(response.data['links']['next'])
+
+        response = self.client.get('/s3/?rowsPerPage=10&page=3')
+        pagination = response.data['pagination']
+        self.assertFalse(pagination['hasMore'])
+        self.assertEqual(pagination['count'], 25)
+        self.assertIsNone(response.data['links']['next'])
+
+    @override_settings(PAGINATION_COUNT_STRATEGY=CountStrategy.CACHED)
+    def test_search_file(self):
+        """
+        python manage.py test data_portal.tests.test_counting.CountingPaginatorTests.test_search_file
+        """
+        _create_s3_objects(25)
+
+        response = self.client.get(reverse('file-search') + '?query=&rowsPerPage=10')
+        self.assertEqual(response.json()['meta']['totalRows'], 25)
+        self.assertFalse(response.json()['meta']['totalRowsApproximate'])
+
+        response = self.client.get(reverse('file-search') + '?query=&rowsPerPage=10&page=1')
+        self.assertEqual(response.json()['meta']['totalPages'], 3)
+        self.assertTrue(response.json()['meta']['totalRowsApproximate'])
@@ -0,0 +1,131 @@
+import logging
+import time
+from unittest import skip
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from data_portal.models.libraryrun import LibraryRun
+from data_portal.models.s3object import S3Object
+from data_portal.pagination import KeysetResultsSetPagination
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def _create_library_runs(size, start=0):
+    LibraryRun.objects.bulk_create([
+        LibraryRun(library_id=f"L{i:07d}", instrument_run_id="200508_A01052_0001_BH5LY7ACGT",
+                   run_id="r.ACGTlKjDgEy099ioQOeOWg", lane=1, override_cycles="Y151;I8;I8;Y151")
+        for i in range(start, start + size)
+    ], batch_size=1000)
+
+
+def _create_s3_objects(size, start=0):
+    S3Object.objects.bulk_create([
+        S3Object(bucket=f"bucket{i % 3}", key=f"key-{i}.csv", size=1, last_modified_date=now(), e_tag="etag")
+        for i in range(start, start + size)
+    ], batch_size=1000)
+
+
+class KeysetPaginationTests(TestCase):
+
+    def _walk(self, url):
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend([r['id'] for r in response.data['results']])
+            url = response.data['links']['next']
+            pages += 1
+        return ids, pages
+
+    def test_keyset_walk(self):
+        """
+        python manage.py test data_portal.tests.test_pagination.KeysetPaginationTests.test_keyset_walk
+        """
+        _create_library_runs(25)
+
+        ids, pages = self._walk('/libraryrun/?cursor=&rowsPerPage=10')
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(ids, sorted(LibraryRun.objects.values_list('id', flat=True), reverse=True))
+
+    def test_keyset_envelope(self):
+        """
+        python manage.py test data_portal.tests.test_pagination.KeysetPaginationTests.test_keyset_envelope
+        """
+        _create_library_runs(25)
+
+        response = self.client.get('/libraryrun/?cursor=&rowsPerPage=10')
+        self.assertEqual(set(response.data.keys()), {'links', 'pagination', 'results'})
+        self.assertEqual(response.data['pagination'], {'count': None, 'page': None, 'rowsPerPage': 10})
+        self.assertIsNone(response.data['links']['previous'])
+
+        # go forward then back again
+        first_ids = [r['id'] for r in response.data['results']]
+        response = self.client.get(response.data['links']['next'])
+        response = self.client.get(response.data['links']['previous'])
+        self.assertEqual([r['id'] for r in response.data['results']], first_ids)
+
+        # page number pagination stays the default
+        response = self.client.get('/libraryrun/?rowsPerPage=10&page=2')
+        self.assertEqual(response.data['pagination'], {'count': 25, 'page': 2, 'rowsPerPage': 10})
+
+        response = self.client.get('/libraryrun/?cursor=notacursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_keyset_composite_ordering(self):
+        """
+        python manage.py test data_portal.tests.test_pagination.KeysetPaginationTests.test_keyset_composite_ordering
+        """
+        _create_s3_objects(20)
+
+        ids, _ = self._walk('/s3/?cursor=&rowsPerPage=3')
+
+        self.assertEqual(ids, list(S3Object.objects.order_by('bucket', 'id').values_list('id', flat=True)))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/s3/?cursor=&rowsPerPage=3')
+        self.assertFalse(any("COUNT(" in q['sql'].upper() for q in ctx.captured_queries))
+
+
+@skip
+class KeysetPaginationBenchmarkTests(TestCase):
+    # benchmark is manual run, comment @skip and run i.e.
+    #   python manage.py test data_portal.tests.test_pagination.KeysetPaginationBenchmarkTests
+    # and keep decorated @skip after run
+    # for MySQL, run with `export DJANGO_SETTINGS_MODULE=data_portal.settings.local` against portal db container
+
+    def test_benchmark_deep_page(self):
+        """
+        python manage.py test data_portal.tests.test_pagination.KeysetPaginationBenchmarkTests.test_benchmark_deep_page
+        """
+        rows = 200000
+        rows_per_page = 100
+        for i in range(0, rows, 10000):
+            _create_s3_objects(10000, start=i)
+
+        for depth in [0.0, 0.5, 0.99]:
+            page = int(rows / rows_per_page * depth) + 1
+
+            start = time.perf_counter()
+            response = self.client.get(f'/s3/?rowsPerPage={rows_per_page}&page={page}')
+            page_number_elapsed = time.perf_counter() - start
+            self.assertEqual(response.status_code, 200)
+
+            # seek to the same depth, as if client had followed the links
+            last = S3Object.objects.order_by('bucket', 'id').values_list('bucket', 'id')[
+                max((page - 1) * rows_per_page - 1, 0)]
+            cursor = KeysetResultsSetPagination.encode_cursor(list(last), False) if page > 1 else ''
+
+            start = time.perf_counter()
+            response = self.client.get(f'/s3/?rowsPerPage={rows_per_page}&cursor={cursor}')
+            keyset_elapsed = time.perf_counter() - start
+            self.assertEqual(len(response.data['results']), rows_per_page)
+
+            logger.info(f"{connection.vendor} page {page} of {rows // rows_per_page}: page number "
+                        f"{page_number_elapsed * 1000:.1f}ms vs keyset {keyset_elapsed * 1000:.1f}ms")
@@ -0,0 +1,139 @@
+import logging
+
+from django.test import TestCase, override_settings
+from libumccr.aws import libs3
+from mockito import when, unstub, verify
+
+from data_portal import presign
+from data_portal.presign import PresignCache
+from data_portal.tests.factories import S3ObjectFactory
+from data_portal.tests.test_counting import FakeClock
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class FakeS3Client:
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_presigned_url(self, client_method, Params, ExpiresIn):
+        self.calls.append(Params)
+        return f"https://{Params['Bucket']}.s3.amazonaws.com/{Params['Key']}?X-Amz-Expires={ExpiresIn}" \
+               f"&X-Amz-Signature={len(self.calls)}"
+
+
+class _Issuer:
+
+    def __init__(self, url):
+        self.url = url
+        self.count = 0
+
+    def __call__(self):
+        self.count += 1
+        return True, self.url
+
+
+class PresignCacheTests(TestCase):
+
+    def test_reissue_near_expiry(self):
+        """
+        python manage.py test data_portal.tests.test_presign.PresignCacheTests.test_reissue_near_expiry
+        """
+        clock = FakeClock()
+        cache = PresignCache(clock=clock)
+        issue = _Issuer("https://bucket.s3.amazonaws.com/key")
+
+        cache.get(('s3', 'key'), issue, expires_in=3600, min_remaining=0.5)
+        clock.now = 1800
+        cache.get(('s3', 'key'), issue, expires_in=3600, min_remaining=0.5)
+        self.assertEqual(issue.count, 1)
+
+        clock.now = 1801  # less than half of its validity left
+        cache.get(('s3', 'key'), issue, expires_in=3600, min_remaining=0.5)
+        self.assertEqual(issue.count, 2)
+
+        self.assertEqual(cache.stats(), {
+            'size': 1, 'hit_count': 1, 'miss_count': 2, 'reissue_count': 1, 'hit_rate': 1 / 3,
+        })
+
+    def test_expiry_from_url(self):
+        """
+        python manage.py test data_portal.tests.test_presign.PresignCacheTests.test_expiry_from_url
+        """
+        clock = FakeClock()
+        clock.now = 1577836800  # 2020-01-01T00:00:00Z
+        cache = PresignCache(clock=clock)
+
+        sigv4 = _Issuer("https://gds.s3.amazonaws.com/f?X-Amz-Date=20200101T000000Z&X-Amz-Expires=600")
+        cache.get(('gds', 'fil.1'), sigv4)
+        clock.now += 300
+        cache.get(('gds', 'fil.1'), sigv4)
+        clock.now += 1
+        cache.get(('gds', 'fil.1'), sigv4)
+        self.assertEqual(sigv4.count, 2)
+
+        # unknown expiry, hence, never cached
+        unknown = _Issuer("https://gds.s3.amazonaws.com/f")
+        cache.get(('gds', 'fil.2'), unknown)
+        cache.get(('gds', 'fil.2'), unknown)
+        self.assertEqual(unknown.count, 2)
+
+        # nor error
+        cache.get(('gds', 'fil.3'), lambda: (False, "error"))
+        self.assertEqual(cache.stats()['size'], 1)
+
+
+class PresignTests(TestCase):
+
+    def setUp(self) -> None:
+        presign.clear()
+        self.client_s3 = FakeS3Client()
+        when(libs3).s3_client().thenReturn(self.client_s3)
+
+    def tearDown(self) -> None:
+        presign.clear()
+        unstub()
+
+    def test_presign_s3_file(self):
+        """
+        python manage.py test data_portal.tests.test_presign.PresignTests.test_presign_s3_file
+        """
+        first = presign.presign_s3_file("bucket", "key", e_tag="etag1")
+        self.assertEqual(presign.presign_s3_file("bucket", "key", e_tag="etag1"), first)
+
+        # object overwritten, or other signing params, are new URLs
+        self.assertNotEqual(presign.presign_s3_file("bucket", "key", e_tag="etag2"), first)
+        presign.presign_s3_file("bucket", "key", content_disposition='attachment', e_tag="etag1")
+
+        self.assertEqual(len(self.client_s3.calls), 3)
+        self.assertEqual(presign.stats()['hit_count'], 1)
+        verify(libs3, times=1).s3_client()
+
+    @override_settings(PRESIGN_CACHE_MIN_REMAINING=1)
+    def test_presign_s3_file_cache_off(self):
+        """
+        python manage.py test data_portal.tests.test_presign.PresignTests.test_presign_s3_file_cache_off
+        """
+        presign.presign_s3_file("bucket", "key", e_tag="etag1")
+        presign.presign_s3_file("bucket", "key", e_tag="etag1")
+        self.assertEqual(len(self.client_s3.calls), 2)
+
+    def test_presign_endpoints(self):
+        """
+        python manage.py test data_portal.tests.test_presign.PresignTests.test_presign_endpoints
+        """
+        obj = S3ObjectFactory()
+
+        first = self.client.get(f"/s3/{obj.id}/presign").json()
+        second = self.client.get(f"/s3/{obj.id}/presign").json()
+        self.assertEqual(first, second)
+        self.assertEqual(self.client_s3.calls[0]['ResponseContentDisposition'], f"attachment; filename={obj.key}")
+
+        response = self.client.get("/file-signed-url", {'bucket': obj.bucket, 'key': obj.key})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ResponseContentDisposition', self.client_s3.calls[1])
+
+        self.assertEqual(len(self.client_s3.calls), 2)
+        verify(libs3, times=1).s3_client()
@@ -5,14 +5,17 @@ from datetime import timedelta
 from typing import List
 
 import pytz
+from django.db import connection
 from django.http import JsonResponse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.timezone import now
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from data_portal.models.s3object import S3ObjectManager
+from data_portal.models.s3object import S3Object, S3ObjectManager
+from data_portal.serializers import S3ObjectSerializer
 from data_portal.tests.factories import S3ObjectFactory, LIMSRowFactory, S3LIMSFactory
 
 
@@ -262,6 +265,34 @@ class S3ObjectSearchTests(TestCase):
             self.assertEqual(len(results), 1, msg='Query: %s' % query_string)
             self.assertEqual(results[0].rn, expected_s3_object.id, msg='Query: %s' % query_string)
 
+    def test_lims_query_count(self):
+        """
+        Test LIMS rows of a page are resolved in one query, so query count per page does not grow with page size
+        """
+        for i in range(30):
+            s3_object = S3ObjectFactory()
+            if i % 3:
+                for run in [1, 2]:
+                    lims_row = LIMSRowFactory(illumina_id=f"RUN{i}_{run}", run=run, subject_id=f"SBJ{i:05d}")
+                    S3LIMSFactory(s3_object=s3_object, lims_row=lims_row)
+
+        query_counts = []
+        for rows_per_page in [5, 30]:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse('file-search') + '?rowsPerPage=%d' % rows_per_page)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(parse_s3_object_result_rows(response)), rows_per_page)
+            query_counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+        # same LIMS fields as resolving per S3 object
+        objs = list(S3Object.objects.order_by('id'))
+        batched = S3ObjectSerializer(objs, many=True, context=S3ObjectSerializer.get_lims_context(objs)).data
+        self.assertEqual(batched, S3ObjectSerializer(objs, many=True).data)
+        self.assertEqual(batched[1][6:], ['RUN1_1,\nRUN1_2', '1,\n2',
+                                          'SBJ00001/external_subject_id', 'sample_id'])
+
     def test_search_query_invalid(self):
         """
         Test search query (parser) returns error for invalid query
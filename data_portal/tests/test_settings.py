@@ -0,0 +1,49 @@
+from django.test import TestCase
+from mockito import when, unstub
+
+from data_portal.settings import ssm
+
+
+class FakeSSMClient:
+    """Stand-in of boto3 SSM client that counts GetParameters calls"""
+
+    def __init__(self, params: dict):
+        self.params = params
+        self.calls = 0
+
+    def get_parameters(self, Names, WithDecryption=False):
+        self.calls += 1
+        return {
+            'Parameters': [{'Name': name, 'Value': self.params[name]} for name in Names if name in self.params],
+            'InvalidParameters': [name for name in Names if name not in self.params],
+        }
+
+
+class SettingsSSMTests(TestCase):
+
+    def setUp(self) -> None:
+        ssm.get_secrets.cache_clear()
+        self.client = FakeSSMClient({'/secret/key': "key", '/secret/db_url': "sqlite:///:memory:"})
+        when(ssm).ssm_client().thenReturn(self.client)
+
+    def tearDown(self) -> None:
+        ssm.get_secrets.cache_clear()
+        unstub()
+
+    def test_get_secrets(self):
+        """
+        python manage.py test data_portal.tests.test_settings.SettingsSSMTests.test_get_secrets
+        """
+        secrets = ssm.get_secrets('/secret/key', '/secret/db_url')
+        self.assertEqual(secrets, {'/secret/key': "key", '/secret/db_url': "sqlite:///:memory:"})
+
+        # warm container, no more call to SSM
+        ssm.get_secrets('/secret/key', '/secret/db_url')
+        self.assertEqual(self.client.calls, 1)
+
+    def test_get_secrets_not_found(self):
+        """
+        python manage.py test data_portal.tests.test_settings.SettingsSSMTests.test_get_secrets_not_found
+        """
+        with self.assertRaises(ValueError):
+            ssm.get_secrets('/secret/key', '/secret/not_found')
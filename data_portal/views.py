@@ -6,19 +6,20 @@ NOTE:
      See viewsets module for newer DRF based impls.
 """
 from typing import Tuple, Optional
-import boto3
-from botocore.exceptions import ClientError
 from django.core.exceptions import EmptyResultSet
-from django.core.paginator import Paginator
+from django.conf import settings
 from django.http import JsonResponse
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.request import Request
 import logging
 
+from data_portal import presign
 from data_portal.exceptions import InvalidSearchQuery, InvalidQueryParameter
 from data_portal.models.s3object import S3Object, S3ObjectManager
 from data_portal.models.limsrow import LIMSRow
+from data_portal.models.storagestat import StorageStat, StorageStatSource, StorageStatCounter
+from data_portal.pagination import CountingPaginator
 from data_portal.responses import JsonErrorResponse
 from data_portal.s3_object_search import S3ObjectSearchQueryHelper
 from data_portal.serializers import S3ObjectSerializer
@@ -124,12 +125,14 @@ def search_file(request: Request):
         return JsonResponse(data={'rows': {'headerRow': [], 'dataRows': []}}, status=status.HTTP_200_OK)
 
     # Apply pagination
-    paginator = Paginator(query_set, per_page=rows_per_page)
+    paginator = CountingPaginator(query_set, per_page=rows_per_page, strategy=settings.PAGINATION_COUNT_STRATEGY)
     object_page = paginator.get_page(page + 1)
     object_list = object_page.object_list
     empty_record = len(object_list) == 0
 
-    serializer = S3ObjectSerializer(object_list, many=True)
+    serializer = S3ObjectSerializer(
+        object_list, many=True, context=S3ObjectSerializer.get_lims_context(object_list)
+    )
 
     # Compose meta information
     meta_data = {
@@ -137,7 +140,8 @@ def search_file(request: Request):
         'page': page + 1,
         'start': object_page.start_index(),
         'totalRows': paginator.count,
-        'totalPages': paginator.num_pages
+        'totalPages': paginator.num_pages,
+        'totalRowsApproximate': paginator.approximate,
     }
 
     data = {
@@ -170,14 +174,8 @@ def sign_s3_file(request: Request):
     if bucket is None or key is None:
         return JsonErrorResponse('Missing required parameters: bucket / key', status=status.HTTP_400_BAD_REQUEST)
 
-    s3_client = boto3.client('s3')
-    try:
-        response = s3_client.generate_presigned_url('get_object', Params={
-            'Bucket': bucket,
-            'Key': key
-        })
-    except ClientError as e:
-        logging.error(e)
+    signed, response = presign.presign_s3_file(bucket, key, content_disposition=None)
+    if not signed:
         return JsonErrorResponse('Failed to sign the specified s3 object', status=status.HTTP_400_BAD_REQUEST)
 
     return JsonResponse(data=response, status=status.HTTP_200_OK, safe=False)
@@ -188,14 +186,31 @@ def storage_stats(request: Request):
     """
     Storage statistics
     """
-    total_s3 = S3Object.objects.count()
-    # Distinct is required as table joining can produce duplicate S3Object records, similar below for LIMS
-    linked_s3 = S3Object.objects.filter(s3lims__isnull=False).distinct().count()
-    not_linked_s3 = S3Object.objects.filter(s3lims__isnull=True).count()
-
-    total_lims = LIMSRow.objects.count()
-    linked_lims = LIMSRow.objects.filter(s3lims__isnull=False).distinct().count()
-    not_linked_lims = LIMSRow.objects.filter(s3lims__isnull=True).count()
+    if settings.STORAGE_STATS_LOOKUP:
+        # materialized per bucket counters, see StorageStat
+        total_s3 = 0
+        counters = {}
+        for source, name, object_count in StorageStat.objects.values_list('source', 'name', 'object_count'):
+            if source == StorageStatSource.S3:
+                total_s3 += object_count
+            elif source == StorageStatSource.COUNTER:
+                counters[name] = object_count
+
+        linked_s3 = counters.get(StorageStatCounter.LINKED_S3, 0)
+        not_linked_s3 = total_s3 - linked_s3
+
+        total_lims = counters.get(StorageStatCounter.TOTAL_LIMS, 0)
+        linked_lims = counters.get(StorageStatCounter.LINKED_LIMS, 0)
+        not_linked_lims = total_lims - linked_lims
+    else:
+        total_s3 = S3Object.objects.count()
+        # Distinct is required as table joining can produce duplicate S3Object records, similar below for LIMS
+        linked_s3 = S3Object.objects.filter(s3lims__isnull=False).distinct().count()
+        not_linked_s3 = S3Object.objects.filter(s3lims__isnull=True).count()
+
+        total_lims = LIMSRow.objects.count()
+        linked_lims = LIMSRow.objects.filter(s3lims__isnull=False).distinct().count()
+        not_linked_lims = LIMSRow.objects.filter(s3lims__isnull=True).count()
 
     data = {
         'total_s3': {
@@ -6,10 +6,13 @@ NOTE:
 """
 import logging
 
+from django.conf import settings
+from django.db.models import F
 from rest_framework import filters
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
 from data_portal.models.s3object import S3Object
+from data_portal.models.storagestat import StorageStat, StorageStatSource
 from data_portal.pagination import StandardResultsSetPagination
 from data_portal.serializers import BucketIdSerializer
 
@@ -24,3 +27,10 @@ class BucketViewSet(ReadOnlyModelViewSet):
     ordering_fields = ['bucket']
     ordering = ['-bucket']
     search_fields = ordering_fields
+
+    def get_queryset(self):
+        if settings.STORAGE_STATS_LOOKUP:
+            # materialized per bucket counters, see StorageStat
+            return StorageStat.objects.filter(source=StorageStatSource.S3, object_count__gt=0).annotate(
+                bucket=F('name')).values_list('bucket', named=True).order_by('bucket')
+        return super(BucketViewSet, self).get_queryset()
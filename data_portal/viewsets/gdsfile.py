@@ -8,14 +8,14 @@ import logging
 import mimetypes
 
 from django.db import InternalError
-from libica.app import gds
 from rest_framework import filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
+from data_portal import presign
 from data_portal.models.gdsfile import GDSFile
-from data_portal.pagination import StandardResultsSetPagination
+from data_portal.pagination import KeysetResultsSetPagination
 from data_portal.serializers import GDSFileModelSerializer
 
 logger = logging.getLogger()
@@ -23,7 +23,9 @@ logger = logging.getLogger()
 
 class GDSFileViewSet(ReadOnlyModelViewSet):
     serializer_class = GDSFileModelSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetResultsSetPagination
+    cursor_ordering = ['id']
+    approximate_count = True  # count by PAGINATION_COUNT_STRATEGY, see data_portal.counting
     filter_backends = [filters.OrderingFilter, filters.SearchFilter]
     ordering_fields = '__all__'
     ordering = ['path']
@@ -46,19 +48,21 @@ class GDSFileViewSet(ReadOnlyModelViewSet):
         # content_type, encoding = mimetypes.guess_type(obj.path, strict=False)
 
         if content_type:
-            response = gds.presign_gds_file_with_override(
+            response = presign.presign_gds_file_with_override(
                 file_id=obj.file_id,
+                version=obj.time_modified,
                 response_content_type=str(content_type),
                 response_content_disposition=content_disposition,
             )
         else:
             # fallback to last resort; whereas let the content server decide through content negotiation protocol
             # i.e. let it response as however it gets stored in S3
-            response = gds.presign_gds_file(
+            response = presign.presign_gds_file(
                 file_id=obj.file_id,
                 volume_name=obj.volume_name,
                 path_=obj.path,
-                presigned_url_mode=content_disposition
+                presigned_url_mode=content_disposition,
+                version=obj.time_modified,
             )
 
         if response[0]:
@@ -14,6 +14,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
+from data_portal.conditional import ConditionalGetMixin
 from data_portal.models.labmetadata import LabMetadata
 from data_portal.pagination import StandardResultsSetPagination
 from data_portal.serializers import LabMetadataModelSerializer, LabMetadataSyncSerializer
@@ -23,7 +24,7 @@ logger = logging.getLogger(__name__)
 allowed_fields = ['project_name', 'project_owner', 'workflow', 'source', 'assay', 'type', 'phenotype']
 
 
-class LabMetadataViewSet(ReadOnlyModelViewSet):
+class LabMetadataViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     serializer_class = LabMetadataModelSerializer
     pagination_class = StandardResultsSetPagination
     filter_backends = [filters.OrderingFilter, filters.SearchFilter]
@@ -9,16 +9,18 @@ import logging
 from rest_framework import filters
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
+from data_portal.conditional import ConditionalGetMixin
 from data_portal.models.libraryrun import LibraryRun
-from data_portal.pagination import StandardResultsSetPagination
+from data_portal.pagination import KeysetResultsSetPagination
 from data_portal.serializers import LibraryRunModelSerializer
 
 logger = logging.getLogger()
 
 
-class LibraryRunViewSet(ReadOnlyModelViewSet):
+class LibraryRunViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     serializer_class = LibraryRunModelSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetResultsSetPagination
+    cursor_ordering = ['-id']
     filter_backends = [filters.OrderingFilter, filters.SearchFilter]
     ordering_fields = '__all__'
     ordering = ['-id']
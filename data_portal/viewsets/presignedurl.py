@@ -6,16 +6,44 @@ NOTE:
 """
 import logging
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
 
 from libica.app import gds
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 
+from data_portal import presign
+from data_portal.models.gdsfile import GDSFile
+from data_portal.models.s3object import S3Object
 from data_portal.viewsets.utils import _error_response, _gds_file_recs_to_presign_resps, _presign_response, \
     _presign_list_response
 
 logger = logging.getLogger()
 
+BATCH_MAX_ITEMS = 500
+PRESIGN_MAX_WORKERS = 8
+LIST_MAX_WORKERS = 4
+LIST_TIMEOUT = 20  # seconds, for all volume listings, well within API Gateway integration timeout
+S3_EXPIRES_IN = 43200  # same as S3ObjectViewSet.presign, mainly for IGV use
+
+# batch item type to record model
+_BATCH_MODELS = {
+    's3': S3Object,
+    'gds': GDSFile,
+}
+
+
+def _batch_id(id_) -> Optional[int]:
+    """Record id of batch item, or None if it is not an integer, i.e. the item is then not found"""
+    if isinstance(id_, bool) or not isinstance(id_, (int, str)):
+        return None
+    try:
+        return int(id_)
+    except (TypeError, ValueError):
+        return None
+
 
 class PresignedUrlViewSet(ViewSet):
 
@@ -33,14 +61,9 @@ class PresignedUrlViewSet(ViewSet):
         except Exception as ex:
             return _error_response(message="Could not parse GDS URL.", err=ex)
 
-        presign_list = list()
-        try:
-            for vol in vol_path.keys():
-                tmp_list = gds.get_files_list(volume_name=vol, paths=vol_path[vol])
-                if tmp_list:
-                    presign_list.extend(tmp_list)
-        except Exception as ex:
-            return _error_response(message="Could create presigned URL.", err=ex)
+        presign_list, failures = _get_files_lists(vol_path)
+        if failures and not presign_list:
+            return _error_response(message="Could create presigned URL.", err=failures)
 
         if len(presign_list) < 1:
             return _error_response(message="No matching GDS records found.", status_code=404)
@@ -52,4 +75,105 @@ class PresignedUrlViewSet(ViewSet):
             return _error_response(message="Could create presigned URL.", err=ex)
 
         # wrap response objects in rest framework Response object
-        return _presign_list_response(presigned_urls=resps)
+        response = _presign_list_response(presigned_urls=resps)
+        if failures:
+            # listing of the other volumes are still usable
+            response.data.update(partial=True, errors=failures)
+        return response
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Bulk presign of S3 object and GDS file records by their id, e.g. of a results table.
+
+        payload: list of {"type": "s3" or "gds", "id": record id}, at most BATCH_MAX_ITEMS
+        header: Content-Disposition, same as of /s3/{id}/presign and /gds/{id}/presign, default attachment
+        response: {"results": [...]} in payload order, each item has either "signed_url" or "error"
+        """
+        payload = self.request.data
+        if not isinstance(payload, list) or not all(isinstance(item, dict) for item in payload):
+            return _error_response(message="Payload must be a list of {\"type\": \"s3\" or \"gds\", \"id\": id}.")
+        if len(payload) > BATCH_MAX_ITEMS:
+            return _error_response(message=f"Too many items, at most {BATCH_MAX_ITEMS} per request.")
+        if not payload:
+            return Response({'results': []})
+
+        content_disposition = request.headers.get('Content-Disposition', 'attachment')
+
+        item_ids = [_batch_id(item.get('id')) for item in payload]
+
+        ids = defaultdict(set)
+        for item, id_ in zip(payload, item_ids):
+            type_ = item.get('type')
+            if isinstance(type_, str) and type_ in _BATCH_MODELS and id_ is not None:
+                ids[type_].add(id_)
+
+        # one query per record type, regardless of number of items
+        records = {
+            (type_, obj.id): obj for type_, model in _BATCH_MODELS.items() if ids[type_]
+            for obj in model.objects.filter(id__in=ids[type_])
+        }
+
+        def _presign_item(item: dict, id_: Optional[int]) -> dict:
+            type_ = item.get('type')
+            result = {'type': type_, 'id': item.get('id')}
+
+            if not isinstance(type_, str) or type_ not in _BATCH_MODELS:
+                result['error'] = f"Unsupported type: {type_}"
+                return result
+
+            obj = records.get((type_, id_))
+            if obj is None:
+                result['error'] = "Not found."
+                return result
+
+            if type_ == 's3':
+                response = presign.presign_s3_file(
+                    obj.bucket, obj.key, content_disposition + '; filename=' + obj.key.split('/')[-1],
+                    expires_in=S3_EXPIRES_IN, e_tag=obj.e_tag,
+                )
+            else:
+                response = presign.presign_gds_file(
+                    obj.file_id, obj.volume_name, obj.path, presigned_url_mode=content_disposition,
+                    version=obj.time_modified,
+                )
+
+            result['signed_url' if response[0] else 'error'] = response[1]
+            return result
+
+        with ThreadPoolExecutor(max_workers=min(PRESIGN_MAX_WORKERS, len(payload))) as executor:
+            results = list(executor.map(_presign_item, payload, item_ids))
+
+        return Response({'results': results})
+
+
+def _get_files_lists(vol_path: Dict[str, List[str]]) -> Tuple[list, List[dict]]:
+    """
+    List files of the volumes concurrently, with bounded pool and timeout. Listing still running at timeout is
+    abandoned, not waited for.
+
+    :param vol_path: dict of volume name to paths
+    :return: tuple of (libgds.FileResponse list of the volumes listed, list of {"volume", "error"} of the others)
+    """
+    if not vol_path:
+        return [], []
+
+    executor = ThreadPoolExecutor(max_workers=min(LIST_MAX_WORKERS, len(vol_path)))
+    futures = {
+        vol: executor.submit(gds.get_files_list, volume_name=vol, paths=paths) for vol, paths in vol_path.items()
+    }
+    wait(futures.values(), timeout=LIST_TIMEOUT)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    presign_list, failures = [], []
+    for vol, future in futures.items():
+        if not future.done():
+            logger.warning(f"Timed out listing GDS volume {vol} after {LIST_TIMEOUT} seconds")
+            failures.append({'volume': vol, 'error': f"Timed out after {LIST_TIMEOUT} seconds."})
+        elif future.exception():
+            logger.error(f"Failed listing GDS volume {vol}. Exception - {future.exception()}")
+            failures.append({'volume': vol, 'error': str(future.exception())})
+        elif future.result():
+            presign_list.extend(future.result())
+
+    return presign_list, failures
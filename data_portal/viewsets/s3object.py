@@ -6,8 +6,12 @@ NOTE:
 """
 import logging
 from datetime import datetime
+from wsgiref.util import is_hop_by_hop
 
+from botocore.response import StreamingBody
+from django.conf import settings
 from django.db import InternalError
+from django.http import HttpResponseRedirect, StreamingHttpResponse
 from django.utils.http import parse_http_date_safe
 from libumccr import libjson
 from libumccr.aws import libs3
@@ -16,18 +20,24 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
+from data_portal import presign
 from data_portal.models.s3object import S3Object
-from data_portal.pagination import StandardResultsSetPagination
+from data_portal.pagination import KeysetResultsSetPagination
 from data_portal.renderers import content_renderers
 from data_portal.serializers import S3ObjectModelSerializer
 from data_portal.viewsets.utils import _presign_response
 
 logger = logging.getLogger()
 
+CONTENT_CHUNK_SIZE = 256 * 1024
+CONTENT_PRESIGN_EXPIRES_IN = 3600
+
 
 class S3ObjectViewSet(ReadOnlyModelViewSet):
     serializer_class = S3ObjectModelSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetResultsSetPagination
+    cursor_ordering = ['bucket', 'id']  # bucket index has id as its suffix
+    approximate_count = True  # count by PAGINATION_COUNT_STRATEGY, see data_portal.counting
     filter_backends = [filters.OrderingFilter, filters.SearchFilter]
     ordering_fields = '__all__'
     ordering = ['key']
@@ -46,7 +56,7 @@ class S3ObjectViewSet(ReadOnlyModelViewSet):
         obj: S3Object = self.get_object()
         content_disposition = request.headers.get('Content-Disposition', 'attachment') + '; filename=' + obj.key.split('/')[-1]
         # Setting 12 hours expiry for presigned URL (mainly for IGV use)
-        return _presign_response(obj.bucket, obj.key, content_disposition, expires_in=43200)
+        return _presign_response(obj.bucket, obj.key, content_disposition, expires_in=43200, e_tag=obj.e_tag)
 
     @action(detail=True)
     def status(self, request, pk=None):
@@ -113,11 +123,35 @@ class S3ObjectViewSet(ReadOnlyModelViewSet):
                 if error_code == "304":
                     return Response(headers=response_headers, status=status.HTTP_304_NOT_MODIFIED)
 
-            content_type = response_headers['content-type']
+            body = resp_data['Body']
+            content_length = resp_data.get('ContentLength', 0)
+
+            if content_length > settings.S3_CONTENT_MAX_PROXY_SIZE:
+                body.close()
+                if version_id:
+                    return Response({'error': f"Object version exceeds {settings.S3_CONTENT_MAX_PROXY_SIZE} bytes, "
+                                              f"the max size to serve as content."},
+                                    status=status.HTTP_400_BAD_REQUEST)
+                signed, url = presign.presign_s3_file(obj.bucket, obj.key, 'inline', CONTENT_PRESIGN_EXPIRES_IN,
+                                                      e_tag=obj.e_tag)
+                if not signed:
+                    return Response({'error': url})
+                return HttpResponseRedirect(url)
+
+            content_type = response_headers.get('content-type')
             if content_type is None:
                 content_type = 'application/octet-stream'
-            body = resp_data['Body']
-            return Response(body, headers=response_headers, content_type=content_type)
+
+            # stream the body in fixed-size chunks, Content-Length is as of S3 response
+            response = StreamingHttpResponse(
+                _iter_body(body),
+                status=resp_data['ResponseMetadata'].get('HTTPStatusCode', status.HTTP_200_OK),
+                content_type=content_type,
+            )
+            for name, value in response_headers.items():
+                if name != 'content-type' and not is_hop_by_hop(name):
+                    response[name] = value
+            return response
 
         else:
             return Response(libjson.dumps(resp_data), content_type='application/json')
@@ -128,3 +162,13 @@ class S3ObjectViewSet(ReadOnlyModelViewSet):
             return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         return super(S3ObjectViewSet, self).handle_exception(exc)
+
+
+def _iter_body(body: StreamingBody):
+    """
+    Chunks of S3 object body, the body is closed when the response is, even if not read through
+    """
+    try:
+        yield from body.iter_chunks(chunk_size=CONTENT_CHUNK_SIZE)
+    finally:
+        body.close()
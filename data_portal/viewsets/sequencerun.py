@@ -8,12 +8,13 @@ NOTE:
 from rest_framework import filters
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
+from data_portal.conditional import ConditionalGetMixin
 from data_portal.models.sequencerun import SequenceRun
 from data_portal.pagination import StandardResultsSetPagination
 from data_portal.serializers import SequenceRunSerializer
 
 
-class SequenceRunViewSet(ReadOnlyModelViewSet):
+class SequenceRunViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     serializer_class = SequenceRunSerializer
     pagination_class = StandardResultsSetPagination
     filter_backends = [filters.OrderingFilter, filters.SearchFilter]
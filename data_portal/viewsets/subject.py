@@ -5,15 +5,23 @@ NOTE:
      This is DRF based Portal API impls.
 """
 import logging
-
-from django.db.models import QuerySet
-from libumccr.aws import libs3
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from cachetools import LRUCache
+from django.conf import settings
 from rest_framework import filters
 from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
-from data_portal.models.analysisresult import AnalysisResult, Lookup, PlatformGeneration, AnalysisMethod
+from data_portal import presign
+from data_portal.models.analysisresult import AnalysisResult, PlatformGeneration, AnalysisMethod
+from data_portal.models.cacheversion import CacheVersion, subject_cache_key
 from data_portal.models.limsrow import LIMSRow
+from data_portal.models.resulttype import ResultType
 from data_portal.models.s3object import S3Object
 from data_portal.pagination import StandardResultsSetPagination
 from data_portal.serializers import LIMSRowModelSerializer, S3ObjectModelSerializer, SubjectIdSerializer, \
@@ -21,6 +29,13 @@ from data_portal.serializers import LIMSRowModelSerializer, S3ObjectModelSeriali
 
 logger = logging.getLogger()
 
+PRESIGN_EXPIRES_IN = 3600
+PRESIGN_MAX_WORKERS = 8
+
+# per subject response of this container, keyed by (subject id, CacheVersion) so that S3 sync invalidates it
+_cache = LRUCache(maxsize=64)
+_cache_lock = threading.Lock()
+
 
 class SubjectViewSet(ReadOnlyModelViewSet):
     queryset = LIMSRow.objects.values_list('subject_id', named=True).filter(subject_id__isnull=False).distinct()
@@ -36,74 +51,43 @@ class SubjectViewSet(ReadOnlyModelViewSet):
         return abs_uri + data_lake if abs_uri.endswith('/') else abs_uri + f"/{data_lake}"
 
     def retrieve(self, request, pk=None, **kwargs):
-        results = []
-        results_gds = []
-        results_sash = []
-        results_icav1_cttsov1 = []
-        results_icav1_wgts = []
-        results_icav2_cttsov2 = []
-        results_icav2_wgts = []
-        results_icav2_sash = []
-
-        qs: QuerySet = AnalysisResult.objects.get_by_lookup(Lookup(pk, PlatformGeneration.ONE)).prefetch_related()
-        if qs.exists():
-            r: AnalysisResult = qs.get()
-            results = r.s3objects.all()
-
-        qs: QuerySet = AnalysisResult.objects.get_by_lookup(Lookup(pk, PlatformGeneration.TWO)).prefetch_related()
-        if qs.exists():
-            r: AnalysisResult = qs.get()
-            results_gds = r.gdsfiles.all()
-            results_sash = r.s3objects.all()
-
-        results_icav1_cttsov1_lookup = Lookup(key=pk, gen=PlatformGeneration.TWO, method=AnalysisMethod.TSO500)
-        qs: QuerySet = AnalysisResult.objects.get_by_lookup(results_icav1_cttsov1_lookup).prefetch_related()
-        if qs.exists():
-            r: AnalysisResult = qs.get()
-            results_icav1_cttsov1 = r.s3objects.all()
-
-        results_icav1_wgts_lookup = Lookup(key=pk, gen=PlatformGeneration.TWO, method=AnalysisMethod.WGTS)
-        qs: QuerySet = AnalysisResult.objects.get_by_lookup(results_icav1_wgts_lookup).prefetch_related()
-        if qs.exists():
-            r: AnalysisResult = qs.get()
-            results_icav1_wgts = r.s3objects.all()
-
-        results_byob_cttsov2_lookup = Lookup(key=pk, gen=PlatformGeneration.THREE, method=AnalysisMethod.TSO500V2)
-        qs: QuerySet = AnalysisResult.objects.get_by_lookup(results_byob_cttsov2_lookup).prefetch_related()
-        if qs.exists():
-            r: AnalysisResult = qs.get()
-            results_icav2_cttsov2 = r.s3objects.all()
-
-        results_byob_wgts_lookup = Lookup(key=pk, gen=PlatformGeneration.THREE, method=AnalysisMethod.WGTS)
-        qs: QuerySet = AnalysisResult.objects.get_by_lookup(results_byob_wgts_lookup).prefetch_related()
-        if qs.exists():
-            r: AnalysisResult = qs.get()
-            results_icav2_wgts = r.s3objects.all()
-
-        results_byob_sash_lookup = Lookup(key=pk, gen=PlatformGeneration.THREE, method=AnalysisMethod.SASH)
-        qs: QuerySet = AnalysisResult.objects.get_by_lookup(results_byob_sash_lookup).prefetch_related()
-        if qs.exists():
-            r: AnalysisResult = qs.get()
-            results_icav2_sash = r.s3objects.all()
-
-        features = []
-
-        def _collect_features(_qs: QuerySet):
-            for obj in _qs:
-                o: S3Object = obj
-                if o.key.endswith('png'):
-                    # features.append(S3ObjectModelSerializer(o).data)
-                    resp = libs3.presign_s3_file(o.bucket, o.key)
-                    if resp[0]:
-                        features.append(resp[1])
-
-        _collect_features(results)
-        _collect_features(results_icav1_wgts)
-        _collect_features(results_icav2_wgts)
+        version = CacheVersion.objects.get_version(subject_cache_key(pk))
+        data = _cache_get(pk, version)
+        if data is None:
+            data = self._retrieve(pk)
+            _cache_put(pk, version, data)
+        return Response(data)
+
+    @staticmethod
+    def _retrieve(pk) -> dict:
+        # all result sets of the subject in one query, plus one prefetch query per relation
+        result_sets = defaultdict(lambda: {'s3objects': [], 'gdsfiles': []})
+        for r in AnalysisResult.objects.filter(key=pk).prefetch_related('s3objects', 'gdsfiles'):
+            result_sets[(r.gen, r.method)] = {'s3objects': list(r.s3objects.all()), 'gdsfiles': list(r.gdsfiles.all())}
+
+        results = result_sets[(PlatformGeneration.ONE, AnalysisMethod.UNCLASSIFIED)]['s3objects']
+        results_gds = result_sets[(PlatformGeneration.TWO, AnalysisMethod.UNCLASSIFIED)]['gdsfiles']
+        results_sash = result_sets[(PlatformGeneration.TWO, AnalysisMethod.UNCLASSIFIED)]['s3objects']
+        results_icav1_cttsov1 = result_sets[(PlatformGeneration.TWO, AnalysisMethod.TSO500)]['s3objects']
+        results_icav1_wgts = result_sets[(PlatformGeneration.TWO, AnalysisMethod.WGTS)]['s3objects']
+        results_icav2_cttsov2 = result_sets[(PlatformGeneration.THREE, AnalysisMethod.TSO500V2)]['s3objects']
+        results_icav2_wgts = result_sets[(PlatformGeneration.THREE, AnalysisMethod.WGTS)]['s3objects']
+        results_icav2_sash = result_sets[(PlatformGeneration.THREE, AnalysisMethod.SASH)]['s3objects']
+
+        def _is_feature(o: S3Object, classified: bool) -> bool:
+            # classified result_type is set at ingest, key check is for row not backfilled yet
+            if classified and o.result_type is not None:
+                return o.result_type == ResultType.CIRCOS
+            return o.key.endswith('png')
+
+        feature_objs = [o for o in results if _is_feature(o, True)]
+        # migrated objects, key layout is not of a result set
+        feature_objs += [o for o in results_icav1_wgts if _is_feature(o, False)]
+        feature_objs += [o for o in results_icav2_wgts if _is_feature(o, True)]
 
         data = {'id': pk}
         data.update(lims=LIMSRowModelSerializer(LIMSRow.objects.filter(subject_id=pk), many=True).data)
-        data.update(features=features)
+        data.update(features=_presign_features(feature_objs))
         data.update(results=S3ObjectModelSerializer(results, many=True).data)
         data.update(results_sash=S3ObjectModelSerializer(results_sash, many=True).data)
         data.update(results_gds=GDSFileModelSerializer(results_gds, many=True).data)
@@ -113,4 +97,40 @@ class SubjectViewSet(ReadOnlyModelViewSet):
         data.update(results_icav2_wgts=S3ObjectModelSerializer(results_icav2_wgts, many=True).data)
         data.update(results_icav2_sash=S3ObjectModelSerializer(results_icav2_sash, many=True).data)
 
-        return Response(data)
+        return data
+
+
+def _presign(o: S3Object) -> Optional[str]:
+    signed, response = presign.presign_s3_file(o.bucket, o.key, 'inline', PRESIGN_EXPIRES_IN, e_tag=o.e_tag)
+    return response if signed else None
+
+
+def _presign_features(objs: List[S3Object]) -> List[str]:
+    """
+    Presign concurrently through the shared presign layer, its pooled boto3 client is thread safe. Order of objects is
+    kept.
+    """
+    if not objs:
+        return []
+    with ThreadPoolExecutor(max_workers=min(PRESIGN_MAX_WORKERS, len(objs))) as executor:
+        return [url for url in executor.map(_presign, objs) if url]
+
+
+def _cache_get(pk, version: int) -> Optional[dict]:
+    with _cache_lock:
+        entry = _cache.get((pk, version))
+    if entry and entry[1] > time.monotonic():
+        return entry[0]
+    return None
+
+
+def _cache_put(pk, version: int, data: dict):
+    if settings.SUBJECT_CACHE_TTL <= 0:
+        return
+    with _cache_lock:
+        _cache[(pk, version)] = (data, time.monotonic() + settings.SUBJECT_CACHE_TTL)
+
+
+def cache_clear():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,168 @@
+import threading
+import time
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from libica.app import gds
+from libica.openapi import libgds
+from libumccr.aws import libs3
+from mockito import when, unstub
+
+from data_portal import presign
+from data_portal.tests.factories import S3ObjectFactory, GDSFileFactory
+from data_portal.viewsets import presignedurl
+from data_portal.viewsets.tests import _logger
+from data_portal.viewsets.tests.test_subject import FakeS3Client
+
+
+class FakeFilesApi:
+
+    def __init__(self, failing_file_ids=()):
+        self.failing_file_ids = failing_file_ids
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def get_file(self, file_id, presigned_url_mode):
+        time.sleep(0.001)  # as of GDS round trip, so that presign overlaps
+        with self._lock:
+            self.threads.add(threading.get_ident())
+        if file_id in self.failing_file_ids:
+            raise libgds.ApiException(status=404, reason="Not Found")
+        return libgds.FileResponse(id=file_id,
+                                   presigned_url=f"https://gds.s3.amazonaws.com/{file_id}?mode={presigned_url_mode}")
+
+
+class PresignedUrlViewSetTestCase(TestCase):
+
+    def setUp(self):
+        presign.clear()
+        self.client_s3 = FakeS3Client()
+        self.files_api = FakeFilesApi(failing_file_ids=["fil.failing"])
+        when(libs3).s3_client().thenReturn(self.client_s3)
+        when(presign).gds_files_api().thenReturn(self.files_api)
+
+    def tearDown(self):
+        presign.clear()
+        unstub()
+
+    def _batch(self, payload, **extra):
+        return self.client.post("/presign/batch", data=payload, content_type="application/json", **extra)
+
+    def test_batch(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_presignedurl.PresignedUrlViewSetTestCase.test_batch
+        """
+        s3_obj = S3ObjectFactory(key="path/to/a.bam")
+        gds_file = GDSFileFactory(file_id="fil.ok", path="/path/to/b.bam")
+        gds_failing = GDSFileFactory(file_id="fil.failing", path="/path/to/c.bam")
+
+        response = self._batch([
+            {'type': 'gds', 'id': gds_file.id},
+            {'type': 's3', 'id': s3_obj.id},
+            {'type': 's3', 'id': 999999},
+            {'type': 'gds', 'id': gds_failing.id},
+            {'type': 'fastq', 'id': 1},
+            {'type': ['s3'], 'id': s3_obj.id},
+            {'type': {'s3': 1}, 'id': s3_obj.id},
+            {'type': 's3', 'id': "²"},
+            {'type': 's3', 'id': [s3_obj.id]},
+            {'type': 's3', 'id': str(s3_obj.id)},
+        ], HTTP_CONTENT_DISPOSITION='inline')
+        self.assertEqual(response.status_code, 200)
+
+        results = response.data['results']
+        _logger.info(results)
+        self.assertEqual([(r['type'], r['id']) for r in results], [
+            ('gds', gds_file.id), ('s3', s3_obj.id), ('s3', 999999), ('gds', gds_failing.id), ('fastq', 1),
+            (['s3'], s3_obj.id), ({'s3': 1}, s3_obj.id), ('s3', "²"), ('s3', [s3_obj.id]), ('s3', str(s3_obj.id)),
+        ])
+        self.assertEqual(results[0]['signed_url'], "https://gds.s3.amazonaws.com/fil.ok?mode=inline")
+        self.assertIn("path/to/a.bam", results[1]['signed_url'])
+        self.assertEqual(self.client_s3.keys, ["path/to/a.bam", "path/to/a.bam"])
+        self.assertEqual(results[2]['error'], "Not found.")
+        self.assertIn("Failed to sign", results[3]['error'])
+        self.assertIn("Unsupported type", results[4]['error'])
+        # unhashable type is an item error too, not server error
+        self.assertIn("Unsupported type", results[5]['error'])
+        self.assertIn("Unsupported type", results[6]['error'])
+        # digit but not integer id, and non scalar id, are not found
+        self.assertEqual(results[7]['error'], "Not found.")
+        self.assertEqual(results[8]['error'], "Not found.")
+        self.assertIn("path/to/a.bam", results[9]['signed_url'])
+
+    def test_batch_bad_payload(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_presignedurl.PresignedUrlViewSetTestCase.test_batch_bad_payload
+        """
+        self.assertEqual(self._batch({'s3': [1]}).status_code, 400)
+        self.assertEqual(self._batch([{'type': 's3', 'id': i} for i in range(501)]).status_code, 400)
+        self.assertEqual(self._batch([]).data, {'results': []})
+
+    def test_batch_query_count(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_presignedurl.PresignedUrlViewSetTestCase.test_batch_query_count
+        """
+        def _payload(size):
+            s3_objs = [S3ObjectFactory() for _ in range(size)]
+            gds_files = [GDSFileFactory(file_id=f"fil.{size}.{i}", path=f"/{size}/{i}.bam") for i in range(size)]
+            return [{'type': 's3', 'id': o.id} for o in s3_objs] + [{'type': 'gds', 'id': o.id} for o in gds_files]
+
+        few, many = _payload(2), _payload(100)
+
+        with CaptureQueriesContext(connection) as few_ctx:
+            self._batch(few)
+        with CaptureQueriesContext(connection) as many_ctx:
+            response = self._batch(many)
+
+        self.assertEqual(len(few_ctx), len(many_ctx))
+        self.assertEqual(len(many_ctx), 2)  # one per record type
+        self.assertTrue(all('signed_url' in r for r in response.data['results']))
+        self.assertGreater(len(self.client_s3.threads | self.files_api.threads), 1)
+
+    def test_create_concurrent_volumes(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_presignedurl.PresignedUrlViewSetTestCase.test_create_concurrent_volumes
+        """
+        def _listing(volume_name, paths):
+            time.sleep(0.2)  # as of GDS round trip
+            return [libgds.FileResponse(volume_name=volume_name, path=p, presigned_url=f"https://{p}") for p in paths]
+
+        when(gds).get_files_list(...).thenAnswer(_listing)
+
+        start = time.perf_counter()
+        response = self.client.post("/presign", data=[f"gds://vol{i}/file.txt" for i in range(4)],
+                                    content_type="application/json")
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['volume'] for r in response.data['signed_urls']], [f"vol{i}" for i in range(4)])
+        self.assertNotIn('partial', response.data)
+        self.assertLess(elapsed, 0.6)
+
+    def test_create_partial(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_presignedurl.PresignedUrlViewSetTestCase.test_create_partial
+        """
+        def _listing(volume_name, paths):
+            if volume_name == "failing":
+                raise ConnectionError("Connection refused")
+            if volume_name == "slow":
+                time.sleep(0.5)
+            return [libgds.FileResponse(volume_name=volume_name, path=p, presigned_url=f"https://{p}") for p in paths]
+
+        when(gds).get_files_list(...).thenAnswer(_listing)
+        self.addCleanup(setattr, presignedurl, 'LIST_TIMEOUT', presignedurl.LIST_TIMEOUT)
+        presignedurl.LIST_TIMEOUT = 0.2
+
+        payload = ["gds://ok/file.txt", "gds://failing/file.txt", "gds://slow/file.txt"]
+        response = self.client.post("/presign", data=payload, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['volume'] for r in response.data['signed_urls']], ["ok"])
+        self.assertTrue(response.data['partial'])
+        self.assertEqual([e['volume'] for e in response.data['errors']], ["failing", "slow"])
+
+        # none listed
+        response = self.client.post("/presign", data=payload[1:], content_type="application/json")
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,141 @@
+import tracemalloc
+
+from botocore.response import StreamingBody
+from django.test import TestCase, override_settings
+from libumccr.aws import libs3
+from mockito import when, unstub
+
+from data_portal import presign
+from data_portal.tests.factories import S3ObjectFactory
+from data_portal.viewsets import s3object
+from data_portal.viewsets.tests import _logger
+from data_portal.viewsets.tests.test_subject import FakeS3Client
+
+
+class FakeRawStream:
+    """
+    Stand-in of urllib3 response of S3 object body, that generates its bytes on read, i.e. never holds them all
+    """
+
+    def __init__(self, size):
+        self.remaining = size
+        self.closed = False
+
+    def read(self, amt=None):
+        amt = self.remaining if amt is None else min(amt, self.remaining)
+        self.remaining -= amt
+        return b"x" * amt
+
+    def close(self):
+        self.closed = True
+
+
+def _get_object_response(size, status_code=200, **headers):
+    return True, {
+        'ResponseMetadata': {
+            'HTTPStatusCode': status_code,
+            'HTTPHeaders': {
+                'content-type': 'text/html',
+                'content-length': str(size),
+                'etag': '"etag"',
+                'last-modified': 'Wed, 01 Jan 2020 00:00:00 GMT',
+                'accept-ranges': 'bytes',
+                **headers,
+            },
+        },
+        'ContentLength': size,
+        'Body': StreamingBody(FakeRawStream(size), size),
+    }
+
+
+class S3ObjectViewSetTestCase(TestCase):
+
+    def setUp(self):
+        presign.clear()
+        self.obj = S3ObjectFactory(key="path/to/report.html")
+
+    def tearDown(self):
+        presign.clear()
+        unstub()
+
+    def test_content(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_s3object.S3ObjectViewSetTestCase.test_content
+        """
+        when(libs3).get_s3_object(self.obj.bucket, self.obj.key).thenReturn(_get_object_response(1000))
+
+        response = self.client.get(f"/s3/{self.obj.id}/content")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/html')
+        self.assertEqual(response['Content-Length'], '1000')
+        self.assertEqual(response['ETag'], '"etag"')
+        self.assertEqual(b"".join(response.streaming_content), b"x" * 1000)
+
+    def test_content_range(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_s3object.S3ObjectViewSetTestCase.test_content_range
+        """
+        when(libs3).get_s3_object(self.obj.bucket, self.obj.key, Range="bytes=0-99").thenReturn(
+            _get_object_response(100, status_code=206, **{'content-range': 'bytes 0-99/1000'})
+        )
+
+        response = self.client.get(f"/s3/{self.obj.id}/content", HTTP_RANGE="bytes=0-99")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 0-99/1000')
+        self.assertEqual(len(b"".join(response.streaming_content)), 100)
+
+    def test_content_not_modified(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_s3object.S3ObjectViewSetTestCase.test_content_not_modified
+        """
+        when(libs3).get_s3_object(self.obj.bucket, self.obj.key, IfNoneMatch='"etag"').thenReturn((True, {
+            'Error': {'Code': "304", 'Message': "Not Modified"},
+            'ResponseMetadata': {'HTTPStatusCode': 304, 'HTTPHeaders': {'etag': '"etag"'}},
+        }))
+
+        response = self.client.get(f"/s3/{self.obj.id}/content", HTTP_IF_NONE_MATCH='"etag"')
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], '"etag"')
+
+    @override_settings(S3_CONTENT_MAX_PROXY_SIZE=1000)
+    def test_content_redirect(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_s3object.S3ObjectViewSetTestCase.test_content_redirect
+        """
+        client_s3 = FakeS3Client()
+        when(libs3).s3_client().thenReturn(client_s3)
+        get_object_response = _get_object_response(1001)
+        when(libs3).get_s3_object(self.obj.bucket, self.obj.key).thenReturn(get_object_response)
+
+        response = self.client.get(f"/s3/{self.obj.id}/content")
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(self.obj.key, response['Location'])
+        self.assertEqual(client_s3.keys, [self.obj.key])
+        self.assertTrue(get_object_response[1]['Body']._raw_stream.closed)
+
+    @override_settings(S3_CONTENT_MAX_PROXY_SIZE=1024 * 1024 * 1024)
+    def test_content_memory(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_s3object.S3ObjectViewSetTestCase.test_content_memory
+        """
+        size = 300 * 1024 * 1024
+        when(libs3).get_s3_object(self.obj.bucket, self.obj.key).thenReturn(_get_object_response(size))
+
+        tracemalloc.start()
+        try:
+            response = self.client.get(f"/s3/{self.obj.id}/content")
+            served = 0
+            for chunk in response.streaming_content:
+                served += len(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        _logger.info(f"served {served} bytes in {s3object.CONTENT_CHUNK_SIZE} bytes chunks, peak {peak} bytes")
+        self.assertEqual(served, size)
+        self.assertLess(peak, 16 * s3object.CONTENT_CHUNK_SIZE)
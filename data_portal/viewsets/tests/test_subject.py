@@ -0,0 +1,213 @@
+import threading
+import time
+from unittest import skip
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from libumccr.aws import libs3
+from mockito import when, unstub, verify
+
+from data_portal import presign
+from data_portal.models.analysisresult import AnalysisResult, Lookup, PlatformGeneration, AnalysisMethod
+from data_portal.models.s3object import S3Object
+from data_portal.viewsets import subject
+from data_portal.viewsets.tests import _logger
+from data_processors.s3 import services as s3_services
+
+SUBJECT_ID = "SBJ00001"
+BUCKET = "umccr-primary-data-dev"
+BYOB_BUCKET = "pipeline-prod-cache-503977275616-ap-southeast-2"
+
+
+class FakeS3Client:
+
+    def __init__(self):
+        self.threads = set()
+        self.keys = []
+        self._lock = threading.Lock()
+
+    def generate_presigned_url(self, client_method, Params, ExpiresIn):
+        time.sleep(0.001)  # as of credential resolution, so that presign overlaps
+        with self._lock:
+            self.threads.add(threading.get_ident())
+            self.keys.append(Params['Key'])
+        return f"https://{Params['Bucket']}.s3.amazonaws.com/{Params['Key']}?X-Amz-Expires={ExpiresIn}"
+
+
+def _s3_object(bucket, key):
+    return S3Object(bucket=bucket, key=key, size=1, last_modified_date=now(), e_tag="etag")
+
+
+def _create_results(size):
+    """
+    bcbio results with circos png, plus icav2 wgts results with circos png
+    """
+    bcbio_keys = [f"Project/{SUBJECT_ID}/WGS/2020-01-01/umccrised/{SUBJECT_ID}__{SUBJECT_ID}_MDX000001_L2000001/"
+                  f"purple/circos/{SUBJECT_ID}.circos_baf_{i}.png" for i in range(size // 2)]
+    bcbio_keys += [f"Project/{SUBJECT_ID}/WGS/2020-01-01/umccrised/{SUBJECT_ID}__{SUBJECT_ID}_MDX000001_L2000001/"
+                   f"cancer_report_{i}.html" for i in range(size - size // 2)]
+    byob_keys = [f"byob-icav2/production/analysis/umccrise/20240101abcd1234/L2000001__L2000002/"
+                 f"{SUBJECT_ID}__L2000001/purple/plot/{SUBJECT_ID}__L2000001.circos_baf.png"]
+
+    s3_services.persist_s3_object_bulk([_s3_object(BUCKET, key) for key in bcbio_keys])
+    s3_services.persist_s3_object_bulk([_s3_object(BYOB_BUCKET, key) for key in byob_keys])
+
+    AnalysisResult.objects.create_or_update(
+        Lookup(SUBJECT_ID, PlatformGeneration.ONE), s3objects=list(S3Object.objects.filter(bucket=BUCKET))
+    )
+    AnalysisResult.objects.create_or_update(
+        Lookup(SUBJECT_ID, PlatformGeneration.THREE, AnalysisMethod.WGTS),
+        s3objects=list(S3Object.objects.filter(bucket=BYOB_BUCKET))
+    )
+    return bcbio_keys, byob_keys
+
+
+class SubjectViewSetTestCase(TestCase):
+
+    def setUp(self):
+        subject.cache_clear()
+        presign.clear()
+        self.client_s3 = FakeS3Client()
+        when(libs3).s3_client().thenReturn(self.client_s3)
+
+    def tearDown(self):
+        subject.cache_clear()
+        presign.clear()
+        unstub()
+
+    def test_retrieve(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_subject.SubjectViewSetTestCase.test_retrieve
+        """
+        bcbio_keys, byob_keys = _create_results(20)
+
+        response = self.client.get(f"/subjects/{SUBJECT_ID}/")
+        self.assertEqual(response.status_code, 200)
+
+        data = response.data
+        self.assertEqual(data['id'], SUBJECT_ID)
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(len(data['results_icav2_wgts']), 1)
+        self.assertEqual(data['results_sash'], [])
+        self.assertEqual(data['results_gds'], [])
+
+        # features in result set order, bcbio then icav2 wgts
+        expected_keys = [o.key for o in AnalysisResult.objects.get(gen=PlatformGeneration.ONE).s3objects.all()
+                         if o.key.endswith('png')] + byob_keys
+        self.assertEqual([url.split('.com/')[1].split('?')[0] for url in data['features']], expected_keys)
+        self.assertEqual(len(self.client_s3.keys), 11)
+
+    def test_retrieve_query_count(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_subject.SubjectViewSetTestCase.test_retrieve_query_count
+        """
+        _create_results(4)
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(f"/subjects/{SUBJECT_ID}/")
+
+        subject.cache_clear()
+        _create_results(100)
+
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(f"/subjects/{SUBJECT_ID}/")
+
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(len([q for q in many.captured_queries if 'data_portal_analysisresult"' in q['sql']
+                              and 'INNER JOIN' not in q['sql']]), 1)
+
+    def test_retrieve_cache(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_subject.SubjectViewSetTestCase.test_retrieve_cache
+        """
+        _create_results(10)
+
+        first = self.client.get(f"/subjects/{SUBJECT_ID}/").data
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(f"/subjects/{SUBJECT_ID}/").data
+        self.assertEqual(second, first)
+        self.assertEqual(len(ctx.captured_queries), 1)  # version lookup only
+        self.assertEqual(len(self.client_s3.keys), 6)  # presigned once
+
+        # S3 event of another subject does not invalidate
+        s3_services.persist_s3_object_bulk([_s3_object(BUCKET, "Project/SBJ00002/WGS/2020-01-01/final/a.bam")])
+        self.client.get(f"/subjects/{SUBJECT_ID}/")
+        self.assertEqual(len(self.client_s3.keys), 6)
+
+        # S3 event of the subject does
+        removed = AnalysisResult.objects.get(gen=PlatformGeneration.ONE).s3objects.first()
+        s3_services.delete_s3_object_bulk([(removed.bucket, removed.key)])
+        third = self.client.get(f"/subjects/{SUBJECT_ID}/").data
+        self.assertEqual(len(third['results']), len(first['results']) - 1)
+
+        # so does TTL
+        with override_settings(SUBJECT_CACHE_TTL=0):
+            subject.cache_clear()
+            self.client.get(f"/subjects/{SUBJECT_ID}/")
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(f"/subjects/{SUBJECT_ID}/")
+        self.assertGreater(len(ctx.captured_queries), 1)
+
+    def test_presign_concurrent(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_subject.SubjectViewSetTestCase.test_presign_concurrent
+        """
+        objs = [_s3_object(BUCKET, f"{SUBJECT_ID}/{i}.png") for i in range(50)]
+
+        urls = subject._presign_features(objs)
+
+        self.assertEqual([url.split('.com/')[1].split('?')[0] for url in urls], [o.key for o in objs])
+        self.assertGreater(len(self.client_s3.threads), 1)
+        verify(libs3, times=1).s3_client()
+
+
+@skip
+class SubjectViewSetBenchmarkTests(TestCase):
+    # benchmark is manual run, comment @skip and run i.e.
+    #   python manage.py test data_portal.viewsets.tests.test_subject.SubjectViewSetBenchmarkTests
+    # and keep decorated @skip after run
+    # for MySQL, run with `export DJANGO_SETTINGS_MODULE=data_portal.settings.local` against portal db container
+
+    def test_benchmark_retrieve(self):
+        """
+        python manage.py test data_portal.viewsets.tests.test_subject.SubjectViewSetBenchmarkTests.test_benchmark_retrieve
+        """
+        import boto3
+        size = 600
+        _create_results(size)
+
+        def _s3_client():
+            # real client, signing is local with dummy credentials
+            return boto3.client('s3', region_name='ap-southeast-2', aws_access_key_id='AKIAEXAMPLE',
+                                aws_secret_access_key='secret')
+
+        when(libs3).s3_client().thenAnswer(_s3_client)
+
+        # as of before, one client per presign
+        features = [o for o in S3Object.objects.all() if o.key.endswith('png')]
+        start = time.perf_counter()
+        for o in features:
+            _s3_client().generate_presigned_url('get_object', Params={'Bucket': o.bucket, 'Key': o.key},
+                                                ExpiresIn=3600)
+        serial_elapsed = time.perf_counter() - start
+
+        subject.cache_clear()
+        presign.clear()
+        with CaptureQueriesContext(connection) as cold_ctx:
+            start = time.perf_counter()
+            response = self.client.get(f"/subjects/{SUBJECT_ID}/")
+            cold_elapsed = time.perf_counter() - start
+        self.assertEqual(len(response.data['features']), len(features))
+
+        with CaptureQueriesContext(connection) as warm_ctx:
+            start = time.perf_counter()
+            self.client.get(f"/subjects/{SUBJECT_ID}/")
+            warm_elapsed = time.perf_counter() - start
+
+        _logger.info(f"{connection.vendor} subject with {size + 1} results, {len(features)} features: presign one "
+                     f"client each {serial_elapsed * 1000:.1f}ms, retrieve cold {cold_elapsed * 1000:.1f}ms "
+                     f"({len(cold_ctx)} queries), warm {warm_elapsed * 1000:.1f}ms ({len(warm_ctx)} queries)")
+        unstub()
@@ -1,6 +1,7 @@
-from libumccr.aws import libs3
 from rest_framework.response import Response
 
+from data_portal import presign
+
 
 def _error_response(message, status_code=400, err=None) -> Response:
     data = {'error': message}
@@ -12,8 +13,8 @@ def _error_response(message, status_code=400, err=None) -> Response:
     )
 
 
-def _presign_response(bucket, key, content_disposition: str = 'inline', expires_in: int = 3600) -> Response:
-    response = libs3.presign_s3_file(bucket, key, content_disposition, expires_in)
+def _presign_response(bucket, key, content_disposition: str = 'inline', expires_in: int = 3600, e_tag=None) -> Response:
+    response = presign.presign_s3_file(bucket, key, content_disposition, expires_in, e_tag=e_tag)
     if response[0]:
         return Response({'signed_url': response[1]})
     else:
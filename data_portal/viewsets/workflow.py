@@ -8,14 +8,16 @@ NOTE:
 from rest_framework import filters
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
+from data_portal.conditional import ConditionalGetMixin
 from data_portal.models.workflow import Workflow
-from data_portal.pagination import StandardResultsSetPagination
+from data_portal.pagination import KeysetResultsSetPagination
 from data_portal.serializers import WorkflowSerializer
 
 
-class WorkflowViewSet(ReadOnlyModelViewSet):
+class WorkflowViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     serializer_class = WorkflowSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetResultsSetPagination
+    cursor_ordering = ['-id']
     filter_backends = [filters.OrderingFilter, filters.SearchFilter]
     ordering_fields = '__all__'
     ordering = ['-id']
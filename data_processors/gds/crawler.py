@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""gds crawler module
+Impl in here index GDS files of a volume into GDSFile. GDS files API is paged by token, i.e. next page can only be
+requested once the current page has arrived. A background thread therefore fetches upcoming pages into a bounded queue,
+while the calling thread bulk upserts each page, so that fetching and persisting overlap.
+
+After each persisted page, the next page token is written to checkpoint file. An interrupted crawl then resumes from
+the page where it stopped.
+"""
+import logging
+import os
+import queue
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+
+from libica.openapi import libgds
+from libumccr import libjson, libdt
+
+from data_processors.gds import services
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_PREFETCH = 4
+
+
+def crawl_gds_files(files_api: libgds.FilesApi, volume_name: str, path: str = "/*",
+                    page_size: int = DEFAULT_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH,
+                    checkpoint_path: Optional[str] = None, dry: bool = False) -> dict:
+    """
+    Index GDS files of the volume under path into GDSFile, one bulk upsert per page
+
+    :param files_api: libgds.FilesApi or stand-in with the same list_files() signature
+    :param volume_name: GDS volume name
+    :param path: GDS path pattern
+    :param page_size: number of files per page
+    :param prefetch: number of pages fetched ahead of persisting
+    :param checkpoint_path: checkpoint file path, no checkpoint if None
+    :param dry: log GDS files instead of persisting, checkpoint is not written
+    :return results of crawl
+    """
+    if dry:
+        checkpoint_path = None
+
+    results = defaultdict(int)
+
+    checkpoint = _load_checkpoint(checkpoint_path)
+    if checkpoint and (checkpoint['volume_name'], checkpoint['path']) != (volume_name, path):
+        raise ValueError(f"Checkpoint ({checkpoint_path}) is of another crawl: gds://{checkpoint['volume_name']}"
+                         f"{checkpoint['path']}")
+
+    page_token = None
+    if checkpoint:
+        page_token = checkpoint['page_token']
+        results['resumed_count'] = checkpoint['count']
+        logger.info(f"Resuming crawl of gds://{volume_name}{path} after {checkpoint['count']} files")
+
+    page_queue = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    fetcher = threading.Thread(
+        target=_fetch_pages,
+        args=(files_api, volume_name, path, page_size, page_token, page_queue, stop),
+        daemon=True,
+    )
+    fetcher.start()
+
+    try:
+        while True:
+            payload_list, next_page_token, error = page_queue.get()
+
+            if error:
+                logger.error(f"Failed crawling gds://{volume_name}{path}, re-run to resume from checkpoint: {error}")
+                results['failed_count'] += 1
+                break
+
+            if dry:
+                for payload in payload_list:
+                    logger.info(f"gds://{payload['volumeName']}{payload['path']}")
+            else:
+                services.persist_gds_file_payload_bulk(payload_list)
+
+            results['crawled_count'] += len(payload_list)
+            results['page_count'] += 1
+
+            if not next_page_token:
+                break
+
+            _save_checkpoint(checkpoint_path, {
+                'volume_name': volume_name,
+                'path': path,
+                'page_token': next_page_token,
+                'count': results['resumed_count'] + results['crawled_count'],
+            })
+    finally:
+        stop.set()
+        fetcher.join()
+
+    if not results['failed_count'] and checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    return results
+
+
+def _fetch_pages(files_api: libgds.FilesApi, volume_name: str, path: str, page_size: int, page_token: Optional[str],
+                 page_queue: queue.Queue, stop: threading.Event):
+    try:
+        while not stop.is_set():
+            file_list: libgds.FileListResponse = files_api.list_files(
+                volume_name=[volume_name],
+                path=[path],
+                page_size=page_size,
+                page_token=page_token,
+            )
+
+            page_token = file_list.next_page_token
+            if not _put(page_queue, stop, ([_to_rest_repr(file) for file in file_list.items], page_token, None)):
+                return
+
+            if not page_token:
+                return
+    except Exception as e:
+        _put(page_queue, stop, ([], None, e))
+
+
+def _put(page_queue: queue.Queue, stop: threading.Event, item: tuple) -> bool:
+    while not stop.is_set():
+        try:
+            page_queue.put(item, timeout=1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _to_rest_repr(file: libgds.FileResponse) -> dict:
+    """
+    Transform back into REST style representation, i.e. payload of GET /v1/files/{fileId}
+    """
+    file_rest_repr = {}
+    for k, v in file.attribute_map.items():
+        item = getattr(file, k)
+        if isinstance(item, datetime):
+            item = libdt.serializable_datetime(item)
+        file_rest_repr[v] = item
+    return file_rest_repr
+
+
+def _load_checkpoint(checkpoint_path: Optional[str]) -> Optional[dict]:
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            return libjson.loads(f.read())
+    return None
+
+
+def _save_checkpoint(checkpoint_path: Optional[str], state: dict):
+    if not checkpoint_path:
+        return
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(libjson.dumps(state))
+    os.replace(tmp_path, checkpoint_path)
@@ -1,34 +1,176 @@
 import logging
 from collections import defaultdict
-from typing import List
+from typing import List, Tuple
 
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import transaction
+from django.db import transaction, connection
 from django.utils.dateparse import parse_datetime
 from django.utils.timezone import is_aware, make_aware
 from libica.app import GDSFilesEventType
 
+from data_portal.fields import HashFieldHelper
 from data_portal.models.gdsfile import GDSFile
+from data_portal.models.pathtoken import GDSFilePathToken
+from data_portal.models.storagestat import StorageStat, StorageStatSource
 from data_processors.const import GDSEventRecord
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+BULK_BATCH_SIZE = 500
+
+UPSERT_UPDATE_FIELDS = [
+    'file_id', 'name', 'volume_id', 'type', 'tenant_id', 'sub_tenant_id', 'time_created', 'created_by',
+    'time_modified', 'modified_by', 'inherited_acl', 'urn', 'size_in_bytes', 'is_uploaded', 'archive_status',
+    'storage_tier', 'presigned_url', 'result_pipeline', 'result_type',
+]
+
 
 def sync_gds_event_records(records: List[GDSEventRecord]):
+    """
+    Synchronise GDS event records to the db in bulk, i.e. one upsert on GDSFile.unique_hash for uploaded (and other
+    non-deleted) events and, chunked hash based delete for deleted events. Records of the same GDS file within the
+    batch are collapsed into the latest by event time. Storage stat deltas of the batch are applied once, as the last
+    statement of the transaction, see StorageStat.objects.apply().
+
+    :param records: records to be processed
+    :return results of synchronisation
+    """
     results = defaultdict(int)
 
+    latest_by_hash = dict()
     for record in records:
+        hash_key = _get_unique_hash(record.gds_volume_name, record.gds_object_meta['path'])
+        current = latest_by_hash.get(hash_key)
+        if current is None or not record.event_time < current.event_time:
+            latest_by_hash[hash_key] = record
+
+    results['coalesced_count'] = len(records) - len(latest_by_hash)
+
+    gds_file_list = list()
+    removed_hash_list = list()
+    for hash_key, record in latest_by_hash.items():
         if record.event_type == GDSFilesEventType.DELETED:
-            removed_count = delete_gds_file(record.gds_object_meta)
-            results['removed_count'] += removed_count
+            removed_hash_list.append(hash_key)
         else:
-            created_or_updated_count = create_or_update_gds_file(record.gds_object_meta)
-            results['created_or_updated_count'] += created_or_updated_count
+            gds_file_list.append(_populate_gds_file(GDSFile(), record.gds_object_meta))
+
+    with transaction.atomic():
+        persist_stat_deltas = _persist_gds_file_bulk(gds_file_list)
+        removed_count, delete_stat_deltas = _delete_gds_file_bulk(removed_hash_list)
+
+        # last, as volume stat row is shared by all concurrent syncs of the volume
+        StorageStat.objects.apply(
+            StorageStatSource.GDS, StorageStat.objects.merge_deltas(persist_stat_deltas, delete_stat_deltas)
+        )
+
+    results['created_or_updated_count'] += len(gds_file_list)
+    results['removed_count'] += removed_count
 
     return results
 
 
+def _get_unique_hash(volume_name: str, path: str) -> str:
+    h = HashFieldHelper()
+    h.add(volume_name).add(path)
+    return h.calculate_hash()
+
+
+def _upsert_conflict_target() -> dict:
+    """
+    MySQL resolves conflict on any unique index and does not allow the conflict target to be specified, whereas
+    other backends (e.g. sqlite in unit test) require it.
+    """
+    if connection.features.supports_update_conflicts_with_target:
+        return {'unique_fields': ['unique_hash']}
+    return {}
+
+
+@transaction.atomic
+def persist_gds_file_bulk(gds_file_list: List[GDSFile]) -> int:
+    """
+    Upsert GDSFile records in a single statement (per batch) keyed on unique_hash
+    :param gds_file_list: list of unsaved GDSFile instance
+    :return: number of GDSFile created or updated
+    """
+    stat_deltas = _persist_gds_file_bulk(gds_file_list)
+    StorageStat.objects.apply(StorageStatSource.GDS, stat_deltas)
+
+    return len(gds_file_list)
+
+
+def _persist_gds_file_bulk(gds_file_list: List[GDSFile]) -> dict:
+    """
+    Upsert GDSFile records, without applying the storage stat deltas. Must be called within transaction.
+    :return: storage stat deltas of the upsert
+    """
+    # payload without timeArchived must not clear the existing value, hence, upsert these separately
+    archived_list = [gds_file for gds_file in gds_file_list if gds_file.time_archived is not None]
+    not_archived_list = [gds_file for gds_file in gds_file_list if gds_file.time_archived is None]
+
+    stat_deltas = StorageStat.objects.upsert_deltas(StorageStatSource.GDS, gds_file_list)
+
+    for obj_list, update_fields in [
+        (archived_list, UPSERT_UPDATE_FIELDS + ['time_archived']),
+        (not_archived_list, UPSERT_UPDATE_FIELDS),
+    ]:
+        if not obj_list:
+            continue
+        GDSFile.objects.bulk_create(
+            obj_list,
+            batch_size=BULK_BATCH_SIZE,
+            update_conflicts=True,
+            update_fields=update_fields,
+            **_upsert_conflict_target(),
+        )
+
+    GDSFilePathToken.index(gds_file_list)
+
+    return stat_deltas
+
+
+def persist_gds_file_payload_bulk(payload_list: List[dict]) -> int:
+    """
+    Upsert GDSFile records from list of GET /v1/files/{fileId} dict response, see persist_gds_file_bulk()
+    :param payload_list: list of GDS file payload
+    :return: number of GDSFile created or updated
+    """
+    return persist_gds_file_bulk([_populate_gds_file(GDSFile(), payload) for payload in payload_list])
+
+
+@transaction.atomic
+def delete_gds_file_bulk(hash_key_list: List[str]) -> int:
+    """
+    Delete GDSFile records in chunked `unique_hash IN (...)` statements. Association records (AnalysisResult gdsfiles)
+    are cascaded by the ORM collector.
+    :param hash_key_list: list of GDSFile unique_hash, see _get_unique_hash()
+    :return: number of GDSFile deleted
+    """
+    removed_count, stat_deltas = _delete_gds_file_bulk(hash_key_list)
+    StorageStat.objects.apply(StorageStatSource.GDS, stat_deltas)
+
+    return removed_count
+
+
+def _delete_gds_file_bulk(hash_key_list: List[str]) -> Tuple[int, dict]:
+    """
+    Delete GDSFile records, without applying the storage stat deltas. Must be called within transaction.
+    :return: number of GDSFile deleted, storage stat deltas of the delete
+    """
+    removed_count = 0
+    stat_deltas_list = list()
+    for i in range(0, len(hash_key_list), BULK_BATCH_SIZE):
+        chunk = hash_key_list[i:i + BULK_BATCH_SIZE]
+        qs = GDSFile.objects.filter(unique_hash__in=chunk)
+        stat_deltas_list.append(StorageStat.objects.delete_deltas(StorageStatSource.GDS, qs))
+        _, deleted_per_model = qs.delete()
+        removed_count += deleted_per_model.get(GDSFile._meta.label, 0)
+
+    logger.info(f"Deleted {removed_count} GDSFile out of {len(hash_key_list)} removal requested")
+
+    return removed_count, StorageStat.objects.merge_deltas(*stat_deltas_list)
+
+
 @transaction.atomic
 def delete_gds_file(payload: dict) -> int:
     """
@@ -43,8 +185,9 @@ def delete_gds_file(payload: dict) -> int:
     path = payload['path']
 
     try:
-        gds_file = GDSFile.objects.get(volume_name=volume_name, path=path)
+        gds_file = GDSFile.objects.select_for_update().get(volume_name=volume_name, path=path)
         gds_file.delete()
+        StorageStat.objects.apply(StorageStatSource.GDS, {volume_name: [-1, -(gds_file.size_in_bytes or 0)]})
         logger.info(f"Deleted GDSFile: gds://{volume_name}{path}")
         return 1
     except ObjectDoesNotExist as e:
@@ -73,14 +216,28 @@ def create_or_update_gds_file(payload: dict) -> int:
         logger.info(f"Updating existing GDSFile (volume_name={volume_name}, path={path})")
         gds_file: GDSFile = qs.get()
 
+    _populate_gds_file(gds_file, payload)
+    stat_deltas = StorageStat.objects.upsert_deltas(StorageStatSource.GDS, [gds_file])
+    gds_file.save()
+
+    GDSFilePathToken.index([gds_file])
+    StorageStat.objects.apply(StorageStatSource.GDS, stat_deltas)
+
+    return 1
+
+
+def _populate_gds_file(gds_file: GDSFile, payload: dict) -> GDSFile:
+    """
+    Map payload of GET /v1/files/{fileId} onto GDSFile model attributes
+    """
     gds_file.file_id = payload.get('id')
     gds_file.name = payload.get('name')
     gds_file.volume_id = payload.get('volumeId')
-    gds_file.volume_name = volume_name
+    gds_file.volume_name = payload.get('volumeName')
     gds_file.type = payload.get('type', None)
     gds_file.tenant_id = payload.get('tenantId')
     gds_file.sub_tenant_id = payload.get('subTenantId')
-    gds_file.path = path
+    gds_file.path = payload.get('path')
     time_created = parse_datetime(payload.get('timeCreated'))
     gds_file.time_created = time_created if is_aware(time_created) else make_aware(time_created)
     gds_file.created_by = payload.get('createdBy')
@@ -98,6 +255,4 @@ def create_or_update_gds_file(payload: dict) -> int:
         gds_file.time_archived = time_archived if is_aware(time_archived) else make_aware(time_archived)
     gds_file.storage_tier = payload.get('storageTier')
     gds_file.presigned_url = payload.get('presignedUrl', None)
-    gds_file.save()
-
-    return 1
+    return gds_file
@@ -0,0 +1,150 @@
+import os
+import tempfile
+import threading
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from libica.openapi import libgds
+from libumccr import libjson
+from mockito import when
+
+from data_portal.models.gdsfile import GDSFile
+from data_portal.models.storagestat import StorageStat, StorageStatSource
+from data_processors.gds import crawler, services
+from data_processors.gds.tests.case import GDSEventUnitTestCase, logger
+from data_processors.gds.tests.test_services import _payload
+
+
+def _make_fixture_pages(volume_name, paths, page_size) -> dict:
+    """
+    :return: dict of page token to JSON response of GET /v1/files, first page token is None
+    """
+    pages = {}
+    chunks = [paths[i:i + page_size] for i in range(0, len(paths), page_size)]
+    for n, chunk in enumerate(chunks):
+        pages[f"page-{n}" if n else None] = libjson.dumps({
+            'items': [_payload(path, volume_name=volume_name) for path in chunk],
+            'nextPageToken': f"page-{n + 1}" if n + 1 < len(chunks) else None,
+        })
+    return pages
+
+
+class FakeFilesApi:
+    """Stand-in of libgds.FilesApi that serves list_files() pages from fixture JSON"""
+
+    def __init__(self, pages: dict, fail_at: str = None):
+        self.pages = pages
+        self.fail_at = fail_at
+        self.page_tokens = []
+        self.page_fetched = {}
+
+    def list_files(self, volume_name, path, page_size, page_token=None) -> libgds.FileListResponse:
+        self.page_tokens.append(page_token)
+        if self.fail_at and page_token == self.fail_at:
+            raise libgds.ApiException(status=500, reason="Simulated GDS API failure")
+
+        response = libjson.loads(self.pages[page_token])
+        items = []
+        for item in response['items']:
+            items.append(libgds.FileResponse(**{k: item.get(v) for k, v in libgds.FileResponse.attribute_map.items()}))
+
+        self.page_fetched.setdefault(page_token, threading.Event()).set()
+        return libgds.FileListResponse(items=items, next_page_token=response['nextPageToken'])
+
+
+class GDSCrawlerUnitTests(GDSEventUnitTestCase):
+
+    def setUp(self) -> None:
+        super(GDSCrawlerUnitTests, self).setUp()
+        self.checkpoint_path = os.path.join(tempfile.mkdtemp(), "gdscrawler.checkpoint")
+        self.paths = [f"/analysis_data/SBJ00001/{i:04d}.bam" for i in range(25)]
+
+    def test_crawl_gds_files(self):
+        """
+        python manage.py test data_processors.gds.tests.test_crawler.GDSCrawlerUnitTests.test_crawl_gds_files
+        """
+        files_api = FakeFilesApi(_make_fixture_pages("umccr-temp-data-dev", self.paths, 10))
+        # storage stat row of the volume is there, as of after its first sync
+        StorageStat.objects.create(source=StorageStatSource.GDS, name="umccr-temp-data-dev")
+
+        with CaptureQueriesContext(connection) as ctx:
+            results = crawler.crawl_gds_files(files_api, "umccr-temp-data-dev", page_size=10,
+                                              checkpoint_path=self.checkpoint_path)
+        logger.info(dict(results))
+
+        self.assertEqual(results['crawled_count'], 25)
+        self.assertEqual(results['page_count'], 3)
+        self.assertEqual(files_api.page_tokens, [None, "page-1", "page-2"])
+        self.assertEqual(GDSFile.objects.filter(volume_name="umccr-temp-data-dev").count(), 25)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+        # one bulk upsert per page, and one path token index insert per page
+        insert_gds_file = f"INSERT INTO {connection.ops.quote_name(GDSFile._meta.db_table)}"
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith(insert_gds_file)]), 3)
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith("INSERT")]), 6)
+
+    def test_crawl_gds_files_prefetch(self):
+        """
+        python manage.py test data_processors.gds.tests.test_crawler.GDSCrawlerUnitTests.test_crawl_gds_files_prefetch
+        """
+        files_api = FakeFilesApi(_make_fixture_pages("umccr-temp-data-dev", self.paths, 10))
+        files_api.page_fetched["page-2"] = threading.Event()
+        persisted = []
+
+        def _persist(payload_list):
+            # the last page is fetched while the first page is still being persisted
+            if not persisted:
+                persisted.append(files_api.page_fetched["page-2"].wait(timeout=10))
+            return len(payload_list)
+
+        when(services).persist_gds_file_payload_bulk(...).thenAnswer(_persist)
+
+        results = crawler.crawl_gds_files(files_api, "umccr-temp-data-dev", page_size=10, prefetch=2)
+
+        self.assertEqual(results['crawled_count'], 25)
+        self.assertEqual(persisted, [True])
+
+    def test_crawl_gds_files_resume(self):
+        """
+        python manage.py test data_processors.gds.tests.test_crawler.GDSCrawlerUnitTests.test_crawl_gds_files_resume
+        """
+        pages = _make_fixture_pages("umccr-temp-data-dev", self.paths, 10)
+
+        results = crawler.crawl_gds_files(FakeFilesApi(pages, fail_at="page-2"), "umccr-temp-data-dev", page_size=10,
+                                          checkpoint_path=self.checkpoint_path)
+        logger.info(dict(results))
+
+        self.assertEqual(results['failed_count'], 1)
+        self.assertEqual(results['crawled_count'], 20)
+        self.assertTrue(os.path.exists(self.checkpoint_path))
+
+        files_api = FakeFilesApi(pages)
+        results = crawler.crawl_gds_files(files_api, "umccr-temp-data-dev", page_size=10,
+                                          checkpoint_path=self.checkpoint_path)
+        logger.info(dict(results))
+
+        # resume from the page where it stopped
+        self.assertEqual(files_api.page_tokens, ["page-2"])
+        self.assertEqual(results['resumed_count'], 20)
+        self.assertEqual(results['crawled_count'], 5)
+        self.assertEqual(GDSFile.objects.count(), 25)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+        # checkpoint of another volume is refused
+        crawler._save_checkpoint(self.checkpoint_path, {'volume_name': "other", 'path': "/*", 'page_token': "page-2",
+                                                        'count': 20})
+        with self.assertRaises(ValueError):
+            crawler.crawl_gds_files(files_api, "umccr-temp-data-dev", checkpoint_path=self.checkpoint_path)
+
+    def test_crawl_gds_files_dry(self):
+        """
+        python manage.py test data_processors.gds.tests.test_crawler.GDSCrawlerUnitTests.test_crawl_gds_files_dry
+        """
+        files_api = FakeFilesApi(_make_fixture_pages("umccr-temp-data-dev", self.paths, 10))
+
+        results = crawler.crawl_gds_files(files_api, "umccr-temp-data-dev", page_size=10,
+                                          checkpoint_path=self.checkpoint_path, dry=True)
+
+        self.assertEqual(results['crawled_count'], 25)
+        self.assertEqual(GDSFile.objects.count(), 0)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
@@ -0,0 +1,149 @@
+import time
+from datetime import timedelta
+from unittest import skip
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from libica.app import GDSFilesEventType
+
+from data_portal.models import AnalysisResult
+from data_portal.models.gdsfile import GDSFile
+from data_portal.models.storagestat import StorageStat, StorageStatSource
+from data_processors.const import GDSEventRecord
+from data_processors.gds import services
+from data_processors.gds.tests.case import GDSEventUnitTestCase, logger
+
+
+def _payload(path: str, volume_name: str = "umccr-temp-data-dev", **kwargs) -> dict:
+    payload = {
+        "id": "fil.8036f70c160549m1107500d7cf72d73p",
+        "name": path.split("/")[-1],
+        "volumeId": "vol.912zb524d44b434395b308d77g441333",
+        "volumeName": volume_name,
+        "tenantId": "AAdzLXVzLBBsXXXmb3JtOjEwWDGwNTM3OjBiYTU5YWUxLWZkYWUtNDNiYS1hM2I1LTRkMzY3TTQzOOJkBB",
+        "subTenantId": "wid:f687447b-d13e-4464-a6b8-7167fc75742d",
+        "path": path,
+        "timeCreated": "2020-04-08T02:00:58.026467",
+        "createdBy": "14c99f4f-8934-4af2-9df2-729e1b840f42",
+        "timeModified": "2020-04-01T20:55:35.025Z",
+        "modifiedBy": "14c99f4f-8934-4af2-9df2-729e1b840f42",
+        "urn": f"urn:ilmn:iap:aps2:file:fil.8036f70c160549m1107500d7cf72d73p#{path}",
+        "sizeInBytes": 1000,
+        "isUploaded": True,
+        "archiveStatus": "None",
+        "storageTier": "Standard",
+    }
+    payload.update(kwargs)
+    return payload
+
+
+def _record(event_type: GDSFilesEventType, path: str, event_time=None, **kwargs) -> GDSEventRecord:
+    payload = _payload(path, **kwargs)
+    return GDSEventRecord(event_type, event_time if event_time else now(), payload['volumeName'], payload)
+
+
+class GDSServicesUnitTests(GDSEventUnitTestCase):
+
+    def test_sync_gds_event_records(self):
+        """
+        python manage.py test data_processors.gds.tests.test_services.GDSServicesUnitTests.test_sync_gds_event_records
+        """
+        t0 = now()
+        services.create_or_update_gds_file(_payload("/Runs/to_delete.txt"))
+        services.create_or_update_gds_file(_payload("/Runs/to_update.txt", sizeInBytes=1))
+
+        analysis_result = AnalysisResult.objects.create(key='SBJ00001', gen=0, method=0)
+        analysis_result.gdsfiles.add(GDSFile.objects.get(path="/Runs/to_delete.txt"))
+
+        results = services.sync_gds_event_records([
+            _record(GDSFilesEventType.UPLOADED, "/Runs/new.txt", t0),
+            _record(GDSFilesEventType.UPLOADED, "/Runs/to_update.txt", t0, sizeInBytes=2),
+            _record(GDSFilesEventType.UPLOADED, "/Runs/to_update.txt", t0 + timedelta(seconds=1), sizeInBytes=3),
+            _record(GDSFilesEventType.DELETED, "/Runs/to_delete.txt", t0),
+            _record(GDSFilesEventType.DELETED, "/Runs/non_existent.txt", t0),
+        ])
+
+        self.assertEqual(results['coalesced_count'], 1)
+        self.assertEqual(results['created_or_updated_count'], 2)
+        self.assertEqual(results['removed_count'], 1)
+        self.assertEqual(GDSFile.objects.count(), 2)
+        self.assertEqual(GDSFile.objects.get(path="/Runs/to_update.txt").size_in_bytes, 3)
+        self.assertEqual(AnalysisResult.objects.get(key='SBJ00001').gdsfiles.count(), 0)
+
+    def test_sync_gds_event_records_retain_time_archived(self):
+        """
+        python manage.py test data_processors.gds.tests.test_services.GDSServicesUnitTests.test_sync_gds_event_records_retain_time_archived
+        """
+        services.sync_gds_event_records([
+            _record(GDSFilesEventType.ARCHIVED, "/Runs/a.txt", timeArchived="2021-04-01T20:55:35.025Z"),
+        ])
+        services.sync_gds_event_records([
+            _record(GDSFilesEventType.UNARCHIVED, "/Runs/a.txt", archiveStatus="Unarchived"),
+        ])
+
+        gds_file = GDSFile.objects.get(path="/Runs/a.txt")
+        self.assertEqual(gds_file.archive_status, "Unarchived")
+        self.assertIsNotNone(gds_file.time_archived)
+
+    def test_sync_gds_event_records_query_count(self):
+        """
+        python manage.py test data_processors.gds.tests.test_services.GDSServicesUnitTests.test_sync_gds_event_records_query_count
+        """
+        # storage stat row of the volume is there, as of after its first sync
+        StorageStat.objects.create(source=StorageStatSource.GDS, name="umccr-temp-data-dev")
+
+        with CaptureQueriesContext(connection) as few:
+            services.sync_gds_event_records([_record(GDSFilesEventType.UPLOADED, f"/Runs/{i}.txt") for i in range(2)])
+
+        # stay within a single insert batch, i.e. sqlite caps the number of query parameters
+        with CaptureQueriesContext(connection) as many:
+            services.sync_gds_event_records([_record(GDSFilesEventType.UPLOADED, f"/Runs/{i}.txt") for i in range(40)])
+
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(GDSFile.objects.count(), 40)
+
+
+@skip
+class GDSServicesBenchmarkTests(GDSEventUnitTestCase):
+    # benchmark is manual run, comment @skip and run against the database backend of interest i.e.
+    #   export DJANGO_SETTINGS_MODULE=data_portal.settings.local   (MySQL, see docker-compose.yml)
+    #   export DJANGO_SETTINGS_MODULE=data_portal.settings.it PORTAL_DB_URL=sqlite:////tmp/portal.sqlite3
+    # and keep decorated @skip after run
+
+    def test_benchmark_sync_gds_event_records(self):
+        """
+        python manage.py test data_processors.gds.tests.test_services.GDSServicesBenchmarkTests.test_benchmark_sync_gds_event_records
+        """
+        size = 10000
+        records = [_record(GDSFilesEventType.UPLOADED, f"/Runs/benchmark/{i}.txt") for i in range(size)]
+
+        # count through execute wrapper, CaptureQueriesContext is capped at 9000 queries
+        per_record, bulk, bulk_update = [], [], []
+
+        with connection.execute_wrapper(lambda execute, sql, *args: per_record.append(sql) or execute(sql, *args)):
+            start = time.perf_counter()
+            for record in records:
+                services.create_or_update_gds_file(record.gds_object_meta)
+            per_record_elapsed = time.perf_counter() - start
+
+        GDSFile.objects.all().delete()
+
+        with connection.execute_wrapper(lambda execute, sql, *args: bulk.append(sql) or execute(sql, *args)):
+            start = time.perf_counter()
+            services.sync_gds_event_records(records)
+            bulk_elapsed = time.perf_counter() - start
+
+        # redelivery of the same files, i.e. conflict update path of the upsert, ON DUPLICATE KEY UPDATE on MySQL
+        with connection.execute_wrapper(lambda execute, sql, *args: bulk_update.append(sql) or execute(sql, *args)):
+            start = time.perf_counter()
+            services.sync_gds_event_records(records)
+            bulk_update_elapsed = time.perf_counter() - start
+
+        logger.info(f"{connection.vendor}: {size} records")
+        logger.info(f"per record:    {len(per_record)} queries, {per_record_elapsed:.2f}s")
+        logger.info(f"bulk insert:   {len(bulk)} queries, {bulk_elapsed:.2f}s")
+        logger.info(f"bulk update:   {len(bulk_update)} queries, {bulk_update_elapsed:.2f}s")
+
+        self.assertEqual(GDSFile.objects.count(), size)
+        self.assertLess(len(bulk), len(per_record))
@@ -7,6 +7,7 @@ from django.db import transaction
 from libumccr import libgdrive, libjson
 from libumccr.aws import libssm
 
+from data_portal.models.cacheversion import CacheVersion, model_cache_key
 from data_portal.models.labmetadata import LabMetadata
 from data_processors import const
 
@@ -30,6 +31,7 @@ def truncate_labmetadata():
     tbl_name = LabMetadata.get_table_name()
     try:
         LabMetadata.truncate()
+        CacheVersion.objects.bump([model_cache_key(LabMetadata)])
         logger.info(f"Truncating '{tbl_name}' table succeeded")
         return True
     except Exception as e:
@@ -101,6 +103,8 @@ def persist_labmetadata(df: pd.DataFrame):
                 rows_invalid.append(record)
             continue
 
+    CacheVersion.objects.bump([model_cache_key(LabMetadata)])
+
     return {
         'labmetadata_row_update_count': len(rows_updated),
         'labmetadata_row_new_count': len(rows_created),
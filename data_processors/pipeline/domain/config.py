@@ -8,6 +8,13 @@ Or consider Helper class-ing where composite builder is needed.
 
 ICA_WORKFLOW_PREFIX = "/iap/workflow"
 
+# seconds to cache SSM parameter in warm lambda container, if other than paramcache.DEFAULT_TTL
+# ops toggle are short-lived, so that they take effect within a minute
+SSM_PARAM_TTL = {
+    f"{ICA_WORKFLOW_PREFIX}/step_skip_list": 60,
+    f"{ICA_WORKFLOW_PREFIX}/emergency_stop_list": 60,
+}
+
 SQS_NOTIFICATION_QUEUE_ARN = "/data_portal/backend/sqs_notification_queue_arn"
 
 SQS_TN_QUEUE_ARN = "/data_portal/backend/sqs_tumor_normal_queue_arn"
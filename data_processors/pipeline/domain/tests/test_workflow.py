@@ -1,6 +1,5 @@
 import json
 
-from libumccr.aws import libssm
 from mockito import when, spy2
 
 from data_portal.models.workflow import Workflow
@@ -10,6 +9,7 @@ from data_processors.pipeline.domain.config import ICA_WORKFLOW_PREFIX
 from data_processors.pipeline.domain.workflow import WorkflowRule, WorkflowType, SecondaryAnalysisHelper, \
     PrimaryDataHelper, SequenceRule, SequenceRuleError, WorkflowHelper
 from data_processors.pipeline.tests.case import logger, PipelineUnitTestCase
+from data_processors.pipeline.tools import paramcache
 
 
 class WorkflowDomainUnitTests(PipelineUnitTestCase):
@@ -72,8 +72,8 @@ class WorkflowDomainUnitTests(PipelineUnitTestCase):
         """
         python manage.py test data_processors.pipeline.domain.tests.test_workflow.WorkflowDomainUnitTests.test_secondary_analysis_helper_param_not_found
         """
-        spy2(libssm.get_ssm_param)
-        (when(libssm).get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/{WorkflowType.DRAGEN_WTS_QC.value}/id")
+        spy2(paramcache.get_ssm_param)
+        (when(paramcache).get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/{WorkflowType.DRAGEN_WTS_QC.value}/id")
          .thenRaise(Exception("An error occurred (ParameterNotFound) when calling the GetParameter operation")))
 
         with self.assertRaises(Exception) as cm:
@@ -125,7 +125,7 @@ class SequenceDomainRuleUnitTests(PipelineUnitTestCase):
         """
         mock_sequence = SequenceFactory()
 
-        when(libssm).get_ssm_param(...).thenReturn(json.dumps([TestConstant.instrument_run_id.value]))
+        when(paramcache).get_ssm_param(...).thenReturn(json.dumps([TestConstant.instrument_run_id.value]))
 
         try:
             sr = SequenceRule(mock_sequence).must_not_emergency_stop()
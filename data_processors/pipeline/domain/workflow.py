@@ -12,10 +12,10 @@ from enum import Enum
 from pathlib import Path
 
 from libumccr import libjson
-from libumccr.aws import libssm
 
 from data_portal.fields import IdHelper
 from data_processors.pipeline.domain.config import ICA_WORKFLOW_PREFIX
+from data_processors.pipeline.tools import paramcache
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -105,11 +105,18 @@ class IcaWorkflowHelper(WorkflowHelper):
 
     def __init__(self, type_: WorkflowType):
         super().__init__(type_)
-        self.workdir_root = libssm.get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/workdir_root")
-        self.output_root = libssm.get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/output_root")
-        self.workflow_id = libssm.get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/{self.type.value}/id")
-        self.workflow_version = libssm.get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/{self.type.value}/version")
-        input_template = libssm.get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/{self.type.value}/input")
+        workdir_root_param = f"{ICA_WORKFLOW_PREFIX}/workdir_root"
+        output_root_param = f"{ICA_WORKFLOW_PREFIX}/output_root"
+        id_param = f"{ICA_WORKFLOW_PREFIX}/{self.type.value}/id"
+        version_param = f"{ICA_WORKFLOW_PREFIX}/{self.type.value}/version"
+        input_param = f"{ICA_WORKFLOW_PREFIX}/{self.type.value}/input"
+        paramcache.prefetch([workdir_root_param, output_root_param, id_param, version_param, input_param])
+
+        self.workdir_root = paramcache.get_ssm_param(workdir_root_param)
+        self.output_root = paramcache.get_ssm_param(output_root_param)
+        self.workflow_id = paramcache.get_ssm_param(id_param)
+        self.workflow_version = paramcache.get_ssm_param(version_param)
+        input_template = paramcache.get_ssm_param(input_param)
         self.workflow_input = copy.deepcopy(libjson.loads(input_template))
 
     @staticmethod
@@ -301,7 +308,7 @@ class SequenceRule:
               --profile dev
         """
         try:
-            emergency_stop_list_json = libssm.get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/emergency_stop_list")
+            emergency_stop_list_json = paramcache.get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/emergency_stop_list")
             emergency_stop_list = libjson.loads(emergency_stop_list_json)
         except Exception as e:
             # If any exception found, log warning and proceed
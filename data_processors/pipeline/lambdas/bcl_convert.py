@@ -12,9 +12,8 @@ django.setup()
 # ---
 
 import logging
-from typing import List
+from typing import List, TYPE_CHECKING
 
-import pandas as pd
 from data_portal.models.workflow import Workflow
 from data_portal.models.labmetadata import LabMetadata
 from data_processors.pipeline.services import notification_srv, sequencerun_srv, workflow_srv, metadata_srv, \
@@ -24,6 +23,9 @@ from data_processors.pipeline.lambdas import wes_handler
 from data_processors.pipeline.tools import liborca
 from libumccr import libjson, libdt
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
@@ -237,8 +239,9 @@ def get_settings_by_instrument_type_assay(instrument, sample_type, assay):
     return settings
 
 
-def get_metadata_df(gds_volume: str, samplesheet_path: str) -> pd.DataFrame:
+def get_metadata_df(gds_volume: str, samplesheet_path: str) -> 'pd.DataFrame':
     """Get libraries and metadata associated with this run/SampleSheet"""
+    import pandas as pd
 
     sample_names: List[str] = liborca.get_sample_names_from_samplesheet(
         gds_volume=gds_volume,
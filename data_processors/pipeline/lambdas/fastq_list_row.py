@@ -13,7 +13,6 @@ django.setup()
 
 import logging
 from typing import List
-import pandas as pd
 
 from libumccr import libjson, libregex
 from libica.app import gds
@@ -62,6 +61,7 @@ def handler(event, context) -> List[dict]:
     :param context:
     :return: fastq container
     """
+    import pandas as pd  # lazy import, fastq_list_row module is also imported by orchestrator
 
     logger.info(f"Start processing fastq list rows event")
     logger.info(libjson.dumps(event))
@@ -13,27 +13,21 @@ django.setup()
 
 import logging
 from data_processors.pipeline.services import gds_srv
-from libica.app import configuration
-from libica.openapi import libgds
 from libumccr import libjson
 
+from data_portal import presign
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-def get_presigned_url(file_id: str):
+def get_presigned_url(file_id: str, volume_name: str = None, path_: str = None, version=None):
     logger.debug(f"Retrieving pre-signed URL for file: {file_id}")
-    with libgds.ApiClient(configuration(libgds)) as api_client:
-        file_api = libgds.FilesApi(api_client)
-    try:
-        file_details: libgds.FileListResponse = file_api.get_file(file_id=file_id)
-    except libgds.ApiException as e:
-        logger.info("Exception when calling FilesApi: %s\n" % e)
-
-    logger.info("FILE DETAILS")
-    logger.info(file_details)
-
-    return file_details.presigned_url
+    signed, response = presign.presign_gds_file(file_id, volume_name, path_, version=version)
+    if not signed:
+        logger.info(response)
+        return None
+    return response
 
 
 def handler(event, context):
@@ -83,10 +77,10 @@ def handler(event, context):
 
     results = {'volume': gds_volume_name, 'files': []}
     for record in query_set:
-        results['files'].append({'path': record.path, 'id': record.file_id})
-
-    if presigned:
-        for file in results['files']:
-            file['presigned_url'] = get_presigned_url(file_id=file['id'])
+        file = {'path': record.path, 'id': record.file_id}
+        if presigned:
+            file['presigned_url'] = get_presigned_url(file_id=record.file_id, volume_name=record.volume_name,
+                                                      path_=record.path, version=record.time_modified)
+        results['files'].append(file)
 
     return results
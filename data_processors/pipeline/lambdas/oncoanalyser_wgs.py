@@ -13,13 +13,13 @@ django.setup()
 import logging
 import json
 from libumccr import libjson, libdt, aws
-from libumccr.aws import libssm
 from libumccr.aws.liblambda import LambdaInvocationType
 
 from data_portal.models import Workflow
 from data_processors.pipeline.domain.config import ONCOANALYSER_WGS_LAMBDA_ARN
 from data_processors.pipeline.domain.workflow import ExternalWorkflowHelper, WorkflowType
 from data_processors.pipeline.services import workflow_srv, libraryrun_srv
+from data_processors.pipeline.tools import paramcache
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -134,7 +134,7 @@ def handler(event, context) -> dict:
     # (i.e. once instead of every invocation). However, that will prevent mockito from intercepting and complicate
     # testing. We compromise the little execution overhead for ease of testing.
     lambda_client = aws.lambda_client()
-    submission_lambda = libssm.get_ssm_param(ONCOANALYSER_WGS_LAMBDA_ARN)
+    submission_lambda = paramcache.get_ssm_param(ONCOANALYSER_WGS_LAMBDA_ARN)
     logger.info(f"Using oncoanalyser (wgs) submission lambda: {submission_lambda}")
     lambda_response = lambda_client.invoke(
         FunctionName=submission_lambda,
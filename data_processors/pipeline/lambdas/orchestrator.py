@@ -33,8 +33,8 @@ from data_processors.pipeline.orchestration import dragen_wgs_qc_step, tumor_nor
     star_alignment_step, oncoanalyser_wts_step, oncoanalyser_wgs_step, oncoanalyser_wgts_existing_both_step, sash_step
 from data_processors.pipeline.domain.workflow import WorkflowType, WorkflowStatus, WorkflowRule
 from data_processors.pipeline.lambdas import workflow_update
+from data_processors.pipeline.tools import paramcache
 from libumccr import libjson
-from libumccr.aws import libssm
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -104,7 +104,7 @@ def init_skip(event):
         skip['by_run'] = dict()
 
     try:
-        ssm_skip_json = libssm.get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/step_skip_list")
+        ssm_skip_json = paramcache.get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/step_skip_list")
         ssm_skip = libjson.loads(ssm_skip_json)
     except Exception as e:
         # If any exception found, log warning and proceed
@@ -18,6 +18,7 @@ from data_portal.models.workflow import Workflow
 from data_processors.pipeline.services import workflow_srv, libraryrun_srv
 from data_processors.pipeline.domain.workflow import WorkflowType, SecondaryAnalysisHelper, WorkflowStatus
 from data_processors.pipeline.lambdas import wes_handler
+from data_processors.pipeline.tools import paramcache
 
 from libumccr import libjson, libdt
 
@@ -234,7 +235,7 @@ def by_umccrise_handler(event, context) -> dict:
     """
     from data_processors.pipeline.domain.config import SQS_RNASUM_QUEUE_ARN
     from data_processors.pipeline.orchestration import rnasum_step
-    from libumccr.aws import libsqs, libssm
+    from libumccr.aws import libsqs
 
     wfr_id = event['wfr_id']
     wfv_id = event.get('wfv_id', None)
@@ -255,7 +256,7 @@ def by_umccrise_handler(event, context) -> dict:
             job['dataset'] = dataset  # override dataset
 
         # now dispatch to rnasum job queue
-        _ = libsqs.dispatch_jobs(queue_arn=libssm.get_ssm_param(SQS_RNASUM_QUEUE_ARN), job_list=job_list)
+        _ = libsqs.dispatch_jobs(queue_arn=paramcache.get_ssm_param(SQS_RNASUM_QUEUE_ARN), job_list=job_list)
         msg = "Succeeded"
 
     else:
@@ -1,7 +1,6 @@
 import json
 
 from libumccr import aws
-from libumccr.aws import libssm
 from mockito import spy2, when, mock
 
 from data_portal.models import LabMetadata, LibraryRun, Workflow
@@ -11,6 +10,7 @@ from data_processors.pipeline.domain.config import ONCOANALYSER_WGTS_LAMBDA_ARN
 from data_processors.pipeline.lambdas import oncoanalyser_wgts_existing_both
 from data_processors.pipeline.services import workflow_srv
 from data_processors.pipeline.tests.case import PipelineUnitTestCase, logger
+from data_processors.pipeline.tools import paramcache
 
 
 class OncoanalyserWgtsExistingBothUnitTests(PipelineUnitTestCase):
@@ -28,8 +28,8 @@ class OncoanalyserWgtsExistingBothUnitTests(PipelineUnitTestCase):
         mock_lbr_wgs_tumor: LibraryRun = TumorLibraryRunFactory()
         mock_lbr_wts_tumor: LibraryRun = WtsTumorLibraryRunFactory()
 
-        spy2(libssm.get_ssm_param)
-        when(libssm).get_ssm_param(ONCOANALYSER_WGTS_LAMBDA_ARN).thenReturn('FOO')
+        spy2(paramcache.get_ssm_param)
+        when(paramcache).get_ssm_param(ONCOANALYSER_WGTS_LAMBDA_ARN).thenReturn('FOO')
         mock_client = mock(aws.lambda_client())
         mock_client.invoke = mock()
         when(aws).lambda_client(...).thenReturn(mock_client)
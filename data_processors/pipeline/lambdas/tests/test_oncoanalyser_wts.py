@@ -1,7 +1,6 @@
 import json
 
 from libumccr import aws
-from libumccr.aws import libssm
 from mockito import spy2, when, mock
 
 from data_portal.models import LabMetadata, LibraryRun, Workflow
@@ -10,6 +9,7 @@ from data_processors.pipeline.domain.config import ONCOANALYSER_WTS_LAMBDA_ARN
 from data_processors.pipeline.lambdas import oncoanalyser_wts
 from data_processors.pipeline.services import workflow_srv
 from data_processors.pipeline.tests.case import PipelineUnitTestCase, logger
+from data_processors.pipeline.tools import paramcache
 
 
 class OncoanalyserWtsUnitTests(PipelineUnitTestCase):
@@ -22,8 +22,8 @@ class OncoanalyserWtsUnitTests(PipelineUnitTestCase):
         mock_meta_wts_tumor: LabMetadata = WtsTumorLabMetadataFactory()
         mock_lbr_wts_tumor: LibraryRun = WtsTumorLibraryRunFactory()
 
-        spy2(libssm.get_ssm_param)
-        when(libssm).get_ssm_param(ONCOANALYSER_WTS_LAMBDA_ARN).thenReturn('FOO')
+        spy2(paramcache.get_ssm_param)
+        when(paramcache).get_ssm_param(ONCOANALYSER_WTS_LAMBDA_ARN).thenReturn('FOO')
         mock_client = mock(aws.lambda_client())
         mock_client.invoke = mock()
         when(aws).lambda_client(...).thenReturn(mock_client)
@@ -1,6 +1,5 @@
 import json
 
-from libumccr.aws import libssm
 from mockito import spy2, when
 
 from data_portal.models.libraryrun import LibraryRun
@@ -12,6 +11,7 @@ from data_processors.pipeline.lambdas import rnasum
 from data_processors.pipeline.orchestration.tests import test_rnasum_step
 from data_processors.pipeline.services import workflow_srv
 from data_processors.pipeline.tests.case import logger, PipelineUnitTestCase
+from data_processors.pipeline.tools import paramcache
 
 
 class RNAsumLambdaUnitTests(PipelineUnitTestCase):
@@ -85,8 +85,8 @@ class RNAsumLambdaUnitTests(PipelineUnitTestCase):
         )
 
         # let spy and mock the input template
-        spy2(libssm.get_ssm_param)
-        when(libssm).get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/{WorkflowType.RNASUM.value}/input").thenReturn(input_tpl)
+        spy2(paramcache.get_ssm_param)
+        when(paramcache).get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/{WorkflowType.RNASUM.value}/input").thenReturn(input_tpl)
 
         result: dict = rnasum.handler(
             {
@@ -139,8 +139,8 @@ class RNAsumLambdaUnitTests(PipelineUnitTestCase):
         )
 
         # let spy and mock the input template
-        spy2(libssm.get_ssm_param)
-        when(libssm).get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/{WorkflowType.RNASUM.value}/input").thenReturn(input_tpl)
+        spy2(paramcache.get_ssm_param)
+        when(paramcache).get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/{WorkflowType.RNASUM.value}/input").thenReturn(input_tpl)
 
         result: dict = rnasum.handler(
             {
@@ -1,7 +1,6 @@
 import json
 
 from libumccr import aws
-from libumccr.aws import libssm
 from mockito import spy2, when, mock
 
 from data_portal.models import Workflow, LibraryRun
@@ -10,6 +9,7 @@ from data_processors.pipeline.domain.config import SASH_LAMBDA_ARN
 from data_processors.pipeline.lambdas import sash
 from data_processors.pipeline.services import workflow_srv
 from data_processors.pipeline.tests.case import PipelineUnitTestCase, logger
+from data_processors.pipeline.tools import paramcache
 
 
 class SashUnitTests(PipelineUnitTestCase):
@@ -21,8 +21,8 @@ class SashUnitTests(PipelineUnitTestCase):
         mock_lbr_tumor: LibraryRun = TumorLibraryRunFactory()
         mock_lbr_normal: LibraryRun = LibraryRunFactory()
 
-        spy2(libssm.get_ssm_param)
-        when(libssm).get_ssm_param(SASH_LAMBDA_ARN).thenReturn('FOO')
+        spy2(paramcache.get_ssm_param)
+        when(paramcache).get_ssm_param(SASH_LAMBDA_ARN).thenReturn('FOO')
         mock_client = mock(aws.lambda_client())
         mock_client.invoke = mock()
         when(aws).lambda_client(...).thenReturn(mock_client)
@@ -4,7 +4,6 @@ from datetime import datetime
 from django.utils.timezone import make_aware
 from libica.openapi import libwes
 from libumccr import libslack, libjson
-from libumccr.aws import libssm
 from mockito import when, verify
 
 from data_portal.models.batchrun import BatchRun
@@ -19,6 +18,7 @@ from data_processors.pipeline.services import libraryrun_srv
 from data_processors.pipeline.tests import _rand, _uuid
 from data_processors.pipeline.tests.case import logger, PipelineUnitTestCase
 from data_processors.pipeline.tools import liborca
+from data_processors.pipeline.tools import paramcache
 
 
 def _mock_bcl_convert_output():
@@ -354,7 +354,7 @@ class SQSIAPEventUnitTests(PipelineUnitTestCase):
         python manage.py test data_processors.pipeline.lambdas.tests.test_sqs_iap_event.SQSIAPEventUnitTests.test_sequence_run_event_emergency_stop
         """
         when(libraryrun_srv).create_library_run_from_sequence(...).thenReturn(list())  # skip LibraryRun creation
-        when(libssm).get_ssm_param(...).thenReturn(libjson.dumps([TestConstant.instrument_run_id.value]))
+        when(paramcache).get_ssm_param(...).thenReturn(libjson.dumps([TestConstant.instrument_run_id.value]))
 
         _ = sqs_iap_event.handler(_sqs_bssh_event_message(), None)
 
@@ -2,7 +2,6 @@ import json
 
 import boto3
 from libumccr import aws
-from libumccr.aws import libssm
 from mockito import when, spy2, mock
 
 from data_portal.models.workflow import Workflow
@@ -13,6 +12,7 @@ from data_processors.pipeline.domain.config import STAR_ALIGNMENT_LAMBDA_ARN, IC
 from data_processors.pipeline.lambdas import star_alignment
 from data_processors.pipeline.services import workflow_srv
 from data_processors.pipeline.tests.case import logger, PipelineUnitTestCase
+from data_processors.pipeline.tools import paramcache
 
 
 class StarAlignmentUnitTests(PipelineUnitTestCase):
@@ -43,8 +43,8 @@ class StarAlignmentUnitTests(PipelineUnitTestCase):
         _ = WtsTumorLabMetadataFactory()
         _ = WtsTumorLibraryRunFactory()
 
-        spy2(libssm.get_ssm_param)
-        when(libssm).get_ssm_param(STAR_ALIGNMENT_LAMBDA_ARN).thenReturn('FOO')
+        spy2(paramcache.get_ssm_param)
+        when(paramcache).get_ssm_param(STAR_ALIGNMENT_LAMBDA_ARN).thenReturn('FOO')
         mock_client = mock(aws.lambda_client())
         mock_client.invoke = mock()
         when(aws).lambda_client(...).thenReturn(mock_client)
@@ -19,8 +19,9 @@ from data_processors.pipeline.lambdas import wes_handler
 from data_processors.pipeline.domain.config import SQS_NOTIFICATION_QUEUE_ARN
 from data_processors.pipeline.domain.workflow import WorkflowType
 from data_processors.pipeline.domain.event.wrsc import WorkflowRunStateChangeEnvelope, WorkflowRunStateChange
+from data_processors.pipeline.tools import paramcache
 from libumccr import libjson
-from libumccr.aws import libssm, libsqs
+from libumccr.aws import libsqs
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -102,7 +103,7 @@ def handler(event, context):
             logger.info(f"{updated_workflow.type_name} '{updated_workflow.wfr_id}' workflow status "
                         f"'{updated_workflow.end_status}' is already notified once. Not reporting to Slack!")
         else:
-            queue_arn = libssm.get_ssm_param(SQS_NOTIFICATION_QUEUE_ARN)
+            queue_arn = paramcache.get_ssm_param(SQS_NOTIFICATION_QUEUE_ARN)
             message = {
                 'batch_run_id': updated_workflow.batch_run.id,
                 'workflow_id': updated_workflow.id,
@@ -21,20 +21,23 @@ difference and, guidelines here are:
  - if function is public modifier by nature and, its parameters can be deduced to primitive types then go to liborca
  - if it is internal behaviours that make sense only within step modules then they are here!
 """
-from typing import List
-
-import pandas as pd
+from typing import List, TYPE_CHECKING
 
 from data_portal.models.fastqlistrow import FastqListRow
 from data_portal.models.labmetadata import LabMetadata, LabMetadataPhenotype, LabMetadataType
 from data_processors.pipeline.tools import liborca
 import logging
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
-def _reduce_and_transform_to_df(meta_list: List[LabMetadata]) -> pd.DataFrame:
+def _reduce_and_transform_to_df(meta_list: List[LabMetadata]) -> 'pd.DataFrame':
+    import pandas as pd
+
     # also reduce to columns of interest
     return pd.DataFrame(
         [
@@ -50,21 +53,21 @@ def _reduce_and_transform_to_df(meta_list: List[LabMetadata]) -> pd.DataFrame:
     )
 
 
-def _extract_unique_meta(meta_list_df: pd.DataFrame, column_prop: str) -> List[str]:
+def _extract_unique_meta(meta_list_df: 'pd.DataFrame', column_prop: str) -> List[str]:
     if meta_list_df.empty:
         return []
     return meta_list_df[column_prop].unique().tolist()
 
 
-def _extract_unique_subjects(meta_list_df: pd.DataFrame) -> List[str]:
+def _extract_unique_subjects(meta_list_df: 'pd.DataFrame') -> List[str]:
     return _extract_unique_meta(meta_list_df, "subject_id")
 
 
-def _extract_unique_libraries(meta_list_df: pd.DataFrame) -> List[str]:
+def _extract_unique_libraries(meta_list_df: 'pd.DataFrame') -> List[str]:
     return _extract_unique_meta(meta_list_df, "library_id")
 
 
-def _extract_unique_wgs_tumor_samples(meta_list_df: pd.DataFrame) -> List[str]:
+def _extract_unique_wgs_tumor_samples(meta_list_df: 'pd.DataFrame') -> List[str]:
     _df = meta_list_df.copy().loc[
         (meta_list_df['type'] == LabMetadataType.WGS.value) &
         (meta_list_df['phenotype'] == LabMetadataPhenotype.TUMOR.value)
@@ -10,9 +10,8 @@ import re
 from pathlib import Path
 from typing import List
 
-import pandas as pd
 from libumccr import libjson
-from libumccr.aws import libssm, libsqs
+from libumccr.aws import libsqs
 
 from data_portal.models.labmetadata import LabMetadata
 from data_portal.models.workflow import Workflow
@@ -20,7 +19,7 @@ from data_processors.pipeline.domain.batch import Batcher, BatchRule, BatchRuleE
 from data_processors.pipeline.domain.config import SQS_DRAGEN_TSO_CTDNA_QUEUE_ARN
 from data_processors.pipeline.domain.workflow import WorkflowType, LabMetadataRule, LabMetadataRuleError
 from data_processors.pipeline.services import batch_srv, fastq_srv, metadata_srv, libraryrun_srv
-from data_processors.pipeline.tools import liborca
+from data_processors.pipeline.tools import liborca, paramcache
 
 # GLOBALS
 SAMPLESHEET_ASSAY_TYPE_REGEX = r"^(?:SampleSheet\.)(\S+)(?:\.csv)$"
@@ -46,7 +45,7 @@ def perform(this_workflow: Workflow):
     job_list = prepare_dragen_tso_ctdna_jobs(batcher)
     if job_list:
         libsqs.dispatch_jobs(
-            queue_arn=libssm.get_ssm_param(SQS_DRAGEN_TSO_CTDNA_QUEUE_ARN),
+            queue_arn=paramcache.get_ssm_param(SQS_DRAGEN_TSO_CTDNA_QUEUE_ARN),
             job_list=job_list
         )
     else:
@@ -74,6 +73,8 @@ def prepare_dragen_tso_ctdna_jobs(batcher: Batcher) -> List[dict]:
     :param batcher:
     :return:
     """
+    import pandas as pd
+
     job_list = []
     fastq_list_rows: List[dict] = libjson.loads(batcher.batch.context_data)
 
@@ -16,9 +16,8 @@ See orchestration package __init__.py doc string.
 import logging
 from typing import List
 
-import pandas as pd
 from libumccr import libjson
-from libumccr.aws import libssm, libsqs
+from libumccr.aws import libsqs
 
 from data_portal.models.labmetadata import LabMetadata
 from data_portal.models.workflow import Workflow
@@ -26,7 +25,7 @@ from data_processors.pipeline.domain.batch import Batcher, BatchRule, BatchRuleE
 from data_processors.pipeline.domain.config import SQS_DRAGEN_WGS_QC_QUEUE_ARN
 from data_processors.pipeline.domain.workflow import WorkflowType, LabMetadataRule, LabMetadataRuleError
 from data_processors.pipeline.services import batch_srv, fastq_srv, metadata_srv, libraryrun_srv
-from data_processors.pipeline.tools import liborca
+from data_processors.pipeline.tools import liborca, paramcache
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -51,7 +50,7 @@ def perform(this_workflow: Workflow):
     if job_list:
         libsqs.dispatch_jobs(
             # Used for both WGS and WTS
-            queue_arn=libssm.get_ssm_param(SQS_DRAGEN_WGS_QC_QUEUE_ARN),
+            queue_arn=paramcache.get_ssm_param(SQS_DRAGEN_WGS_QC_QUEUE_ARN),
             job_list=job_list
         )
     else:
@@ -67,6 +66,8 @@ def prepare_dragen_wgs_qc_jobs(batcher: Batcher) -> List[dict]:
     :param batcher:
     :return:
     """
+    import pandas as pd
+
     job_list = []
     fastq_list_rows: List[dict] = libjson.loads(batcher.batch.context_data)
 
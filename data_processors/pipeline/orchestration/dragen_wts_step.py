@@ -7,8 +7,7 @@ See orchestration package __init__.py doc string.
 import logging
 from typing import List, Dict
 
-import pandas as pd
-from libumccr.aws import libssm, libsqs
+from libumccr.aws import libsqs
 
 from data_portal.models.fastqlistrow import FastqListRow
 from data_portal.models.labmetadata import LabMetadata
@@ -17,6 +16,7 @@ from data_processors.pipeline.domain.config import SQS_DRAGEN_WTS_QUEUE_ARN
 from data_processors.pipeline.domain.workflow import WorkflowType
 from data_processors.pipeline.orchestration import _reduce_and_transform_to_df, _extract_unique_subjects, _handle_rerun
 from data_processors.pipeline.services import workflow_srv, metadata_srv, fastq_srv
+from data_processors.pipeline.tools import paramcache
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -54,7 +54,7 @@ def perform(this_workflow: Workflow):
 
         if job_list:
             logger.info(f"Submitting {len(job_list)} WTS jobs for {subjects}")
-            queue_arn = libssm.get_ssm_param(SQS_DRAGEN_WTS_QUEUE_ARN)
+            queue_arn = paramcache.get_ssm_param(SQS_DRAGEN_WTS_QUEUE_ARN)
             libsqs.dispatch_jobs(queue_arn=queue_arn, job_list=job_list)
         else:
             logger.warning(f"Calling to prepare_tumor_normal_jobs() return empty list, no job to dispatch...")
@@ -111,6 +111,8 @@ def prepare_dragen_wts_jobs(meta_list: List[LabMetadata]) -> (List, List):
 
 
 def create_wts_job(fastq_list_rows: List[FastqListRow], subject_id: str, library_id: str) -> Dict:
+    import pandas as pd
+
     # Get fastq list rows into dict format
     fqlr = pd.DataFrame([fq_list_row.to_dict() for fq_list_row in fastq_list_rows]).to_dict(orient="records")
 
@@ -7,7 +7,7 @@ See orchestration package __init__.py doc string.
 from typing import List, Set
 
 from django.db.models import QuerySet
-from libumccr import libgdrive, libregex
+from libumccr import libregex
 from libumccr.aws import libssm
 
 from data_portal.models.labmetadata import LabMetadata
@@ -142,6 +142,8 @@ def convert_limsrow_to_tuple(limsrow: LIMSRow) -> tuple:
 
 
 def update_google_lims_sheet(lims_rows: List[LIMSRow]):
+    from libumccr import libgdrive
+
     lims_sheet_id = libssm.get_secret(const.LIMS_SHEET_ID)
     account_info = libssm.get_secret(const.GDRIVE_SERVICE_ACCOUNT)
 
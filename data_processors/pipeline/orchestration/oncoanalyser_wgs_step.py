@@ -8,13 +8,13 @@ import json
 import logging
 from typing import List
 
-from libumccr.aws import libssm, libsqs
+from libumccr.aws import libsqs
 
 from data_portal.models import Workflow, LabMetadata
 from data_processors.pipeline.domain.config import SQS_ONCOANALYSER_WGS_QUEUE_ARN
 from data_processors.pipeline.domain.workflow import WorkflowType
 from data_processors.pipeline.services import workflow_srv
-from data_processors.pipeline.tools import liborca
+from data_processors.pipeline.tools import liborca, paramcache
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -44,7 +44,7 @@ def perform(this_workflow: Workflow):
     logger.info(f"Submitting {WorkflowType.ONCOANALYSER_WGS.value} job induced by "
                 f"workflow ({this_workflow.type_name}, {this_workflow.portal_run_id})")
 
-    queue_arn = libssm.get_ssm_param(SQS_ONCOANALYSER_WGS_QUEUE_ARN)
+    queue_arn = paramcache.get_ssm_param(SQS_ONCOANALYSER_WGS_QUEUE_ARN)
     libsqs.dispatch_jobs(queue_arn=queue_arn, job_list=[job])
 
     return job
@@ -9,12 +9,13 @@ import logging
 from typing import Optional
 from urllib.parse import urlparse
 
-from libumccr.aws import libssm, libsqs
+from libumccr.aws import libsqs
 
 from data_portal.models import Workflow
 from data_processors.pipeline.domain.config import SQS_ONCOANALYSER_WGTS_QUEUE_ARN
 from data_processors.pipeline.domain.workflow import WorkflowType
 from data_processors.pipeline.services import workflow_srv, s3object_srv
+from data_processors.pipeline.tools import paramcache
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -42,7 +43,7 @@ def perform(this_workflow: Workflow):
     logger.info(f"Submitting {WorkflowType.ONCOANALYSER_WGTS_EXISTING_BOTH.value} job induced by "
                 f"workflow ({this_workflow.type_name}, {this_workflow.portal_run_id})")
 
-    queue_arn = libssm.get_ssm_param(SQS_ONCOANALYSER_WGTS_QUEUE_ARN)
+    queue_arn = paramcache.get_ssm_param(SQS_ONCOANALYSER_WGTS_QUEUE_ARN)
     libsqs.dispatch_jobs(queue_arn=queue_arn, job_list=[job])
 
     return job
@@ -7,7 +7,7 @@ See orchestration package __init__.py doc string.
 import logging
 from typing import List, Dict
 
-from libumccr.aws import libssm, libsqs
+from libumccr.aws import libsqs
 
 from data_portal.models.labmetadata import LabMetadata
 from data_portal.models.libraryrun import LibraryRun
@@ -17,7 +17,7 @@ from data_processors.pipeline.domain.workflow import WorkflowType
 from data_processors.pipeline.orchestration import _reduce_and_transform_to_df, _extract_unique_subjects, \
     _extract_unique_libraries, _mint_libraries, _extract_unique_wgs_tumor_samples
 from data_processors.pipeline.services import metadata_srv, workflow_srv
-from data_processors.pipeline.tools import liborca
+from data_processors.pipeline.tools import liborca, paramcache
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -27,7 +27,7 @@ def perform(this_workflow: Workflow):
     # prepare job list and dispatch to job queue
     job_list = prepare_rnasum_jobs(this_workflow)
     if job_list:
-        libsqs.dispatch_jobs(queue_arn=libssm.get_ssm_param(SQS_RNASUM_QUEUE_ARN), job_list=job_list)
+        libsqs.dispatch_jobs(queue_arn=paramcache.get_ssm_param(SQS_RNASUM_QUEUE_ARN), job_list=job_list)
     else:
         logger.warning(f"Calling to prepare_rnasum_jobs() return empty list, no job to dispatch...")
 
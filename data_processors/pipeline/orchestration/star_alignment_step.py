@@ -7,12 +7,13 @@ See orchestration package __init__.py doc string.
 import logging
 from typing import List
 
-from libumccr.aws import libssm, libsqs
+from libumccr.aws import libsqs
 
 from data_portal.models import Workflow, FastqListRow, LabMetadata
 from data_processors.pipeline.domain.config import SQS_STAR_ALIGNMENT_QUEUE_ARN
 from data_processors.pipeline.domain.workflow import WorkflowType
 from data_processors.pipeline.services import fastq_srv, metadata_srv
+from data_processors.pipeline.tools import paramcache
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -40,7 +41,7 @@ def perform(this_workflow: Workflow):
 
     logger.info(f"Submitting Star Alignment job for {job.get('subject_id')}")
 
-    queue_arn = libssm.get_ssm_param(SQS_STAR_ALIGNMENT_QUEUE_ARN)
+    queue_arn = paramcache.get_ssm_param(SQS_STAR_ALIGNMENT_QUEUE_ARN)
     libsqs.dispatch_jobs(queue_arn=queue_arn, job_list=[job])
 
     return job
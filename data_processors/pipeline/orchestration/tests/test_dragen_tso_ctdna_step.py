@@ -5,7 +5,6 @@ from unittest import skip
 from django.utils.timezone import make_aware
 from libica.app import wes
 from libica.openapi import libwes
-from libumccr.aws import libssm
 from mockito import when, spy2
 
 from data_portal.fields import IdHelper
@@ -22,6 +21,7 @@ from data_processors.pipeline.lambdas import orchestrator
 from data_processors.pipeline.orchestration import fastq_update_step, dragen_tso_ctdna_step
 from data_processors.pipeline.services import batch_srv, fastq_srv, libraryrun_srv
 from data_processors.pipeline.tests.case import PipelineIntegrationTestCase, PipelineUnitTestCase, logger
+from data_processors.pipeline.tools import paramcache
 
 tn_mock_subject_id = "SBJ00001"
 mock_library_id = "LPRJ200438"
@@ -113,8 +113,8 @@ class DragenTsoCtDnaStepUnitTests(PipelineUnitTestCase):
         mock_labmetadata_tumor.save()
 
         # ignore step_skip_list
-        spy2(libssm.get_ssm_param)
-        when(libssm).get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/step_skip_list").thenReturn(json.dumps({}))
+        spy2(paramcache.get_ssm_param)
+        when(paramcache).get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/step_skip_list").thenReturn(json.dumps({}))
 
         result = orchestrator.handler({
             'wfr_id': TestConstant.wfr_id.value,
@@ -170,8 +170,8 @@ class DragenTsoCtDnaStepUnitTests(PipelineUnitTestCase):
         mock_labmetadata_tumor.save()
 
         # ignore step_skip_list
-        spy2(libssm.get_ssm_param)
-        when(libssm).get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/step_skip_list").thenReturn(json.dumps({}))
+        spy2(paramcache.get_ssm_param)
+        when(paramcache).get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/step_skip_list").thenReturn(json.dumps({}))
 
         result = orchestrator.handler({
             'wfr_id': TestConstant.wfr_id.value,
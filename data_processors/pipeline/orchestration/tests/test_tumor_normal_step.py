@@ -4,7 +4,6 @@ from unittest import skip
 
 from django.utils.timezone import make_aware, now
 from libica.openapi import libwes
-from libumccr.aws import libssm
 from mockito import when, spy2
 
 from data_portal.models.fastqlistrow import FastqListRow
@@ -19,6 +18,7 @@ from data_processors.pipeline.lambdas import orchestrator
 from data_processors.pipeline.orchestration import tumor_normal_step, google_lims_update_step
 from data_processors.pipeline.services import libraryrun_srv, metadata_srv
 from data_processors.pipeline.tests.case import PipelineIntegrationTestCase, PipelineUnitTestCase, logger
+from data_processors.pipeline.tools import paramcache
 
 tn_mock_subject_id = "SBJ00001"
 tn_mock_normal_read_1 = "gds://volume/path/normal_read_1.fastq.gz"
@@ -214,8 +214,8 @@ class TumorNormalStepUnitTests(PipelineUnitTestCase):
         when(google_lims_update_step).perform(any).thenReturn(True)
 
         # ignore step_skip_list
-        spy2(libssm.get_ssm_param)
-        when(libssm).get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/step_skip_list").thenReturn(json.dumps({}))
+        spy2(paramcache.get_ssm_param)
+        when(paramcache).get_ssm_param(f"{ICA_WORKFLOW_PREFIX}/step_skip_list").thenReturn(json.dumps({}))
 
         result = orchestrator.handler({
             'wfr_id': TestConstant.wfr_id.value,
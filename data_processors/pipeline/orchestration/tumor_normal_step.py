@@ -8,8 +8,7 @@ import logging
 from typing import List
 import json
 
-import pandas as pd
-from libumccr.aws import libssm, libsqs
+from libumccr.aws import libsqs
 
 from data_portal.models.fastqlistrow import FastqListRow
 from data_portal.models.labmetadata import LabMetadata, LabMetadataWorkflow
@@ -19,7 +18,7 @@ from data_processors.pipeline.domain.workflow import WorkflowType, WorkflowStatu
 from data_processors.pipeline.orchestration import _reduce_and_transform_to_df, _extract_unique_subjects, \
     _mint_libraries
 from data_processors.pipeline.services import workflow_srv, metadata_srv, fastq_srv
-from data_processors.pipeline.tools import liborca
+from data_processors.pipeline.tools import liborca, paramcache
 from data_processors.pipeline.orchestration import _handle_rerun
 
 logger = logging.getLogger(__name__)
@@ -54,7 +53,7 @@ def perform(this_workflow):
 
         if job_list:
             logger.info(f"Submitting {len(job_list)} T/N jobs for {submitting_subjects}.")
-            queue_arn = libssm.get_ssm_param(SQS_TN_QUEUE_ARN)
+            queue_arn = paramcache.get_ssm_param(SQS_TN_QUEUE_ARN)
             libsqs.dispatch_jobs(queue_arn=queue_arn, job_list=job_list)
         else:
             logger.warning(f"Calling to prepare_tumor_normal_jobs() return empty list, no job to dispatch...")
@@ -268,6 +267,8 @@ def prepare_tumor_normal_jobs(meta_list: List[LabMetadata]) -> (List, List, List
 
 
 def create_tn_job(tumor_fastq_list_rows: List[FastqListRow], normal_fastq_list_rows: List[FastqListRow], subject_id):
+    import pandas as pd
+
     # Get tumor sample name
     tumor_library_id = tumor_fastq_list_rows[0].rglb
     tumor_sample_id = tumor_fastq_list_rows[0].rgsm
@@ -8,13 +8,13 @@ import json
 import logging
 from typing import List, Dict
 
-from libumccr.aws import libssm, libsqs
+from libumccr.aws import libsqs
 
 from data_portal.models.labmetadata import LabMetadata
 from data_portal.models.workflow import Workflow
 from data_processors.pipeline.domain.config import SQS_UMCCRISE_QUEUE_ARN
 from data_processors.pipeline.services import metadata_srv
-from data_processors.pipeline.tools import liborca
+from data_processors.pipeline.tools import liborca, paramcache
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -25,7 +25,7 @@ def perform(this_workflow: Workflow):
     # prepare job list and dispatch to job queue
     job_list = prepare_umccrise_jobs(this_workflow)
     if job_list:
-        libsqs.dispatch_jobs(queue_arn=libssm.get_ssm_param(SQS_UMCCRISE_QUEUE_ARN), job_list=job_list)
+        libsqs.dispatch_jobs(queue_arn=paramcache.get_ssm_param(SQS_UMCCRISE_QUEUE_ARN), job_list=job_list)
     else:
         logger.warning(f"Calling to prepare_umccrise_jobs() return empty list, no job to dispatch...")
 
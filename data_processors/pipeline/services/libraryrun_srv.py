@@ -7,6 +7,7 @@ from django.db import transaction
 from django.db.models import QuerySet
 from libumccr import libregex
 
+from data_portal.models.cacheversion import CacheVersion, model_cache_key
 from data_portal.models.libraryrun import LibraryRun
 from data_portal.models.workflow import Workflow
 from data_processors.pipeline.services import metadata_srv
@@ -131,6 +132,7 @@ def create_or_update_library_run(payload: dict):
     library_run.valid_for_analysis = payload.get('valid_for_analysis', True)
 
     library_run.save()
+    CacheVersion.objects.bump([model_cache_key(LibraryRun)])
 
     return library_run
 
@@ -184,6 +186,8 @@ def link_library_run_with_workflow(library_id: str, lane: int, workflow: Workflo
     if library_run:
         library_run.workflows.add(workflow)
         library_run.save()
+        # workflow list is filtered by library_id through this link too, see WorkflowManager.get_by_keyword()
+        CacheVersion.objects.bump([model_cache_key(LibraryRun), model_cache_key(Workflow)])
         return library_run
     else:
         logger.warning(f"LibraryRun not found for {rglb}, {lane}, {seq_name}")
@@ -215,6 +219,8 @@ def link_library_runs_with_x_seq_workflow(library_id_list: List[str], workflow:
                 lib_run.workflows.add(workflow)
                 lib_run.save()
                 library_run_list.append(lib_run)
+        if library_run_list:
+            CacheVersion.objects.bump([model_cache_key(LibraryRun), model_cache_key(Workflow)])
         return library_run_list
     else:
         logger.warning(f"No LibraryRun records found for {rglb_list}")
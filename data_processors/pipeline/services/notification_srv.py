@@ -5,6 +5,7 @@ from typing import List
 from django.db import transaction
 from libumccr import libslack, libdt
 
+from data_portal.models.cacheversion import CacheVersion, model_cache_key
 from data_portal.models.labmetadata import LabMetadata, LabMetadataPhenotype
 from data_portal.models.libraryrun import LibraryRun
 from data_portal.models.sequencerun import SequenceRun
@@ -234,6 +235,7 @@ def notify_workflow_status(workflow: Workflow):
     if _resp:
         workflow.notified = True
         workflow.save()
+        CacheVersion.objects.bump([model_cache_key(Workflow)])
 
     return _resp
 
@@ -317,6 +319,7 @@ def notify_batch_run_status(batch_run_id):
         for wfl in workflows:
             wfl.notified = True
             wfl.save()
+        CacheVersion.objects.bump([model_cache_key(Workflow)])
 
         batch_run.notified = True
         batch_run.save()
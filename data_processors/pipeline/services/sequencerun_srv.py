@@ -4,6 +4,7 @@ from typing import List
 from django.db import transaction
 from django.db.models import QuerySet
 
+from data_portal.models.cacheversion import CacheVersion, model_cache_key
 from data_portal.models.sequencerun import SequenceRun
 
 logger = logging.getLogger(__name__)
@@ -37,6 +38,7 @@ def create_or_update_sequence_run(payload: dict):
         sqr.msg_attr_action_type = payload.get('messageAttributesActionType')
         sqr.msg_attr_produced_by = payload.get('messageAttributesProducedBy')
         sqr.save()
+        CacheVersion.objects.bump([model_cache_key(SequenceRun)])
         return sqr
     else:
         logger.info(f"Ignore existing SequenceRun (run_id={run_id}, date_modified={date_modified}, status={status})")
@@ -7,6 +7,7 @@ from django.db.models import QuerySet
 from django.utils.timezone import make_aware, is_aware
 from libumccr import libjson
 
+from data_portal.models.cacheversion import CacheVersion, model_cache_key
 from data_portal.models.labmetadata import LabMetadata
 from data_portal.models.libraryrun import LibraryRun
 from data_portal.models.sequencerun import SequenceRun
@@ -101,6 +102,7 @@ def create_or_update_workflow(model: dict):
 
     # --- write to database
     workflow.save()
+    CacheVersion.objects.bump([model_cache_key(Workflow)])
 
     return workflow
 
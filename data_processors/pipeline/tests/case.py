@@ -8,6 +8,7 @@ from libumccr.aws import libsqs
 from mockito import mock, when, unstub
 
 from data_portal.tests.factories import TestConstant
+from data_processors.pipeline.tools import paramcache, artifactcache
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -16,6 +17,9 @@ logger.setLevel(logging.INFO)
 class PipelineUnitTestCase(TestCase):
 
     def setUp(self) -> None:
+        paramcache.invalidate()  # do not leak SSM parameter value across test cases
+        artifactcache.clear()  # nor downloaded run folder artifact
+
         os.environ['ICA_BASE_URL'] = "http://localhost"
         os.environ['ICA_ACCESS_TOKEN'] = "mock"
         os.environ['ICA_WES_WORKFLOW_ID'] = TestConstant.wfl_id.value
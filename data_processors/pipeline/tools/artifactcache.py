@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""artifactcache module
+
+Content-addressed cache of small run folder artifacts on GDS, i.e. SampleSheet.csv and RunInfo.xml, for warm lambda
+container. The same run SampleSheet is looked up several times per sequence run event, by LibraryRun creation, by
+bcl_convert and by sample name helpers. With this, each artifact is downloaded and parsed once per warm container.
+
+Cache key is sha256 of GDS path, ETag and size as of GDS file listing. Hence, re-uploaded artifact at the same path is
+a different key and never served stale. Downloaded content is kept under /tmp, bounded by total bytes and evicted least
+recently used first. Parsed representation is memoized in-process per (key, parser), bounded by entry count.
+
+Parsed object is shared across callers. Treat it as read-only.
+
+Usage:
+    from data_processors.pipeline.tools import artifactcache
+    root = artifactcache.get_parsed(gds_volume, "/path/to/RunInfo.xml", parse_runinfo)
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from tempfile import gettempdir
+from typing import Any, Callable, Optional, Tuple
+
+import requests
+from libica.app import gds
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+CACHE_DIR = os.path.join(gettempdir(), "portal_artifact_cache")
+MAX_DISK_BYTES = 64 * 1024 * 1024  # lambda ephemeral storage is 512MB by default, shared with other /tmp use
+MAX_PARSED = 64
+
+
+def content_key(gds_volume: str, path: str, e_tag: Optional[str], size: Optional[int]) -> str:
+    return hashlib.sha256(f"gds://{gds_volume}{path}|{e_tag}|{size}".encode()).hexdigest()
+
+
+class ArtifactCache:
+    """
+    GDS artifact cache with bounded /tmp footprint, memoized parse and, counters
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = MAX_DISK_BYTES, max_parsed: int = MAX_PARSED):
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._max_parsed = max_parsed
+        self._parsed: OrderedDict = OrderedDict()  # (key, parser name) to parsed object
+        self._lock = threading.RLock()
+        self.download_count = 0
+        self.disk_hit_count = 0
+        self.parse_count = 0
+        self.parse_hit_count = 0
+        self.evict_count = 0
+
+    def fetch(self, gds_volume: str, path: str) -> Optional[Tuple[str, str]]:
+        """
+        Resolve the GDS file and return its local copy, download only if the content key is not cached yet
+
+        :param gds_volume:
+        :param path: absolute GDS path of the file
+        :return: tuple of (content key, local path), or None if file is not found or multiple files are found
+        """
+        file_list = gds.get_file_list(volume_name=gds_volume, path=path)
+
+        if len(file_list) != 1:
+            logger.warning(f"Please specify a single file. Found {len(file_list)} files at gds://{gds_volume}{path}")
+            return None
+
+        file = file_list[0]
+        key = content_key(gds_volume, path, file.e_tag, file.size_in_bytes)
+        local_path = os.path.join(self._cache_dir, key)
+
+        with self._lock:
+            if os.path.exists(local_path):
+                os.utime(local_path)  # mark as recently used
+                self.disk_hit_count += 1
+                return key, local_path
+
+        logger.info(f"Downloading file from GDS: gds://{gds_volume}{path}")
+        resp = requests.get(file.presigned_url)
+        resp.raise_for_status()
+
+        with self._lock:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            tmp_path = f"{local_path}.{os.getpid()}.{threading.get_ident()}.part"
+            with open(tmp_path, 'wb') as f:
+                f.write(resp.content)
+            os.replace(tmp_path, local_path)
+            self.download_count += 1
+            self._evict(keep=local_path)
+
+        return key, local_path
+
+    def get_parsed(self, gds_volume: str, path: str, parser: Callable[[str], Any]) -> Any:
+        """
+        Resolve the GDS file and return parser(local path), memoized per content key and parser
+
+        :param gds_volume:
+        :param path: absolute GDS path of the file
+        :param parser: function that take local file path and return parsed object
+        :return: parsed object, or None if file is not found or multiple files are found
+        """
+        resolved = self.fetch(gds_volume, path)
+        if resolved is None:
+            return None
+
+        key, local_path = resolved
+        memo_key = (key, f"{parser.__module__}.{parser.__qualname__}")
+
+        with self._lock:
+            if memo_key in self._parsed:
+                self._parsed.move_to_end(memo_key)
+                self.parse_hit_count += 1
+                return self._parsed[memo_key]
+
+            parsed = parser(local_path)
+            self.parse_count += 1
+
+            self._parsed[memo_key] = parsed
+            while len(self._parsed) > self._max_parsed:
+                self._parsed.popitem(last=False)
+
+        return parsed
+
+    def _evict(self, keep: str):
+        """
+        Remove least recently used files until total size is within max bytes, never the file just downloaded
+        """
+        entries = []
+        for name in os.listdir(self._cache_dir):
+            entry_path = os.path.join(self._cache_dir, name)
+            if entry_path.endswith(".part"):
+                continue
+            st = os.stat(entry_path)
+            entries.append((st.st_mtime, st.st_size, entry_path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total <= self._max_bytes:
+                break
+            if entry_path == keep:
+                continue
+            os.remove(entry_path)
+            total -= size
+            self.evict_count += 1
+
+    def clear(self):
+        """
+        Drop memoized parse, remove all cached files and, reset counters
+        """
+        with self._lock:
+            self._parsed.clear()
+            self.download_count = self.disk_hit_count = self.parse_count = self.parse_hit_count = self.evict_count = 0
+            if os.path.isdir(self._cache_dir):
+                for name in os.listdir(self._cache_dir):
+                    os.remove(os.path.join(self._cache_dir, name))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'parsed_size': len(self._parsed),
+                'download_count': self.download_count,
+                'disk_hit_count': self.disk_hit_count,
+                'parse_count': self.parse_count,
+                'parse_hit_count': self.parse_hit_count,
+                'evict_count': self.evict_count,
+            }
+
+
+_cache = ArtifactCache()
+
+
+def fetch(gds_volume: str, path: str) -> Optional[Tuple[str, str]]:
+    return _cache.fetch(gds_volume, path)
+
+
+def get_parsed(gds_volume: str, path: str, parser: Callable[[str], Any]) -> Any:
+    return _cache.get_parsed(gds_volume, path, parser)
+
+
+def clear():
+    _cache.clear()
+
+
+def stats() -> dict:
+    return _cache.stats()
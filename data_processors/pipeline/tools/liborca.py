@@ -18,14 +18,16 @@ import logging
 import os
 import re
 import xml.etree.ElementTree as et
-from contextlib import closing
 from datetime import datetime
-from tempfile import NamedTemporaryFile
-from typing import List, Dict, Any
+from typing import List, Dict, Any, TYPE_CHECKING
 
 from libica.app import gds
 from libumccr import libjson, libregex
-from sample_sheet import SampleSheet
+
+from data_processors.pipeline.tools import artifactcache
+
+if TYPE_CHECKING:
+    from sample_sheet import SampleSheet
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -276,20 +278,29 @@ def get_library_id_from_sample_name(sample_name: str):
     return fragments[-1]
 
 
-def get_samplesheet(gds_volume: str, samplesheet_path: str) -> SampleSheet:
+def parse_samplesheet(local_path: str) -> 'SampleSheet':
+    from sample_sheet import SampleSheet
+    return SampleSheet(local_path)
+
+
+def parse_runinfo(local_path: str) -> et.Element:
+    return et.ElementTree(file=local_path).getroot()
+
+
+def get_samplesheet(gds_volume: str, samplesheet_path: str) -> 'SampleSheet':
+    """
+    NOTE: SampleSheet is downloaded and parsed once per warm container, see artifactcache. Treat it as read-only.
+    """
     if not samplesheet_path.startswith(os.path.sep):
         samplesheet_path = os.path.sep + samplesheet_path
 
-    ntf: NamedTemporaryFile = gds.download_gds_file(gds_volume, samplesheet_path)
-    if ntf is None:
+    samplesheet = artifactcache.get_parsed(gds_volume, samplesheet_path, parse_samplesheet)
+    if samplesheet is None:
         reason = f"Can not download sample sheet from GDS: gds://{gds_volume}{samplesheet_path}"
         logger.error(reason)
         raise ValueError(reason)
 
-    logger.debug(f"Local sample sheet path: {ntf.name}")
-
-    with closing(ntf) as f:
-        return SampleSheet(f.name)
+    return samplesheet
 
 
 def get_samplesheet_to_json(gds_volume: str, samplesheet_path: str) -> str:
@@ -315,17 +326,14 @@ def get_samplesheet_json_from_file(gds_volume: str, samplesheet_path: str) -> st
         samplesheet_path = os.path.sep + samplesheet_path
     logger.info(f"Extracting samplesheet config from gds://{gds_volume}{samplesheet_path}")
 
-    ntf: NamedTemporaryFile = gds.download_gds_file(gds_volume, samplesheet_path)
-    if ntf is None:
+    samplesheet = artifactcache.get_parsed(gds_volume, samplesheet_path, parse_samplesheet)
+    if samplesheet is None:
         reason = f"Abort extracting metadata process. " \
                  f"Cannot download file from GDS: gds://{gds_volume}{samplesheet_path}"
         logger.error(reason)
         raise ValueError(reason)
 
-    logger.info(f"Local sample sheet path: {ntf.name}")
-    with closing(ntf) as f:
-        samplesheet = SampleSheet(f.name)
-        samplesheet_config = samplesheet.to_json()
+    samplesheet_config = samplesheet.to_json()
 
     logger.info(f"Extracted samplesheet config: {samplesheet_config}")
 
@@ -338,16 +346,14 @@ def get_runinfo(gds_volume: str, runinfo_path: str) -> et.Element:
         runinfo_path = os.path.sep + runinfo_path
     logger.info(f"Extracting run config from gds://{gds_volume}{runinfo_path}")
 
-    ntf: NamedTemporaryFile = gds.download_gds_file(gds_volume, runinfo_path)
-    if ntf is None:
+    root = artifactcache.get_parsed(gds_volume, runinfo_path, parse_runinfo)
+    if root is None:
         reason = f"Abort extracting metadata process. " \
                  f"Can not download file from GDS: gds://{gds_volume}{runinfo_path}"
         logger.error(reason)
         raise ValueError(reason)
 
-    logger.info(f"Local sample sheet path: {ntf.name}")
-    tree = et.ElementTree(file=ntf)
-    return tree.getroot()
+    return root
 
 
 def get_run_config_from_runinfo(gds_volume: str, runinfo_path: str) -> str:
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""paramcache module
+
+Process-wide cache of SSM parameters, i.e. warm lambda container re-use parameter values across events instead of a
+round trip to SSM per lookup. Each entry expires after its own TTL, so that ops toggle such as step_skip_list or
+emergency_stop_list still take effect in a warm container, see config.SSM_PARAM_TTL. Parameters known up-front, e.g.
+those of IcaWorkflowHelper, can be prefetched in one GetParameters call.
+
+Usage:
+    from data_processors.pipeline.tools import paramcache
+    paramcache.prefetch([name1, name2])
+    value = paramcache.get_ssm_param(name1)
+
+Unlike libssm.get_ssm_param, this is the lookup to mock in test, i.e. when(paramcache).get_ssm_param(...)
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Callable
+
+from libumccr.aws import ssm_client
+
+from data_processors.pipeline.domain.config import SSM_PARAM_TTL
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_TTL = 300  # seconds
+GET_PARAMETERS_MAX = 10  # max names per SSM GetParameters call
+
+
+class ParameterCache:
+    """
+    SSM parameter cache with per key TTL and, hit/miss counters
+    """
+
+    def __init__(self, client_factory: Optional[Callable] = None, ttl: int = DEFAULT_TTL,
+                 ttl_by_name: Optional[Dict[str, int]] = None, clock: Callable[[], float] = time.monotonic):
+        self._client_factory = client_factory
+        self._ttl = ttl
+        self._ttl_by_name = ttl_by_name or {}
+        self._clock = clock
+        self._entries: Dict[str, Tuple[str, float]] = {}  # name to (value, expire at)
+        self._lock = threading.Lock()
+        self.hit_count = 0
+        self.miss_count = 0
+        self.fetch_count = 0
+
+    def _client(self):
+        return self._client_factory() if self._client_factory else ssm_client()
+
+    def _lookup(self, name: str) -> Optional[str]:
+        entry = self._entries.get(name)
+        if entry and entry[1] > self._clock():
+            return entry[0]
+        return None
+
+    def _put(self, name: str, value: str, ttl: Optional[int]):
+        if ttl is None:
+            ttl = self._ttl_by_name.get(name, self._ttl)
+        self._entries[name] = (value, self._clock() + ttl)
+
+    def get(self, name: str, ttl: Optional[int] = None) -> str:
+        """
+        Get parameter value, from SSM if not cached or expired
+
+        :param name: parameter name
+        :param ttl: seconds to cache the value, default to TTL of the name or cache TTL
+        :raise ClientError ParameterNotFound: as of SSM GetParameter
+        """
+        with self._lock:
+            value = self._lookup(name)
+            if value is not None:
+                self.hit_count += 1
+                return value
+            self.miss_count += 1
+
+        resp = self._client().get_parameter(Name=name, WithDecryption=True)
+        value = resp['Parameter']['Value']
+
+        with self._lock:
+            self.fetch_count += 1
+            self._put(name, value, ttl)
+
+        return value
+
+    def prefetch(self, names: List[str], ttl: Optional[int] = None):
+        """
+        Fetch parameters not yet cached in as few GetParameters calls as possible. Parameter that does not exist is
+        skipped, its get() raise as usual.
+
+        :param names: parameter names
+        :param ttl: seconds to cache the values, default to TTL of the name or cache TTL
+        """
+        with self._lock:
+            missing = list(dict.fromkeys(name for name in names if self._lookup(name) is None))
+
+        for i in range(0, len(missing), GET_PARAMETERS_MAX):
+            resp = self._client().get_parameters(Names=missing[i:i + GET_PARAMETERS_MAX], WithDecryption=True)
+
+            if resp.get('InvalidParameters'):
+                logger.warning(f"SSM parameters not found: {resp['InvalidParameters']}")
+
+            with self._lock:
+                self.fetch_count += 1
+                for param in resp['Parameters']:
+                    self._put(param['Name'], param['Value'], ttl)
+
+    def invalidate(self, name: Optional[str] = None):
+        """
+        Evict the parameter, or all parameters if name is None
+        """
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hit_count': self.hit_count,
+                'miss_count': self.miss_count,
+                'fetch_count': self.fetch_count,
+            }
+
+
+_cache = ParameterCache(ttl_by_name=SSM_PARAM_TTL)
+
+
+def get_ssm_param(name: str, ttl: Optional[int] = None) -> str:
+    return _cache.get(name, ttl=ttl)
+
+
+def prefetch(names: List[str], ttl: Optional[int] = None):
+    _cache.prefetch(names, ttl=ttl)
+
+
+def invalidate(name: Optional[str] = None):
+    _cache.invalidate(name)
+
+
+def stats() -> dict:
+    return _cache.stats()
@@ -0,0 +1,156 @@
+import json
+import os
+import tempfile
+
+import requests
+from libica.app import gds
+from libica.openapi import libgds
+from mockito import when
+
+from data_processors.pipeline.tests.case import logger, PipelineUnitTestCase
+from data_processors.pipeline.tools import artifactcache, liborca
+
+GDS_VOLUME = "bssh.acgt"
+RUN_FOLDER = "/Runs/200508_A01052_0001_BH5LY7ACGT_r.ACGTlKjDgEy099ioQOeOWg"
+
+SAMPLESHEET_CSV = """[Header]
+IEMFileVersion,5
+Experiment Name,Tsqn-NebRNA231113
+Date,13/11/2023
+Workflow,GenerateFASTQ
+Chemistry,Amplicon
+
+[Reads]
+151
+151
+
+[Settings]
+Adapter,AGATCGGAAGAGCACACGTCTGAACTCCAGTCA
+AdapterRead2,AGATCGGAAGAGCGTCGTGTAGGGAAAGAGTGT
+
+[Data]
+Lane,Sample_ID,Sample_Name,index,index2
+1,PRJ230001_L2300001,L2300001,AACCTCTC,TCCGAGTA
+1,PRJ230002_L2300002,L2300002,GTTCTCGT,CCGTCGCA
+"""
+
+RUNINFO_XML = """<?xml version="1.0"?>
+<RunInfo Version="5">
+  <Run Id="200508_A01052_0001_BH5LY7ACGT" Number="1">
+    <Reads>
+      <Read Number="1" NumCycles="151" IsIndexedRead="N" />
+      <Read Number="2" NumCycles="8" IsIndexedRead="Y" />
+      <Read Number="3" NumCycles="8" IsIndexedRead="Y" />
+      <Read Number="4" NumCycles="151" IsIndexedRead="N" />
+    </Reads>
+    <FlowcellLayout LaneCount="4" SurfaceCount="2" SwathCount="6" TileCount="78" />
+  </Run>
+</RunInfo>
+"""
+
+
+class FakeResponse:
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class ArtifactCacheUnitTests(PipelineUnitTestCase):
+
+    def setUp(self) -> None:
+        super(ArtifactCacheUnitTests, self).setUp()
+        self.artifacts = {
+            f"{RUN_FOLDER}/SampleSheet.csv": (SAMPLESHEET_CSV, "etag1"),
+            f"{RUN_FOLDER}/RunInfo.xml": (RUNINFO_XML, "etag2"),
+        }
+        self.mock_gds()
+
+    def mock_gds(self):
+        for path, (content, e_tag) in self.artifacts.items():
+            mock_file = libgds.FileResponse()
+            mock_file.path = path
+            mock_file.e_tag = e_tag
+            mock_file.size_in_bytes = len(content)
+            mock_file.presigned_url = f"https://presigned{path}?{e_tag}"
+            when(gds).get_file_list(volume_name=GDS_VOLUME, path=path).thenReturn([mock_file])
+            when(requests).get(mock_file.presigned_url).thenReturn(FakeResponse(content.encode()))
+
+    def test_samplesheet_once_per_run(self):
+        """
+        python manage.py test data_processors.pipeline.tools.tests.test_artifactcache.ArtifactCacheUnitTests.test_samplesheet_once_per_run
+        """
+        samplesheet_path = f"{RUN_FOLDER}/SampleSheet.csv"
+
+        # as of sequence run event, LibraryRun creation, bcl_convert and sample name helpers
+        samplesheet_json = liborca.get_samplesheet_to_json(GDS_VOLUME, samplesheet_path)
+        sample_names = liborca.get_sample_names_from_samplesheet(GDS_VOLUME, samplesheet_path)
+        sample_sheet_config = liborca.get_samplesheet_json_from_file(GDS_VOLUME, samplesheet_path)
+
+        stats = artifactcache.stats()
+        logger.info(stats)
+        self.assertEqual(stats['download_count'], 1)
+        self.assertEqual(stats['parse_count'], 1)
+        self.assertEqual(stats['parse_hit_count'], 2)
+
+        self.assertEqual(sorted(sample_names), ["PRJ230001_L2300001", "PRJ230002_L2300002"])
+        self.assertEqual(samplesheet_json, sample_sheet_config)
+        self.assertEqual(len(json.loads(samplesheet_json)['Data']), 2)
+
+    def test_runinfo_once_per_run(self):
+        """
+        python manage.py test data_processors.pipeline.tools.tests.test_artifactcache.ArtifactCacheUnitTests.test_runinfo_once_per_run
+        """
+        runinfo_path = f"{RUN_FOLDER}/RunInfo.xml"
+
+        self.assertEqual(liborca.get_number_of_lanes_from_runinfo(GDS_VOLUME, runinfo_path), 4)
+        run_config = liborca.get_run_config_from_runinfo(GDS_VOLUME, runinfo_path)
+
+        self.assertEqual(json.loads(run_config)['RunCycles'], "151,8,8,151")
+        self.assertEqual(artifactcache.stats()['download_count'], 1)
+        self.assertEqual(artifactcache.stats()['parse_count'], 1)
+
+    def test_etag_changed(self):
+        """
+        python manage.py test data_processors.pipeline.tools.tests.test_artifactcache.ArtifactCacheUnitTests.test_etag_changed
+        """
+        samplesheet_path = f"{RUN_FOLDER}/SampleSheet.csv"
+        liborca.get_sample_names_from_samplesheet(GDS_VOLUME, samplesheet_path)
+
+        # sample sheet re-uploaded with an extra sample
+        self.artifacts[samplesheet_path] = (
+            SAMPLESHEET_CSV + "1,PRJ230003_L2300003,L2300003,GGTCACGA,GTCAGTCA\n", "etag3"
+        )
+        self.mock_gds()
+
+        sample_names = liborca.get_sample_names_from_samplesheet(GDS_VOLUME, samplesheet_path)
+
+        self.assertEqual(len(sample_names), 3)
+        self.assertEqual(artifactcache.stats()['download_count'], 2)
+
+    def test_not_found(self):
+        """
+        python manage.py test data_processors.pipeline.tools.tests.test_artifactcache.ArtifactCacheUnitTests.test_not_found
+        """
+        when(gds).get_file_list(...).thenReturn([])
+
+        with self.assertRaises(ValueError):
+            liborca.get_samplesheet(GDS_VOLUME, f"{RUN_FOLDER}/SampleSheet.csv")
+
+    def test_evict(self):
+        """
+        python manage.py test data_processors.pipeline.tools.tests.test_artifactcache.ArtifactCacheUnitTests.test_evict
+        """
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = artifactcache.ArtifactCache(cache_dir=cache_dir, max_bytes=len(SAMPLESHEET_CSV))
+
+            _, samplesheet_local = cache.fetch(GDS_VOLUME, f"{RUN_FOLDER}/SampleSheet.csv")
+            _, runinfo_local = cache.fetch(GDS_VOLUME, f"{RUN_FOLDER}/RunInfo.xml")
+
+            # both do not fit, least recently used is evicted, the one just downloaded is kept
+            self.assertEqual(cache.stats()['evict_count'], 1)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            self.assertTrue(os.path.exists(runinfo_local))
+            self.assertFalse(os.path.exists(samplesheet_local))
@@ -0,0 +1,156 @@
+import json
+
+from botocore.exceptions import ClientError
+from mockito import when
+
+from data_processors.pipeline.domain.config import ICA_WORKFLOW_PREFIX
+from data_processors.pipeline.domain.workflow import SecondaryAnalysisHelper, WorkflowType
+from data_processors.pipeline.lambdas import orchestrator
+from data_processors.pipeline.tests.case import logger, PipelineUnitTestCase
+from data_processors.pipeline.tools import paramcache
+
+
+class FakeSSMClient:
+    """In-memory stand-in of boto3 SSM client that counts GetParameter and GetParameters calls"""
+
+    def __init__(self, params: dict):
+        self.params = params
+        self.get_parameter_calls = 0
+        self.get_parameters_calls = 0
+
+    def get_parameter(self, Name, WithDecryption=False):
+        self.get_parameter_calls += 1
+        if Name not in self.params:
+            raise ClientError({'Error': {'Code': "ParameterNotFound", 'Message': Name}}, "GetParameter")
+        return {'Parameter': {'Name': Name, 'Value': self.params[Name]}}
+
+    def get_parameters(self, Names, WithDecryption=False):
+        self.get_parameters_calls += 1
+        assert len(Names) <= paramcache.GET_PARAMETERS_MAX
+        return {
+            'Parameters': [{'Name': name, 'Value': self.params[name]} for name in Names if name in self.params],
+            'InvalidParameters': [name for name in Names if name not in self.params],
+        }
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ParamCacheUnitTests(PipelineUnitTestCase):
+
+    def setUp(self) -> None:
+        super(ParamCacheUnitTests, self).setUp()
+        self.client = FakeSSMClient({f"/param/{i}": f"value{i}" for i in range(12)})
+        self.clock = FakeClock()
+        self.cache = paramcache.ParameterCache(client_factory=lambda: self.client, ttl=300,
+                                               ttl_by_name={"/param/0": 60}, clock=self.clock)
+
+    def test_get(self):
+        """
+        python manage.py test data_processors.pipeline.tools.tests.test_paramcache.ParamCacheUnitTests.test_get
+        """
+        self.assertEqual(self.cache.get("/param/1"), "value1")
+        self.assertEqual(self.cache.get("/param/1"), "value1")
+
+        stats = self.cache.stats()
+        logger.info(stats)
+        self.assertEqual(self.client.get_parameter_calls, 1)
+        self.assertEqual(stats['hit_count'], 1)
+        self.assertEqual(stats['miss_count'], 1)
+
+        with self.assertRaises(ClientError):
+            self.cache.get("/param/not_found")
+
+    def test_get_ttl(self):
+        """
+        python manage.py test data_processors.pipeline.tools.tests.test_paramcache.ParamCacheUnitTests.test_get_ttl
+        """
+        self.cache.get("/param/0")
+        self.cache.get("/param/1")
+
+        self.clock.now = 61
+        self.client.params["/param/0"] = "changed"
+        self.client.params["/param/1"] = "changed"
+
+        # per key TTL has expired, default TTL has not
+        self.assertEqual(self.cache.get("/param/0"), "changed")
+        self.assertEqual(self.cache.get("/param/1"), "value1")
+
+        self.clock.now = 301
+        self.assertEqual(self.cache.get("/param/1"), "changed")
+        self.assertEqual(self.client.get_parameter_calls, 4)
+
+    def test_prefetch(self):
+        """
+        python manage.py test data_processors.pipeline.tools.tests.test_paramcache.ParamCacheUnitTests.test_prefetch
+        """
+        self.cache.get("/param/0")
+        names = [f"/param/{i}" for i in range(12)] + ["/param/not_found"]
+
+        self.cache.prefetch(names)
+
+        # 12 names not yet cached, in batches of 10
+        self.assertEqual(self.client.get_parameters_calls, 2)
+        for i in range(12):
+            self.assertEqual(self.cache.get(f"/param/{i}"), f"value{i}")
+        self.assertEqual(self.client.get_parameter_calls, 1)
+
+        # all cached, nothing to fetch
+        self.cache.prefetch([f"/param/{i}" for i in range(12)])
+        self.assertEqual(self.client.get_parameters_calls, 2)
+
+    def test_invalidate(self):
+        """
+        python manage.py test data_processors.pipeline.tools.tests.test_paramcache.ParamCacheUnitTests.test_invalidate
+        """
+        self.cache.prefetch(["/param/1", "/param/2"])
+
+        self.cache.invalidate("/param/1")
+        self.assertEqual(self.cache.stats()['size'], 1)
+
+        self.cache.invalidate()
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+        self.cache.get("/param/2")
+        self.assertEqual(self.client.get_parameter_calls, 1)
+
+    def test_ica_workflow_helper(self):
+        """
+        python manage.py test data_processors.pipeline.tools.tests.test_paramcache.ParamCacheUnitTests.test_ica_workflow_helper
+        """
+        wfl_type = WorkflowType.DRAGEN_WGS_QC.value
+        client = FakeSSMClient({
+            f"{ICA_WORKFLOW_PREFIX}/workdir_root": "gds://path/to/workdir",
+            f"{ICA_WORKFLOW_PREFIX}/output_root": "gds://path/to/output",
+            f"{ICA_WORKFLOW_PREFIX}/{wfl_type}/id": "wfl.xxx",
+            f"{ICA_WORKFLOW_PREFIX}/{wfl_type}/version": "v1",
+            f"{ICA_WORKFLOW_PREFIX}/{wfl_type}/input": json.dumps({'fastq_list_rows': []}),
+        })
+        when(paramcache).ssm_client().thenReturn(client)
+
+        for _ in range(3):
+            helper = SecondaryAnalysisHelper(WorkflowType.DRAGEN_WGS_QC)
+            self.assertEqual(helper.get_workflow_id(), "wfl.xxx")
+
+        # one GetParameters call instead of five GetParameter calls per helper
+        self.assertEqual(client.get_parameters_calls, 1)
+        self.assertEqual(client.get_parameter_calls, 0)
+
+    def test_init_skip(self):
+        """
+        python manage.py test data_processors.pipeline.tools.tests.test_paramcache.ParamCacheUnitTests.test_init_skip
+        """
+        client = FakeSSMClient({f"{ICA_WORKFLOW_PREFIX}/step_skip_list": json.dumps({'global': ["UMCCRISE_STEP"]})})
+        when(paramcache).ssm_client().thenReturn(client)
+
+        for _ in range(3):
+            skip = orchestrator.init_skip({})
+            self.assertEqual(skip['global'], ["UMCCRISE_STEP"])
+
+        self.assertEqual(client.get_parameter_calls, 1)
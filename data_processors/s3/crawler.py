@@ -0,0 +1,492 @@
+# -*- coding: utf-8 -*-
+"""s3 crawler module
+Impl in here index S3 objects of a bucket into S3Object in parallel and resumable fashion. The keyspace is split into
+prefix shards (by "/" delimiter) that are listed concurrently by a worker pool. Listed objects are bulk upserted in
+batches from the calling thread, so that only one database connection is in use. After each persisted batch, the last
+key seen of the shard is written to the shard checkpoint file. An interrupted crawl then resumes from where it stopped.
+
+Reconcile mode merge-joins the S3 listing against S3Object rows of the bucket, both in key order, and bulk inserts,
+updates and deletes the difference. This catches up objects whose events were lost, with bounded memory.
+
+Listing is abstracted by S3Lister, so that crawl can be driven by any other listing source, e.g. a fake S3 in test.
+"""
+import hashlib
+import heapq
+import logging
+import os
+import pickle
+import queue
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Iterator, Tuple, Iterable, Callable
+
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Collate
+from django.utils.timezone import now
+from libumccr import libjson
+from libumccr.aws import s3_client
+
+from data_portal.models.cacheversion import CacheVersion, subject_cache_keys
+from data_portal.models.s3object import S3Object
+from data_processors.s3 import services
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_WORKERS = 8
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_SHARD_DEPTH = 1
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_SORT_CHUNK_SIZE = 500000
+DELIMITER = "/"
+
+
+class S3Lister(ABC):
+    """S3 Lister Interface Contract
+
+    Model after S3 ListObjectsV2 semantic, i.e. objects are listed in ascending key order
+    """
+
+    @abstractmethod
+    def list_objects(self, bucket: str, prefix: str, start_after: Optional[str] = None,
+                     delimiter: Optional[str] = None) -> Iterator[dict]:
+        """
+        :param bucket: s3 bucket name
+        :param prefix: s3 key prefix
+        :param start_after: list keys after this key, if any
+        :param delimiter: if any, list only objects that are directly under prefix
+        :return: generator of S3 object dict i.e. Key, LastModified, ETag, Size
+        """
+        pass
+
+    @abstractmethod
+    def list_common_prefixes(self, bucket: str, prefix: str) -> List[str]:
+        """
+        :param bucket: s3 bucket name
+        :param prefix: s3 key prefix
+        :return: list of prefixes that are one "/" level below the prefix
+        """
+        pass
+
+
+class Boto3S3Lister(S3Lister):
+
+    def list_objects(self, bucket: str, prefix: str, start_after: Optional[str] = None,
+                     delimiter: Optional[str] = None) -> Iterator[dict]:
+        kwargs = {'Bucket': bucket, 'Prefix': prefix}
+        if start_after:
+            kwargs['StartAfter'] = start_after
+        if delimiter:
+            kwargs['Delimiter'] = delimiter
+
+        paginator = s3_client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(**kwargs):
+            for obj in page.get('Contents', []):
+                yield obj
+
+    def list_common_prefixes(self, bucket: str, prefix: str) -> List[str]:
+        paginator = s3_client().get_paginator("list_objects_v2")
+        prefixes = []
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter=DELIMITER):
+            prefixes.extend([p['Prefix'] for p in page.get('CommonPrefixes', [])])
+        return prefixes
+
+
+@dataclass(frozen=True)
+class Shard:
+    prefix: str
+    recursive: bool = True
+
+    @property
+    def delimiter(self) -> Optional[str]:
+        return None if self.recursive else DELIMITER
+
+    def __str__(self):
+        return self.prefix + ("*" if self.recursive else "")
+
+
+class ShardCheckpoint:
+    """
+    Per shard progress, persisted as JSON file in checkpoint directory. File is written atomically so that a crash
+    while saving leaves the previous checkpoint intact.
+    """
+
+    def __init__(self, checkpoint_dir: Optional[str], bucket: str, shard: Shard):
+        self.path = None
+        if checkpoint_dir:
+            name = hashlib.sha256(f"{bucket}/{shard}".encode()).hexdigest()
+            self.path = os.path.join(checkpoint_dir, f"{name}.json")
+        self.bucket = bucket
+        self.shard = shard
+        self.last_key = None
+        self.count = 0
+        self.done = False
+
+    def load(self) -> 'ShardCheckpoint':
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as f:
+                state = libjson.loads(f.read())
+            self.last_key = state['last_key']
+            self.count = state['count']
+            self.done = state['done']
+        return self
+
+    def save(self):
+        if not self.path:
+            return
+        state = {
+            'bucket': self.bucket,
+            'prefix': self.shard.prefix,
+            'recursive': self.shard.recursive,
+            'last_key': self.last_key,
+            'count': self.count,
+            'done': self.done,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(libjson.dumps(state))
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def get_shards(lister: S3Lister, bucket: str, prefix: str = "", depth: int = DEFAULT_SHARD_DEPTH) -> List[Shard]:
+    """
+    Split keyspace under prefix into shards by "/" delimited prefixes, down to the given depth. At each level, objects
+    that are directly under the prefix make up their own non-recursive shard.
+    """
+    if depth <= 0:
+        return [Shard(prefix)]
+
+    common_prefixes = lister.list_common_prefixes(bucket, prefix)
+    if not common_prefixes:
+        return [Shard(prefix)]
+
+    shards = [Shard(prefix, recursive=False)]
+    for common_prefix in common_prefixes:
+        shards.extend(get_shards(lister, bucket, common_prefix, depth - 1))
+    return shards
+
+
+def crawl_s3_objects(bucket: str, prefix: str = "", lister: Optional[S3Lister] = None, workers: int = DEFAULT_WORKERS,
+                     batch_size: int = DEFAULT_BATCH_SIZE, shard_depth: int = DEFAULT_SHARD_DEPTH,
+                     checkpoint_dir: Optional[str] = None, dry: bool = False) -> dict:
+    """
+    Index S3 objects of the bucket under prefix into S3Object
+
+    :param bucket: s3 bucket name
+    :param prefix: s3 key prefix
+    :param lister: S3Lister impl, default to Boto3S3Lister
+    :param workers: number of shards to be listed concurrently
+    :param batch_size: number of S3 objects per bulk upsert
+    :param shard_depth: number of "/" levels below prefix to split into shards
+    :param checkpoint_dir: directory of shard checkpoint files, no checkpoint if None
+    :param dry: log S3 objects instead of persisting, checkpoint is not written
+    :return results of crawl
+    """
+    if lister is None:
+        lister = Boto3S3Lister()
+
+    if checkpoint_dir and not dry:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    results = defaultdict(int)
+
+    checkpoints = {}
+    for shard in get_shards(lister, bucket, prefix, shard_depth):
+        checkpoint = ShardCheckpoint(None if dry else checkpoint_dir, bucket, shard).load()
+        checkpoints[shard] = checkpoint
+        if checkpoint.done:
+            results['skipped_shard_count'] += 1
+        elif checkpoint.last_key:
+            results['resumed_shard_count'] += 1
+    results['shard_count'] = len(checkpoints)
+
+    pending_shards = [shard for shard, checkpoint in checkpoints.items() if not checkpoint.done]
+
+    logger.info(f"Crawling s3://{bucket}/{prefix} in {len(pending_shards)} shards "
+                f"({results['skipped_shard_count']} already completed)")
+
+    # bounded, so that listing can not run too far ahead of persisting
+    batch_queue = queue.Queue(maxsize=workers * 2)
+    stop = threading.Event()
+
+    # subject cache versions are bumped once per crawl, not per batch
+    cache_keys = set()
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for shard in pending_shards:
+            executor.submit(_list_shard, lister, bucket, shard, checkpoints[shard].last_key, batch_size, batch_queue,
+                            stop)
+
+        remaining = len(pending_shards)
+        while remaining:
+            shard, batch, finished, error = batch_queue.get()
+            checkpoint = checkpoints[shard]
+
+            if batch:
+                if dry:
+                    for obj in batch:
+                        logger.info(f"s3://{bucket}/{obj['Key']}")
+                else:
+                    services.persist_s3_object_bulk([to_s3_object(bucket, obj) for obj in batch], bump_subjects=False)
+                    cache_keys |= subject_cache_keys(obj['Key'] for obj in batch)
+
+                checkpoint.last_key = batch[-1]['Key']
+                checkpoint.count += len(batch)
+                checkpoint.save()
+                results['indexed_count'] += len(batch)
+
+            if finished:
+                remaining -= 1
+                if error:
+                    logger.error(f"Failed crawling shard s3://{bucket}/{shard} after key ({checkpoint.last_key}): "
+                                 f"{error}")
+                    results['failed_shard_count'] += 1
+                else:
+                    checkpoint.done = True
+                    checkpoint.save()
+                    logger.info(f"Completed shard s3://{bucket}/{shard} ({checkpoint.count} objects)")
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    CacheVersion.objects.bump(cache_keys)
+
+    # fresh start on next crawl, once all shards have completed
+    if not results['failed_shard_count']:
+        for checkpoint in checkpoints.values():
+            checkpoint.remove()
+
+    return results
+
+
+def reconcile_s3_objects(bucket: str, prefix: str = "", lister: Optional[S3Lister] = None,
+                         batch_size: int = DEFAULT_BATCH_SIZE, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         sort_chunk_size: int = DEFAULT_SORT_CHUNK_SIZE, tmp_dir: Optional[str] = None,
+                         as_of: Optional[datetime] = None, dry: bool = False) -> dict:
+    """
+    Reconcile S3Object rows of the bucket under prefix with the S3 listing, by merge join of the two key ordered
+    streams. i.e. key only in S3 is inserted, key only in db is deleted and key in both is updated if it differs.
+
+    Both sides are streamed, and writes are flushed every batch_size, so that memory stays flat regardless of bucket
+    size. MySQL driver does not stream query result, therefore on MySQL, db side is read in primary key chunks and
+    external sorted on local disk instead, see external_sort.
+
+    Rows that have been modified since the listing was taken (default to start of reconcile), i.e. by S3 event, are
+    left alone.
+
+    :param bucket: s3 bucket name
+    :param prefix: s3 key prefix
+    :param lister: S3Lister impl, default to Boto3S3Lister
+    :param batch_size: number of S3 objects per bulk upsert or delete
+    :param chunk_size: number of rows per fetch from db
+    :param sort_chunk_size: number of rows per sorted run, on MySQL
+    :param tmp_dir: directory of sorted runs, default to system temporary directory
+    :param as_of: point in time of the listing, if it is a snapshot e.g. S3 Inventory
+    :param dry: log the difference instead of persisting
+    :return results of reconcile
+    """
+    if lister is None:
+        lister = Boto3S3Lister()
+
+    if as_of is None:
+        as_of = now()
+
+    results = defaultdict(int)
+
+    logger.info(f"Reconciling s3://{bucket}/{prefix}")
+
+    upsert_list = []
+    removed_list = []
+    cache_keys = set()
+
+    def flush():
+        if dry:
+            for obj in upsert_list:
+                logger.info(f"Upsert s3://{bucket}/{obj.key}")
+            for _, key in removed_list:
+                logger.info(f"Delete s3://{bucket}/{key}")
+        else:
+            services.persist_s3_object_bulk(upsert_list, bump_subjects=False)
+            services.delete_s3_object_bulk(removed_list, bump_subjects=False)
+            cache_keys.update(subject_cache_keys(obj.key for obj in upsert_list))
+            cache_keys.update(subject_cache_keys(key for _, key in removed_list))
+        upsert_list.clear()
+        removed_list.clear()
+
+    s3_iter = iter(lister.list_objects(bucket, prefix))
+    db_iter = _iter_db_objects(bucket, prefix, chunk_size, sort_chunk_size, tmp_dir)
+
+    obj = next(s3_iter, None)
+    row = next(db_iter, None)
+    while obj is not None or row is not None:
+        if row is None or (obj is not None and obj['Key'] < row[0]):
+            upsert_list.append(to_s3_object(bucket, obj))
+            results['inserted_count'] += 1
+            obj = next(s3_iter, None)
+
+        elif obj is None or row[0] < obj['Key']:
+            key, _, _, last_modified_date = row
+            if last_modified_date < as_of:
+                removed_list.append((bucket, key))
+                results['deleted_count'] += 1
+            else:
+                results['skipped_count'] += 1
+            row = next(db_iter, None)
+
+        else:
+            s3_object = to_s3_object(bucket, obj)
+            _, size, e_tag, last_modified_date = row
+            # listing has second precision of last modified date, compare content only
+            if (size, e_tag) == (s3_object.size, s3_object.e_tag):
+                results['unchanged_count'] += 1
+            elif last_modified_date < as_of:
+                upsert_list.append(s3_object)
+                results['updated_count'] += 1
+            else:
+                results['skipped_count'] += 1
+            obj = next(s3_iter, None)
+            row = next(db_iter, None)
+
+        if len(upsert_list) + len(removed_list) >= batch_size:
+            flush()
+
+    flush()
+
+    # once per reconcile, not per batch
+    CacheVersion.objects.bump(cache_keys)
+
+    return results
+
+
+def external_sort(items: Iterable, key: Callable, chunk_size: int = DEFAULT_SORT_CHUNK_SIZE,
+                  tmp_dir: Optional[str] = None) -> Iterator:
+    """
+    Sort items that do not fit in memory, by sorting chunk_size items at a time into run files on local disk and then
+    merging the runs. Run files are removed once the returned generator is exhausted or closed.
+    """
+    run_files = []
+    try:
+        chunk = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                run_files.append(_write_run_file(chunk, key, tmp_dir))
+                chunk = []
+
+        if not run_files:
+            # fit in memory
+            yield from sorted(chunk, key=key)
+            return
+
+        if chunk:
+            run_files.append(_write_run_file(chunk, key, tmp_dir))
+
+        logger.info(f"Merging {len(run_files)} sorted runs")
+        yield from heapq.merge(*[_iter_run_file(run_file) for run_file in run_files], key=key)
+    finally:
+        for run_file in run_files:
+            os.remove(run_file)
+
+
+def _write_run_file(chunk: List, key: Callable, tmp_dir: Optional[str]) -> str:
+    chunk.sort(key=key)
+    fd, run_file = tempfile.mkstemp(prefix="s3crawler-", suffix=".run", dir=tmp_dir)
+    with os.fdopen(fd, 'wb') as f:
+        for item in chunk:
+            pickle.dump(item, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return run_file
+
+
+def _iter_run_file(run_file: str) -> Iterator:
+    with open(run_file, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def _binary_key():
+    """
+    S3 lists keys in UTF-8 binary order, db side must order keys the same way for merge join
+    """
+    if connection.vendor == 'postgresql':
+        return Collate('key', 'C')
+    return F('key')  # sqlite compares text by memcmp
+
+
+def _iter_db_objects(bucket: str, prefix: str, chunk_size: int, sort_chunk_size: int,
+                     tmp_dir: Optional[str]) -> Iterator[Tuple]:
+    """
+    Stream (key, size, e_tag, last_modified_date) of S3Object under prefix in binary key order
+    """
+    qs = S3Object.objects.filter(bucket=bucket, key__startswith=prefix)
+
+    if connection.vendor == 'mysql':
+        # keyset pagination on primary key is served by index, whereas key (TEXT) is not indexed
+        def _iter_by_pk():
+            last_id = 0
+            while True:
+                rows = list(qs.filter(id__gt=last_id).order_by('id').values_list(
+                    'id', 'key', 'size', 'e_tag', 'last_modified_date')[:chunk_size])
+                for row in rows:
+                    yield row[1:]
+                if len(rows) < chunk_size:
+                    return
+                last_id = rows[-1][0]
+
+        yield from external_sort(_iter_by_pk(), key=lambda r: r[0], chunk_size=sort_chunk_size, tmp_dir=tmp_dir)
+        return
+
+    yield from qs.annotate(binary_key=_binary_key()).order_by('binary_key').values_list(
+        'key', 'size', 'e_tag', 'last_modified_date').iterator(chunk_size=chunk_size)
+
+
+def _list_shard(lister: S3Lister, bucket: str, shard: Shard, start_after: Optional[str], batch_size: int,
+                batch_queue: queue.Queue, stop: threading.Event):
+    batch = []
+    try:
+        for obj in lister.list_objects(bucket, shard.prefix, start_after=start_after, delimiter=shard.delimiter):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                if not _put(batch_queue, stop, (shard, batch, False, None)):
+                    return
+                batch = []
+        _put(batch_queue, stop, (shard, batch, True, None))
+    except Exception as e:
+        # objects listed so far are still good to persist and checkpoint
+        _put(batch_queue, stop, (shard, batch, True, e))
+
+
+def _put(batch_queue: queue.Queue, stop: threading.Event, item: tuple) -> bool:
+    while not stop.is_set():
+        try:
+            batch_queue.put(item, timeout=1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def to_s3_object(bucket: str, obj: dict) -> S3Object:
+    """
+    Map S3 object dict of ListObjectsV2 representation, i.e. quoted ETag, into unsaved S3Object
+    """
+    return S3Object(
+        bucket=bucket,
+        key=obj['Key'],
+        last_modified_date=obj['LastModified'],
+        e_tag=str(obj['ETag'][1:-1]),
+        size=int(obj['Size']),
+    )
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""s3 inventory module
+Impl in here import S3 Inventory report, i.e. manifest.json and its data files, from local path into S3Object. This is
+the cheaper alternative to listing a huge bucket through the API, see crawler module.
+
+Data files are streamed in batches, so that memory is bounded by batch size regardless of inventory size. Import is
+either load (bulk upsert only) or reconcile (merge join against db, including deletes). Inventory data files are not
+ordered by key, therefore reconcile external sorts them on local disk first.
+
+CSV is supported out of the box. ORC and Parquet require pyarrow, i.e. pip install pyarrow
+See https://docs.aws.amazon.com/AmazonS3/latest/userguide/storage-inventory.html
+"""
+import csv
+import gzip
+import logging
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import List, Optional, Iterator
+from urllib.parse import unquote_plus
+
+from libumccr import libjson
+
+from data_portal.models.cacheversion import CacheVersion, subject_cache_keys
+from data_processors.s3 import services, crawler
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_BATCH_SIZE = 5000
+
+# fields that import reads, of CSV and their ORC and Parquet column, which are optional in inventory configuration
+REQUIRED_FIELDS = {
+    'Key': 'key',
+    'Size': 'size',
+    'LastModifiedDate': 'last_modified_date',
+    'ETag': 'e_tag',
+}
+
+
+class InventoryManifest:
+    """
+    S3 Inventory manifest.json, with its data files resolved to local path
+    """
+
+    def __init__(self, manifest_path: str, data_dir: Optional[str] = None):
+        with open(manifest_path) as f:
+            manifest = libjson.loads(f.read())
+
+        self.manifest_path = manifest_path
+        self.source_bucket: str = manifest['sourceBucket']
+        self.file_format: str = manifest['fileFormat'].upper()
+        self.file_schema: List[str] = [col.strip() for col in manifest['fileSchema'].split(",")]
+        self.creation_time = datetime.fromtimestamp(int(manifest['creationTimestamp']) / 1000, tz=timezone.utc)
+        self.data_files: List[str] = [
+            _resolve_data_file(os.path.dirname(manifest_path), data_dir, file['key']) for file in manifest['files']
+        ]
+
+        if self.file_format not in ("CSV", "ORC", "PARQUET"):
+            raise ValueError(f"Unsupported S3 Inventory file format: {self.file_format}")
+
+        if self.file_format == "CSV":
+            missing = [field for field in REQUIRED_FIELDS if field not in self.file_schema]
+        else:
+            columns = set(re.findall(r"\w+", manifest['fileSchema']))
+            missing = [field for field, column in REQUIRED_FIELDS.items() if column not in columns]
+        if missing:
+            raise ValueError(f"S3 Inventory is missing required fields {', '.join(missing)} in its fileSchema, "
+                             f"include them in the inventory configuration")
+
+    def iter_batches(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[dict]]:
+        """
+        Stream current version of S3 objects in the inventory, in batches of S3 object dict of ListObjectsV2
+        representation, i.e. Key, LastModified, ETag, Size
+        """
+        batch = []
+        for data_file in self.data_files:
+            logger.info(f"Reading {data_file}")
+            for obj in self._iter_data_file(data_file, batch_size):
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def _iter_data_file(self, data_file: str, batch_size: int) -> Iterator[dict]:
+        if self.file_format == "CSV":
+            return self._iter_csv(data_file)
+        return self._iter_columnar(data_file, batch_size)
+
+    def _iter_csv(self, data_file: str) -> Iterator[dict]:
+        # CSV has no header, columns are as declared in manifest fileSchema; ORC and Parquet use snake_case of the same
+        opener = gzip.open if data_file.endswith(".gz") else open
+        with opener(data_file, 'rt', newline='') as f:
+            for values in csv.reader(f):
+                row = dict(zip(self.file_schema, values))
+                if row.get("IsLatest") == "false" or row.get("IsDeleteMarker") == "true":
+                    continue
+                yield {
+                    'Key': unquote_plus(row['Key']),  # CSV inventory key is URL encoded
+                    'LastModified': datetime.fromisoformat(row['LastModifiedDate']),
+                    'ETag': f"\"{row['ETag']}\"",
+                    'Size': int(row['Size']),
+                }
+
+    def _iter_columnar(self, data_file: str, batch_size: int) -> Iterator[dict]:
+        try:
+            if self.file_format == "ORC":
+                from pyarrow import orc
+                orc_file = orc.ORCFile(data_file)
+                record_batches = (orc_file.read_stripe(i) for i in range(orc_file.nstripes))
+            else:
+                from pyarrow import parquet
+                record_batches = parquet.ParquetFile(data_file).iter_batches(batch_size=batch_size)
+        except ImportError:
+            raise ImportError(f"Reading {self.file_format} S3 Inventory requires pyarrow, i.e. pip install pyarrow")
+
+        for record_batch in record_batches:
+            for row in record_batch.to_pylist():
+                if row.get('is_latest') is False or row.get('is_delete_marker') is True:
+                    continue
+                last_modified_date: datetime = row['last_modified_date']
+                if last_modified_date.tzinfo is None:
+                    last_modified_date = last_modified_date.replace(tzinfo=timezone.utc)
+                yield {
+                    'Key': row['key'],
+                    'LastModified': last_modified_date,
+                    'ETag': f"\"{row['e_tag']}\"",
+                    'Size': int(row['size']),
+                }
+
+
+class InventoryS3Lister(crawler.S3Lister):
+    """
+    S3Lister over S3 Inventory, in key order as ListObjectsV2 does, see crawler.external_sort
+    """
+
+    def __init__(self, manifest: InventoryManifest, sort_chunk_size: int = crawler.DEFAULT_SORT_CHUNK_SIZE,
+                 tmp_dir: Optional[str] = None):
+        self.manifest = manifest
+        self.sort_chunk_size = sort_chunk_size
+        self.tmp_dir = tmp_dir
+
+    def list_objects(self, bucket: str, prefix: str, start_after: Optional[str] = None,
+                     delimiter: Optional[str] = None) -> Iterator[dict]:
+        for obj in crawler.external_sort(self._iter_objects(prefix, delimiter), key=lambda o: o['Key'],
+                                         chunk_size=self.sort_chunk_size, tmp_dir=self.tmp_dir):
+            if start_after and obj['Key'] <= start_after:
+                continue
+            yield obj
+
+    def list_common_prefixes(self, bucket: str, prefix: str) -> List[str]:
+        prefixes = set()
+        for obj in self._iter_objects(prefix):
+            rest = obj['Key'][len(prefix):]
+            if crawler.DELIMITER in rest:
+                prefixes.add(prefix + rest.split(crawler.DELIMITER)[0] + crawler.DELIMITER)
+        return sorted(prefixes)
+
+    def _iter_objects(self, prefix: str, delimiter: Optional[str] = None) -> Iterator[dict]:
+        for batch in self.manifest.iter_batches():
+            for obj in batch:
+                key = obj['Key']
+                if not key.startswith(prefix) or (delimiter and delimiter in key[len(prefix):]):
+                    continue
+                yield obj
+
+
+def import_inventory(manifest: InventoryManifest, reconcile: bool = False, batch_size: int = DEFAULT_BATCH_SIZE,
+                     chunk_size: int = crawler.DEFAULT_CHUNK_SIZE,
+                     sort_chunk_size: int = crawler.DEFAULT_SORT_CHUNK_SIZE,
+                     tmp_dir: Optional[str] = None, dry: bool = False) -> dict:
+    """
+    Import S3 Inventory into S3Object of the inventory source bucket
+
+    :param manifest: S3 Inventory manifest
+    :param reconcile: merge join against db, i.e. also delete rows of objects not in inventory, otherwise upsert only
+    :param batch_size: number of S3 objects per bulk upsert or delete
+    :param chunk_size: number of rows per fetch from db, in reconcile
+    :param sort_chunk_size: number of S3 objects per sorted run, in reconcile
+    :param tmp_dir: directory of sorted runs, default to system temporary directory
+    :param dry: log S3 objects instead of persisting
+    :return results of import
+    """
+    bucket = manifest.source_bucket
+
+    if reconcile:
+        lister = InventoryS3Lister(manifest, sort_chunk_size=sort_chunk_size, tmp_dir=tmp_dir)
+        return crawler.reconcile_s3_objects(bucket, lister=lister, batch_size=batch_size, chunk_size=chunk_size,
+                                            sort_chunk_size=sort_chunk_size, tmp_dir=tmp_dir,
+                                            as_of=manifest.creation_time, dry=dry)
+
+    results = defaultdict(int)
+    cache_keys = set()
+    for batch in manifest.iter_batches(batch_size):
+        if dry:
+            for obj in batch:
+                logger.info(f"s3://{bucket}/{obj['Key']}")
+        else:
+            services.persist_s3_object_bulk([crawler.to_s3_object(bucket, obj) for obj in batch], bump_subjects=False)
+            cache_keys |= subject_cache_keys(obj['Key'] for obj in batch)
+        results['indexed_count'] += len(batch)
+
+    # once per import, not per batch
+    CacheVersion.objects.bump(cache_keys)
+
+    return results
+
+
+def _resolve_data_file(manifest_dir: str, data_dir: Optional[str], key: str) -> str:
+    """
+    Data file key is relative to inventory destination bucket. Look it up in data_dir if given, otherwise, next to
+    the manifest or in data/ directory of the inventory, as downloaded by `aws s3 sync` of the inventory prefix.
+    """
+    file_name = os.path.basename(key)
+    if data_dir:
+        candidates = [os.path.join(data_dir, file_name)]
+    else:
+        candidates = [
+            os.path.join(manifest_dir, file_name),
+            os.path.join(os.path.dirname(manifest_dir), "data", file_name),
+        ]
+
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            return candidate
+
+    raise FileNotFoundError(f"S3 Inventory data file ({key}) not found in: {candidates}")
@@ -12,9 +12,10 @@ django.setup()
 # ---
 
 import logging
-from typing import Union, Dict, List
-from dateutil.parser import parse
+from datetime import datetime
+from typing import Union, Dict, List, Optional
 
+from dateutil.parser import parse
 from libumccr import libjson
 from libumccr.aws import libs3
 from data_processors.s3 import services
@@ -25,6 +26,17 @@ from data_processors.const import S3EventRecord
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+LOG_MAX_LENGTH = 1024  # max characters of the sample message body in event summary log
+
+EVENT_OBJECT_CREATED = libs3.S3EventType.EVENT_OBJECT_CREATED
+EVENT_OBJECT_REMOVED = libs3.S3EventType.EVENT_OBJECT_REMOVED
+EVENT_UNSUPPORTED = libs3.S3EventType.EVENT_UNSUPPORTED
+
+EVENTBRIDGE_EVENT_TYPES = {
+    'ObjectCreated': EVENT_OBJECT_CREATED,
+    'ObjectDeleted': EVENT_OBJECT_REMOVED,
+}
+
 
 def handler(event: dict, context) -> Union[bool, Dict[str, int]]:
     """
@@ -36,7 +48,7 @@ def handler(event: dict, context) -> Union[bool, Dict[str, int]]:
     """
 
     logger.info("Start processing S3 event")
-    logger.info(libjson.dumps(event))
+    logger.info(summarize_event(event))
 
     # subsegment = xray_recorder.begin_subsegment("S3_EVENT_RECORDS_TRACE")
 
@@ -78,55 +90,76 @@ def parse_raw_s3_event_records(messages: List[dict]) -> Dict:
     for message in messages:
         body: dict = libjson.loads(message['body'])
 
+        # SNS > SQS without raw message delivery, S3 event is wrapped in SNS notification
+        if 'Message' in body and body.get('Type') == 'Notification':
+            body = libjson.loads(body['Message'])
+
         if 'detail-type' in body:
 
             # -- S3 event route through EventBridge integration
 
             event_name = str(body['detail-type']).strip().replace(' ', '')
-            event_time = parse(body['time'])
             s3 = body['detail']
-            s3_bucket_name = s3['bucket']['name']
-            s3_object_meta = s3['object']
 
-            if event_name in ['ObjectCreated']:
-                event_type = libs3.S3EventType.EVENT_OBJECT_CREATED
-            elif event_name in ['ObjectDeleted']:
-                event_type = libs3.S3EventType.EVENT_OBJECT_REMOVED
-            else:
-                event_type = libs3.S3EventType.EVENT_UNSUPPORTED
+            s3_event_records.append(
+                S3EventRecord(
+                    EVENTBRIDGE_EVENT_TYPES.get(event_name, EVENT_UNSUPPORTED),
+                    parse_event_time(body['time']),
+                    s3['bucket']['name'],
+                    s3['object'],
+                )
+            )
 
-            logger.debug(f"Found new event of type {event_type}")
-
-            s3_event_records.append(S3EventRecord(event_type, event_time, s3_bucket_name, s3_object_meta))
-
-        else:
+        elif 'Records' in body:
 
             # -- S3 event route through SQS, SNS, Lambda integration
 
-            if 'Records' not in body:
-                continue
-
-            records = body['Records']
-
-            for record in records:
+            for record in body['Records']:
                 event_name = record['eventName']
-                event_time = parse(record['eventTime'])
                 s3 = record['s3']
-                s3_bucket_name = s3['bucket']['name']
-                s3_object_meta = s3['object']
 
                 # Check event type
-                if libs3.S3EventType.EVENT_OBJECT_CREATED.value in event_name:
-                    event_type = libs3.S3EventType.EVENT_OBJECT_CREATED
-                elif libs3.S3EventType.EVENT_OBJECT_REMOVED.value in event_name:
-                    event_type = libs3.S3EventType.EVENT_OBJECT_REMOVED
+                if EVENT_OBJECT_CREATED.value in event_name:
+                    event_type = EVENT_OBJECT_CREATED
+                elif EVENT_OBJECT_REMOVED.value in event_name:
+                    event_type = EVENT_OBJECT_REMOVED
                 else:
-                    event_type = libs3.S3EventType.EVENT_UNSUPPORTED
-
-                logger.debug(f"Found new event of type {event_type}")
+                    event_type = EVENT_UNSUPPORTED
 
-                s3_event_records.append(S3EventRecord(event_type, event_time, s3_bucket_name, s3_object_meta))
+                s3_event_records.append(
+                    S3EventRecord(event_type, parse_event_time(record['eventTime']), s3['bucket']['name'], s3['object'])
+                )
 
     return {
         's3_event_records': s3_event_records,
     }
+
+
+def parse_event_time(value: str) -> datetime:
+    """
+    Parse event time of S3 event, which is ISO-8601 e.g. 2021-04-18T12:35:17.716Z, with the fast C implementation.
+    Fall back to dateutil for anything else that it does not understand.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        logger.warning(f"Fall back to dateutil for parsing non ISO-8601 event time: {value}")
+        return parse(value)
+
+
+def summarize_event(event: dict, max_length: Optional[int] = LOG_MAX_LENGTH) -> str:
+    """
+    Summarise SQS event for logging, instead of dumping the whole event, which can be some MB for a batch of 10k
+    messages. i.e. number of messages, their event sources and, the first message body truncated to max_length.
+    """
+    messages = event.get('Records', [])
+
+    sources = set()
+    for message in messages:
+        sources.add(message.get('eventSourceARN', message.get('eventSource', "unknown")))
+
+    sample = messages[0].get('body', "") if messages else ""
+    if max_length is not None and len(sample) > max_length:
+        sample = f"{sample[:max_length]}...({len(sample) - max_length} more characters)"
+
+    return f"Received {len(messages)} messages from {sorted(sources)}, first message body: {sample}"
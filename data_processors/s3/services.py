@@ -9,62 +9,271 @@ direct mutation to the actual S3 object itself, etc.
 """
 import logging
 from collections import defaultdict
-from datetime import datetime
-from typing import Tuple, List
+from datetime import datetime, timedelta
+from typing import Tuple, List, Optional, Dict
 
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import transaction
+from django.db import transaction, connection
+from django.utils.timezone import now
 # from django.db.models import ExpressionWrapper, Value, CharField, Q, F  FIXME to be removed when refactoring #343
 from libumccr.aws import libs3
 
 from data_portal.fields import HashFieldHelper
+from data_portal.models.cacheversion import CacheVersion, subject_cache_keys
 from data_portal.models.limsrow import LIMSRow, S3LIMS
-from data_portal.models.s3object import S3Object
+from data_portal.models.pathtoken import S3ObjectPathToken
+from data_portal.models.s3object import S3Object, S3ObjectTombstone
+from data_portal.models.storagestat import StorageStat, StorageStatSource
 from data_processors.const import S3EventRecord
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+DELETE_CHUNK_SIZE = 500
+TOMBSTONE_RETENTION_DAYS = 14  # match SQS maximum message retention period, i.e. how late an event can be delivered
+
+UPSERT_UPDATE_FIELDS = ['last_modified_date', 'size', 'e_tag', 'result_pipeline', 'result_type']
+
 
 def sync_s3_event_records(records: List[S3EventRecord]) -> dict:
     """
     Synchronise s3 event records to the db.
+
+    Upsert and delete are conditional on the event being newer than what is already known of the S3 object, i.e. the
+    sequencer (or event time) stored on S3Object or its S3ObjectTombstone. This makes the sync converge to the same
+    state regardless of delivery order, duplicates and concurrent invocations. Rows of the batch are locked for update
+    so that concurrent invocations serialise per S3 object. Storage stat deltas and subject cache versions of the batch
+    are updated once, as the last statements of the transaction, see StorageStat.objects.apply().
+
     :param records: records to be processed
     :return results of synchronisation
     """
     results = defaultdict(int)
 
-    obj_list = list()
-    for record in records:
-        if record.event_type == libs3.S3EventType.EVENT_OBJECT_REMOVED:
-            removed_count, s3_lims_removed_count = _sync_s3_event_record_removed(record)
-            results['removed_count'] += removed_count
-            results['s3_lims_removed_count'] += s3_lims_removed_count
-
-        elif record.event_type == libs3.S3EventType.EVENT_OBJECT_CREATED:
-            # created_count, s3_lims_created_count = _sync_s3_event_record_created(record)
-            obj_list.append(_sync_s3_event_record_created(record))
-            created_count, s3_lims_created_count = (1, 1)
-            results['created_count'] += created_count
-            results['s3_lims_created_count'] += s3_lims_created_count
+    coalesced_records = coalesce_s3_event_records(records)
+    results['coalesced_count'] = len(records) - len(coalesced_records)
+
+    supported_records = list()
+    for record in coalesced_records:
+        if record.event_type in (libs3.S3EventType.EVENT_OBJECT_CREATED, libs3.S3EventType.EVENT_OBJECT_REMOVED):
+            supported_records.append(record)
         else:
             logger.info(f"Found unsupported S3 event type: {record.event_type}")
             results['unsupported_count'] += 1
 
-    persist_s3_object_bulk(obj_list)
+    with transaction.atomic():
+        current_versions = _get_current_versions([_get_unique_hash(record) for record in supported_records])
+
+        obj_list = list()
+        removed_list = list()
+        tombstone_list = list()
+        for record in supported_records:
+            hash_key = _get_unique_hash(record)
+
+            current_version = current_versions.get(hash_key)
+            if current_version and _is_older_version(_get_version(record), current_version):
+                logger.info(f"Skip stale {record.event_type} event of S3Object (bucket={record.s3_bucket_name}, "
+                            f"key={record.s3_object_meta['key']})")
+                results['stale_count'] += 1
+                continue
+
+            if record.event_type == libs3.S3EventType.EVENT_OBJECT_REMOVED:
+                removed_list.append((record.s3_bucket_name, record.s3_object_meta['key']))
+                tombstone_list.append(
+                    S3ObjectTombstone(
+                        unique_hash=hash_key,
+                        sequencer=record.s3_object_meta.get('sequencer'),
+                        event_time=record.event_time,
+                    )
+                )
+            else:
+                # created_count, s3_lims_created_count = _sync_s3_event_record_created(record)
+                obj_list.append(_sync_s3_event_record_created(record))
+                created_count, s3_lims_created_count = (1, 1)
+                results['created_count'] += created_count
+                results['s3_lims_created_count'] += s3_lims_created_count
+
+        persist_stat_deltas = _persist_s3_object_bulk(obj_list)
+        cache_keys = subject_cache_keys(obj.key for obj in obj_list)
+
+        removed_count, s3_lims_removed_count, delete_stat_deltas = _delete_s3_object_bulk(removed_list)
+        if removed_count:
+            cache_keys |= subject_cache_keys(key for _, key in removed_list)
+        results['removed_count'] += removed_count
+        results['s3_lims_removed_count'] += s3_lims_removed_count
+        results['missing_count'] += len(removed_list) - removed_count
+
+        persist_s3_object_tombstone_bulk(tombstone_list)
+        _delete_s3_object_tombstone_bulk([obj.unique_hash for obj in obj_list])
+
+        # last, as bucket stat row and subject cache versions are shared by all concurrent syncs of the bucket
+        StorageStat.objects.apply(
+            StorageStatSource.S3, StorageStat.objects.merge_deltas(persist_stat_deltas, delete_stat_deltas)
+        )
+        CacheVersion.objects.bump(cache_keys)
 
     return results
 
 
+def coalesce_s3_event_records(records: List[S3EventRecord]) -> List[S3EventRecord]:
+    """
+    Collapse event records of the same S3 object (i.e. same bucket and key, see S3Object.unique_hash) into the
+    latest one, so that each object costs at most one database write within a batch. e.g. burst of create, overwrite
+    and then delete of the same key is reduced to just the delete.
+
+    Last writer wins by S3 event `sequencer` when both records carry one, otherwise by event time. On tie, the
+    later arrival in the batch wins. Unsupported event types are passed through as-is.
+
+    :param records: records to be coalesced
+    :return: coalesced records, retaining the order of first appearance of each S3 object
+    """
+    latest_by_hash = dict()
+    passthrough = list()
+
+    for record in records:
+        if record.event_type not in (libs3.S3EventType.EVENT_OBJECT_CREATED,
+                                     libs3.S3EventType.EVENT_OBJECT_REMOVED):
+            passthrough.append(record)
+            continue
+
+        hash_key = _get_unique_hash(record)
+
+        current = latest_by_hash.get(hash_key)
+        if current is None or not _is_older_version(_get_version(record), _get_version(current)):
+            latest_by_hash[hash_key] = record
+
+    return list(latest_by_hash.values()) + passthrough
+
+
+def _get_unique_hash(record: S3EventRecord) -> str:
+    h = HashFieldHelper()
+    h.add(record.s3_bucket_name).add(record.s3_object_meta['key'])
+    return h.calculate_hash()
+
+
+def _get_version(record: S3EventRecord) -> Tuple[Optional[str], datetime]:
+    return record.s3_object_meta.get('sequencer'), record.event_time
+
+
+def _is_older_version(version: Tuple[Optional[str], datetime], other: Tuple[Optional[str], datetime]) -> bool:
+    """
+    Compare two versions, i.e. (sequencer, event time) tuple, of the same S3 object
+    :return: True if version has happened strictly before the other version, False otherwise
+    """
+    sequencer, event_time = version
+    other_sequencer, other_event_time = other
+
+    if sequencer and other_sequencer:
+        # sequencer is hexadecimal string of variable length, right pad the shorter one with zeros for comparison
+        # see https://docs.aws.amazon.com/AmazonS3/latest/userguide/notification-content-structure.html
+        width = max(len(sequencer), len(other_sequencer))
+        return sequencer.upper().ljust(width, '0') < other_sequencer.upper().ljust(width, '0')
+
+    return event_time < other_event_time
+
+
+def _get_current_versions(hash_key_list: List[str]) -> Dict[str, Tuple[Optional[str], datetime]]:
+    """
+    Lock and look up the latest known version of S3 objects, from either S3Object or S3ObjectTombstone. Objects
+    without known version are absent from the result. Must be called within transaction.
+    :param hash_key_list: list of S3Object unique_hash
+    :return: dict of unique_hash to (sequencer, event time) tuple
+    """
+    versions = dict()
+
+    # consistent lock order to avoid deadlock between concurrent invocations
+    hash_key_list = sorted(set(hash_key_list))
+
+    for i in range(0, len(hash_key_list), DELETE_CHUNK_SIZE):
+        chunk = hash_key_list[i:i + DELETE_CHUNK_SIZE]
+
+        # S3Object without sequencer (i.e. legacy or indexed by crawler) is compared by its last modified date instead
+        s3_object_qs = S3Object.objects.select_for_update().filter(unique_hash__in=chunk)
+        for hash_key, sequencer, last_modified_date in s3_object_qs.values_list(
+                'unique_hash', 'sequencer', 'last_modified_date'):
+            versions[hash_key] = (sequencer, last_modified_date)
+
+        tombstone_qs = S3ObjectTombstone.objects.select_for_update().filter(unique_hash__in=chunk)
+        for hash_key, sequencer, event_time in tombstone_qs.values_list('unique_hash', 'sequencer', 'event_time'):
+            current = versions.get(hash_key)
+            if current is None or _is_older_version(current, (sequencer, event_time)):
+                versions[hash_key] = (sequencer, event_time)
+
+    return versions
+
+
+def _upsert_conflict_target() -> dict:
+    """
+    MySQL resolves conflict on any unique index and does not allow the conflict target to be specified, whereas
+    other backends (e.g. sqlite in unit test) require it.
+    """
+    if connection.features.supports_update_conflicts_with_target:
+        return {'unique_fields': ['unique_hash']}
+    return {}
+
+
 @transaction.atomic
-def persist_s3_object_bulk(obj_list):
-    S3Object.objects.bulk_create(
-        obj_list,
+def persist_s3_object_bulk(obj_list, bump_subjects: bool = True):
+    """
+    Upsert S3Object records keyed on unique_hash
+    :param obj_list: list of unsaved S3Object instance
+    :param bump_subjects: bump cache version of subjects of the objects, caller that persists in batches e.g. crawler
+        may opt out and bump once per run instead
+    """
+    stat_deltas = _persist_s3_object_bulk(obj_list)
+    StorageStat.objects.apply(StorageStatSource.S3, stat_deltas)
+    if bump_subjects:
+        CacheVersion.objects.bump(subject_cache_keys(obj.key for obj in obj_list))
+
+
+def _persist_s3_object_bulk(obj_list) -> dict:
+    """
+    Upsert S3Object records, without applying the storage stat deltas. Must be called within transaction.
+    :return: storage stat deltas of the upsert
+    """
+    stat_deltas = StorageStat.objects.upsert_deltas(StorageStatSource.S3, obj_list)
+
+    # listing, i.e. crawler or inventory, has no sequencer and must not clear the one known from S3 event, hence,
+    # upsert these separately
+    for upsert_list, update_fields in [
+        ([obj for obj in obj_list if obj.sequencer], UPSERT_UPDATE_FIELDS + ['sequencer']),
+        ([obj for obj in obj_list if not obj.sequencer], UPSERT_UPDATE_FIELDS),
+    ]:
+        if not upsert_list:
+            continue
+        S3Object.objects.bulk_create(
+            upsert_list,
+            update_conflicts=True,
+            update_fields=update_fields,
+            **_upsert_conflict_target(),
+        )
+
+    S3ObjectPathToken.index(obj_list)
+    return stat_deltas
+
+
+@transaction.atomic
+def persist_s3_object_tombstone_bulk(tombstone_list: List[S3ObjectTombstone]):
+    """
+    Record deletion of S3 objects and, prune tombstones that have passed their retention
+    """
+    if not tombstone_list:
+        return
+
+    S3ObjectTombstone.objects.bulk_create(
+        tombstone_list,
         update_conflicts=True,
-        # unique_fields=['unique_hash'],
-        update_fields=['last_modified_date', 'size', 'e_tag'],
+        update_fields=['sequencer', 'event_time'],
+        **_upsert_conflict_target(),
     )
 
+    S3ObjectTombstone.objects.filter(event_time__lt=now() - timedelta(days=TOMBSTONE_RETENTION_DAYS)).delete()
+
+
+def _delete_s3_object_tombstone_bulk(hash_key_list: List[str]):
+    for i in range(0, len(hash_key_list), DELETE_CHUNK_SIZE):
+        S3ObjectTombstone.objects.filter(unique_hash__in=hash_key_list[i:i + DELETE_CHUNK_SIZE]).delete()
+
 
 def _sync_s3_event_record_created(record: S3EventRecord) -> S3Object:
     """
@@ -84,22 +293,15 @@ def _sync_s3_event_record_created(record: S3EventRecord) -> S3Object:
 
     # tag_s3_object(bucket_name, key, "bam")
 
-    return persist_s3_object(bucket=bucket_name, key=key, size=size, last_modified_date=record.event_time, e_tag=e_tag)
+    sequencer = record.s3_object_meta.get('sequencer')
 
-
-def _sync_s3_event_record_removed(record: S3EventRecord) -> Tuple[int, int]:
-    """
-    Synchronise a S3 event (REMOVED) record to db
-    :param record: record to be synced
-    :return: number of s3 records deleted, number of s3-lims association records deleted
-    """
-    bucket_name = record.s3_bucket_name
-    key = record.s3_object_meta['key']
-    return delete_s3_object(bucket_name, key)
+    return persist_s3_object(bucket=bucket_name, key=key, size=size, last_modified_date=record.event_time, e_tag=e_tag,
+                             sequencer=sequencer)
 
 
 # @transaction.atomic
-def persist_s3_object(bucket: str, key: str, last_modified_date: datetime, size: int, e_tag: str) -> S3Object:
+def persist_s3_object(bucket: str, key: str, last_modified_date: datetime, size: int, e_tag: str,
+                      sequencer: Optional[str] = None) -> S3Object:
     """
     Persist an s3 object record into the db
     :param bucket: s3 bucket name
@@ -107,6 +309,7 @@ def persist_s3_object(bucket: str, key: str, last_modified_date: datetime, size:
     :param last_modified_date: s3 object last modified date
     :param size: s3 object size
     :param e_tag: s3 objec etag
+    :param sequencer: s3 event sequencer, if known
     :return: number of s3 object created, number of s3-lims association records created
     """
     # query_set = S3Object.objects.filter(bucket=bucket, key=key)
@@ -134,6 +337,7 @@ def persist_s3_object(bucket: str, key: str, last_modified_date: datetime, size:
         last_modified_date=last_modified_date,
         size=size,
         e_tag=e_tag,
+        sequencer=sequencer,
     )
     return s3_object
 
@@ -203,7 +407,10 @@ def delete_s3_object(bucket_name: str, key: str) -> Tuple[int, int]:
         # s3_lims_records.delete()
 
         if s3_object.exists():
+            stat_deltas = StorageStat.objects.delete_deltas(StorageStatSource.S3, s3_object)
             s3_object.delete()
+            StorageStat.objects.apply(StorageStatSource.S3, stat_deltas)
+            CacheVersion.objects.bump(subject_cache_keys([key]))
             logger.info(f"Deleted S3Object: s3://{bucket_name}/{key}")
             return 1, 0
         else:
@@ -214,6 +421,51 @@ def delete_s3_object(bucket_name: str, key: str) -> Tuple[int, int]:
         return 0, 0
 
 
+@transaction.atomic
+def delete_s3_object_bulk(bucket_key_list: List[Tuple[str, str]], bump_subjects: bool = True) -> Tuple[int, int]:
+    """
+    Delete S3 object records from db in set-based fashion, i.e. chunked `unique_hash IN (...)` statements instead of
+    one round trip per object. Association records (S3LIMS, AnalysisResult s3objects) are cascaded by the ORM collector.
+    :param bucket_key_list: list of (s3 bucket name, s3 object key) tuple
+    :param bump_subjects: bump cache version of subjects of the objects, see persist_s3_object_bulk()
+    :return: number of s3 records deleted, number of s3-lims association records deleted
+    """
+    removed_count, s3_lims_removed_count, stat_deltas = _delete_s3_object_bulk(bucket_key_list)
+
+    StorageStat.objects.apply(StorageStatSource.S3, stat_deltas)
+    if removed_count and bump_subjects:
+        CacheVersion.objects.bump(subject_cache_keys(key for _, key in bucket_key_list))
+
+    return removed_count, s3_lims_removed_count
+
+
+def _delete_s3_object_bulk(bucket_key_list: List[Tuple[str, str]]) -> Tuple[int, int, dict]:
+    """
+    Delete S3 object records, without applying the storage stat deltas. Must be called within transaction.
+    :return: number of s3 records deleted, number of s3-lims association records deleted, storage stat deltas
+    """
+    hash_key_list = list()
+    for bucket_name, key in bucket_key_list:
+        h = HashFieldHelper()
+        h.add(bucket_name).add(key)
+        hash_key_list.append(h.calculate_hash())
+
+    removed_count = 0
+    s3_lims_removed_count = 0
+    stat_deltas_list = list()
+    for i in range(0, len(hash_key_list), DELETE_CHUNK_SIZE):
+        chunk = hash_key_list[i:i + DELETE_CHUNK_SIZE]
+        qs = S3Object.objects.filter(unique_hash__in=chunk)
+        stat_deltas_list.append(StorageStat.objects.delete_deltas(StorageStatSource.S3, qs))
+        _, deleted_per_model = qs.delete()
+        removed_count += deleted_per_model.get(S3Object._meta.label, 0)
+        s3_lims_removed_count += deleted_per_model.get(S3LIMS._meta.label, 0)
+
+    logger.info(f"Deleted {removed_count} S3Object out of {len(bucket_key_list)} removal requested")
+
+    return removed_count, s3_lims_removed_count, StorageStat.objects.merge_deltas(*stat_deltas_list)
+
+
 def tag_s3_object(bucket_name: str, key: str, extension: str):
     """
     Tag S3 Object if extension is <extension>
@@ -0,0 +1,274 @@
+import os
+import random
+import tempfile
+import tracemalloc
+from datetime import datetime, timezone, timedelta
+from typing import Iterator, List, Optional
+from unittest.mock import patch
+
+from django.db import connection
+from django.utils.timezone import now
+
+from data_portal.models.cacheversion import CacheVersion, subject_cache_key
+from data_portal.models.s3object import S3Object
+from data_processors.s3 import crawler
+from data_processors.s3.tests.case import S3EventUnitTestCase, logger
+
+
+class FakeS3Lister(crawler.S3Lister):
+    """In-memory S3 that model after ListObjectsV2 semantic, optionally loaded from a local directory tree"""
+
+    def __init__(self, keys: List[str], fail_after: Optional[str] = None):
+        self.keys = sorted(keys)
+        self.fail_after = fail_after
+        self.list_calls = []
+
+    @classmethod
+    def from_dir(cls, root: str) -> 'FakeS3Lister':
+        keys = []
+        for dir_path, _, file_names in os.walk(root):
+            for file_name in file_names:
+                keys.append(os.path.relpath(os.path.join(dir_path, file_name), root).replace(os.sep, "/"))
+        return cls(keys)
+
+    def list_objects(self, bucket: str, prefix: str, start_after: Optional[str] = None,
+                     delimiter: Optional[str] = None) -> Iterator[dict]:
+        self.list_calls.append((prefix, start_after, delimiter))
+        for key in self.keys:
+            if not key.startswith(prefix) or (start_after and key <= start_after):
+                continue
+            if delimiter and delimiter in key[len(prefix):]:
+                continue
+            yield {
+                'Key': key,
+                'LastModified': datetime(2024, 10, 16, tzinfo=timezone.utc),
+                'ETag': '"d41d8cd98f00b204e9800998ecf8427e"',
+                'Size': len(key),
+            }
+            if key == self.fail_after:
+                raise ConnectionError("Simulated listing failure")
+
+    def list_common_prefixes(self, bucket: str, prefix: str) -> List[str]:
+        prefixes = set()
+        for key in self.keys:
+            if key.startswith(prefix) and crawler.DELIMITER in key[len(prefix):]:
+                prefixes.add(prefix + key[len(prefix):].split(crawler.DELIMITER)[0] + crawler.DELIMITER)
+        return sorted(prefixes)
+
+
+KEYS = [
+    "README.md",
+    "SBJ00001/WGS/2021-04-08/SBJ00001.bam",
+    "SBJ00001/WGS/2021-04-08/SBJ00001.bam.bai",
+    "SBJ00001/WGS/2021-04-08/SBJ00001.vcf.gz",
+    "SBJ00001/WTS/2021-04-08/SBJ00001.bam",
+    "SBJ00002/WGS/2021-04-09/SBJ00002.bam",
+    "SBJ00002/WGS/2021-04-09/SBJ00002.vcf.gz",
+    "SBJ00003/sample_sheet.csv",
+]
+
+
+class S3CrawlerUnitTests(S3EventUnitTestCase):
+
+    def setUp(self) -> None:
+        super(S3CrawlerUnitTests, self).setUp()
+        self.checkpoint_dir = tempfile.mkdtemp()
+
+    def test_get_shards(self):
+        """
+        python manage.py test data_processors.s3.tests.test_crawler.S3CrawlerUnitTests.test_get_shards
+        """
+        lister = FakeS3Lister(KEYS)
+
+        shards = crawler.get_shards(lister, 'some-bucket', depth=1)
+        logger.info([str(s) for s in shards])
+        self.assertEqual(len(shards), 4)
+        self.assertIn(crawler.Shard("", recursive=False), shards)
+        self.assertIn(crawler.Shard("SBJ00001/"), shards)
+
+        shards = crawler.get_shards(lister, 'some-bucket', depth=2)
+        self.assertIn(crawler.Shard("SBJ00001/", recursive=False), shards)
+        self.assertIn(crawler.Shard("SBJ00001/WTS/"), shards)
+
+        # every key is covered by exactly one shard
+        for depth in range(4):
+            listed = []
+            for shard in crawler.get_shards(lister, 'some-bucket', depth=depth):
+                listed.extend([o['Key'] for o in lister.list_objects('some-bucket', shard.prefix, None, shard.delimiter)])
+            self.assertEqual(sorted(listed), sorted(KEYS))
+
+    def test_crawl_s3_objects(self):
+        """
+        python manage.py test data_processors.s3.tests.test_crawler.S3CrawlerUnitTests.test_crawl_s3_objects
+        """
+        results = crawler.crawl_s3_objects('some-bucket', lister=FakeS3Lister(KEYS), workers=3, batch_size=2,
+                                           shard_depth=2, checkpoint_dir=self.checkpoint_dir)
+        logger.info(dict(results))
+
+        self.assertEqual(results['indexed_count'], len(KEYS))
+        self.assertEqual(results['failed_shard_count'], 0)
+        self.assertEqual(S3Object.objects.filter(bucket='some-bucket').count(), len(KEYS))
+        self.assertEqual(S3Object.objects.get(key="README.md").e_tag, "d41d8cd98f00b204e9800998ecf8427e")
+        self.assertEqual(os.listdir(self.checkpoint_dir), [])
+
+        # bumped once per crawl, not per batch
+        self.assertEqual(CacheVersion.objects.get_version(subject_cache_key("SBJ00001")), 1)
+
+    def test_crawl_s3_objects_from_dir(self):
+        """
+        python manage.py test data_processors.s3.tests.test_crawler.S3CrawlerUnitTests.test_crawl_s3_objects_from_dir
+        """
+        root = tempfile.mkdtemp()
+        for key in KEYS:
+            os.makedirs(os.path.dirname(os.path.join(root, key)), exist_ok=True)
+            open(os.path.join(root, key), 'w').close()
+
+        results = crawler.crawl_s3_objects('some-bucket', lister=FakeS3Lister.from_dir(root), batch_size=1000)
+
+        self.assertEqual(results['indexed_count'], len(KEYS))
+        self.assertEqual(S3Object.objects.count(), len(KEYS))
+
+    def test_crawl_s3_objects_dry(self):
+        """
+        python manage.py test data_processors.s3.tests.test_crawler.S3CrawlerUnitTests.test_crawl_s3_objects_dry
+        """
+        results = crawler.crawl_s3_objects('some-bucket', lister=FakeS3Lister(KEYS), checkpoint_dir=self.checkpoint_dir,
+                                           dry=True)
+
+        self.assertEqual(results['indexed_count'], len(KEYS))
+        self.assertEqual(S3Object.objects.count(), 0)
+        self.assertEqual(os.listdir(self.checkpoint_dir), [])
+
+    def test_crawl_s3_objects_resume(self):
+        """
+        python manage.py test data_processors.s3.tests.test_crawler.S3CrawlerUnitTests.test_crawl_s3_objects_resume
+        """
+        failing_lister = FakeS3Lister(KEYS, fail_after="SBJ00001/WGS/2021-04-08/SBJ00001.bam.bai")
+
+        results = crawler.crawl_s3_objects('some-bucket', lister=failing_lister, workers=2, batch_size=1,
+                                           checkpoint_dir=self.checkpoint_dir)
+        logger.info(dict(results))
+
+        self.assertEqual(results['failed_shard_count'], 1)
+        self.assertEqual(len(os.listdir(self.checkpoint_dir)), 4)
+        self.assertEqual(S3Object.objects.count(), 6)
+
+        lister = FakeS3Lister(KEYS)
+        results = crawler.crawl_s3_objects('some-bucket', lister=lister, workers=2, batch_size=1,
+                                           checkpoint_dir=self.checkpoint_dir)
+        logger.info(dict(results))
+
+        # only the failed shard is listed again, and from where it stopped
+        self.assertEqual(results['skipped_shard_count'], 3)
+        self.assertEqual(results['resumed_shard_count'], 1)
+        self.assertEqual(results['indexed_count'], 2)
+        self.assertEqual(lister.list_calls, [("SBJ00001/", "SBJ00001/WGS/2021-04-08/SBJ00001.bam.bai", None)])
+        self.assertEqual(S3Object.objects.count(), len(KEYS))
+        self.assertEqual(os.listdir(self.checkpoint_dir), [])
+
+    def test_reconcile_s3_objects(self):
+        """
+        python manage.py test data_processors.s3.tests.test_crawler.S3CrawlerUnitTests.test_reconcile_s3_objects
+        """
+        keys = KEYS + ["sbj00001/lowercase.txt", "SBJ00001/WGS/2021-04-08/SBJ00001.BAM"]
+        lister = FakeS3Lister(keys)
+
+        def _create(key, size, last_modified_date=datetime(2024, 10, 16, tzinfo=timezone.utc)):
+            S3Object.objects.create(bucket='some-bucket', key=key, size=size, last_modified_date=last_modified_date,
+                                    e_tag="d41d8cd98f00b204e9800998ecf8427e")
+
+        for key in [KEYS[1], KEYS[2], KEYS[4], KEYS[5]]:
+            _create(key, len(key))
+        _create("SBJ00001/WGS/2021-04-08/SBJ00001.vcf.gz", 1)  # changed
+        _create("SBJ00001/WGS/2021-04-08/deleted.txt", 1)  # stale
+        _create("SBJ00009/WGS/2021-04-09/deleted.bam", 1)  # stale, prefix no longer exist in bucket
+        _create("SBJ00001/WGS/2021-04-08/SBJ00001.bai", 1, now() + timedelta(minutes=1))  # newer than reconcile
+        S3Object.objects.create(bucket='other-bucket', key="SBJ00009/other.txt", size=1, last_modified_date=now(),
+                                e_tag="")
+
+        results = crawler.reconcile_s3_objects('some-bucket', lister=lister, batch_size=2, chunk_size=2)
+        logger.info(dict(results))
+
+        self.assertEqual(results['inserted_count'], 5)
+        self.assertEqual(results['updated_count'], 1)
+        self.assertEqual(results['deleted_count'], 2)
+        self.assertEqual(results['unchanged_count'], 4)
+        self.assertEqual(results['skipped_count'], 1)
+
+        self.assertEqual(
+            sorted(S3Object.objects.filter(bucket='some-bucket').values_list('key', flat=True)),
+            sorted(keys + ["SBJ00001/WGS/2021-04-08/SBJ00001.bai"]),
+        )
+        self.assertEqual(S3Object.objects.get(key="SBJ00001/WGS/2021-04-08/SBJ00001.vcf.gz").size,
+                         len("SBJ00001/WGS/2021-04-08/SBJ00001.vcf.gz"))
+        self.assertTrue(S3Object.objects.filter(bucket='other-bucket').exists())
+
+        # converged
+        results = crawler.reconcile_s3_objects('some-bucket', lister=lister)
+        self.assertEqual(results['unchanged_count'], len(keys))
+        self.assertEqual(results['skipped_count'], 1)
+        self.assertEqual(sum(results.values()), len(keys) + 1)
+
+    def test_reconcile_s3_objects_mysql(self):
+        """
+        python manage.py test data_processors.s3.tests.test_crawler.S3CrawlerUnitTests.test_reconcile_s3_objects_mysql
+        """
+        keys = KEYS + ["sbj00001/lowercase.txt", "SBJ00001/WGS/2021-04-08/SBJ00001.BAM"]
+        for key in reversed(keys):
+            S3Object.objects.create(bucket='some-bucket', key=key, size=len(key), e_tag="d41d8cd98f00b204e9800998ecf8427e",
+                                    last_modified_date=datetime(2024, 10, 16, tzinfo=timezone.utc))
+
+        # db side is read by primary key chunks and external sorted, instead of ordered by db
+        tmp_dir = tempfile.mkdtemp()
+        with patch.object(connection, 'vendor', 'mysql'):
+            results = crawler.reconcile_s3_objects('some-bucket', lister=FakeS3Lister(keys), chunk_size=3,
+                                                   sort_chunk_size=2, tmp_dir=tmp_dir)
+
+        self.assertEqual(dict(results), {'unchanged_count': len(keys)})
+        self.assertEqual(os.listdir(tmp_dir), [])
+
+    def test_external_sort(self):
+        """
+        python manage.py test data_processors.s3.tests.test_crawler.S3CrawlerUnitTests.test_external_sort
+        """
+        items = [(random.randint(0, 1000), now()) for _ in range(100)]
+        tmp_dir = tempfile.mkdtemp()
+
+        for chunk_size in [1, 7, 100, 1000]:
+            sorted_items = list(crawler.external_sort(items, key=lambda i: i[0], chunk_size=chunk_size, tmp_dir=tmp_dir))
+            self.assertEqual(sorted_items, sorted(items, key=lambda i: i[0]))
+            self.assertEqual(os.listdir(tmp_dir), [])
+
+    def test_reconcile_s3_objects_dry(self):
+        """
+        python manage.py test data_processors.s3.tests.test_crawler.S3CrawlerUnitTests.test_reconcile_s3_objects_dry
+        """
+        S3Object.objects.create(bucket='some-bucket', key="deleted.txt", size=1, last_modified_date=now(), e_tag="")
+
+        results = crawler.reconcile_s3_objects('some-bucket', lister=FakeS3Lister(KEYS), dry=True)
+
+        self.assertEqual(results['inserted_count'], len(KEYS))
+        self.assertEqual(results['deleted_count'], 1)
+        self.assertEqual(S3Object.objects.count(), 1)
+
+    def test_reconcile_s3_objects_memory(self):
+        """
+        python manage.py test data_processors.s3.tests.test_crawler.S3CrawlerUnitTests.test_reconcile_s3_objects_memory
+        """
+        def _peak(size):
+            S3Object.objects.all().delete()
+            lister = FakeS3Lister([f"SBJ{i % 10:05d}/{i:08d}.bam" for i in range(size)])
+
+            tracemalloc.start()
+            crawler.reconcile_s3_objects('some-bucket', lister=lister, batch_size=100, chunk_size=100)
+            crawler.reconcile_s3_objects('some-bucket', lister=lister, batch_size=100, chunk_size=100)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            self.assertEqual(S3Object.objects.count(), size)
+            return peak
+
+        small, large = _peak(500), _peak(5000)
+        logger.info(f"Peak memory: {small} bytes for 500 objects, {large} bytes for 5000 objects")
+
+        self.assertLess(large, small * 2)
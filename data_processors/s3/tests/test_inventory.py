@@ -0,0 +1,258 @@
+import csv
+import gzip
+import os
+import tempfile
+import time
+from datetime import datetime, timezone, timedelta
+from unittest import skip, skipUnless
+from urllib.parse import quote_plus
+
+from libumccr import libjson
+
+from data_portal.models.s3object import S3Object
+from data_processors.s3 import inventory
+from data_processors.s3.tests.case import S3EventUnitTestCase, logger
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+CREATION_TIME = datetime(2024, 10, 16, 1, 0, tzinfo=timezone.utc)
+
+CSV_SCHEMA = "Bucket, Key, VersionId, IsLatest, IsDeleteMarker, Size, LastModifiedDate, ETag, StorageClass"
+PARQUET_SCHEMA = "message s3.inventory { required binary bucket (STRING); required binary key (STRING); " \
+                 "optional int64 size; optional int64 last_modified_date (TIMESTAMP(MILLIS,true)); " \
+                 "optional binary e_tag (STRING);}"
+
+
+def _make_inventory(rows_per_file, file_format="CSV", file_schema=None) -> str:
+    """
+    Generate S3 Inventory in the layout of `aws s3 sync` of the inventory destination prefix, i.e.
+        <root>/2024-10-16T01-00Z/manifest.json
+        <root>/data/<uuid>.csv.gz
+    :return: manifest path
+    """
+    root = tempfile.mkdtemp()
+    os.makedirs(os.path.join(root, "2024-10-16T01-00Z"))
+    os.makedirs(os.path.join(root, "data"))
+
+    files = []
+    for i, rows in enumerate(rows_per_file):
+        ext = "csv.gz" if file_format == "CSV" else file_format.lower()
+        file_key = f"some-bucket/daily/data/{i:04d}.{ext}"
+        data_file = os.path.join(root, "data", os.path.basename(file_key))
+
+        if file_format == "CSV":
+            with gzip.open(data_file, 'wt', newline='') as f:
+                writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+                for row in rows:
+                    writer.writerow([
+                        'some-bucket',
+                        quote_plus(row['key'], safe="/"),
+                        row.get('version_id', ''),
+                        str(row.get('is_latest', True)).lower(),
+                        str(row.get('is_delete_marker', False)).lower(),
+                        row['size'],
+                        row['last_modified_date'].strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                        row['e_tag'],
+                        "STANDARD",
+                    ])
+        else:
+            from pyarrow import parquet
+            parquet.write_table(pyarrow.Table.from_pylist(rows), data_file)
+
+        files.append({'key': file_key, 'size': os.path.getsize(data_file), 'MD5checksum': ""})
+
+    manifest = {
+        'sourceBucket': "some-bucket",
+        'destinationBucket': "arn:aws:s3:::some-inventory-bucket",
+        'version': "2016-11-30",
+        'creationTimestamp': str(int(CREATION_TIME.timestamp() * 1000)),
+        'fileFormat': file_format,
+        'fileSchema': file_schema or (CSV_SCHEMA if file_format == "CSV" else PARQUET_SCHEMA),
+        'files': files,
+    }
+
+    manifest_path = os.path.join(root, "2024-10-16T01-00Z", "manifest.json")
+    with open(manifest_path, 'w') as f:
+        f.write(libjson.dumps(manifest))
+
+    return manifest_path
+
+
+def _row(key, size=1, last_modified_date=CREATION_TIME - timedelta(days=1), **kwargs) -> dict:
+    return {'key': key, 'size': size, 'last_modified_date': last_modified_date, 'e_tag': f"etag{size}", **kwargs}
+
+
+def _generate_rows(size, files):
+    return [
+        [_row(f"SBJ{i % 1000:05d}/WGS/{i:09d}.bam", size=i) for i in range(f, size, files)] for f in range(files)
+    ]
+
+
+class S3InventoryUnitTests(S3EventUnitTestCase):
+
+    def test_manifest(self):
+        """
+        python manage.py test data_processors.s3.tests.test_inventory.S3InventoryUnitTests.test_manifest
+        """
+        manifest_path = _make_inventory([[_row("a.txt")], [_row("b.txt")]])
+
+        manifest = inventory.InventoryManifest(manifest_path)
+
+        self.assertEqual(manifest.source_bucket, "some-bucket")
+        self.assertEqual(manifest.creation_time, CREATION_TIME)
+        self.assertEqual(len(manifest.data_files), 2)
+        self.assertTrue(os.path.exists(manifest.data_files[0]))
+
+    def test_manifest_missing_fields(self):
+        """
+        python manage.py test data_processors.s3.tests.test_inventory.S3InventoryUnitTests.test_manifest_missing_fields
+        """
+        manifest_path = _make_inventory([[_row("a.txt")]], file_schema="Bucket, Key, Size, StorageClass")
+        with self.assertRaises(ValueError) as cm:
+            inventory.InventoryManifest(manifest_path)
+        self.assertIn("LastModifiedDate, ETag", str(cm.exception))
+
+        manifest_path = _make_inventory([], file_format="Parquet",
+                                        file_schema="message s3.inventory { required binary key (STRING);}")
+        with self.assertRaises(ValueError) as cm:
+            inventory.InventoryManifest(manifest_path)
+        self.assertIn("Size, LastModifiedDate, ETag", str(cm.exception))
+
+    def test_import_inventory(self):
+        """
+        python manage.py test data_processors.s3.tests.test_inventory.S3InventoryUnitTests.test_import_inventory
+        """
+        manifest_path = _make_inventory([
+            [
+                _row("SBJ00001/a b+c.txt"),
+                _row("SBJ00001/versioned.txt", size=2, version_id="v2", is_latest=True),
+                _row("SBJ00001/versioned.txt", size=1, version_id="v1", is_latest=False),
+                _row("SBJ00001/deleted.txt", version_id="v2", is_latest=True, is_delete_marker=True),
+            ],
+            [_row(f"SBJ00002/{i}.txt") for i in range(10)],
+        ])
+
+        results = inventory.import_inventory(inventory.InventoryManifest(manifest_path), batch_size=3)
+        logger.info(dict(results))
+
+        self.assertEqual(results['indexed_count'], 12)
+        self.assertEqual(S3Object.objects.count(), 12)
+        self.assertTrue(S3Object.objects.filter(key="SBJ00001/a b+c.txt").exists())
+        self.assertEqual(S3Object.objects.get(key="SBJ00001/versioned.txt").size, 2)
+        self.assertEqual(S3Object.objects.get(key="SBJ00001/versioned.txt").e_tag, "etag2")
+
+        # upsert on re-import
+        results = inventory.import_inventory(inventory.InventoryManifest(manifest_path), batch_size=3)
+        self.assertEqual(results['indexed_count'], 12)
+        self.assertEqual(S3Object.objects.count(), 12)
+
+    def test_import_inventory_reconcile(self):
+        """
+        python manage.py test data_processors.s3.tests.test_inventory.S3InventoryUnitTests.test_import_inventory_reconcile
+        """
+        manifest_path = _make_inventory([
+            [_row("SBJ00002/b.txt"), _row("SBJ00001/a.txt", size=2), _row("README.md")],
+            [_row("SBJ00003/c.txt"), _row("SBJ00001/b.txt")],
+        ])
+
+        def _create(key, size=1, last_modified_date=CREATION_TIME - timedelta(days=2)):
+            S3Object.objects.create(bucket='some-bucket', key=key, size=size, last_modified_date=last_modified_date,
+                                    e_tag=f"etag{size}")
+
+        _create("SBJ00001/a.txt", size=1)  # changed
+        _create("SBJ00001/b.txt")  # unchanged
+        _create("SBJ00001/deleted.txt")  # deleted before inventory was taken
+        _create("SBJ00004/created.txt", last_modified_date=CREATION_TIME + timedelta(hours=1))  # after inventory
+
+        tmp_dir = tempfile.mkdtemp()
+        results = inventory.import_inventory(inventory.InventoryManifest(manifest_path), reconcile=True, batch_size=2,
+                                             sort_chunk_size=2, tmp_dir=tmp_dir)
+        logger.info(dict(results))
+
+        self.assertEqual(results['inserted_count'], 3)
+        self.assertEqual(results['updated_count'], 1)
+        self.assertEqual(results['unchanged_count'], 1)
+        self.assertEqual(results['deleted_count'], 1)
+        self.assertEqual(results['skipped_count'], 1)
+        self.assertEqual(
+            sorted(S3Object.objects.values_list('key', flat=True)),
+            ["README.md", "SBJ00001/a.txt", "SBJ00001/b.txt", "SBJ00002/b.txt", "SBJ00003/c.txt",
+             "SBJ00004/created.txt"],
+        )
+        self.assertEqual(S3Object.objects.get(key="SBJ00001/a.txt").size, 2)
+
+        # sorted runs are cleaned up
+        self.assertEqual(os.listdir(tmp_dir), [])
+
+    def test_inventory_s3_lister(self):
+        """
+        python manage.py test data_processors.s3.tests.test_inventory.S3InventoryUnitTests.test_inventory_s3_lister
+        """
+        rows_per_file = _generate_rows(100, 3)
+        lister = inventory.InventoryS3Lister(inventory.InventoryManifest(_make_inventory(rows_per_file)),
+                                             sort_chunk_size=7)
+
+        keys = [obj['Key'] for obj in lister.list_objects("some-bucket", "")]
+        self.assertEqual(keys, sorted(row['key'] for rows in rows_per_file for row in rows))
+
+        keys = [obj['Key'] for obj in lister.list_objects("some-bucket", "SBJ00001/", start_after=keys[0])]
+        self.assertEqual(keys, ["SBJ00001/WGS/000000001.bam"])
+
+        self.assertEqual(len(lister.list_common_prefixes("some-bucket", "")), 100)
+        self.assertEqual(lister.list_common_prefixes("some-bucket", "SBJ00001/"), ["SBJ00001/WGS/"])
+
+    @skipUnless(pyarrow, "pyarrow is not installed")
+    def test_import_inventory_parquet(self):
+        """
+        python manage.py test data_processors.s3.tests.test_inventory.S3InventoryUnitTests.test_import_inventory_parquet
+        """
+        manifest_path = _make_inventory([
+            [
+                {'bucket': "some-bucket", **_row("SBJ00001/a b+c.txt")},
+                {'bucket': "some-bucket", **_row("SBJ00001/b.txt")},
+            ],
+        ], file_format="Parquet")
+
+        results = inventory.import_inventory(inventory.InventoryManifest(manifest_path))
+
+        self.assertEqual(results['indexed_count'], 2)
+        self.assertTrue(S3Object.objects.filter(key="SBJ00001/a b+c.txt").exists())
+
+
+@skip
+class S3InventoryBenchmarkTests(S3EventUnitTestCase):
+    # benchmark is manual run, comment @skip and run against the database backend of interest i.e.
+    #   export DJANGO_SETTINGS_MODULE=data_portal.settings.local   (MySQL, see docker-compose.yml)
+    #   export DJANGO_SETTINGS_MODULE=data_portal.settings.it PORTAL_DB_URL=sqlite:////tmp/portal.sqlite3
+    # and keep decorated @skip after run
+
+    def test_benchmark_import_inventory(self):
+        """
+        python manage.py test data_processors.s3.tests.test_inventory.S3InventoryBenchmarkTests.test_benchmark_import_inventory
+        """
+        size = 200000
+        manifest = inventory.InventoryManifest(_make_inventory(_generate_rows(size, 8)))
+
+        start = time.perf_counter()
+        for _ in manifest.iter_batches():
+            pass
+        read_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        inventory.import_inventory(manifest)
+        load_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = inventory.import_inventory(manifest, reconcile=True)
+        reconcile_elapsed = time.perf_counter() - start
+
+        logger.info(f"{size} objects in {len(manifest.data_files)} CSV data files")
+        logger.info(f"read:      {read_elapsed:.2f}s, {size / read_elapsed:.0f} objects/s")
+        logger.info(f"load:      {load_elapsed:.2f}s, {size / load_elapsed:.0f} objects/s")
+        logger.info(f"reconcile: {reconcile_elapsed:.2f}s, {size / reconcile_elapsed:.0f} objects/s")
+
+        self.assertEqual(S3Object.objects.count(), size)
+        self.assertEqual(results['unchanged_count'], size)
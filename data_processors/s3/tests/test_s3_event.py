@@ -1,5 +1,10 @@
+import copy
 import json
 import logging
+import time
+from unittest import skip
+
+from dateutil.parser import parse
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.test.utils import override_settings
@@ -139,7 +144,8 @@ class S3EventUnitTests(S3EventUnitTestCase):
         key_to_delete = 'to-delete.json'
 
         # Create an S3Object first with the key to be deleted
-        s3_object = S3Object(bucket=bucket_name, key=key_to_delete, size=0, last_modified_date=now(), e_tag='')
+        s3_object = S3Object(bucket=bucket_name, key=key_to_delete, size=0,
+                             last_modified_date=parse("2018-12-31T00:00:00.000Z"), e_tag='')
         s3_object.save()
 
         # Create the s3-lims association between the lims row and s3 object (to be deleted)
@@ -292,7 +298,7 @@ class S3EventUnitTests(S3EventUnitTestCase):
             bucket='pipeline-dev-cache-987654321987-ap-southeast-2',
             key='byob-icav2/.iap_upload_test.tmp',
             size=123,
-            last_modified_date=now(),
+            last_modified_date=parse("2024-06-19T07:00:00Z"),
             e_tag='',
         )
 
@@ -309,6 +315,97 @@ class S3EventUnitTests(S3EventUnitTestCase):
         logger.info(json.dumps(results))
         self.assertEqual(results['removed_count'], 0)
 
+    def test_parse_raw_s3_event_records_sns_wrapped(self):
+        """
+        python manage.py test data_processors.s3.tests.test_s3_event.S3EventUnitTests.test_parse_raw_s3_event_records_sns_wrapped
+        """
+        message = copy.deepcopy(mock_report_event['Records'][0])
+        message['body'] = json.dumps({
+            'Type': "Notification",
+            'MessageId': "d2a4b1c8-3b5b-5b8a-9c2b-6c1e8f0e3a11",
+            'TopicArn': "arn:aws:sns:ap-southeast-2:123456789123:s3-event-topic",
+            'Message': mock_report_event['Records'][0]['body'],
+        })
+
+        s3_event_records = s3_event.parse_raw_s3_event_records([message])['s3_event_records']
+
+        self.assertEqual(len(s3_event_records), 1)
+        self.assertEqual(s3_event_records[0].s3_bucket_name, "primary-data-dev")
+
+    def test_parse_event_time(self):
+        """
+        python manage.py test data_processors.s3.tests.test_s3_event.S3EventUnitTests.test_parse_event_time
+        """
+        for value in [
+            "2021-04-18T12:35:17.716Z",
+            "2024-06-20T18:49:05Z",
+            "2019-01-01T00:00:00.000Z",
+            "2021-04-18T12:35:17.716123+10:00",
+            "2021-04-18 12:35:17Z",
+            "Sun, 18 Apr 2021 12:35:17 GMT",  # not ISO-8601, fall back to dateutil
+        ]:
+            self.assertEqual(s3_event.parse_event_time(value), parse(value), value)
+
+    def test_summarize_event(self):
+        """
+        python manage.py test data_processors.s3.tests.test_s3_event.S3EventUnitTests.test_summarize_event
+        """
+        summary = s3_event.summarize_event(mock_report_event)
+        logger.info(summary)
+        self.assertIn("Received 1 messages", summary)
+        self.assertIn("arn:aws:sqs:ap-southeast-2:123456789123:s3-event-queue", summary)
+
+        event = {'Records': mock_report_event['Records'] * 10000}
+        summary = s3_event.summarize_event(event, max_length=100)
+        self.assertIn("Received 10000 messages", summary)
+        self.assertLess(len(summary), 500)
+
+        self.assertIn("Received 0 messages", s3_event.summarize_event({}))
+
+
+@skip
+class S3EventBenchmarkTests(S3EventUnitTestCase):
+    # benchmark is manual run, comment @skip and run i.e.
+    #   python manage.py test data_processors.s3.tests.test_s3_event.S3EventBenchmarkTests
+    # and keep decorated @skip after run
+
+    def test_benchmark_parse_raw_s3_event_records(self):
+        """
+        python manage.py test data_processors.s3.tests.test_s3_event.S3EventBenchmarkTests.test_benchmark_parse_raw_s3_event_records
+        """
+        size = 10000
+        messages = (mock_report_event['Records'] + mock_eventbridge_s3_event_object_created['Records']) * (size // 2)
+        event = {'Records': messages}
+        event_times = [json.loads(m['body']).get('time', "2021-04-18T12:35:17.716Z") for m in messages]
+
+        start = time.perf_counter()
+        for value in event_times:
+            parse(value)
+        dateutil_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for value in event_times:
+            s3_event.parse_event_time(value)
+        fast_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        s3_event.parse_raw_s3_event_records(messages)
+        parse_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dump = json.dumps(event)
+        dump_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        summary = s3_event.summarize_event(event)
+        summary_elapsed = time.perf_counter() - start
+
+        logger.info(f"{size} messages")
+        logger.info(f"event time dateutil: {dateutil_elapsed * 1000:.1f}ms, fromisoformat: {fast_elapsed * 1000:.1f}ms")
+        logger.info(f"parse_raw_s3_event_records: {parse_elapsed * 1000:.1f}ms, {size / parse_elapsed:.0f} messages/s")
+        logger.info(f"log event dumps: {dump_elapsed * 1000:.1f}ms ({len(dump)} chars), "
+                    f"summary: {summary_elapsed * 1000:.1f}ms ({len(summary)} chars)")
+
 
 class S3EventIntegrationTests(S3EventIntegrationTestCase):
     # integration test hit actual File or API endpoint, thus, manual run in most cases
@@ -0,0 +1,329 @@
+import random
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from libumccr.aws import libs3
+
+from data_portal.models import AnalysisResult
+from data_portal.models.cacheversion import CacheVersion, subject_cache_key
+from data_portal.models.s3object import S3Object, S3ObjectTombstone
+from data_portal.models.storagestat import StorageStat, StorageStatSource
+from data_processors.const import S3EventRecord
+from data_processors.s3 import services, crawler
+from data_processors.s3.tests.case import S3EventUnitTestCase
+
+
+def _record(event_type, event_time, key, bucket='some-bucket', size=1, sequencer=None) -> S3EventRecord:
+    s3_object_meta = {'key': key, 'size': size, 'eTag': f"etag{size}"}
+    if sequencer:
+        s3_object_meta['sequencer'] = sequencer
+    return S3EventRecord(event_type, event_time, bucket, s3_object_meta)
+
+
+class S3ServicesUnitTests(S3EventUnitTestCase):
+
+    def test_coalesce_s3_event_records(self):
+        """
+        python manage.py test data_processors.s3.tests.test_services.S3ServicesUnitTests.test_coalesce_s3_event_records
+        """
+        t0 = now()
+        records = [
+            _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0, 'a.txt', size=1),
+            _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0, 'b.txt', size=1),
+            _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0 + timedelta(seconds=1), 'a.txt', size=2),
+            _record(libs3.S3EventType.EVENT_UNSUPPORTED, t0, 'a.txt'),
+            _record(libs3.S3EventType.EVENT_OBJECT_REMOVED, t0 + timedelta(seconds=2), 'a.txt'),
+            _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0, 'a.txt', bucket='other-bucket'),
+        ]
+
+        coalesced = services.coalesce_s3_event_records(records)
+
+        self.assertEqual(len(coalesced), 4)
+        self.assertEqual(coalesced[0].event_type, libs3.S3EventType.EVENT_OBJECT_REMOVED)
+        self.assertEqual(coalesced[0].s3_object_meta['key'], 'a.txt')
+        self.assertEqual(coalesced[1].s3_object_meta['key'], 'b.txt')
+        self.assertEqual(coalesced[2].s3_bucket_name, 'other-bucket')
+        self.assertEqual(coalesced[3].event_type, libs3.S3EventType.EVENT_UNSUPPORTED)
+
+    def test_coalesce_s3_event_records_by_sequencer(self):
+        """
+        python manage.py test data_processors.s3.tests.test_services.S3ServicesUnitTests.test_coalesce_s3_event_records_by_sequencer
+        """
+        t0 = now()
+        records = [
+            # late delivery of the newer event, with the same event time
+            _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0, 'a.txt', size=2, sequencer='0066728E192EA8FA5F'),
+            _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0, 'a.txt', size=1, sequencer='0066728E192EA8FA5E'),
+            # shorter sequencer is right padded with zeros before comparison
+            _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0, 'b.txt', size=1, sequencer='0066728E192EA8FA'),
+            _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0, 'b.txt', size=2, sequencer='0066728E192EA8FA01'),
+        ]
+
+        coalesced = services.coalesce_s3_event_records(records)
+
+        self.assertEqual(len(coalesced), 2)
+        self.assertEqual(coalesced[0].s3_object_meta['size'], 2)
+        self.assertEqual(coalesced[1].s3_object_meta['size'], 2)
+
+    def test_sync_s3_event_records_coalesced(self):
+        """
+        python manage.py test data_processors.s3.tests.test_services.S3ServicesUnitTests.test_sync_s3_event_records_coalesced
+        """
+        t0 = now()
+        S3Object.objects.create(bucket='some-bucket', key='a.txt', size=0, last_modified_date=t0, e_tag='')
+
+        records = [
+            _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0 + timedelta(seconds=1), 'a.txt', size=1),
+            _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0 + timedelta(seconds=2), 'a.txt', size=2),
+            _record(libs3.S3EventType.EVENT_OBJECT_REMOVED, t0 + timedelta(seconds=3), 'a.txt'),
+        ]
+
+        results = services.sync_s3_event_records(records)
+
+        self.assertEqual(results['coalesced_count'], 2)
+        self.assertEqual(results['removed_count'], 1)
+        self.assertEqual(results['created_count'], 0)
+        self.assertFalse(S3Object.objects.filter(key='a.txt').exists())
+
+    def test_delete_s3_object_bulk(self):
+        """
+        python manage.py test data_processors.s3.tests.test_services.S3ServicesUnitTests.test_delete_s3_object_bulk
+        """
+        s3_object = S3Object.objects.create(bucket='some-bucket', key='a.txt', size=0, last_modified_date=now(), e_tag='')
+        S3Object.objects.create(bucket='some-bucket', key='b.txt', size=0, last_modified_date=now(), e_tag='')
+        S3Object.objects.create(bucket='some-bucket', key='retain.txt', size=0, last_modified_date=now(), e_tag='')
+
+        analysis_result = AnalysisResult.objects.create(key='SBJ00001', gen=0, method=0)
+        analysis_result.s3objects.add(s3_object)
+
+        removed_count, _ = services.delete_s3_object_bulk([
+            ('some-bucket', 'a.txt'),
+            ('some-bucket', 'b.txt'),
+            ('some-bucket', 'non-existent.txt'),
+        ])
+
+        self.assertEqual(removed_count, 2)
+        self.assertEqual(S3Object.objects.count(), 1)
+        self.assertEqual(AnalysisResult.objects.count(), 1)
+        self.assertEqual(AnalysisResult.objects.get(key='SBJ00001').s3objects.count(), 0)
+
+    def test_delete_s3_object_bulk_query_count(self):
+        """
+        python manage.py test data_processors.s3.tests.test_services.S3ServicesUnitTests.test_delete_s3_object_bulk_query_count
+        """
+        keys = [f"run/{i}.txt" for i in range(50)]
+        for key in keys:
+            S3Object.objects.create(bucket='some-bucket', key=key, size=0, last_modified_date=now(), e_tag='')
+        # storage stat row of the bucket is there, as of after its first sync
+        StorageStat.objects.create(source=StorageStatSource.S3, name='some-bucket', object_count=50)
+
+        with CaptureQueriesContext(connection) as single:
+            services.delete_s3_object_bulk([('some-bucket', keys[0])])
+
+        with CaptureQueriesContext(connection) as many:
+            services.delete_s3_object_bulk([('some-bucket', key) for key in keys[1:]])
+
+        self.assertEqual(len(single), len(many))
+        self.assertEqual(S3Object.objects.count(), 0)
+
+    def test_sync_s3_event_records_storage_stat(self):
+        """
+        python manage.py test data_processors.s3.tests.test_services.S3ServicesUnitTests.test_sync_s3_event_records_storage_stat
+        """
+        t0 = now()
+        for bucket in ['bucket-b', 'bucket-a']:
+            S3Object.objects.create(bucket=bucket, key='removed.txt', size=5, last_modified_date=t0, e_tag='')
+            StorageStat.objects.create(source=StorageStatSource.S3, name=bucket, object_count=1, total_bytes=5)
+
+        with CaptureQueriesContext(connection) as ctx:
+            services.sync_s3_event_records([
+                _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0, 'a.txt', bucket='bucket-b', size=2),
+                _record(libs3.S3EventType.EVENT_OBJECT_REMOVED, t0, 'removed.txt', bucket='bucket-b'),
+                _record(libs3.S3EventType.EVENT_OBJECT_REMOVED, t0, 'removed.txt', bucket='bucket-a'),
+                _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0, 'a.txt', bucket='bucket-a', size=3),
+            ])
+
+        # one update per bucket, in name order, after all the writes of the batch
+        sql_list = [q['sql'] for q in ctx.captured_queries]
+        stat_sql_list = [sql for sql in sql_list if 'data_portal_storagestat' in sql]
+        self.assertEqual(len(stat_sql_list), 2)
+        self.assertIn("'bucket-a'", stat_sql_list[0])
+        self.assertIn("'bucket-b'", stat_sql_list[1])
+        last_write = max(i for i, sql in enumerate(sql_list) if 'data_portal_s3object' in sql)
+        self.assertGreater(sql_list.index(stat_sql_list[0]), last_write)
+
+        stats = StorageStat.objects.filter(source=StorageStatSource.S3).order_by('name')
+        self.assertEqual([(s.name, s.object_count, s.total_bytes) for s in stats], [
+            ('bucket-a', 1, 3), ('bucket-b', 1, 2),
+        ])
+
+    def test_sync_s3_event_records_cache_version(self):
+        """
+        python manage.py test data_processors.s3.tests.test_services.S3ServicesUnitTests.test_sync_s3_event_records_cache_version
+        """
+        t0 = now()
+        S3Object.objects.create(bucket='some-bucket', key='Project/SBJ00002/WGS/2020-01-01/final/SBJ00002-ready.bam',
+                                size=1, last_modified_date=t0, e_tag='')
+
+        with CaptureQueriesContext(connection) as ctx:
+            services.sync_s3_event_records([
+                _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0,
+                        'Project/SBJ00001/WGS/2020-01-01/final/SBJ00001-ready.bam'),
+                _record(libs3.S3EventType.EVENT_OBJECT_REMOVED, t0,
+                        'Project/SBJ00002/WGS/2020-01-01/final/SBJ00002-ready.bam'),
+            ])
+
+        # both subjects in one bump, i.e. one insert and one update, as the last statements
+        sql_list = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+        cache_sql_list = [sql for sql in sql_list if 'data_portal_cacheversion' in sql]
+        self.assertEqual(len(cache_sql_list), 2)
+        self.assertEqual(sql_list[-len(cache_sql_list):], cache_sql_list)
+        for subject_id in ['SBJ00001', 'SBJ00002']:
+            self.assertEqual(CacheVersion.objects.get_version(subject_cache_key(subject_id)), 1)
+
+    def test_sync_s3_event_records_stale_remove(self):
+        """
+        python manage.py test data_processors.s3.tests.test_services.S3ServicesUnitTests.test_sync_s3_event_records_stale_remove
+        """
+        t0 = now()
+        services.sync_s3_event_records([
+            _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0, 'a.txt', size=2, sequencer='0066728E192EA8FA02'),
+        ])
+
+        # delete that happened before the re-create is delivered late
+        results = services.sync_s3_event_records([
+            _record(libs3.S3EventType.EVENT_OBJECT_REMOVED, t0, 'a.txt', sequencer='0066728E192EA8FA01'),
+        ])
+
+        self.assertEqual(results['stale_count'], 1)
+        self.assertEqual(results['removed_count'], 0)
+        self.assertEqual(S3Object.objects.get(key='a.txt').size, 2)
+
+    def test_sync_s3_event_records_stale_create(self):
+        """
+        python manage.py test data_processors.s3.tests.test_services.S3ServicesUnitTests.test_sync_s3_event_records_stale_create
+        """
+        t0 = now()
+        S3Object.objects.create(bucket='some-bucket', key='a.txt', size=1, last_modified_date=t0, e_tag='')
+
+        services.sync_s3_event_records([
+            _record(libs3.S3EventType.EVENT_OBJECT_REMOVED, t0 + timedelta(seconds=2), 'a.txt'),
+        ])
+        self.assertEqual(S3ObjectTombstone.objects.count(), 1)
+
+        # create that happened before the delete is delivered late, must not resurrect the object
+        results = services.sync_s3_event_records([
+            _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0 + timedelta(seconds=1), 'a.txt', size=3),
+        ])
+
+        self.assertEqual(results['stale_count'], 1)
+        self.assertFalse(S3Object.objects.filter(key='a.txt').exists())
+
+        # whereas newer create does, and clears the tombstone
+        services.sync_s3_event_records([
+            _record(libs3.S3EventType.EVENT_OBJECT_CREATED, t0 + timedelta(seconds=3), 'a.txt', size=4),
+        ])
+
+        self.assertEqual(S3Object.objects.get(key='a.txt').size, 4)
+        self.assertEqual(S3ObjectTombstone.objects.count(), 0)
+
+    def test_sync_s3_event_records_shuffled_replay(self):
+        """
+        python manage.py test data_processors.s3.tests.test_services.S3ServicesUnitTests.test_sync_s3_event_records_shuffled_replay
+        """
+        t0 = now()
+        rand = random.Random(20241016)
+
+        # event stream of several keys, each goes through a random sequence of create, overwrite and delete
+        stream = []
+        expected = {}
+        seq = 0x0066728E192EA8FA00
+        for k in range(10):
+            key = f"run/{k}.txt"
+            for n in range(rand.randint(1, 8)):
+                seq += rand.randint(1, 1000)
+                event_type = rand.choice([libs3.S3EventType.EVENT_OBJECT_CREATED, libs3.S3EventType.EVENT_OBJECT_REMOVED])
+                rec = _record(event_type, t0, key, size=n, sequencer=format(seq, 'X').zfill(18))
+                stream.append(rec)
+                expected[key] = n if event_type == libs3.S3EventType.EVENT_OBJECT_CREATED else None
+
+        for _ in range(5):
+            S3Object.objects.all().delete()
+            S3ObjectTombstone.objects.all().delete()
+
+            # shuffle, duplicate some deliveries and, replay in random sized batches
+            replay = stream + rand.sample(stream, len(stream) // 3)
+            rand.shuffle(replay)
+            while replay:
+                batch_size = rand.randint(1, 10)
+                services.sync_s3_event_records(replay[:batch_size])
+                replay = replay[batch_size:]
+
+            for key, size in expected.items():
+                qs = S3Object.objects.filter(bucket='some-bucket', key=key)
+                if size is None:
+                    self.assertFalse(qs.exists(), key)
+                else:
+                    self.assertEqual(qs.get().size, size, key)
+
+    def test_sync_s3_event_records_shuffled_replay_with_crawl(self):
+        """
+        python manage.py test data_processors.s3.tests.test_services.S3ServicesUnitTests.test_sync_s3_event_records_shuffled_replay_with_crawl
+        """
+        t0 = now().replace(microsecond=0)
+        rand = random.Random(20241017)
+        keys = [f"run/{k}.txt" for k in range(10)]
+
+        # event stream interleaving the keys, a second apart as listing has second precision of last modified date
+        stream = []
+        seq = 0x0066728E192EA8FA00
+        for i in range(60):
+            seq += rand.randint(1, 1000)
+            event_type = rand.choice([libs3.S3EventType.EVENT_OBJECT_CREATED, libs3.S3EventType.EVENT_OBJECT_REMOVED])
+            stream.append(_record(event_type, t0 + timedelta(seconds=i), rand.choice(keys), size=i,
+                                  sequencer=format(seq, 'X').zfill(18)))
+        stream_index = {id(rec): i for i, rec in enumerate(stream)}
+
+        def _listing(cut):
+            """S3 listing as of after stream[:cut], i.e. without sequencer"""
+            state = {}
+            for rec in stream[:cut]:
+                if rec.event_type == libs3.S3EventType.EVENT_OBJECT_CREATED:
+                    state[rec.s3_object_meta['key']] = rec
+                else:
+                    state.pop(rec.s3_object_meta['key'], None)
+            return [
+                {'Key': key, 'LastModified': rec.event_time, 'ETag': f'"{rec.s3_object_meta["eTag"]}"',
+                 'Size': rec.s3_object_meta['size']}
+                for key, rec in state.items()
+            ]
+
+        expected = _listing(len(stream))
+
+        for _ in range(5):
+            S3Object.objects.all().delete()
+            S3ObjectTombstone.objects.all().delete()
+
+            replay = stream + rand.sample(stream, len(stream) // 3)
+            rand.shuffle(replay)
+            crawl_at = rand.randint(1, len(replay) - 1)
+
+            delivered = 0
+            last_happened = 0
+            while replay:
+                batch_size = min(rand.randint(1, 10), len(replay))
+                if delivered < crawl_at <= delivered + batch_size:
+                    # crawl lists S3 as of some time after the events delivered so far have happened
+                    cut = last_happened + rand.randint(1, 5)
+                    services.persist_s3_object_bulk([crawler.to_s3_object('some-bucket', obj) for obj in _listing(cut)])
+                services.sync_s3_event_records(replay[:batch_size])
+                last_happened = max([last_happened] + [stream_index[id(rec)] + 1 for rec in replay[:batch_size]])
+                delivered += batch_size
+                replay = replay[batch_size:]
+
+            self.assertEqual(
+                sorted(S3Object.objects.filter(bucket='some-bucket').values_list('key', 'size')),
+                sorted((obj['Key'], obj['Size']) for obj in expected),
+            )